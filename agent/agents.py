@@ -1,61 +1,408 @@
-from typing import List, Dict, Any, Optional
-from .prompts import FilteringPrompt, CategoryPrompt, RecommendPrompt
+from typing import List, Dict, Any, Optional, Callable, Tuple
+from .prompts import (FilteringPrompt, CategoryPrompt, PackedCategoryPrompt, RecommendPrompt, ClusterLabelPrompt,
+                      HashtagPrompt, count_tokens)
 from dotenv import load_dotenv
 import os
-from langchain_openai import AzureChatOpenAI
+import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from utils.concurrency import RateLimiter, CircuitBreaker, backoff_delay
+from .llm import LLM_TIMEOUT, get_llm, get_llm_name, structured_llm
+from .ledger import get_ledger
 # from langchain.callbacks.tracers.langsmith import LangSmithTracer
 
 # .env 파일에서 환경 변수 로드
 load_dotenv()
 
-llm = AzureChatOpenAI(
-    openai_api_key=os.getenv("AOAI_API_KEY"),
-    azure_endpoint=os.getenv("AOAI_ENDPOINT"),
-    azure_deployment=os.getenv("AOAI_DEPLOY_GPT4O_MINI"),
-    api_version="2024-08-01-preview",
-    temperature=0.5,
+# 배포 단위 분당 요청/토큰 한도 (같은 배포를 쓰는 모든 에이전트가 공유, 0이면 제한 없음)
+llm_rate_limiter = RateLimiter(
+    rpm=int(os.getenv("AOAI_RPM", "0")),
+    tpm=int(os.getenv("AOAI_TPM", "0")),
 )
 
-class CategorizeAgent:
+# 429/5xx/시간 초과 재시도 (지수 백오프 + jitter) 설정
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE = float(os.getenv("LLM_RETRY_BASE", "0.5"))
+LLM_RETRY_MAX = float(os.getenv("LLM_RETRY_MAX", "8"))
+# 재시도를 포함한 LLM 호출 한 번의 전체 시간 제한(초)
+LLM_CALL_DEADLINE = float(os.getenv("LLM_CALL_DEADLINE", "60"))
+# 전체 시간 제한이 이만큼(초)도 남지 않았으면 다음 시도를 시작하지 않음
+LLM_MIN_ATTEMPT_SECONDS = float(os.getenv("LLM_MIN_ATTEMPT_SECONDS", "1"))
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {"APITimeoutError", "APIConnectionError", "Timeout", "TimeoutException", "ConnectTimeout",
+                    "ReadTimeout", "ConnectError", "RemoteProtocolError"}
+
+
+class LLMUnavailableError(RuntimeError):
+    """LLM 엔드포인트가 비정상이라 circuit breaker가 호출을 막은 경우"""
+
+
+def _record_transition(previous: str, state: str) -> None:
+    print(f"LLM circuit breaker: {previous} -> {state}")
+    ledger = get_ledger()
+    if ledger is not None:
+        ledger.record("llm", f"circuit_{state}", ok=state != CircuitBreaker.OPEN)
+
+
+# 배포 단위 circuit breaker (연속 실패 시 reset 시간 동안 LLM 호출 없이 검색 결과만 사용)
+llm_circuit_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+    reset_seconds=float(os.getenv("LLM_BREAKER_RESET", "30")),
+    on_transition=_record_transition,
+)
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """다시 시도할 만한 오류인지 (429/5xx 응답, 시간 초과, 연결 오류)"""
+    if getattr(error, "status_code", None) in RETRYABLE_STATUS:
+        return True
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+
+def attempt_timeout(remaining: float) -> Optional[float]:
+    """호출 전체 시간 제한까지 remaining초 남았을 때 요청 한 번의 시간 제한 (None이면 클라이언트의 LLM_TIMEOUT)
+
+    structured_llm이 시간 제한별로 러너블을 캐시하므로 1초 이상은 초 단위, 1초 미만은 0.1초 단위로 내림합니다.
+    """
+    if remaining >= LLM_TIMEOUT:
+        return None
+    if remaining >= 1:
+        return float(int(remaining))
+    return max(0.1, int(remaining * 10) / 10)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """할당량 초과(429) 오류인지 (엔드포인트 장애가 아니라 백오프 대상)"""
+    if getattr(error, "status_code", None) == 429:
+        return True
+    return any(cls.__name__ == "RateLimitError" for cls in type(error).__mro__)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """응답의 Retry-After 헤더(초) (없으면 None)"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        return None
+    return None
+
+# 카테고리 분류 응답(JSON) 토큰 예상치 (TPM 계산용)
+CATEGORY_OUTPUT_TOKENS = 150
+# 필터링 응답에서 북마크 한 개당 토큰 예상치 (인덱스 + 이유 한 줄)
+FILTER_OUTPUT_TOKENS_PER_BOOKMARK = 40
+# 필터링 이유 앞의 청크 안 번호 (예: "3 / O / 여행 관련 게시물입니다.")
+REASON_INDEX_PATTERN = re.compile(r"\s*\[?(?:index:\s*)?(\d+)")
+
+def llm_model_name(llm) -> str:
+    """캐시 키용 모델(배포) 이름"""
+    return str(getattr(llm, "deployment_name", None) or getattr(llm, "model_name", ""))
+
+class LLMAgent:
+    """에이전트 공통: self.llm은 처음 사용할 때 프로세스 전역 클라이언트(get_llm)를 가져옵니다.
+
+    벤치마크처럼 agent.llm에 다른 LLM 객체를 대입하면 그 객체를 사용합니다.
+    LLM 호출은 _invoke_structured로 실행해 지연시간/토큰/오류를 LLM 호출 기록(get_ledger)에 남깁니다.
+    """
+    # LLM 호출 기록의 agent 이름
+    agent_name = "agent"
+    # 검색 한 번처럼 여러 호출을 묶어 집계할 때 설정 (ledger.new_trace_id())
+    trace_id = None
+    _llm = None
+
+    @property
+    def llm(self):
+        return self._llm if self._llm is not None else get_llm()
+
+    @llm.setter
+    def llm(self, value):
+        self._llm = value
+
+    @property
+    def model_name(self) -> str:
+        """캐시 키/호출 기록용 모델 이름 (프로세스 전역 클라이언트를 쓰면 클라이언트를 만들지 않고 설정에서 읽음)"""
+        return llm_model_name(self._llm) if self._llm is not None else get_llm_name()
+
+    def structured(self, schema: type, timeout: Optional[float] = None):
+        """스키마(와 요청 시간 제한)별로 한 번 만든 with_structured_output 러너블"""
+        return structured_llm(schema, self.llm, timeout)
+
+    def record_usage(self, operation: str, **fields) -> None:
+        """LLM 호출 기록에 한 건을 남깁니다. (기록기가 없으면 무시)"""
+        ledger = get_ledger()
+        if ledger is not None:
+            ledger.record(self.agent_name, operation, model=self.model_name, trace_id=self.trace_id, **fields)
+
+    def _invoke_structured(self, schema: type, chat_messages: List[Dict[str, str]], operation: str,
+                           items: int = 1, retries: int = 0, deadline: Optional[float] = None):
+        """구조화된 출력으로 LLM을 호출하고 시도마다 호출 기록을 남깁니다.
+
+        429/5xx/시간 초과/연결 오류는 지수 백오프(+jitter, Retry-After 우선)로 최대 LLM_MAX_RETRIES번 다시 시도합니다.
+        시도마다 요청 시간 제한을 min(LLM_TIMEOUT, deadline까지 남은 시간)으로 줄여 재시도를 포함한 전체 시간이
+        deadline(초, 기본 LLM_CALL_DEADLINE)을 넘지 않게 하고, 남은 시간이 LLM_MIN_ATTEMPT_SECONDS보다 적으면
+        다시 시도하지 않고 마지막 오류를 냅니다.
+        llm_circuit_breaker가 열려 있으면 호출하지 않고 바로 LLMUnavailableError를 냅니다.
+        응답 파싱 실패는 다시 시도하지 않습니다. 토큰 수는 응답의 usage_metadata, 없으면 프롬프트 토큰 추정치입니다.
+        """
+        deadline = deadline or LLM_CALL_DEADLINE
+        first_started = time.monotonic()
+        attempt = 0
+        while True:
+            timeout = attempt_timeout(deadline - (time.monotonic() - first_started))
+            if not llm_circuit_breaker.allow():
+                self.record_usage(operation, items=items, retries=retries + attempt, ok=False, error="circuit open")
+                raise LLMUnavailableError("LLM 엔드포인트 일시 차단 중 (circuit open)")
+            started = time.perf_counter()
+            try:
+                result = self.structured(schema, timeout).invoke(chat_messages)
+            except Exception as e:
+                retryable = is_retryable_error(e)
+                if retryable and not is_rate_limit_error(e):
+                    llm_circuit_breaker.record_failure()
+                else:
+                    # 429(할당량 초과, 백오프로 처리)나 요청 자체의 문제(400 등)는 엔드포인트 장애가 아니므로
+                    # 연속 실패 수는 그대로 두고 시험 호출 자리만 비움
+                    llm_circuit_breaker.release()
+                self.record_usage(operation, latency=time.perf_counter() - started, items=items,
+                                  retries=retries + attempt, ok=False, error=str(e),
+                                  prompt_tokens=count_tokens("".join(m["content"] for m in chat_messages)))
+                if not retryable or attempt >= LLM_MAX_RETRIES:
+                    raise
+                delay = min(retry_after(e) or backoff_delay(attempt, LLM_RETRY_BASE, LLM_RETRY_MAX), LLM_RETRY_MAX)
+                # 기다린 뒤 남는 시간이 LLM_MIN_ATTEMPT_SECONDS보다 적으면 다시 시도해도 끝낼 수 없음
+                if time.monotonic() - first_started + delay + LLM_MIN_ATTEMPT_SECONDS > deadline:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            llm_circuit_breaker.record_success()
+            break
+        latency = time.perf_counter() - started
+        usage = getattr(result.get("raw"), "usage_metadata", None) or {}
+        prompt_tokens = usage.get("input_tokens") or count_tokens("".join(m["content"] for m in chat_messages))
+        error = result.get("parsing_error")
+        self.record_usage(operation, latency=latency, items=items, retries=retries + attempt,
+                          prompt_tokens=prompt_tokens, completion_tokens=usage.get("output_tokens") or 0,
+                          ok=error is None, error=str(error) if error else None)
+        if error is not None:
+            raise error
+        return result.get("parsed")
+
+class CategorizeAgent(LLMAgent):
     """북마크의 카테고리를 분류하는 에이전트"""
+    agent_name = "categorize"
     
-    def __init__(self):
-        self.llm = llm
-        
+    def __init__(self, max_concurrency: Optional[int] = None, rate_limiter: Optional[RateLimiter] = None,
+                 pack_size: Optional[int] = None, pack_token_budget: Optional[int] = None):
+        """
+        Args:
+            max_concurrency: classify_many의 동시 LLM 호출 수 (기본: LLM_MAX_CONCURRENCY 환경 변수 또는 8)
+            rate_limiter: LLM 호출 전 RPM/TPM 한도를 확인할 RateLimiter (기본: llm_rate_limiter)
+            pack_size: classify_many에서 LLM 호출 한 번에 묶을 최대 게시물 수
+                (기본: CATEGORY_PACK_SIZE 환경 변수 또는 1 = 묶지 않음)
+            pack_token_budget: 묶음 프롬프트 한 개의 최대 토큰 수 (기본: CATEGORY_PACK_TOKENS 환경 변수 또는 4000)
+        """
         # 기본 카테고리 목록
         self.base_categories = [] # app.py 57 line
+
+        # 유사 북마크 이웃 투표 분류기 (설정 시 확신이 높은 항목은 LLM 호출 생략)
+        self.knn_classifier = None
+        # 라벨 클러스터 중심 분류기 (TaxonomyClassifier, 설정 시 가까운 중심이 있는 항목은 LLM 호출 생략)
+        self.taxonomy_classifier = None
+        # 분류 결과 캐시 (CategoryCache, 설정 시 이미 분류한 게시물은 LLM 호출 생략)
+        self.cache = None
+        # cache/knn/taxonomy/llm: 분류된 게시물 수, llm_calls/prompt_tokens: LLM 호출 수와 프롬프트 토큰(추정), retries: 묶음 누락 재시도 수
+        self.stats = {"cache": 0, "knn": 0, "taxonomy": 0, "llm": 0, "llm_calls": 0, "prompt_tokens": 0, "retries": 0}
+
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        self.rate_limiter = rate_limiter or llm_rate_limiter
+        self.pack_size = pack_size or int(os.getenv("CATEGORY_PACK_SIZE", "1"))
+        self.pack_token_budget = pack_token_budget or int(os.getenv("CATEGORY_PACK_TOKENS", "4000"))
+        # classify_many 작업 스레드들이 base_categories/stats를 함께 갱신
+        self._lock = threading.Lock()
     
     def _update_base_categories(self, category: str) -> None:
         """기본 카테고리 세트에 새 카테고리를 추가합니다."""
         if not category:
             return
             
-        if category not in self.base_categories:
-            self.base_categories.append(category)
-            print(f"새로운 카테고리 추가됨: {category}")
+        with self._lock:
+            if category not in self.base_categories:
+                self.base_categories.append(category)
+                print(f"새로운 카테고리 추가됨: {category}")
 
-    def classify(self, caption: str, hashtags: Optional[List[str]] = None) -> CategoryPrompt.OutputFormat:
+    def classify(self, caption: str, hashtags: Optional[List[str]] = None, feed_id: Optional[str] = None) -> CategoryPrompt.OutputFormat:
         """
         인스타그램 캡션과 해시태그를 분석하여 카테고리를 분류합니다.
         단일 카테고리를 string 형태로 반환합니다.
+        cache에 같은 게시물의 결과가 있거나, knn_classifier의 유사 북마크 투표가 확실하거나,
+        taxonomy_classifier의 라벨 클러스터 중심이 충분히 가까운 경우 LLM을 호출하지 않습니다.
         """
+        with self._lock:
+            base_categories = list(self.base_categories)
+        results = [None]
+        item = {"caption": caption, "hashtags": hashtags or [], "feed_id": feed_id}
+        if not self._classify_local([item], base_categories, results.__setitem__):
+            return results[0]
+        return self._classify_llm(caption, hashtags)
+
+    def _model_name(self) -> str:
+        """캐시 키용 모델(배포) 이름 (캐시만 조회할 때는 LLM 클라이언트를 만들지 않음)"""
+        return self.model_name
+
+    def _get_cached(self, caption: str, hashtags: Optional[List[str]],
+                    base_categories: List[str]) -> Optional[CategoryPrompt.OutputFormat]:
+        """캐시된 분류 결과를 반환합니다. (캐시가 없거나 조회 실패 시 None)"""
+        if self.cache is None:
+            return None
+        try:
+            cached = self.cache.get(CategoryPrompt.PROMPT_VERSION, self._model_name(), caption, hashtags,
+                                    base_categories)
+        except Exception as e:
+            print(f"카테고리 캐시 조회 중 오류 (LLM으로 분류): {e}")
+            return None
+        if cached:
+            with self._lock:
+                self.stats["cache"] += 1
+        return cached
+
+    def _put_cached(self, base_categories: List[str], entries) -> None:
+        """LLM 분류 결과 [(캡션, 해시태그, 결과)]를 캐시에 저장합니다."""
+        if self.cache is None or not entries:
+            return
+        try:
+            self.cache.put_many(CategoryPrompt.PROMPT_VERSION, self._model_name(), base_categories, entries)
+        except Exception as e:
+            print(f"카테고리 캐시 저장 중 오류: {e}")
+
+    def _predict_knn(self, caption: str, feed_id: Optional[str] = None) -> Optional[CategoryPrompt.OutputFormat]:
+        """유사 북마크 투표가 확실하면 그 결과를, 아니면 None을 반환합니다."""
+        return self._predict_knn_many([(caption, feed_id)])[0]
+
+    def _predict_knn_many(self, items: List[Tuple[str, Optional[str]]]) -> List[Optional[CategoryPrompt.OutputFormat]]:
+        """[(캡션, feed_id)]별 kNN 예측 (캡션 임베딩은 knn_classifier.predict_many에서 한 번에 생성)"""
+        if not self.knn_classifier:
+            return [None] * len(items)
+        try:
+            predictions = self.knn_classifier.predict_many(items)
+        except Exception as e:
+            print(f"kNN 카테고리 예측 중 오류 (LLM으로 분류): {e}")
+            return [None] * len(items)
+        responses = []
+        for prediction in predictions:
+            if not prediction:
+                responses.append(None)
+                continue
+            with self._lock:
+                self.stats["knn"] += 1
+            responses.append(CategoryPrompt.OutputFormat(
+                categories=prediction["category"],
+                category_reason=(
+                    f"유사한 북마크 {prediction['neighbors']}개 중 "
+                    f"{prediction['confidence']:.0%}가 '{prediction['category']}' 카테고리입니다."
+                ),
+            ))
+        return responses
+
+    def _predict_taxonomy_many(self, items: List[Tuple[str, Optional[str]]]) -> List[Optional[CategoryPrompt.OutputFormat]]:
+        """[(캡션, feed_id)]별로 가까운 라벨 클러스터 중심이 있으면 그 카테고리를, 아니면 None을 반환합니다."""
+        if not self.taxonomy_classifier:
+            return [None] * len(items)
+        try:
+            predictions = self.taxonomy_classifier.predict_many(items)
+        except Exception as e:
+            print(f"클러스터 카테고리 예측 중 오류 (LLM으로 분류): {e}")
+            return [None] * len(items)
+        responses = []
+        for prediction in predictions:
+            if not prediction:
+                responses.append(None)
+                continue
+            with self._lock:
+                self.stats["taxonomy"] += 1
+            self._update_base_categories(prediction["category"])
+            responses.append(CategoryPrompt.OutputFormat(
+                categories=prediction["category"],
+                category_reason=f"[클러스터 {prediction['cluster']}] {prediction['category_reason']}",
+            ))
+        return responses
+
+    def _classify_local(self, items: List[Dict[str, Any]], base_categories: List[str], finish) -> List[int]:
+        """캐시 -> kNN -> 클러스터 중심 순으로 LLM 없이 분류할 수 있는 항목을 finish로 넘기고, 남은 항목 위치를 반환합니다."""
+        # 1) 이미 분류한 게시물은 캐시 결과 사용
+        remaining = []
+        for i, item in enumerate(items):
+            cached = self._get_cached(item.get('caption', ''), item.get('hashtags') or [], base_categories)
+            if cached:
+                finish(i, cached)
+            else:
+                remaining.append(i)
+
+        # 2) 유사 북마크 투표가 확실한 항목은 LLM 없이 분류
+        if self.knn_classifier and remaining:
+            predictions = self._predict_knn_many(
+                [(items[i].get('caption', ''), items[i].get('feed_id')) for i in remaining]
+            )
+            unresolved = []
+            for i, prediction in zip(remaining, predictions):
+                if prediction:
+                    finish(i, prediction)
+                else:
+                    unresolved.append(i)
+            remaining = unresolved
+
+        # 3) 라벨 클러스터 중심에 충분히 가까운 항목은 그 카테고리로 분류
+        if self.taxonomy_classifier and remaining:
+            predictions = self._predict_taxonomy_many(
+                [(items[i].get('caption', ''), items[i].get('feed_id')) for i in remaining]
+            )
+            unresolved = []
+            for i, prediction in zip(remaining, predictions):
+                if prediction:
+                    finish(i, prediction)
+                else:
+                    unresolved.append(i)
+            remaining = unresolved
+        return remaining
+
+    def _classify_llm(self, caption: str, hashtags: Optional[List[str]] = None,
+                      retry: bool = False) -> CategoryPrompt.OutputFormat:
+        """게시물 하나를 LLM으로 분류합니다. (오류 시 "기타", retry: 묶음 응답에서 빠져 다시 호출하는 경우)"""
+        with self._lock:
+            self.stats["llm"] += 1
+            self.stats["llm_calls"] += 1
+            base_categories = list(self.base_categories)
         try:
             prompt = CategoryPrompt(
                 caption=caption, 
                 hashtags=hashtags or [],
-                base_categories=self.base_categories
+                base_categories=base_categories
             )
             
             chat_messages = [
                 {"role": "system", "content": prompt.get_system_prompt()},
                 {"role": "user", "content": prompt.get_user_prompt()}
             ]
+
+            # 배포 할당량(RPM/TPM) 안에서만 호출
+            prompt_tokens = count_tokens(chat_messages[0]["content"] + chat_messages[1]["content"])
+            with self._lock:
+                self.stats["prompt_tokens"] += prompt_tokens
+            self.rate_limiter.acquire(prompt_tokens + CATEGORY_OUTPUT_TOKENS)
             
-            response = self.llm.with_structured_output(
-                CategoryPrompt.OutputFormat
-            ).invoke(chat_messages)
+            response = self._invoke_structured(CategoryPrompt.OutputFormat, chat_messages, "classify",
+                                               retries=int(retry))
             
             self._update_base_categories(response.categories)
+            self._put_cached(base_categories, [(caption, hashtags or [], response)])
             
             # 원본 Pydantic 객체 반환
             return response
@@ -63,14 +410,207 @@ class CategorizeAgent:
         except Exception as e:
             print(f"카테고리 분류 중 예상치 못한 오류: {e}")
             # 오류 발생 시 Pydantic 객체 직접 생성하여 반환
-            fallback_result = prompt.OutputFormat(
+            fallback_result = CategoryPrompt.OutputFormat(
                 categories="기타",
                 category_reason=f"분류 오류: {str(e)}"
             )
             return fallback_result
-    
+
+    def _make_packs(self, items: List[Dict[str, Any]], positions: List[int]) -> List[List[int]]:
+        """항목 위치들을 pack_size개, pack_token_budget 토큰 이하의 묶음으로 나눕니다.
+
+        시스템 프롬프트와 카테고리 목록은 묶음마다 한 번만 들어가므로 예산에서 먼저 빼고,
+        남은 예산을 게시물 캡션/해시태그로 채웁니다. (예산보다 긴 게시물은 혼자 한 묶음)
+        """
+        with self._lock:
+            base_categories = list(self.base_categories)
+        empty_prompt = PackedCategoryPrompt([], [], base_categories)
+        overhead = count_tokens(empty_prompt.get_system_prompt() + empty_prompt.get_user_prompt())
+        budget = max(self.pack_token_budget - overhead, 0)
+
+        packs, current, used = [], [], 0
+        for i in positions:
+            item = items[i]
+            tokens = count_tokens(PackedCategoryPrompt.format_post(i, item.get('caption', ''), item.get('hashtags') or []))
+            if current and (len(current) >= self.pack_size or used + tokens > budget):
+                packs.append(current)
+                current, used = [], 0
+            current.append(i)
+            used += tokens
+        if current:
+            packs.append(current)
+        return packs
+
+    def _classify_pack(self, items: List[Dict[str, Any]]) -> List[Optional[CategoryPrompt.OutputFormat]]:
+        """게시물 묶음을 LLM 한 번으로 분류합니다.
+
+        Returns:
+            입력 순서의 결과 목록. 응답에서 빠졌거나 번호가 범위를 벗어난 항목(또는 호출 실패 시 전체)은 None
+        """
+        with self._lock:
+            self.stats["llm_calls"] += 1
+            base_categories = list(self.base_categories)
+        prompt = PackedCategoryPrompt(
+            captions=[item.get('caption', '') for item in items],
+            hashtags=[item.get('hashtags') or [] for item in items],
+            base_categories=base_categories
+        )
+        chat_messages = [
+            {"role": "system", "content": prompt.get_system_prompt()},
+            {"role": "user", "content": prompt.get_user_prompt()}
+        ]
+        prompt_tokens = count_tokens(chat_messages[0]["content"] + chat_messages[1]["content"])
+        with self._lock:
+            self.stats["prompt_tokens"] += prompt_tokens
+        self.rate_limiter.acquire(prompt_tokens + CATEGORY_OUTPUT_TOKENS * len(items))
+
+        results = [None] * len(items)
+        try:
+            response = self._invoke_structured(PackedCategoryPrompt.OutputFormat, chat_messages, "classify_pack",
+                                               items=len(items))
+        except Exception as e:
+            print(f"묶음 카테고리 분류 중 오류 (개별 재시도): {e}")
+            return results
+
+        for item in response.results:
+            # 범위 밖/중복 번호와 빈 카테고리는 버리고 개별 재시도
+            if 0 <= item.index < len(items) and results[item.index] is None and item.categories:
+                results[item.index] = CategoryPrompt.OutputFormat(
+                    categories=item.categories,
+                    category_reason=item.category_reason
+                )
+                self._update_base_categories(item.categories)
+        with self._lock:
+            self.stats["llm"] += sum(r is not None for r in results)
+        self._put_cached(base_categories, [
+            (item.get('caption', ''), item.get('hashtags') or [], result)
+            for item, result in zip(items, results) if result is not None
+        ])
+        return results
+
+    def _classify_packed(self, items: List[Dict[str, Any]], workers: int, progress_callback=None
+                         ) -> List[CategoryPrompt.OutputFormat]:
+        """classify_many의 묶음 모드: 캐시 -> kNN -> 묶음 LLM 호출 -> 누락 항목 개별 재시도"""
+        results = [None] * len(items)
+        done = 0
+        with self._lock:
+            base_categories = list(self.base_categories)
+
+        def finish(i, response):
+            nonlocal done
+            results[i] = response
+            done += 1
+            if progress_callback:
+                progress_callback(done, len(items), i, response)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            remaining = self._classify_local(items, base_categories, finish)
+
+            # 3) 남은 항목은 묶어서 호출하고, 응답에서 빠진 항목만 개별 호출로 재시도
+            pending = {
+                executor.submit(self._classify_pack, [items[i] for i in pack]): pack
+                for pack in self._make_packs(items, remaining)
+            }
+            retries = set()
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    positions = pending.pop(future)
+                    try:
+                        responses = future.result()
+                    except Exception as e:
+                        print(f"카테고리 분류 중 예상치 못한 오류: {e}")
+                        responses = [None] * len(positions)
+                    for i, response in zip(positions, responses):
+                        if response is not None:
+                            finish(i, response)
+                        elif future in retries:
+                            # 개별 재시도도 실패하면 해당 항목만 "기타"
+                            finish(i, CategoryPrompt.OutputFormat(categories="기타", category_reason="분류 오류: 응답 없음"))
+                        else:
+                            with self._lock:
+                                self.stats["retries"] += 1
+                            item = items[i]
+                            retry = executor.submit(
+                                lambda item: [self._classify_llm(item.get('caption', ''), item.get('hashtags') or [],
+                                                                 retry=True)],
+                                item
+                            )
+                            retries.add(retry)
+                            pending[retry] = [i]
+        return results
+
+    def classify_many(self, items: List[Dict[str, Any]], max_concurrency: Optional[int] = None,
+                      progress_callback: Optional[Callable[[int, int, int, CategoryPrompt.OutputFormat], None]] = None
+                      ) -> List[CategoryPrompt.OutputFormat]:
+        """여러 항목을 최대 max_concurrency개씩 동시에 분류합니다.
+
+        결과는 입력 순서대로 반환하며, 한 항목의 오류는 해당 항목만 "기타"로 처리합니다.
+        pack_size > 1이면 여러 게시물을 LLM 호출 한 번에 묶어 보냅니다. (_classify_packed)
+        progress_callback(완료 수, 전체 수, 항목 위치, 결과)은 호출한 스레드에서 완료 순서대로
+        호출되므로 Streamlit 위젯을 갱신해도 됩니다.
+
+        Args:
+            items: {"caption", "hashtags", "feed_id"} 목록
+            max_concurrency: 동시 호출 수 (기본: self.max_concurrency)
+            progress_callback: 항목이 끝날 때마다 호출할 함수
+        """
+        results = [None] * len(items)
+        if not items:
+            return results
+
+        with self._lock:
+            before = dict(self.stats)
+        workers = max(1, min(max_concurrency or self.max_concurrency, len(items)))
+        if self.pack_size > 1:
+            results = self._classify_packed(items, workers, progress_callback)
+            self._log_run(before, len(items))
+            return results
+
+        done = 0
+        with self._lock:
+            base_categories = list(self.base_categories)
+
+        def finish(i, response):
+            nonlocal done
+            results[i] = response
+            done += 1
+            if progress_callback:
+                progress_callback(done, len(items), i, response)
+
+        # 캐시/kNN으로 끝나지 않은 항목만 LLM에 동시에 보냄
+        remaining = self._classify_local(items, base_categories, finish)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self._classify_llm, items[i].get('caption', ''), items[i].get('hashtags') or []): i
+                for i in remaining
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    response = future.result()
+                except Exception as e:
+                    print(f"카테고리 분류 중 예상치 못한 오류: {e}")
+                    response = CategoryPrompt.OutputFormat(
+                        categories="기타",
+                        category_reason=f"분류 오류: {str(e)}"
+                    )
+                finish(i, response)
+        self._log_run(before, len(items))
+        return results
+
+    def _log_run(self, before: Dict[str, int], total: int) -> None:
+        """classify_many 한 번의 캐시 적중률과 LLM 호출 수를 출력합니다."""
+        with self._lock:
+            run = {key: self.stats[key] - before.get(key, 0) for key in self.stats}
+        print(f"카테고리 분류 {total}건: 캐시 {run['cache']}건 ({run['cache'] / total:.0%}), "
+              f"kNN {run['knn']}건, 클러스터 {run['taxonomy']}건, LLM {run['llm']}건 (호출 {run['llm_calls']}회)")
+        if run['cache'] or run['knn'] or run['taxonomy']:
+            # LLM 호출 없이 분류한 건수 (호출별 기록은 _invoke_structured)
+            self.record_usage("cache", items=run['cache'] + run['knn'] + run['taxonomy'], cache_hits=run['cache'])
+
     def classify_batch(self, bookmarks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """여러 북마크의 카테고리를 일괄 분류합니다.
+        """여러 북마크의 카테고리를 일괄 분류합니다. (classify_many로 동시 호출)
         
         Args:
             bookmarks: 북마크 목록
@@ -78,28 +618,151 @@ class CategorizeAgent:
         Returns:
             카테고리가 추가된 북마크 목록
         """
-        for bookmark in bookmarks:
-            caption = bookmark.get('caption', '')
-            hashtags = bookmark.get('hashtags', [])
-            
-            if caption or hashtags:
-                # classify 메서드가 반환하는 Pydantic 모델에서 속성 접근
-                response = self.classify(caption, hashtags)
-                bookmark['categories'] = response.categories
-                bookmark['category_reason'] = response.category_reason
+        targets = [b for b in bookmarks if b.get('caption') or b.get('hashtags')]
+        responses = self.classify_many(targets)
+        for bookmark, response in zip(targets, responses):
+            bookmark['categories'] = response.categories
+            bookmark['category_reason'] = response.category_reason
         
         return bookmarks
 
-class FilterAgent:
-    """검색 결과 필터링을 위한 에이전트"""
+class ClusterLabelAgent(LLMAgent):
+    """임베딩 클러스터의 대표 게시물로 클러스터 전체의 카테고리를 정하는 에이전트"""
+    agent_name = "cluster_label"
+
+    def __init__(self, base_categories: Optional[List[str]] = None):
+        self.base_categories = list(base_categories or [])
+
+    def label(self, captions: List[str], hashtags: List[List[str]]) -> ClusterLabelPrompt.OutputFormat:
+        """대표 게시물 캡션/해시태그로 클러스터 카테고리를 분류합니다. (LLM 1회 호출)"""
+        prompt = ClusterLabelPrompt(
+            captions=captions,
+            hashtags=hashtags,
+            base_categories=self.base_categories
+        )
+        chat_messages = [
+            {"role": "system", "content": prompt.get_system_prompt()},
+            {"role": "user", "content": prompt.get_user_prompt()}
+        ]
+        try:
+            response = self._invoke_structured(ClusterLabelPrompt.OutputFormat, chat_messages, "label",
+                                               items=len(captions))
+        except Exception as e:
+            print(f"클러스터 카테고리 분류 중 오류: {e}")
+            return ClusterLabelPrompt.OutputFormat(
+                categories="기타",
+                category_reason=f"분류 오류: {str(e)}"
+            )
+
+        # 이후 클러스터가 같은 이름을 재사용하도록 카테고리 목록 갱신
+        if response.categories and response.categories not in self.base_categories:
+            self.base_categories.append(response.categories)
+        return response
+
+class HashtagAgent(LLMAgent):
+    """검색어에 맞는 트렌드 해시태그를 후보 중에서 고르는 에이전트 (HashtagIndex 유사도가 낮을 때의 대체 경로)"""
+    agent_name = "hashtag"
+
+    def choose(self, query: str, candidates: List[str]) -> Optional[str]:
+        """후보 중 하나를 반환합니다. (관련 후보가 없거나 오류/후보 밖의 답이면 None)"""
+        if not candidates:
+            return None
+        prompt = HashtagPrompt(query=query, candidates=candidates)
+        chat_messages = [
+            {"role": "system", "content": prompt.get_system_prompt()},
+            {"role": "user", "content": prompt.get_user_prompt()}
+        ]
+        try:
+            response = self._invoke_structured(HashtagPrompt.OutputFormat, chat_messages, "hashtag",
+                                               items=len(candidates))
+        except Exception as e:
+            print(f"해시태그 선택 중 오류: {e}")
+            return None
+        hashtag = (response.hashtag or "").strip().lstrip("#")
+        return hashtag if hashtag in candidates else None
+
+class FilterAgent(LLMAgent):
+    """검색 결과 필터링을 위한 에이전트
+
+    후보가 많으면 토큰 예산 단위 청크로 나눠 동시에 LLM을 호출하고, 청크별 인덱스를 전체 위치로 합칩니다.
+    전체 시간 제한(deadline)까지 끝나지 않았거나 실패한 청크의 후보는 걸러내지 않고 그대로 남깁니다.
+    """
+    agent_name = "filter"
     
-    def __init__(self):
+    def __init__(self, chunk_token_budget: Optional[int] = None, chunk_size: Optional[int] = None,
+                 max_concurrency: Optional[int] = None, deadline: Optional[float] = None,
+                 rate_limiter: Optional[RateLimiter] = None):
         """
         검색 결과 필터링 에이전트 초기화
+
+        Args:
+            chunk_token_budget: 청크 프롬프트 한 개의 최대 토큰 수 (기본: FILTER_CHUNK_TOKENS 환경 변수 또는 3000)
+            chunk_size: 청크 한 개의 최대 북마크 수 (기본: FILTER_CHUNK_SIZE 환경 변수 또는 20)
+            max_concurrency: 동시 LLM 호출 수 (기본: LLM_MAX_CONCURRENCY 환경 변수 또는 8)
+            deadline: 필터링 전체 시간 제한(초) (기본: FILTER_DEADLINE 환경 변수 또는 20)
+            rate_limiter: LLM 호출 전 RPM/TPM 한도를 확인할 RateLimiter (기본: llm_rate_limiter)
         """
-        self.llm = llm
+        self.chunk_token_budget = chunk_token_budget or int(os.getenv("FILTER_CHUNK_TOKENS", "3000"))
+        self.chunk_size = chunk_size or int(os.getenv("FILTER_CHUNK_SIZE", "20"))
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        self.deadline = deadline or float(os.getenv("FILTER_DEADLINE", "20"))
+        self.rate_limiter = rate_limiter or llm_rate_limiter
+
+    def _make_chunks(self, query: str, bookmarks: List[Dict[str, Any]]) -> List[List[int]]:
+        """북마크 위치들을 chunk_size개, chunk_token_budget 토큰 이하의 청크로 나눕니다.
+
+        시스템 프롬프트와 검색어는 청크마다 들어가므로 예산에서 먼저 뺍니다. (예산보다 긴 북마크는 혼자 한 청크)
+        """
+        empty_prompt = FilteringPrompt(query=query, bookmarks=[])
+        overhead = count_tokens(empty_prompt.get_system_prompt() + empty_prompt.get_user_prompt())
+        budget = max(self.chunk_token_budget - overhead, 0)
+
+        chunks, current, used = [], [], 0
+        for i, bookmark in enumerate(bookmarks):
+            tokens = count_tokens(FilteringPrompt.format_bookmark(i, bookmark))
+            if current and (len(current) >= self.chunk_size or used + tokens > budget):
+                chunks.append(current)
+                current, used = [], 0
+            current.append(i)
+            used += tokens
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _filter_chunk(self, query: str, bookmarks: List[Dict[str, Any]]):
+        """청크 하나를 LLM으로 필터링합니다.
+
+        Returns:
+            (청크 안 인덱스 목록, 필터링 이유 목록)
+        """
+        # FilteringPrompt 인스턴스 생성
+        prompt = FilteringPrompt(query=query, bookmarks=bookmarks)
         
-    def filter(self, query: str, bookmarks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # 프롬프트 구성
+        chat_messages = [
+            {"role": "system", "content": prompt.get_system_prompt()},
+            {"role": "user", "content": prompt.get_user_prompt()}
+        ]
+        # 이유는 북마크마다 한 줄씩 출력되므로 출력 토큰도 북마크 수에 비례
+        prompt_tokens = count_tokens(chat_messages[0]["content"] + chat_messages[1]["content"])
+        self.rate_limiter.acquire(prompt_tokens + FILTER_OUTPUT_TOKENS_PER_BOOKMARK * len(bookmarks))
+
+        # LLM 호출 및 구조화된 출력 처리
+        response = self._invoke_structured(prompt.OutputFormat, chat_messages, "filter", items=len(bookmarks),
+                                           deadline=self.deadline)
+
+        # 결과에서 북마크 인덱스 추출 (문자열 리스트에서 정수로 변환)
+        # 딕셔너리로 반환되는 경우
+        if isinstance(response, dict) and "bookmark_indexes" in response:
+            indices = [int(idx) for idx in response["bookmark_indexes"]]
+            reasons = list(response.get("filter_reasons") or [])
+        # Pydantic 모델로 반환되는 경우
+        else:
+            indices = [int(idx) for idx in response.bookmark_indexes]
+            reasons = list(response.filter_reasons)
+        return indices, reasons
+        
+    def filter(self, query: str, bookmarks: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         LLM을 사용하여 검색어와 북마크 데이터를 처리합니다.
         
@@ -110,45 +773,89 @@ class FilterAgent:
         Returns:
             필터링 결과가 추가된 상태 정보
         """
+        state = None
+        for state in self.filter_stream(query, bookmarks):
+            pass
+        return state
+
+    def filter_stream(self, query: str, bookmarks: List[Dict[str, Any]]):
+        """filter()와 같지만 청크가 끝날 때마다 중간 상태를 yield합니다. (마지막 yield가 최종 결과)
+
+        중간 상태의 "decisions"에는 끝난 청크의 판단만 들어있고(나머지는 None), "done"은 False입니다.
+        """
         # 상태 정보를 딕셔너리 형태로 관리
         state = {
             "query": query,
             "bookmarks": bookmarks,
             "filtered_bookmarks": None,
-            "filter_reasons":None
+            "filter_reasons":None,
+            "filter_stats": None,
+            # 후보별 LLM 판단 (True: 채택, False: 제외, None: 실패/시간 초과로 판단 없음)과 이유
+            "decisions": [None] * len(bookmarks),
+            "reasons": [None] * len(bookmarks),
+            "done": False
         }
-        
-        # FilteringPrompt 인스턴스 생성
-        prompt = FilteringPrompt(query=query, bookmarks=bookmarks)
-        
-        # 시스템 프롬프트와 사용자 프롬프트 가져오기
-        system_prompt = prompt.get_system_prompt()
-        user_prompt = prompt.get_user_prompt()
-        
-        # 프롬프트 구성
-        chat_messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
+        started = time.monotonic()
+        chunks = self._make_chunks(query, bookmarks)
+        stats = {"candidates": len(bookmarks), "chunks": len(chunks), "completed": 0, "failed": 0, "timed_out": 0}
+        state["filter_stats"] = stats
 
-        # LLM 호출 및 구조화된 출력 처리
-        response = self.llm.with_structured_output(prompt.OutputFormat).invoke(chat_messages)
-
-        # 결과에서 북마크 인덱스 추출 (문자열 리스트에서 정수로 변환)
+        # 청크별 선택 여부 (None: 실패/시간 초과 -> 청크 후보를 그대로 유지)
+        selected = [None] * len(chunks)
+        executor = ThreadPoolExecutor(max_workers=max(1, min(self.max_concurrency, len(chunks))))
         try:
-            # 딕셔너리로 반환되는 경우
-            if isinstance(response, dict) and "bookmark_indexes" in response:
-                relevant_indices = [int(idx) for idx in response["bookmark_indexes"]]
-            # Pydantic 모델로 반환되는 경우
-            else:
-                relevant_indices = [int(idx) for idx in response.bookmark_indexes]
-        except AttributeError:
-            print("응답 형식이 예상과 다릅니다. 원본 북마크를 반환합니다.")
-            state["filtered_bookmarks"] = state["bookmarks"]
-            return state
-        
-        # 유효한 인덱스만 필터링 (범위 체크)
-        valid_indices = [idx for idx in relevant_indices if 0 <= idx < len(state["bookmarks"])]
+            futures = {
+                executor.submit(self._filter_chunk, query, [bookmarks[i] for i in chunk]): c
+                for c, chunk in enumerate(chunks)
+            }
+            pending = set(futures)
+            while pending:
+                remaining = self.deadline - (time.monotonic() - started)
+                finished, pending = wait(pending, timeout=max(remaining, 0), return_when=FIRST_COMPLETED)
+                if not finished:
+                    break
+                for future in finished:
+                    c = futures[future]
+                    try:
+                        indices, chunk_reasons = future.result()
+                    except Exception as e:
+                        print(f"필터링 청크 {c} 오류 (후보 유지): {e}")
+                        stats["failed"] += 1
+                        continue
+                    # 청크 안 인덱스 -> 전체 위치 (범위 밖/중복 인덱스는 무시)
+                    positions = chunks[c]
+                    selected[c] = list(dict.fromkeys(positions[idx] for idx in indices if 0 <= idx < len(positions)))
+                    for i in positions:
+                        state["decisions"][i] = False
+                    for i in selected[c]:
+                        state["decisions"][i] = True
+                    # 이유는 "번호 / O·X / 이유" 형식이므로 앞의 번호로 후보와 연결하고,
+                    # 청크마다 0부터 매긴 번호를 전체 후보 위치로 바꿔 저장
+                    for reason in chunk_reasons:
+                        reason = str(reason)
+                        match = REASON_INDEX_PATTERN.match(reason)
+                        if match and int(match.group(1)) < len(positions):
+                            position = positions[int(match.group(1))]
+                            state["reasons"][position] = reason[:match.start(1)] + str(position) + reason[match.end(1):]
+                    stats["completed"] += 1
+                if pending:
+                    stats["elapsed"] = round(time.monotonic() - started, 3)
+                    yield state
+            stats["timed_out"] = len(pending)
+            if pending:
+                print(f"필터링 시간 제한({self.deadline}s) 초과: 청크 {len(pending)}개의 후보를 그대로 유지합니다.")
+        finally:
+            # 시간 제한을 넘긴 청크는 기다리지 않음 (아직 시작하지 않은 청크는 취소)
+            executor.shutdown(wait=False, cancel_futures=True)
+        stats["elapsed"] = round(time.monotonic() - started, 3)
+        # 판단하지 못한 후보가 있으면 (LLM 오류/차단/시간 초과) 검색 결과를 그대로 보여주는 저하 모드
+        stats["degraded"] = bool(stats["failed"] or stats["timed_out"])
+        state["done"] = True
+
+        # 후보 순위(청크 순서)대로 합침
+        valid_indices = []
+        for c, chunk in enumerate(chunks):
+            valid_indices.extend(chunk if selected[c] is None else selected[c])
 
         # 인덱스가 비어있으면 원본 반환
         if not valid_indices:
@@ -157,11 +864,12 @@ class FilterAgent:
         else:
             # 관련 있는 북마크만 필터링하여 반환
             state["filtered_bookmarks"] = [state["bookmarks"][idx] for idx in valid_indices]
-            state["filter_reasons"] = [r for r in response.filter_reasons]
+            # 후보 순서대로, 번호는 state["bookmarks"] 위치
+            state["filter_reasons"] = [r for r in state["reasons"] if r is not None]
     
-        return state
+        yield state
     
-    def run(self, query: str, bookmarks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def run(self, query: str, bookmarks: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         검색어와 관련 있는 북마크만 필터링하여 반환합니다.
         
@@ -170,7 +878,7 @@ class FilterAgent:
             bookmarks: 필터링할 북마크 리스트
             
         Returns:
-            필터링된 북마크 리스트
+            필터링 결과 상태 정보 (state["filtered_bookmarks"]: 필터링된 북마크 리스트)
         """
         try:
             # 필터링 단계
@@ -181,19 +889,21 @@ class FilterAgent:
             
         except Exception as e:
             print(f"필터링 과정에서 오류 발생: {e}")
-            return bookmarks
+            return {"query": query, "bookmarks": bookmarks, "filtered_bookmarks": bookmarks,
+                    "filter_reasons": None, "filter_stats": None, "decisions": [None] * len(bookmarks),
+                    "reasons": [None] * len(bookmarks), "done": True}
         
-class RecommendAgent:
+class RecommendAgent(LLMAgent):
     """
     유저 쿼리와 관련된 최신 글 추천을 위한 에이전트
     (RAG를 명시적으로 사용하는 에이전트!)
     """
+    agent_name = "recommend"
     
     def __init__(self):
         """
         추천 에이전트 초기화
         """
-        self.llm = llm
         # # 트레이서 초기화 (프로젝트 이름은 원하는 대로 설정)
         # self.tracer = LangSmithTracer(
         #     project_name=os.getenv("LANGCHAIN_PROJECT", "InstaLLM")
@@ -232,7 +942,7 @@ class RecommendAgent:
         ]
 
         # LLM 호출 및 구조화된 출력 처리
-        response = self.llm.with_structured_output(prompt.OutputFormat).invoke(chat_messages)
+        response = self._invoke_structured(prompt.OutputFormat, chat_messages, "recommend", items=len(feeds))
         # # LLM 호출에 트레이서 추가
         # response = self.llm.with_structured_output(
         #     prompt.OutputFormat
@@ -288,5 +998,7 @@ class RecommendAgent:
             return state # NOTE 출력 받고 나서 state["recommended_feeds"] 반드시 수행할 것 까먹지 말기
             
         except Exception as e:
-            print(f"필터링 과정에서 오류 발생: {e}")
-            return None
\ No newline at end of file
+            print(f"추천 과정에서 오류 발생 (후보 게시물 그대로 반환): {e}")
+            # 저하 모드: LLM 없이 후보 게시물을 그대로 (추천 결과가 없을 때와 같은 형식)
+            return {"query": query, "user_history": user_history, "feeds": feeds,
+                    "recommended_feeds": feeds, "recommend_reasons": None, "degraded": True}
\ No newline at end of file
@@ -0,0 +1,130 @@
+import json
+import sqlite3
+import hashlib
+import threading
+from typing import List, Optional, Iterable, Tuple
+
+from .prompts import CategoryPrompt
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def caption_hash(caption: Optional[str]) -> str:
+    """캡션 해시 (앞뒤/중복 공백은 무시)"""
+    return _digest(" ".join(str(caption or "").split()))
+
+
+def hashtag_hash(hashtags: Optional[List[str]]) -> str:
+    """해시태그 해시 (순서/중복 무시)"""
+    return _digest(json.dumps(sorted(set(hashtags or [])), ensure_ascii=False))
+
+
+def category_set_version(categories: Iterable[str]) -> str:
+    """프롬프트에 들어간 기본 카테고리 목록의 버전 (순서 무시)"""
+    return _digest(json.dumps(sorted(set(categories)), ensure_ascii=False))[:16]
+
+
+class CategoryCache:
+    """LLM 카테고리 분류 결과를 저장하는 SQLite 캐시
+
+    키는 (프롬프트 버전, 모델, 캡션 해시, 해시태그 해시, 카테고리 목록 버전)이며,
+    같은 게시물을 다시 분류할 때(재실행/중단 후 재개) LLM을 호출하지 않도록 classify 전에 조회합니다.
+    분류 중 새 카테고리가 추가되면 카테고리 목록 버전이 바뀌므로, 정확히 일치하는 항목이 없을 때는
+    같은 게시물의 가장 최근 결과 중 카테고리가 현재 목록에 남아있는 것을 재사용합니다. (compatible)
+    분류 오류로 채운 "기타" 결과는 저장하지 않습니다.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        # classify_many 작업 스레드들이 하나의 연결을 공유
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''
+        CREATE TABLE IF NOT EXISTS category_cache (
+            prompt_version TEXT NOT NULL,
+            model TEXT NOT NULL,
+            caption_hash TEXT NOT NULL,
+            hashtag_hash TEXT NOT NULL,
+            category_set_version TEXT NOT NULL,
+            categories TEXT NOT NULL,
+            category_reason TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (prompt_version, model, caption_hash, hashtag_hash, category_set_version)
+        )
+        ''')
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.compatible_hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def get(self, prompt_version: str, model: str, caption: str, hashtags: Optional[List[str]],
+            categories: List[str]) -> Optional[CategoryPrompt.OutputFormat]:
+        """캐시된 분류 결과를 반환합니다. 없으면 None (miss로 집계)"""
+        content_key = (prompt_version, model, caption_hash(caption), hashtag_hash(hashtags))
+        version = category_set_version(categories)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT categories, category_reason FROM category_cache WHERE prompt_version = ? AND model = ? "
+                "AND caption_hash = ? AND hashtag_hash = ? AND category_set_version = ?",
+                (*content_key, version)
+            ).fetchone()
+            if row:
+                self.hits += 1
+                return CategoryPrompt.OutputFormat(categories=row[0], category_reason=row[1] or "")
+
+            allowed = set(categories)
+            for row in self._conn.execute(
+                "SELECT categories, category_reason FROM category_cache WHERE prompt_version = ? AND model = ? "
+                "AND caption_hash = ? AND hashtag_hash = ? ORDER BY created_at DESC",
+                content_key
+            ):
+                if row[0] in allowed:
+                    self.compatible_hits += 1
+                    return CategoryPrompt.OutputFormat(categories=row[0], category_reason=row[1] or "")
+            self.misses += 1
+            return None
+
+    def put_many(self, prompt_version: str, model: str, categories: List[str],
+                 entries: List[Tuple[str, Optional[List[str]], CategoryPrompt.OutputFormat]]) -> None:
+        """(캡션, 해시태그, 결과) 목록을 저장합니다. categories는 분류에 사용한 기본 카테고리 목록"""
+        version = category_set_version(categories)
+        rows = [
+            (prompt_version, model, caption_hash(caption), hashtag_hash(hashtags), version,
+             response.categories, response.category_reason)
+            for caption, hashtags, response in entries
+            if response.categories
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO category_cache (prompt_version, model, caption_hash, hashtag_hash, "
+                "category_set_version, categories, category_reason) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+            self.writes += len(rows)
+
+    def put(self, prompt_version: str, model: str, caption: str, hashtags: Optional[List[str]],
+            categories: List[str], response: CategoryPrompt.OutputFormat) -> None:
+        self.put_many(prompt_version, model, categories, [(caption, hashtags, response)])
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM category_cache").fetchone()[0]
+
+    def stats(self):
+        """모니터링용 통계"""
+        with self._lock:
+            lookups = self.hits + self.compatible_hits + self.misses
+            return {
+                "hits": self.hits,
+                "compatible_hits": self.compatible_hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "hit_rate": (self.hits + self.compatible_hits) / lookups if lookups else 0.0,
+            }
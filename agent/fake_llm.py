@@ -0,0 +1,283 @@
+import os
+import re
+import time
+import random
+import hashlib
+import threading
+from functools import lru_cache
+from typing import List, Dict, Optional
+
+import numpy as np
+
+from .prompts import count_tokens
+
+# 오프라인 실행용 가짜 LLM/임베딩 (LLM_PROVIDER=fake, EMBEDDING_PROVIDER=fake)
+# 네트워크/인증 없이 수집 -> 분류 -> 검색 -> 필터링 -> 추천 전체 경로를 같은 입력에 항상 같은 결과로 실행합니다.
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# 가짜 분류 규칙: 단어(접두어 일치) -> 카테고리 (가장 많이 일치한 카테고리, 같으면 먼저 나온 것)
+CATEGORY_KEYWORDS = {
+    "여행": ["여행", "제주", "숙소", "호텔", "travel", "관광", "게스트하우스", "비행"],
+    "음식": ["맛집", "레시피", "파스타", "요리", "food", "디저트", "음식", "먹방"],
+    "카페": ["카페", "커피", "라떼", "cafe"],
+    "패션": ["코디", "ootd", "패션", "트렌치코트", "스타일링", "신상"],
+    "공연": ["뮤지컬", "공연", "콘서트", "티켓팅", "연극"],
+    "운동": ["운동", "헬스", "러닝", "요가", "필라테스"],
+    "반려동물": ["강아지", "고양이", "반려", "멍스타그램", "냥스타그램"],
+}
+
+# 프롬프트 파싱 (캡션은 여러 줄일 수 있으므로 다음 필드 이름까지 non-greedy)
+CATEGORY_POST_PATTERN = re.compile(r"게시물 설명: (.*?)\n\s*해시태그: ([^\n]*)", re.S)
+PACKED_POST_PATTERN = re.compile(r"^\[(\d+)\] 게시물 설명: (.*?)\n\s*해시태그: ([^\n]*)", re.S | re.M)
+BASE_CATEGORIES_PATTERN = re.compile(r"기본 카테고리 목록:\n(.*)\n")
+FILTER_QUERY_PATTERN = re.compile(r"^검색어: (.*)$", re.M)
+FILTER_ITEM_PATTERN = re.compile(r"^\[index: (\d+)\] feed caption: (.*?)\nhashtags: ([^\n]*)", re.S | re.M)
+HASHTAG_CANDIDATES_PATTERN = re.compile(r"후보 해시태그:\n([^\n]*)")
+RECOMMEND_QUERY_PATTERN = re.compile(r"^### 검색어: (.*)$", re.M)
+RECOMMEND_ITEM_PATTERN = re.compile(r"^(\d+):\ncaption: (.*?)\nhashtags: ([^\n]*)", re.S | re.M)
+
+
+class FakeLLMError(RuntimeError):
+    """가짜 LLM의 주입된 실패 (FAKE_LLM_FAIL_RATE, 재시도 대상인 503 응답처럼 동작)"""
+    status_code = 503
+
+
+class FakeTimeoutError(TimeoutError):
+    """가짜 LLM의 응답 지연이 요청 시간 제한을 넘은 경우 (APITimeoutError처럼 동작)"""
+
+
+def words(text: str) -> List[str]:
+    return [w.lower() for w in WORD_PATTERN.findall(text or "")]
+
+
+def overlap(query: str, text: str) -> int:
+    """검색어 단어 중 본문 단어와 접두어가 일치하는 단어 수 (조사가 붙은 한국어 단어도 일치)"""
+    text_words = set(words(text))
+    return sum(
+        any(len(q) >= 2 and (t.startswith(q) or (len(t) >= 2 and q.startswith(t))) for t in text_words)
+        for q in set(words(query))
+    )
+
+
+def classify_text(text: str, base_categories: List[str]) -> str:
+    """본문 단어로 카테고리를 정합니다. (키워드 규칙 -> 본문에 나오는 기본 카테고리 이름 -> "기타")
+
+    규칙을 먼저 적용하므로 동시 호출 순서에 따라 기본 카테고리 목록이 달라도 결과가 같습니다.
+    """
+    text_words = words(text)
+    scores = {
+        category: sum(any(w.startswith(k) for k in keywords) for w in text_words)
+        for category, keywords in CATEGORY_KEYWORDS.items()
+    }
+    best = max(scores, key=lambda c: scores[c])
+    if scores[best]:
+        return best
+    for category in base_categories:
+        if category and category.lower() in text_words:
+            return category
+    return "기타"
+
+
+class FakeMessage:
+    """AIMessage 대신 쓰는 응답 (usage_metadata만 사용)"""
+
+    def __init__(self, content: str, usage_metadata: Dict[str, int]):
+        self.content = content
+        self.usage_metadata = usage_metadata
+
+
+class FakeStructuredRunnable:
+    """with_structured_output(schema, include_raw=True) 러너블 대체"""
+
+    def __init__(self, model: "FakeChatModel", schema: type, include_raw: bool, timeout: Optional[float] = None):
+        self.model = model
+        self.schema = schema
+        self.include_raw = include_raw
+        self.timeout = timeout
+
+    def invoke(self, chat_messages):
+        text = "\n".join(m["content"] for m in chat_messages if m.get("role") != "system")
+        parsed = self.model.respond(self.schema, text, self.timeout)
+        if not self.include_raw:
+            return parsed
+        content = parsed.model_dump_json()
+        usage = {
+            "input_tokens": count_tokens("".join(m["content"] for m in chat_messages)),
+            "output_tokens": count_tokens(content),
+        }
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        return {"raw": FakeMessage(content, usage), "parsed": parsed, "parsing_error": None}
+
+
+class FakeChatModel:
+    """규칙 기반 구조화 출력 가짜 채팅 모델
+
+    프롬프트의 출력 형식(OutputFormat 필드)으로 에이전트를 구분하고, 사용자 프롬프트를 파싱해
+    분류는 키워드 규칙, 필터링/추천은 검색어와 단어가 겹치는 항목을 고릅니다.
+    latency(+ 항목당 per_item_latency)만큼 기다리며, fail_rate 비율로 FakeLLMError를 냅니다. (seed로 재현)
+    기다릴 시간이 요청 시간 제한(with_structured_output의 timeout)보다 길면 제한만큼 기다린 뒤 FakeTimeoutError를 냅니다.
+    """
+    deployment_name = "fake"
+    model_name = "fake"
+
+    def __init__(self, latency: float = 0.0, per_item_latency: float = 0.0, fail_rate: float = 0.0,
+                 seed: int = 0):
+        self.latency = latency
+        self.per_item_latency = per_item_latency
+        self.fail_rate = fail_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # 호출 중인 요청의 시간 제한 (respond -> _wait_or_fail, 스레드별)
+        self._request = threading.local()
+        self.calls = 0
+
+    @classmethod
+    def from_env(cls) -> "FakeChatModel":
+        return cls(
+            latency=float(os.getenv("FAKE_LLM_LATENCY", "0")),
+            per_item_latency=float(os.getenv("FAKE_LLM_LATENCY_PER_ITEM", "0")),
+            fail_rate=float(os.getenv("FAKE_LLM_FAIL_RATE", "0")),
+            seed=int(os.getenv("FAKE_LLM_SEED", "0")),
+        )
+
+    def with_structured_output(self, schema: type, include_raw: bool = False, timeout: Optional[float] = None,
+                               **kwargs) -> FakeStructuredRunnable:
+        return FakeStructuredRunnable(self, schema, include_raw, timeout)
+
+    def _wait_or_fail(self, items: int) -> None:
+        with self._lock:
+            self.calls += 1
+            fail = self.fail_rate and self._random.random() < self.fail_rate
+        delay = self.latency + self.per_item_latency * items
+        timeout = getattr(self._request, "timeout", None)
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise FakeTimeoutError(f"요청 시간 제한({timeout}s) 초과")
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise FakeLLMError("injected failure")
+
+    def respond(self, schema: type, text: str, timeout: Optional[float] = None):
+        """출력 형식에 맞는 응답 객체를 만듭니다."""
+        self._request.timeout = timeout
+        fields = schema.model_fields
+        if "results" in fields:
+            return self._packed(schema, text)
+        if "bookmark_indexes" in fields:
+            return self._filter(schema, text)
+        if "feed_indexes" in fields:
+            return self._recommend(schema, text)
+        if "categories" in fields:
+            return self._category(schema, text)
+        if "hashtag" in fields:
+            return self._hashtag(schema, text)
+        raise ValueError(f"가짜 LLM이 지원하지 않는 출력 형식입니다: {schema.__name__}")
+
+    def _base_categories(self, text: str) -> List[str]:
+        match = BASE_CATEGORIES_PATTERN.search(text)
+        return [c.strip() for c in match.group(1).split(",") if c.strip()] if match else []
+
+    def _category(self, schema: type, text: str):
+        posts = CATEGORY_POST_PATTERN.findall(text)
+        self._wait_or_fail(len(posts))
+        body = " ".join(f"{caption} {hashtags}" for caption, hashtags in posts)
+        category = classify_text(body, self._base_categories(text))
+        return schema(categories=category, category_reason=f"가짜 LLM 규칙 분류: {category}")
+
+    def _packed(self, schema: type, text: str):
+        posts = PACKED_POST_PATTERN.findall(text)
+        self._wait_or_fail(len(posts))
+        base_categories = self._base_categories(text)
+        results = []
+        for index, caption, hashtags in posts:
+            category = classify_text(f"{caption} {hashtags}", base_categories)
+            results.append({"index": int(index), "categories": category,
+                            "category_reason": f"가짜 LLM 규칙 분류: {category}"})
+        return schema(results=results)
+
+    def _filter(self, schema: type, text: str):
+        match = FILTER_QUERY_PATTERN.search(text)
+        query = match.group(1) if match else ""
+        items = FILTER_ITEM_PATTERN.findall(text)
+        self._wait_or_fail(len(items))
+        indexes, reasons = [], []
+        for index, caption, hashtags in items:
+            keep = overlap(query, f"{caption} {hashtags}") > 0
+            if keep:
+                indexes.append(int(index))
+            reasons.append(f"{index} / {'O' if keep else 'X'} / 검색어 단어 {'일치' if keep else '없음'}")
+        return schema(bookmark_indexes=indexes, filter_reasons=reasons)
+
+    def _hashtag(self, schema: type, text: str):
+        match = FILTER_QUERY_PATTERN.search(text)
+        query = match.group(1) if match else ""
+        match = HASHTAG_CANDIDATES_PATTERN.search(text)
+        candidates = [c.strip() for c in match.group(1).split(",") if c.strip()] if match else []
+        self._wait_or_fail(len(candidates))
+        scored = [(overlap(query, candidate), -i, candidate) for i, candidate in enumerate(candidates)]
+        best = max(scored, default=(0, 0, ""))
+        return schema(hashtag=best[2] if best[0] > 0 else "")
+
+    def _recommend(self, schema: type, text: str):
+        match = RECOMMEND_QUERY_PATTERN.search(text)
+        query = match.group(1) if match else ""
+        items = RECOMMEND_ITEM_PATTERN.findall(text)
+        self._wait_or_fail(len(items))
+        scored = sorted(
+            ((overlap(query, f"{caption} {hashtags}"), int(index)) for index, caption, hashtags in items),
+            key=lambda s: (-s[0], s[1])
+        )
+        chosen = [index for score, index in scored if score > 0][:5]
+        return schema(feed_indexes=chosen,
+                      recommend_reasons=[f"{index}: 검색어와 겹치는 단어가 있는 게시물" for index in chosen])
+
+
+@lru_cache(maxsize=100000)
+def _feature(token: str, dim: int):
+    digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+    value = int.from_bytes(digest, "little")
+    return value % dim, 1.0 if (value >> 63) else -1.0
+
+
+class FakeEmbeddings:
+    """해시 기반 결정적 가짜 임베딩 (AzureOpenAIEmbeddings 대체)
+
+    단어와 단어 안의 글자 3-gram을 feature hashing으로 dim 차원에 누적한 뒤 정규화하므로,
+    같은 텍스트는 항상 같은 벡터, 단어를 많이 공유하는 텍스트는 가까운 벡터가 됩니다.
+    """
+
+    def __init__(self, dim: int = 1536, latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+
+    @classmethod
+    def from_env(cls) -> "FakeEmbeddings":
+        return cls(dim=int(os.getenv("FAKE_EMBED_DIM", "1536")),
+                   latency=float(os.getenv("FAKE_EMBED_LATENCY", "0")))
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in words(text):
+            index, sign = _feature(word, self.dim)
+            vector[index] += 2.0 * sign
+            for i in range(max(0, len(word) - 2)):
+                index, sign = _feature("#" + word[i:i + 3], self.dim)
+                vector[index] += sign
+        norm = float(np.linalg.norm(vector))
+        if norm == 0:
+            # 빈 텍스트도 영벡터가 아닌 고정 벡터로
+            vector[0] = 1.0
+            norm = 1.0
+        return (vector / norm).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._embed(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
@@ -0,0 +1,98 @@
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+from .category_cache import caption_hash, hashtag_hash
+from utils.cache import normalize_query
+
+
+def content_hash(bookmark: Dict[str, Any]) -> str:
+    """필터링 프롬프트에 들어가는 북마크 내용(캡션, 해시태그)의 해시"""
+    return caption_hash(bookmark.get('caption'))[:32] + hashtag_hash(bookmark.get('hashtags'))[:32]
+
+
+class FilterCache:
+    """검색어별 후보 관련성 판단(FilterAgent 결과)을 저장하는 SQLite 캐시
+
+    키는 (프롬프트 버전, 모델, 정규화한 검색어, feed_id, 북마크 내용 해시)이므로 같은 검색어를 다시 검색하면
+    이전에 판단한 후보는 LLM으로 보내지 않고, 캡션/해시태그가 바뀐 북마크나 처음 보는 후보만 다시 판단합니다.
+    CategoryCache와 같은 llm_cache.db 파일의 filter_cache 테이블을 사용합니다.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        # Streamlit 세션 스레드들이 하나의 연결을 공유
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''
+        CREATE TABLE IF NOT EXISTS filter_cache (
+            prompt_version TEXT NOT NULL,
+            model TEXT NOT NULL,
+            query TEXT NOT NULL,
+            feed_id TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            keep INTEGER NOT NULL,
+            reason TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (prompt_version, model, query, feed_id, content_hash)
+        )
+        ''')
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def get_many(self, prompt_version: str, model: str, query: str,
+                 bookmarks: List[Dict[str, Any]]) -> List[Optional[Tuple[bool, Optional[str]]]]:
+        """후보별 캐시된 (채택 여부, 이유)를 반환합니다. 없으면 None"""
+        query = normalize_query(query)
+        results = []
+        with self._lock:
+            for bookmark in bookmarks:
+                row = None
+                if bookmark.get('feed_id'):
+                    row = self._conn.execute(
+                        "SELECT keep, reason FROM filter_cache WHERE prompt_version = ? AND model = ? AND query = ? "
+                        "AND feed_id = ? AND content_hash = ?",
+                        (prompt_version, model, query, bookmark['feed_id'], content_hash(bookmark))
+                    ).fetchone()
+                if row:
+                    self.hits += 1
+                    results.append((bool(row[0]), row[1]))
+                else:
+                    self.misses += 1
+                    results.append(None)
+        return results
+
+    def put_many(self, prompt_version: str, model: str, query: str, bookmarks: List[Dict[str, Any]],
+                 decisions: List[Optional[bool]], reasons: Optional[List[Optional[str]]] = None) -> None:
+        """LLM이 판단한 후보(decision이 None이 아닌 것)의 판단과 이유를 저장합니다."""
+        query = normalize_query(query)
+        reasons = reasons or [None] * len(bookmarks)
+        rows = [
+            (prompt_version, model, query, bookmark['feed_id'], content_hash(bookmark), int(keep), reason)
+            for bookmark, keep, reason in zip(bookmarks, decisions, reasons)
+            if keep is not None and bookmark.get('feed_id')
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO filter_cache (prompt_version, model, query, feed_id, content_hash, keep, reason) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+            self.writes += len(rows)
+
+    def stats(self):
+        """모니터링용 통계"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import random
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+from .prompts import FilteringPrompt, count_tokens
+
+
+def candidate_score(bookmark: Dict[str, Any]) -> Optional[float]:
+    """게이팅에 사용할 의미 유사도 점수 (하이브리드 검색은 scores["semantic"], 의미 검색은 similarity)
+
+    키워드 검색으로만 찾은 후보처럼 의미 점수가 없으면 None을 반환합니다.
+    """
+    if isinstance(bookmark.get('scores'), dict):
+        return bookmark['scores'].get('semantic')
+    return bookmark.get('similarity')
+
+
+def candidate_tokens(bookmark: Dict[str, Any]) -> int:
+    """필터링 프롬프트에서 후보 한 개가 차지하는 토큰 수 (추정)"""
+    return count_tokens(FilteringPrompt.format_bookmark(0, bookmark))
+
+
+class ScoreGate:
+    """의미 유사도로 LLM 필터링 전에 후보를 나누는 게이트
+
+    upper 이상은 바로 채택, lower 미만은 바로 제외하고 그 사이(또는 점수가 없는) 후보만 LLM으로 보냅니다.
+    임계값은 utils/calibrate_filter_gate.py가 기록된 LLM 판단으로 보정해 JSON 파일로 저장하며,
+    보정 파일이 없으면 모든 후보를 LLM으로 보냅니다. (기존 동작)
+    explore_rate 비율의 게이트 판정 후보도 LLM에 함께 보내 판단을 기록해 두므로 다음 보정에 사용됩니다.
+    """
+
+    def __init__(self, lower: Optional[float] = None, upper: Optional[float] = None, explore_rate: float = 0.0):
+        self.lower = lower
+        self.upper = upper
+        self.explore_rate = explore_rate
+
+    @classmethod
+    def load(cls, path) -> "ScoreGate":
+        """보정 파일(JSON)에서 임계값을 읽습니다. FILTER_GATE_LOWER/UPPER 환경 변수가 있으면 우선합니다."""
+        lower = upper = None
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    calibration = json.load(f)
+                lower, upper = calibration.get("lower"), calibration.get("upper")
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"필터 게이트 보정 파일을 읽을 수 없습니다 (게이트 사용 안 함): {e}")
+        if os.getenv("FILTER_GATE_LOWER"):
+            lower = float(os.getenv("FILTER_GATE_LOWER"))
+        if os.getenv("FILTER_GATE_UPPER"):
+            upper = float(os.getenv("FILTER_GATE_UPPER"))
+        return cls(lower, upper, explore_rate=float(os.getenv("FILTER_GATE_EXPLORE", "0.05")))
+
+    @property
+    def enabled(self) -> bool:
+        return self.lower is not None or self.upper is not None
+
+    def key(self) -> Tuple[Optional[float], Optional[float]]:
+        """검색 결과 캐시 키용 (임계값이 바뀌면 결과도 바뀜)"""
+        return (self.lower, self.upper)
+
+    def decide(self, score: Optional[float]) -> Optional[bool]:
+        """True: 바로 채택, False: 바로 제외, None: LLM 판단 필요"""
+        if score is None:
+            return None
+        if self.upper is not None and score >= self.upper:
+            return True
+        if self.lower is not None and score < self.lower:
+            return False
+        return None
+
+    def split(self, bookmarks: List[Dict[str, Any]]) -> Tuple[List[Optional[bool]], List[int]]:
+        """후보별 게이트 판정과 LLM으로 보낼 위치 목록을 반환합니다.
+
+        Returns:
+            (판정 목록 [True/False/None], LLM으로 보낼 위치 목록 (판정 None + 탐색용 일부))
+        """
+        decisions = [self.decide(candidate_score(b)) for b in bookmarks]
+        to_llm = [
+            i for i, decision in enumerate(decisions)
+            if decision is None or (self.explore_rate and random.random() < self.explore_rate)
+        ]
+        return decisions, to_llm
+
+
+class FilterDecisionLog:
+    """LLM 필터링 판단 기록 (JSON Lines, 게이트 임계값 보정용)
+
+    Streamlit 세션 스레드들이 함께 쓰므로 추가는 lock으로 보호합니다.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+
+    def log(self, query: str, bookmarks: List[Dict[str, Any]], decisions: List[Optional[bool]],
+            gate_decisions: Optional[List[Optional[bool]]] = None) -> int:
+        """LLM이 판단한 후보(decision이 None이 아닌 것)만 기록하고 기록한 수를 반환합니다.
+
+        Args:
+            query: 검색어
+            bookmarks: LLM으로 보낸 후보 목록
+            decisions: 후보별 LLM 판단 (True: 채택, False: 제외, None: 실패/시간 초과)
+            gate_decisions: 후보별 게이트 판정 (탐색용으로 보낸 후보 표시)
+        """
+        now = time.time()
+        records = []
+        for i, (bookmark, keep) in enumerate(zip(bookmarks, decisions)):
+            if keep is None:
+                continue
+            records.append({
+                "ts": now,
+                "query": query,
+                "feed_id": bookmark.get('feed_id'),
+                "score": candidate_score(bookmark),
+                "tokens": candidate_tokens(bookmark),
+                "keep": keep,
+                "gate": gate_decisions[i] if gate_decisions else None,
+            })
+        if not records:
+            return 0
+        try:
+            with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"필터링 판단 기록 실패: {e}")
+            return 0
+        return len(records)
+
+    def read(self) -> List[Dict[str, Any]]:
+        """기록된 판단 목록 (손상된 줄은 건너뜀)"""
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return records
+
+
+def calibrate(records: List[Dict[str, Any]], target_agreement: float = 0.95,
+              min_support: int = 20) -> Dict[str, Any]:
+    """기록된 LLM 판단으로 게이트 임계값을 정합니다.
+
+    upper는 "점수 >= upper 후보의 LLM 채택 비율 >= target_agreement"를 만족하는 가장 낮은 점수,
+    lower는 "점수 < lower 후보의 LLM 제외 비율 >= target_agreement"를 만족하는 가장 높은 점수이며,
+    해당 구간의 기록이 min_support개보다 적으면 그쪽 게이트는 사용하지 않습니다(None).
+
+    Returns:
+        {"lower", "upper", "target_agreement", "samples", "gated", "agreement", "tokens_saved"}
+    """
+    samples = sorted(
+        (r["score"], bool(r["keep"]), r.get("tokens") or 0)
+        for r in records if r.get("score") is not None and r.get("keep") is not None
+    )
+    n = len(samples)
+
+    # 위에서부터 내려오며 채택 구간을 넓힘
+    upper, kept = None, 0
+    for i in range(n - 1, -1, -1):
+        kept += samples[i][1]
+        support = n - i
+        # 같은 점수가 이어지면 경계로 쓸 수 없음
+        if i > 0 and samples[i - 1][0] == samples[i][0]:
+            continue
+        if support >= min_support and kept / support >= target_agreement:
+            upper = samples[i][0]
+
+    # 아래에서부터 올라가며 제외 구간을 넓힘
+    lower, rejected = None, 0
+    for i in range(n):
+        rejected += not samples[i][1]
+        support = i + 1
+        if i + 1 < n and samples[i + 1][0] == samples[i][0]:
+            continue
+        if support >= min_support and rejected / support >= target_agreement:
+            # 점수 < lower 이므로 다음 점수가 경계
+            lower = samples[i + 1][0] if i + 1 < n else samples[i][0] + 1e-6
+    if lower is not None and upper is not None and lower > upper:
+        lower = upper
+
+    gate = ScoreGate(lower, upper)
+    gated = agree = tokens_total = tokens_saved = 0
+    for score, keep, tokens in samples:
+        tokens_total += tokens
+        decision = gate.decide(score)
+        if decision is None:
+            continue
+        gated += 1
+        agree += decision == keep
+        tokens_saved += tokens
+    return {
+        "lower": lower,
+        "upper": upper,
+        "target_agreement": target_agreement,
+        "samples": n,
+        "gated": gated / n if n else 0.0,
+        # LLM에 보낸 후보는 LLM 판단 그대로이므로 게이트 판정 후보만 불일치 가능
+        "agreement": (n - gated + agree) / n if n else 1.0,
+        "gated_agreement": agree / gated if gated else 1.0,
+        "tokens_saved": tokens_saved / tokens_total if tokens_total else 0.0,
+    }
@@ -0,0 +1,224 @@
+import os
+import json
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from .llm import get_embeddings
+from .recommend_rank import EmbeddingCache, embedding_model_name
+from utils.cache import LRUCache
+
+# 트렌드 게시물 덤프(<해시태그>.json) 디렉토리 (utils.instagram.get_recent_feeds와 같은 위치)
+TREND_DUMP_DIR = os.getenv("TREND_DUMP_DIR", "./data")
+# 유사도가 이보다 낮으면 LLM(HashtagAgent)으로 고름 (ada-002는 무관한 텍스트끼리도 0.7 안팎이라 높게 설정)
+HASHTAG_MIN_SIMILARITY = float(os.getenv("HASHTAG_MIN_SIMILARITY", "0.8"))
+# 점수 = 유사도 + HASHTAG_FREQ_WEIGHT * log(1 + 빈도)
+HASHTAG_FREQ_WEIGHT = float(os.getenv("HASHTAG_FREQ_WEIGHT", "0.02"))
+# 고를 해시태그가 없을 때 (기존 추천 페이지의 기본값)
+DEFAULT_HASHTAG = "트렌드"
+
+# (트렌드 덤프 디렉토리, 덤프 파일 목록, 임베딩 모델) -> HashtagIndex
+_indexes = LRUCache(maxsize=16)
+# (DB, DB 버전, 인덱스 id) -> (HashtagIndex, 북마크 해시태그 빈도를 더한 점수 보너스)
+# 인덱스 객체도 함께 보관해 id가 다른 객체에 재사용되지 않도록 함
+_bonuses = LRUCache(maxsize=64)
+
+
+def normalize_hashtag(tag: str) -> str:
+    return str(tag or "").strip().lstrip("#").lower()
+
+
+def trend_dump_files(trend_dir: str = TREND_DUMP_DIR) -> List[Path]:
+    directory = Path(trend_dir)
+    return sorted(directory.glob("*.json")) if directory.is_dir() else []
+
+
+def load_trend_dumps(trend_dir: str = TREND_DUMP_DIR) -> Dict[str, List[List[str]]]:
+    """트렌드 덤프 파일별 게시물 해시태그 목록 {해시태그(파일 이름): [게시물 해시태그, ...]}
+
+    게시물 목록(feed_id가 있는 dict 리스트)이 아닌 JSON(filter_gate.json 등)은 건너뜁니다.
+    """
+    dumps = {}
+    for path in trend_dump_files(trend_dir):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                feeds = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if isinstance(feeds, list) and feeds and all(isinstance(feed, dict) and "feed_id" in feed for feed in feeds):
+            dumps[path.stem] = [feed.get("hashtags") or [] for feed in feeds]
+    return dumps
+
+
+class HashtagIndex:
+    """트렌드 해시태그 임베딩 인덱스
+
+    추천 페이지에서 게시물을 불러올 수 있는 해시태그는 트렌드 덤프 파일이 있는 것뿐이므로 그 해시태그만
+    임베딩(EmbeddingCache)해 행렬 하나로 들고 있고, 검색어 임베딩과의 내적 한 번으로 가까운 해시태그를 찾습니다.
+    빈도(트렌드 덤프 게시물 수 + 덤프 게시물에 함께 달린 수, frequency_bonus로 북마크 해시태그 수를 더함)는
+    점수 보너스로만 사용합니다.
+    """
+
+    def __init__(self, tags: List[str], counts: List[int], vectors: np.ndarray):
+        self.tags = tags
+        self.counts = np.asarray(counts, dtype=np.float32)
+        self.vectors = vectors
+        self.available = set(tags)
+        self.bonus = self.frequency_bonus()
+
+    def __len__(self):
+        return len(self.tags)
+
+    def frequency_bonus(self, hashtag_counts: Optional[Dict[str, int]] = None) -> np.ndarray:
+        """해시태그별 점수 보너스 HASHTAG_FREQ_WEIGHT * log(1 + 빈도)
+
+        Args:
+            hashtag_counts: 빈도에 더할 북마크 해시태그 수 (db.get_hashtag_counts(), 인덱스에 없는 해시태그는 무시)
+        """
+        counts = self.counts
+        if hashtag_counts:
+            extra = {}
+            for tag, count in hashtag_counts.items():
+                tag = normalize_hashtag(tag)
+                if tag in self.available:
+                    extra[tag] = extra.get(tag, 0) + count
+            counts = counts + np.array([extra.get(tag, 0) for tag in self.tags], dtype=np.float32)
+        return HASHTAG_FREQ_WEIGHT * np.log1p(counts)
+
+    @classmethod
+    def build(cls, embeddings, cache: EmbeddingCache, trend_dir: str = TREND_DUMP_DIR) -> "HashtagIndex":
+        """트렌드 덤프가 있는 해시태그만 임베딩합니다. (캐시에 없는 것만 한 번에)"""
+        dumps = load_trend_dumps(trend_dir)
+        counts = {}
+        for name, feed_hashtags in dumps.items():
+            name = normalize_hashtag(name)
+            if name:
+                # 덤프 파일의 해시태그는 덤프 게시물 수만큼 빈도를 더함
+                counts[name] = counts.get(name, 0) + len(feed_hashtags)
+        for feed_hashtags in dumps.values():
+            for hashtags in feed_hashtags:
+                for tag in set(normalize_hashtag(t) for t in hashtags):
+                    if tag in counts:
+                        counts[tag] += 1
+
+        tags = sorted(counts)
+        if not tags:
+            return cls([], [], np.zeros((0, 0), dtype=np.float32))
+
+        model = embedding_model_name(embeddings)
+        vectors = cache.get_many(model, tags)
+        missing = [tag for tag, vector in zip(tags, vectors) if vector is None]
+        if missing:
+            embedded = embeddings.embed_documents(missing)
+            cache.put_many(model, missing, embedded)
+            by_tag = dict(zip(missing, embedded))
+            vectors = [v if v is not None else by_tag[tag] for v, tag in zip(vectors, tags)]
+        vectors = np.array(vectors, dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return cls(tags, [counts[tag] for tag in tags], vectors)
+
+    def lexical(self, query: str) -> Optional[str]:
+        """검색어에 그대로 들어 있는 (트렌드 덤프가 있는) 해시태그 중 가장 긴 것"""
+        text = "".join(normalize_hashtag(query).split())
+        matches = [tag for tag in self.available if len(tag) >= 2 and tag in text]
+        return max(matches, key=lambda tag: (len(tag), tag)) if matches else None
+
+    def search(self, query_vector, k: int = 3, bonus: Optional[np.ndarray] = None) -> List[Tuple[str, float, float]]:
+        """검색어 임베딩과 가까운 해시태그 [(해시태그, 점수, 유사도)] (점수 내림차순)
+
+        Args:
+            bonus: 해시태그별 점수 보너스 (기본: 트렌드 덤프 빈도만 반영한 self.bonus)
+        """
+        k = min(k, len(self.tags))
+        if k <= 0:
+            return []
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        query_vector = query_vector / max(float(np.linalg.norm(query_vector)), 1e-12)
+        similarity = self.vectors @ query_vector
+        score = similarity + (self.bonus if bonus is None else bonus)
+        top = np.argpartition(-score, k - 1)[:k]
+        top = top[np.argsort(-score[top])]
+        return [(self.tags[i], float(score[i]), float(similarity[i])) for i in top]
+
+
+class HashtagResolver:
+    """검색어 -> 트렌드 해시태그
+
+    1) 검색어에 트렌드 해시태그가 그대로 들어 있으면 바로 사용 (lexical)
+    2) 해시태그 인덱스에서 검색어 임베딩과 가장 가까운 해시태그의 유사도가 min_similarity 이상이면 사용 (embedding)
+    3) 아니면 상위 후보 중에서 LLM(HashtagAgent)이 고르고 (llm), 고르지 못하면 기본 해시태그 (default)
+    인덱스는 트렌드 덤프 파일이 바뀔 때만 다시 만들고(해시태그 임베딩은 EmbeddingCache에 저장),
+    북마크 해시태그 빈도 보너스는 DB가 바뀔 때만 다시 계산합니다. (임베딩은 다시 하지 않음)
+    """
+
+    def __init__(self, db, vector_store, cache: EmbeddingCache, trend_dir: str = TREND_DUMP_DIR,
+                 agent=None, min_similarity: float = HASHTAG_MIN_SIMILARITY, llm_candidates: int = 20):
+        """
+        Args:
+            db: BookmarkDatabase 인스턴스 (북마크 해시태그 빈도)
+            vector_store: VectorStore 또는 VectorServiceClient (검색어 임베딩 캐시)
+            cache: 해시태그 임베딩 캐시
+            trend_dir: 트렌드 덤프 디렉토리
+            agent: 유사도가 낮을 때 사용할 HashtagAgent (None이면 LLM 없이 기본 해시태그)
+            min_similarity: 임베딩 결과를 그대로 쓸 최소 유사도
+            llm_candidates: LLM에 보낼 후보 해시태그 수
+        """
+        self.db = db
+        self.vector_store = vector_store
+        self.cache = cache
+        self.trend_dir = trend_dir
+        self.agent = agent
+        self.min_similarity = min_similarity
+        self.llm_candidates = llm_candidates
+
+    @property
+    def embeddings(self):
+        # 공유 벡터 서비스 클라이언트는 임베딩 객체가 없으므로 같은 설정의 프로세스 전역 클라이언트 사용
+        return getattr(self.vector_store, "embeddings", None) or get_embeddings()
+
+    def index(self) -> HashtagIndex:
+        """현재 트렌드 덤프 기준 해시태그 인덱스 (프로세스 전역 캐시, 파티션끼리 공유)"""
+        dumps = tuple((p.name, p.stat().st_mtime_ns, p.stat().st_size) for p in trend_dump_files(self.trend_dir))
+        key = (str(Path(self.trend_dir).resolve()), dumps, embedding_model_name(self.embeddings))
+        index = _indexes.get(key)
+        if index is None:
+            index = HashtagIndex.build(self.embeddings, self.cache, self.trend_dir)
+            _indexes.put(key, index)
+        return index
+
+    def frequency_bonus(self, index: HashtagIndex) -> np.ndarray:
+        """이 DB의 북마크 해시태그 빈도를 더한 점수 보너스 (DB 버전별 캐시)"""
+        key = (self.db.db_path, self.db.get_version(), id(index))
+        entry = _bonuses.get(key)
+        if entry is None or entry[0] is not index:
+            entry = (index, index.frequency_bonus(self.db.get_hashtag_counts()))
+            _bonuses.put(key, entry)
+        return entry[1]
+
+    def resolve(self, query: str) -> Dict[str, Any]:
+        """{"hashtag", "method": lexical|embedding|llm|default, "similarity", "candidates", "llm": LLM 호출 여부, "elapsed"}"""
+        started = time.perf_counter()
+        result = {"hashtag": DEFAULT_HASHTAG, "method": "default", "similarity": None, "candidates": [],
+                  "llm": False}
+        try:
+            index = self.index()
+            hashtag = index.lexical(query)
+            if hashtag:
+                result.update(hashtag=hashtag, method="lexical")
+            else:
+                candidates = index.search(self.vector_store.embed_query(query), k=self.llm_candidates,
+                                          bonus=self.frequency_bonus(index))
+                result["candidates"] = [tag for tag, _, _ in candidates[:5]]
+                if candidates and candidates[0][2] >= self.min_similarity:
+                    result.update(hashtag=candidates[0][0], method="embedding", similarity=candidates[0][2])
+                elif candidates and self.agent is not None:
+                    result["llm"] = True
+                    hashtag = self.agent.choose(query, [tag for tag, _, _ in candidates])
+                    if hashtag:
+                        result.update(hashtag=hashtag, method="llm", similarity=candidates[0][2])
+        except Exception as e:
+            print(f"해시태그 선택 중 오류 (기본 해시태그 사용): {e}")
+        result["elapsed"] = round(time.perf_counter() - started, 4)
+        return result
@@ -0,0 +1,89 @@
+from typing import Dict, Any, List, Optional, Tuple
+
+# 오류/미분류 시 채워지는 카테고리는 이웃 투표에서 제외
+UNLABELED_CATEGORIES = {None, "", "기타"}
+
+
+class KNNCategoryClassifier:
+    """이미 분류된 북마크의 FAISS 이웃 투표로 카테고리를 예측하는 분류기
+
+    이웃들의 카테고리 합의도(유사도 가중)가 충분히 높을 때만 예측을 반환하고,
+    애매한 경우 None을 반환해 LLM 분류로 넘깁니다.
+    """
+
+    def __init__(self, db, vector_store, k: int = 10, min_similarity: float = 0.85,
+                 min_agreement: float = 0.7, min_neighbors: int = 3):
+        """
+        Args:
+            db: BookmarkDatabase 인스턴스 (bookmarks.category 조회)
+            vector_store: VectorStore 인스턴스
+            k: 조회할 이웃 수
+            min_similarity: 투표에 참여할 이웃의 최소 코사인 유사도
+            min_agreement: 최다 카테고리의 가중 득표율 하한
+            min_neighbors: 투표에 참여한 이웃 수 하한
+        """
+        self.db = db
+        self.vector_store = vector_store
+        self.k = k
+        self.min_similarity = min_similarity
+        self.min_agreement = min_agreement
+        self.min_neighbors = min_neighbors
+
+    def vote(self, neighbors, exclude_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """이웃 목록 [(feed_id, 유사도)]으로 카테고리 투표를 수행합니다.
+
+        Returns:
+            {"category", "confidence", "neighbors"} 또는 확신이 부족하면 None
+        """
+        neighbors = [(fid, sim) for fid, sim in neighbors
+                     if fid != exclude_id and sim >= self.min_similarity]
+        if len(neighbors) < self.min_neighbors:
+            return None
+
+        categories = self.db.get_categories_by_feed_ids([fid for fid, _ in neighbors])
+        votes = {}
+        voters = 0
+        for feed_id, similarity in neighbors:
+            category = categories.get(feed_id)
+            if category in UNLABELED_CATEGORIES:
+                continue
+            votes[category] = votes.get(category, 0.0) + similarity
+            voters += 1
+
+        if voters < self.min_neighbors:
+            return None
+
+        category, weight = max(votes.items(), key=lambda item: item[1])
+        confidence = weight / sum(votes.values())
+        if confidence < self.min_agreement:
+            return None
+        return {"category": category, "confidence": confidence, "neighbors": voters}
+
+    def predict_vector(self, vector, exclude_id: Optional[str] = None, transformed: bool = False) -> Optional[Dict[str, Any]]:
+        """벡터로 카테고리를 예측합니다. (자기 자신은 exclude_id로 제외)"""
+        neighbors = self.vector_store.search_by_vector(vector, limit=self.k + 1, transformed=transformed)
+        return self.vote(neighbors, exclude_id=exclude_id)
+
+    def predict(self, caption: str, feed_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """캡션으로 카테고리를 예측합니다. (predict_many 참고)"""
+        return self.predict_many([(caption, feed_id)])[0]
+
+    def predict_many(self, items: List[Tuple[str, Optional[str]]]) -> List[Optional[Dict[str, Any]]]:
+        """[(캡션, feed_id)] 목록의 카테고리를 예측합니다.
+
+        이미 벡터 스토어에 있는 북마크(feed_id)는 저장된 벡터를 재사용하고, 나머지 캡션은
+        embed_documents 한 번으로 임베딩합니다. (쿼리 캐시 대신 캡션 캐시에 남아 벡터 저장 시 재사용됨)
+        """
+        predictions = [None] * len(items)
+        pending = []
+        for i, (caption, feed_id) in enumerate(items):
+            vector = self.vector_store.get_vector(feed_id) if feed_id else None
+            if vector is not None:
+                predictions[i] = self.predict_vector(vector, exclude_id=feed_id, transformed=True)
+            elif caption:
+                pending.append(i)
+        if pending:
+            vectors = self.vector_store.embed_documents([items[i][0] for i in pending])
+            for i, vector in zip(pending, vectors):
+                predictions[i] = self.predict_vector(vector, exclude_id=items[i][1])
+        return predictions
@@ -0,0 +1,168 @@
+import os
+import math
+import time
+import uuid
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional
+
+# 모델 가격 (USD / 1M 토큰, 기본값: gpt-4o-mini), 배포에 맞게 환경 변수로 조정
+PRICE_INPUT_PER_1M = float(os.getenv("LLM_PRICE_INPUT_PER_1M", "0.15"))
+PRICE_OUTPUT_PER_1M = float(os.getenv("LLM_PRICE_OUTPUT_PER_1M", "0.60"))
+
+
+def estimate_cost(prompt_tokens: int, completion_tokens: int) -> float:
+    """토큰 수로 추정한 호출 비용 (USD)"""
+    return (prompt_tokens * PRICE_INPUT_PER_1M + completion_tokens * PRICE_OUTPUT_PER_1M) / 1_000_000
+
+
+def new_trace_id() -> str:
+    """검색 한 번처럼 여러 LLM 호출을 묶는 ID"""
+    return uuid.uuid4().hex[:16]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """정렬하지 않은 값 목록의 q 분위수 (nearest-rank)"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    rank = max(0, min(len(values) - 1, math.ceil(q * len(values)) - 1))
+    return values[rank]
+
+
+class LLMLedger:
+    """LLM 호출 기록(SQLite)
+
+    에이전트의 LLM 호출마다 지연시간, 프롬프트/출력 토큰, 재시도 여부, 추정 비용을 한 행으로 기록하고,
+    캐시로 LLM 호출을 생략한 경우도 operation="cache" 행으로 남깁니다.
+    검색 한 번의 호출들은 같은 trace_id를 가지므로 검색당 토큰을 집계할 수 있습니다.
+    기록 실패는 출력만 하고 LLM 호출 결과에는 영향을 주지 않습니다.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        # 여러 에이전트/스레드가 하나의 연결을 공유
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''
+        CREATE TABLE IF NOT EXISTS llm_calls (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts REAL NOT NULL,
+            agent TEXT NOT NULL,
+            operation TEXT NOT NULL,
+            model TEXT,
+            trace_id TEXT,
+            latency_ms REAL DEFAULT 0,
+            prompt_tokens INTEGER DEFAULT 0,
+            completion_tokens INTEGER DEFAULT 0,
+            items INTEGER DEFAULT 0,
+            retries INTEGER DEFAULT 0,
+            cache_hits INTEGER DEFAULT 0,
+            ok INTEGER DEFAULT 1,
+            error TEXT,
+            cost_usd REAL DEFAULT 0
+        )
+        ''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_calls_ts ON llm_calls(ts)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def record(self, agent: str, operation: str, model: str = "", trace_id: Optional[str] = None,
+               latency: float = 0.0, prompt_tokens: int = 0, completion_tokens: int = 0, items: int = 0,
+               retries: int = 0, cache_hits: int = 0, ok: bool = True, error: Optional[str] = None) -> None:
+        """호출 한 건을 기록합니다. (latency: 초)"""
+        row = (
+            time.time(), agent, operation, model, trace_id, latency * 1000, prompt_tokens, completion_tokens,
+            items, retries, cache_hits, int(ok), error[:300] if error else None,
+            estimate_cost(prompt_tokens, completion_tokens),
+        )
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT INTO llm_calls (ts, agent, operation, model, trace_id, latency_ms, prompt_tokens, "
+                    "completion_tokens, items, retries, cache_hits, ok, error, cost_usd) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    row
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"LLM 호출 기록 실패: {e}")
+
+    def _rows(self, query: str, params):
+        with self._lock:
+            return self._conn.execute(query, params).fetchall()
+
+    def summary(self, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """에이전트/작업별 집계 (호출 수, 오류, 지연시간 p50/p95, 토큰, 캐시 적중, 추정 비용)
+
+        Args:
+            since: 이 시각(time.time()) 이후 기록만 집계 (기본: 전체)
+        """
+        rows = self._rows(
+            "SELECT agent, operation, latency_ms, prompt_tokens, completion_tokens, items, retries, cache_hits, "
+            "ok, cost_usd FROM llm_calls WHERE ts >= ?", (since or 0,)
+        )
+        groups = {}
+        for agent, operation, latency, prompt, completion, items, retries, cache_hits, ok, cost in rows:
+            group = groups.setdefault((agent, operation), {
+                "agent": agent, "operation": operation, "calls": 0, "errors": 0, "latencies": [],
+                "prompt_tokens": 0, "completion_tokens": 0, "items": 0, "retries": 0, "cache_hits": 0, "cost_usd": 0.0,
+            })
+            if operation != "cache":
+                group["calls"] += 1
+                group["latencies"].append(latency)
+            group["errors"] += not ok
+            group["prompt_tokens"] += prompt
+            group["completion_tokens"] += completion
+            group["items"] += items
+            group["retries"] += retries
+            group["cache_hits"] += cache_hits
+            group["cost_usd"] += cost
+        results = []
+        for key in sorted(groups):
+            group = groups[key]
+            latencies = group.pop("latencies")
+            group["p50_ms"] = percentile(latencies, 0.5)
+            group["p95_ms"] = percentile(latencies, 0.95)
+            results.append(group)
+        return results
+
+    def per_trace(self, agent: str = "filter", since: Optional[float] = None) -> Dict[str, Any]:
+        """trace(검색 한 번)당 LLM 호출 수와 토큰 (평균, p95)"""
+        rows = self._rows(
+            "SELECT trace_id, COUNT(CASE WHEN operation != 'cache' THEN 1 END), "
+            "SUM(prompt_tokens + completion_tokens), SUM(cost_usd) "
+            "FROM llm_calls WHERE ts >= ? AND trace_id IS NOT NULL AND agent = ? GROUP BY trace_id",
+            (since or 0, agent)
+        )
+        calls = [r[1] for r in rows]
+        tokens = [r[2] or 0 for r in rows]
+        return {
+            "agent": agent,
+            "traces": len(rows),
+            "calls_mean": sum(calls) / len(rows) if rows else 0.0,
+            "tokens_mean": sum(tokens) / len(rows) if rows else 0.0,
+            "tokens_p95": percentile(tokens, 0.95),
+            "cost_usd_mean": sum(r[3] or 0 for r in rows) / len(rows) if rows else 0.0,
+        }
+
+
+# 프로세스 전역 기록기 (경로별 하나, LLM_LEDGER_PATH가 빈 문자열이면 기록하지 않음)
+_ledgers: Dict[str, LLMLedger] = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_ledger(path: Optional[str] = None) -> Optional[LLMLedger]:
+    """LLM 호출 기록기 (기본: LLM_LEDGER_PATH 환경 변수 또는 ./data/llm_ledger.db)"""
+    path = path if path is not None else os.getenv("LLM_LEDGER_PATH", "./data/llm_ledger.db")
+    if not path:
+        return None
+    with _ledgers_lock:
+        if path not in _ledgers:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                _ledgers[path] = LLMLedger(path)
+            except (OSError, sqlite3.Error) as e:
+                print(f"LLM 호출 기록 파일을 열 수 없습니다 (기록 안 함): {e}")
+                _ledgers[path] = None
+        return _ledgers[path]
@@ -0,0 +1,139 @@
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+# .env 파일에서 환경 변수 로드
+load_dotenv()
+
+# 프로세스 전역 클라이언트 레지스트리 (처음 사용할 때 생성)
+# langchain_openai import와 클라이언트 생성을 첫 LLM/임베딩 호출까지 미뤄 모듈 import를 가볍게 유지
+_clients: Dict[str, Any] = {}
+_clients_lock = threading.RLock()  # get_llm 생성 중 get_http_client 호출
+
+# (LLM 객체 id, 출력 스키마, 시간 제한) -> (LLM 객체, with_structured_output(include_raw=True) 러너블)
+# LLM 객체도 함께 보관해 id가 다른 객체에 재사용되지 않도록 함
+_structured: Dict[Tuple[int, type], Tuple[Any, Any]] = {}
+_structured_lock = threading.Lock()
+
+# LLM/임베딩 요청 한 번의 시간 제한(초)
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+
+
+def _get_or_create(name: str, factory):
+    client = _clients.get(name)
+    if client is not None:
+        return client
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = factory()
+        return _clients[name]
+
+
+def get_http_client():
+    """LLM/임베딩 클라이언트가 함께 쓰는 HTTP 연결 풀
+
+    같은 Azure 엔드포인트로 가는 채팅/임베딩 요청이 keep-alive 연결을 재사용합니다.
+    openai 기본값(유휴 연결 5초 후 종료)은 검색 사이 간격보다 짧아 매번 TLS 연결을 새로 맺으므로
+    LLM_KEEPALIVE_SECONDS(기본 60초)로 늘리고, 유지할 연결 수는 동시 호출 수(LLM_MAX_CONCURRENCY)에 맞춥니다.
+    """
+    def create():
+        import httpx
+        from openai import DefaultHttpxClient
+
+        concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        return DefaultHttpxClient(limits=httpx.Limits(
+            max_connections=max(100, concurrency * 4),
+            max_keepalive_connections=max(20, concurrency * 2),
+            keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_SECONDS", "60")),
+        ))
+    return _get_or_create("http", create)
+
+
+def get_llm():
+    """프로세스 전역 채팅 LLM 클라이언트 (처음 호출할 때 생성)
+
+    LLM_PROVIDER=azure(기본)는 AzureChatOpenAI, fake는 오프라인 규칙 기반 가짜 모델(agent.fake_llm)입니다.
+    """
+    def create():
+        provider = os.getenv("LLM_PROVIDER", "azure")
+        if provider == "fake":
+            from .fake_llm import FakeChatModel
+            return FakeChatModel.from_env()
+        if provider != "azure":
+            raise ValueError(f"지원하지 않는 LLM_PROVIDER입니다: {provider} (azure, fake)")
+        from langchain_openai import AzureChatOpenAI
+
+        return AzureChatOpenAI(
+            openai_api_key=os.getenv("AOAI_API_KEY"),
+            azure_endpoint=os.getenv("AOAI_ENDPOINT"),
+            azure_deployment=os.getenv("AOAI_DEPLOY_GPT4O_MINI"),
+            api_version="2024-08-01-preview",
+            temperature=0.5,
+            # 재시도는 에이전트(_invoke_structured)가 백오프/circuit breaker와 함께 처리
+            timeout=LLM_TIMEOUT,
+            max_retries=0,
+            http_client=get_http_client(),
+        )
+    return _get_or_create("llm", create)
+
+
+def get_llm_name() -> str:
+    """get_llm() 클라이언트의 모델(배포) 이름 (클라이언트를 아직 만들지 않았으면 만들지 않고 설정에서 읽음)"""
+    client = _clients.get("llm")
+    if client is not None:
+        return str(getattr(client, "deployment_name", None) or getattr(client, "model_name", ""))
+    if os.getenv("LLM_PROVIDER", "azure") == "fake":
+        from .fake_llm import FakeChatModel
+        return FakeChatModel.deployment_name
+    return os.getenv("AOAI_DEPLOY_GPT4O_MINI") or ""
+
+
+def get_embeddings():
+    """프로세스 전역 임베딩 클라이언트 (처음 호출할 때 생성)
+
+    EMBEDDING_PROVIDER=azure(기본)는 AzureOpenAIEmbeddings, fake는 해시 기반 가짜 임베딩(agent.fake_llm)입니다.
+    """
+    def create():
+        provider = os.getenv("EMBEDDING_PROVIDER", "azure")
+        if provider == "fake":
+            from .fake_llm import FakeEmbeddings
+            return FakeEmbeddings.from_env()
+        if provider != "azure":
+            raise ValueError(f"지원하지 않는 EMBEDDING_PROVIDER입니다: {provider} (azure, fake)")
+        from langchain_openai import AzureOpenAIEmbeddings
+
+        return AzureOpenAIEmbeddings(
+            model=os.getenv("AOAI_DEPLOY_EMBED_ADA"),
+            openai_api_version="2024-02-01",
+            api_key=os.getenv("AOAI_API_KEY"),
+            azure_endpoint=os.getenv("AOAI_ENDPOINT"),
+            timeout=LLM_TIMEOUT,
+            http_client=get_http_client(),
+        )
+    return _get_or_create("embeddings", create)
+
+
+def structured_llm(schema: type, llm=None, timeout: Optional[float] = None):
+    """llm.with_structured_output(schema, include_raw=True) 러너블 (LLM 객체, 스키마, 시간 제한별로 한 번만 생성)
+
+    응답은 {"raw": AIMessage, "parsed": schema 객체, "parsing_error": 예외 또는 None}이며,
+    raw의 usage_metadata로 실제 토큰 사용량을 기록합니다.
+
+    Args:
+        schema: 출력 형식 (프롬프트의 OutputFormat)
+        llm: LLM 객체 (기본: get_llm()), 벤치마크처럼 다른 객체를 넘기면 그 객체 기준으로 따로 캐시
+        timeout: 요청 한 번의 시간 제한(초, 기본: 클라이언트의 LLM_TIMEOUT), 호출 전체 시간 제한이 얼마 남지 않았을 때 사용
+    """
+    llm = llm if llm is not None else get_llm()
+    key = (id(llm), schema, timeout)
+    entry = _structured.get(key)
+    if entry is None:
+        with _structured_lock:
+            entry = _structured.get(key)
+            if entry is None:
+                kwargs = {"timeout": timeout} if timeout is not None else {}
+                entry = (llm, llm.with_structured_output(schema, include_raw=True, **kwargs))
+                _structured[key] = entry
+    return entry[1]
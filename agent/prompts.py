@@ -1,7 +1,159 @@
+import os
+import re
+import logging
+import threading
+import unicodedata
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
+try:
+    import tiktoken
+except ImportError:  # requirements.txt에 포함, 설치되지 않은 환경에서는 estimate_tokens 근사치 사용
+    tiktoken = None
+
+logger = logging.getLogger("Prompts")
+
+
+def estimate_tokens(text: str) -> int:
+    """프롬프트 토큰 수 근사치 (영문 약 4자/토큰, 한글 등 비ASCII 약 1.5자/토큰)"""
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return int(ascii_chars / 4 + (len(text) - ascii_chars) / 1.5) + 1
+
+
+# tiktoken 인코딩 (None: 아직 로드 안 함, False: 사용 불가)
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                if tiktoken is None:
+                    logger.warning("tiktoken이 설치되어 있지 않습니다 (토큰 수 근사치 사용)")
+                    _encoding = False
+                    return _encoding
+                try:
+                    # gpt-4o 계열 인코딩 (처음 사용할 때 인코딩 파일을 내려받으므로 오프라인이면 실패)
+                    _encoding = tiktoken.get_encoding(os.getenv("TIKTOKEN_ENCODING", "o200k_base"))
+                except Exception as e:
+                    logger.warning(f"tiktoken 인코딩을 불러올 수 없습니다 (토큰 수 근사치 사용): {e}")
+                    _encoding = False
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """프롬프트 토큰 수 (tiktoken이 있으면 정확한 값, 없으면 estimate_tokens 근사치)"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
+
+
+# 캡션 본문의 해시태그 (해시태그는 별도 필드로 전달하므로 본문에서는 제거)
+_HASHTAG_PATTERN = re.compile(r"(?<!\w)#[^\s#]+")
+# 같은 문장부호/장식 문자 4번 이상 반복 ("!!!!!", "......", "━━━━")
+_REPEAT_PATTERN = re.compile(r"([^\w\s])\1{3,}")
+# 문장 경계 (스마트 자르기용)
+_SENTENCE_END_PATTERN = re.compile(r"[.!?。…]\s|다\.|요\.|\n")
+
+
+def _is_emoji(ch: str) -> bool:
+    return unicodedata.category(ch) in ("So", "Sk") or ch in ("\u200d", "\ufe0f") or 0x1F000 <= ord(ch) <= 0x1FAFF
+
+
+def _collapse_emoji(text: str) -> str:
+    """연속된 이모지는 첫 번째 하나만 남깁니다. (ZWJ/variation selector 포함)"""
+    output = []
+    previous_emoji = False
+    for ch in text:
+        emoji = _is_emoji(ch)
+        if emoji and previous_emoji:
+            continue
+        if not (emoji and ch in ("\u200d", "\ufe0f")):
+            output.append(ch)
+        previous_emoji = emoji
+    return "".join(output)
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """max_tokens 이하로 자릅니다. 가능하면 문장 경계에서 자르고 "…"를 붙입니다."""
+    if not text or max_tokens <= 0:
+        return ""
+    tokens = count_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    cut = int(len(text) * max_tokens / tokens)
+    while cut > 0 and count_tokens(text[:cut] + "…") > max_tokens:
+        cut = int(cut * 0.9)
+    head = text[:cut]
+    # 뒤쪽 30% 안에 문장 경계가 있으면 그 뒤에서 자름
+    boundaries = [m.end() for m in _SENTENCE_END_PATTERN.finditer(head) if m.end() >= cut * 0.7]
+    if boundaries:
+        head = head[:boundaries[-1]]
+    return head.rstrip() + "…"
+
+
+def compact_caption(caption: Optional[str], max_tokens: int = 300) -> str:
+    """프롬프트에 넣을 캡션을 줄입니다.
+
+    본문의 해시태그 제거, 연속 이모지/반복 문장부호/공백 축약, 장식 줄 제거 후 max_tokens를 넘으면 문장 경계에서 자릅니다.
+    해시태그만 있는 캡션이면 해시태그를 그대로 둡니다.
+    """
+    if not caption:
+        return ""
+    text = str(caption)
+    stripped = _HASHTAG_PATTERN.sub(" ", text)
+    if stripped.strip():
+        text = stripped
+    text = _collapse_emoji(text)
+    text = _REPEAT_PATTERN.sub(r"\1\1\1", text)
+    # 줄 단위 공백 정리 후 빈 줄/장식 줄(글자 없이 기호만 있는 줄) 제거
+    lines = [" ".join(line.split()) for line in text.splitlines()]
+    text = "\n".join(line for line in lines if re.search(r"\w", line))
+    return truncate_tokens(text, max_tokens)
+
+
+def compact_hashtags(hashtags, max_hashtags: int = 15) -> List[str]:
+    """해시태그 목록의 중복(대소문자/# 무시)을 제거하고 최대 max_hashtags개만 남깁니다."""
+    if isinstance(hashtags, str):
+        hashtags = hashtags.split()
+    seen = set()
+    compacted = []
+    for tag in hashtags or []:
+        tag = str(tag).strip().lstrip("#")
+        if tag and tag.lower() not in seen:
+            seen.add(tag.lower())
+            compacted.append(tag)
+    return compacted[:max_hashtags]
+
+
+def fit_items(items: List[str], total_tokens: int, min_item_tokens: int = 40, drop: bool = False) -> List[str]:
+    """항목(이미 compact_caption으로 줄인 텍스트)들의 합계가 total_tokens를 넘으면 예산에 맞춥니다.
+
+    drop=False면 항목 수를 유지하고 항목당 길이를 줄이며(최소 min_item_tokens, 후보 번호가 바뀌면 안 되는 경우),
+    drop=True면 앞에서부터 예산 안에 들어가는 항목만 남깁니다. (사용자 히스토리처럼 순위가 있는 경우)
+    """
+    used = [count_tokens(item) for item in items]
+    if sum(used) <= total_tokens:
+        return list(items)
+    if drop:
+        kept, total = [], 0
+        for item, tokens in zip(items, used):
+            if total + tokens > total_tokens:
+                break
+            kept.append(item)
+            total += tokens
+        return kept
+    per_item = max(min_item_tokens, total_tokens // max(len(items), 1))
+    return [truncate_tokens(item, per_item) for item in items]
+
 
 class AgentPrompt(ABC):
     def __init__(self) -> None:
@@ -18,6 +170,11 @@ class AgentPrompt(ABC):
 
 class CategoryPrompt(AgentPrompt):
     """카테고리 분류 에이전트를 위한 프롬프트"""
+    # 분류 결과 캐시 키 (프롬프트/출력 형식을 바꾸면 올려서 이전 캐시를 무효화)
+    PROMPT_VERSION = "category-v2"
+    # 캡션 최대 토큰 수 (compact_caption)
+    CAPTION_TOKENS = 400
+
     class OutputFormat(BaseModel):
         # """카테고리 분류 에이전트의 출력을 파싱하는 클래스"""
         # categories: List[str] = Field(
@@ -84,8 +241,8 @@ class CategoryPrompt(AgentPrompt):
         """사용자 프롬프트를 생성합니다."""
         user_prompt = (
             f"다음 Instagram 게시물의 내용을 분석하여 가장 적절한 카테고리를 분류해주세요.\n\n"
-            f"게시물 설명: {self.caption}\n"
-            f"해시태그: {', '.join(self.hashtags)}\n\n"
+            f"게시물 설명: {compact_caption(self.caption, self.CAPTION_TOKENS)}\n"
+            f"해시태그: {', '.join(compact_hashtags(self.hashtags))}\n\n"
             f"기본 카테고리 목록:\n"
             f"{', '.join(self.base_categories)}\n\n"
             f"위 내용을 바탕으로 다음 형식에 맞춰 응답해주세요:\n"
@@ -95,8 +252,189 @@ class CategoryPrompt(AgentPrompt):
         return user_prompt
 
 
+class PackedCategoryPrompt(AgentPrompt):
+    """여러 게시물을 한 번에 분류하는 카테고리 분류 프롬프트
+
+    시스템 프롬프트와 기본 카테고리 목록을 게시물마다 반복하지 않고 한 번만 보냅니다.
+    게시물별 결과는 CategoryPrompt와 같으므로 캐시도 CategoryPrompt.PROMPT_VERSION으로 공유합니다.
+    """
+    CAPTION_TOKENS = 300
+
+    class ItemFormat(BaseModel):
+        index: int = Field(
+            description="게시물 번호 (입력의 [번호])"
+        )
+        categories: str = Field(
+            description="게시물에 할당할 카테고리 이름"
+        )
+        category_reason: str = Field(
+            description="카테고리 분류 이유"
+        )
+
+    class OutputFormat(BaseModel):
+        results: List["PackedCategoryPrompt.ItemFormat"] = Field(
+            description="입력된 모든 게시물 번호마다 하나씩의 분류 결과 목록"
+        )
+
+    def __init__(
+        self, captions: List[str], hashtags: List[List[str]], base_categories: List[str]
+    ) -> None:
+        self.captions = captions
+        self.hashtags = hashtags
+        self.base_categories = base_categories
+
+    def get_system_prompt(self) -> str:
+        system_prompt = (
+            """
+            Classify each of the numbered Instagram posts into specific categories based on its caption and hashtags.
+
+            Consider the following:
+
+            1. Analyze each post's caption and hashtags independently to determine its main topic and theme.
+            2. Choose the most appropriate category from the given options. Only one category should be assigned to each post.
+            3. If it is challenging to categorize under existing categories, propose a new category.
+            4. When suggesting a new category, ensure it is a distinct topic that does not overlap with existing categories.
+            5. Category names should consist of a single noun.
+
+            # Output Format
+
+            - Return exactly one result for every post number in the input, with the same number as its index.
+            - The name of the selected category (or proposed new category) in korean.
+            - Ensure categories are concise and clear.
+            """
+        )
+        return system_prompt
+
+    @classmethod
+    def format_post(cls, index: int, caption: str, hashtags: List[str]) -> str:
+        """게시물 한 개의 프롬프트 텍스트 (묶음 토큰 예산 계산에도 사용)"""
+        return (
+            f"[{index}] 게시물 설명: {compact_caption(caption, cls.CAPTION_TOKENS)}\n"
+            f"    해시태그: {', '.join(compact_hashtags(hashtags))}"
+        )
+
+    def get_user_prompt(self) -> str:
+        """사용자 프롬프트를 생성합니다."""
+        posts = [
+            self.format_post(i, caption, hashtags)
+            for i, (caption, hashtags) in enumerate(zip(self.captions, self.hashtags))
+        ]
+        user_prompt = (
+            f"다음 {len(posts)}개의 Instagram 게시물을 각각 분석하여 가장 적절한 카테고리를 분류해주세요.\n\n"
+            f"{chr(10).join(posts)}\n\n"
+            f"기본 카테고리 목록:\n"
+            f"{', '.join(self.base_categories)}\n\n"
+            f"위 내용을 바탕으로 게시물 번호마다 다음 형식에 맞춰 응답해주세요:\n"
+            f"1. index: 게시물 번호\n"
+            f"2. categories: 게시물에 할당할 카테고리 이름\n"
+            f"3. category_reason: 카테고리 분류 이유"
+        )
+        return user_prompt
+
+
+class ClusterLabelPrompt(AgentPrompt):
+    """임베딩 클러스터 대표 게시물로 카테고리 이름을 짓는 프롬프트"""
+    CAPTION_TOKENS = 200
+
+    class OutputFormat(BaseModel):
+        categories: str = Field(
+            description="클러스터 전체에 할당할 카테고리 이름"
+        )
+        category_reason: str = Field(
+            description="카테고리 선정 이유"
+        )
+
+    def __init__(
+        self, captions: List[str], hashtags: List[List[str]], base_categories: List[str]
+    ) -> None:
+        self.captions = captions
+        self.hashtags = hashtags
+        self.base_categories = base_categories
+
+    def get_system_prompt(self) -> str:
+        system_prompt = (
+            """
+            You are given representative Instagram posts sampled from one cluster of semantically similar posts.
+            Assign a single category that describes the whole cluster.
+
+            Consider the following:
+
+            1. Identify the common topic shared by the representative posts, ignoring details specific to a single post.
+            2. Prefer one of the existing categories if it fits the common topic.
+            3. If none fits, propose a new category that does not overlap with existing categories.
+            4. Category names should consist of a single noun.
+
+            # Output Format
+
+            - The name of the selected category (or proposed new category) in korean.
+            - Ensure categories are concise and clear.
+            """
+        )
+        return system_prompt
+
+    def get_user_prompt(self) -> str:
+        """사용자 프롬프트를 생성합니다."""
+        posts = []
+        for i, (caption, hashtags) in enumerate(zip(self.captions, self.hashtags)):
+            posts.append(
+                f"[{i}] 게시물 설명: {compact_caption(caption, self.CAPTION_TOKENS)}\n"
+                f"    해시태그: {', '.join(compact_hashtags(hashtags))}"
+            )
+        user_prompt = (
+            f"다음은 서로 유사한 Instagram 게시물 묶음의 대표 게시물입니다. 묶음 전체에 맞는 카테고리를 하나 분류해주세요.\n\n"
+            f"{chr(10).join(posts)}\n\n"
+            f"기본 카테고리 목록:\n"
+            f"{', '.join(self.base_categories)}\n\n"
+            f"위 내용을 바탕으로 다음 형식에 맞춰 응답해주세요:\n"
+            f"1. categories: 묶음에 할당할 카테고리 이름\n"
+            f"2. category_reason: 카테고리 분류 이유"
+        )
+        return user_prompt
+
+
+class HashtagPrompt(AgentPrompt):
+    """검색어에 맞는 트렌드 해시태그를 후보 중에서 고르는 프롬프트 (해시태그 인덱스 유사도가 낮을 때만 사용)"""
+
+    class OutputFormat(BaseModel):
+        hashtag: str = Field(
+            description="후보 해시태그 중 검색어와 가장 관련 있는 해시태그 하나 ('#' 제외). 관련 있는 후보가 없으면 빈 문자열"
+        )
+
+    def __init__(self, query: str, candidates: List[str]) -> None:
+        self.query = query
+        self.candidates = candidates
+
+    def get_system_prompt(self) -> str:
+        system_prompt = (
+            """
+            You pick the Instagram hashtag whose trending posts best match a user's search query.
+
+            1. Choose exactly one hashtag from the given candidates. Never invent a new hashtag.
+            2. Prefer the hashtag that covers the main topic of the query (place, activity, food, event, ...).
+            3. If no candidate is related to the query, answer with an empty string.
+            """
+        )
+        return system_prompt
+
+    def get_user_prompt(self) -> str:
+        """사용자 프롬프트를 생성합니다."""
+        user_prompt = (
+            f"검색어: {self.query}\n\n"
+            f"후보 해시태그:\n"
+            f"{', '.join(self.candidates)}\n\n"
+            f"위 후보 중 검색어와 가장 관련 있는 해시태그 하나를 hashtag로 응답해주세요."
+        )
+        return user_prompt
+
+
 class FilteringPrompt(AgentPrompt):
     """필터링 에이전트를 위한 프롬프트"""
+    # 필터링 판단 캐시 키 (프롬프트/출력 형식을 바꾸면 올려서 이전 캐시를 무효화)
+    PROMPT_VERSION = "filter-v2"
+    # 북마크 한 개 / 북마크 목록 전체의 최대 토큰 수 (FilterAgent는 청크를 이보다 작게 나눔)
+    ITEM_TOKENS = 200
+    TOTAL_TOKENS = 8000
+
     class OutputFormat(BaseModel):
         """
         필터링 에이전트의 출력을 파싱하는 클래스
@@ -162,6 +500,16 @@ class FilteringPrompt(AgentPrompt):
         )
         return system_prompt
 
+    @classmethod
+    def format_bookmark(cls, index: int, bookmark: dict) -> str:
+        """북마크 한 개의 프롬프트 텍스트 (청크 토큰 예산 계산에도 사용)"""
+        bookmark_info = [
+            f"[index: {index}] feed caption: {compact_caption(bookmark.get('caption', ''), cls.ITEM_TOKENS)}",
+            # f"    URL: {bookmark.get('url', '')}",
+            f"hashtags: {', '.join(compact_hashtags(bookmark.get('hashtags', [])))}"
+        ]
+        return "\n".join(bookmark_info)
+
     def get_user_prompt(self) -> str:
         """
         사용자 프롬프트를 생성합니다.
@@ -176,14 +524,9 @@ class FilteringPrompt(AgentPrompt):
         query = self.query
         bookmarks = self.bookmarks
 
-        bookmarks_text = []
-        for i, bookmark in enumerate(bookmarks):
-            bookmark_info = [
-                f"[index: {i}] feed caption: {bookmark.get('caption', '')}",
-                # f"    URL: {bookmark.get('url', '')}",
-                f"hashtags: {', '.join(bookmark.get('hashtags', []))}"
-            ]
-            bookmarks_text.append("\n".join(bookmark_info))
+        bookmarks_text = [self.format_bookmark(i, bookmark) for i, bookmark in enumerate(bookmarks)]
+        # 전체 예산을 넘으면 북마크 수는 유지하고 북마크당 길이를 줄임 (인덱스가 바뀌지 않도록)
+        bookmarks_text = fit_items(bookmarks_text, self.TOTAL_TOKENS)
         
         formatted_bookmarks = "\n\n".join(bookmarks_text)
         
@@ -202,6 +545,12 @@ class RecommendPrompt(AgentPrompt):
     """
     추천 에이전트를 위한 프롬프트
     """
+    # 사용자 히스토리 / 추천 후보의 항목당, 전체 최대 토큰 수
+    HISTORY_ITEM_TOKENS = 100
+    HISTORY_TOTAL_TOKENS = 1500
+    FEED_ITEM_TOKENS = 200
+    FEED_TOTAL_TOKENS = 4000
+
     class OutputFormat(BaseModel):
         """
         추천 에이전트의 출력을 파싱하는 클래스
@@ -269,27 +618,31 @@ class RecommendPrompt(AgentPrompt):
         user_history = self.user_history
         feeds = self.feeds
 
-        # 사용자 히스토리 포맷팅 # TODO
+        # 사용자 히스토리 포맷팅 (검색 순위대로 HISTORY_TOTAL_TOKENS 안에 들어가는 만큼만)
         history_text = "### 사용자 히스토리:\n"
         if user_history and len(user_history) > 0:
-            for i, h in enumerate(user_history):
-                history_text += f"{h.get('caption', '')}, {h.get('hashtags', '')}\n"
+            histories = [
+                f"{compact_caption(h.get('caption', ''), self.HISTORY_ITEM_TOKENS)}, "
+                f"{', '.join(compact_hashtags(h.get('hashtags', [])))}"
+                for h in user_history
+            ]
+            for history in fit_items(histories, self.HISTORY_TOTAL_TOKENS, drop=True):
+                history_text += f"{history}\n"
                 history_text += "==================================================\n"
                 # if 'timestamp' in h:
                 #     history_text += f"  (시간: {h.get('timestamp', '')})\n"
         else:
             history_text += "- 이용 가능한 사용자 히스토리가 없습니다.\n"
         
-        # 게시물 목록 포맷팅
+        # 게시물 목록 포맷팅 (후보 번호가 바뀌지 않도록 개수는 유지하고 길이만 줄임)
         feed_infos = []
         for i, f in enumerate(feeds):
             feed_infos.append(
-                f"""
-                {i}: \n
-                caption: {f.get('caption', '')}\n
-                hashtags: {f.get('hashtags')}
-                """
+                f"{i}:\n"
+                f"caption: {compact_caption(f.get('caption', ''), self.FEED_ITEM_TOKENS)}\n"
+                f"hashtags: {', '.join(compact_hashtags(f.get('hashtags')))}"
             )
+        feed_infos = fit_items(feed_infos, self.FEED_TOTAL_TOKENS)
         
         formatted_feeds = "\n\n".join(feed_infos)
         
@@ -0,0 +1,267 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from .category_cache import caption_hash
+from .llm import get_embeddings
+from utils.cache import SharedInstances
+
+# RecommendAgent 프롬프트에 넣을 후보 수와 점수 가중치 (환경 변수로 조정)
+RECOMMEND_TOP_K = int(os.getenv("RECOMMEND_TOP_K", "20"))
+# 관련도 = QUERY_WEIGHT * 검색어 유사도 + (1 - QUERY_WEIGHT) * 취향 벡터 유사도
+RECOMMEND_QUERY_WEIGHT = float(os.getenv("RECOMMEND_QUERY_WEIGHT", "0.5"))
+# MMR 관련도 비중 (1: 관련도만, 낮을수록 이미 고른 후보와 비슷한 후보를 더 밀어냄)
+RECOMMEND_MMR_LAMBDA = float(os.getenv("RECOMMEND_MMR_LAMBDA", "0.7"))
+
+
+def feed_text(feed: Dict[str, Any]) -> str:
+    """임베딩할 게시물 텍스트 (벡터 인덱스와 같이 캡션, 없으면 해시태그)"""
+    return feed.get("caption") or " ".join(feed.get("hashtags") or [])
+
+
+def embedding_model_name(embeddings) -> str:
+    return str(getattr(embeddings, "model", None) or getattr(embeddings, "deployment", None)
+               or type(embeddings).__name__)
+
+
+def mmr(vectors: np.ndarray, relevance: np.ndarray, k: int, mmr_lambda: float = RECOMMEND_MMR_LAMBDA) -> List[int]:
+    """Maximal Marginal Relevance로 k개를 고릅니다.
+
+    매 단계 mmr_lambda * 관련도 - (1 - mmr_lambda) * (이미 고른 후보와의 최대 유사도)가 가장 큰 후보를 고릅니다.
+
+    Args:
+        vectors: (n, d) 정규화된 후보 벡터
+        relevance: (n,) 후보 관련도
+
+    Returns:
+        고른 순서대로 후보 위치 목록
+    """
+    n = len(relevance)
+    k = min(k, n)
+    if k <= 0:
+        return []
+    selected = []
+    max_similarity = np.full(n, -np.inf, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    for _ in range(k):
+        if selected:
+            scores = mmr_lambda * relevance - (1 - mmr_lambda) * max_similarity
+        else:
+            scores = relevance.astype(np.float32)
+        scores = np.where(available, scores, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        # 새로 고른 후보와의 유사도로 최대 유사도 갱신 (후보 수 n에 선형)
+        max_similarity = np.maximum(max_similarity, vectors @ vectors[best])
+    return selected
+
+
+class EmbeddingCache:
+    """게시물 임베딩을 저장하는 SQLite 캐시
+
+    키는 (임베딩 모델, 캡션 해시)이므로 같은 해시태그 트렌드 게시물을 다시 추천할 때 임베딩 API를 호출하지 않습니다.
+    CategoryCache/FilterCache와 같은 llm_cache.db 파일의 embedding_cache 테이블을 사용하며,
+    벡터는 차원 축소 전 원본 임베딩(float32)으로 저장합니다.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        # Streamlit 세션 스레드들이 하나의 연결을 공유
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''
+        CREATE TABLE IF NOT EXISTS embedding_cache (
+            model TEXT NOT NULL,
+            text_hash TEXT NOT NULL,
+            vector BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (model, text_hash)
+        )
+        ''')
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """텍스트별 캐시된 임베딩을 반환합니다. 없으면 None"""
+        hashes = [caption_hash(text) for text in texts]
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                chunk = list(set(hashes[start:start + 500]))
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embedding_cache WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model] + chunk
+                ).fetchall()
+                found.update((h, np.frombuffer(blob, dtype=np.float32)) for h, blob in rows)
+            results = [found.get(h) for h in hashes]
+            hits = sum(r is not None for r in results)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]) -> None:
+        rows = [
+            (model, caption_hash(text), np.asarray(vector, dtype=np.float32).tobytes())
+            for text, vector in zip(texts, vectors)
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (model, text_hash, vector) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def stats(self):
+        """모니터링용 통계"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+
+# 임베딩 캐시 (파일 경로별로 하나의 연결을 공유, 최근 사용한 파티션 것만 유지)
+_embedding_caches = SharedInstances(EmbeddingCache)
+
+
+def get_embedding_cache(path) -> EmbeddingCache:
+    return _embedding_caches.get(str(path))
+
+
+class RecommendRanker:
+    """RecommendAgent 호출 전 추천 후보를 임베딩으로 줄이는 사전 순위화
+
+    1) 이미 북마크한 게시물(벡터 인덱스에 있는 feed_id)과 히스토리 게시물을 후보에서 제외
+    2) 후보 임베딩(EmbeddingCache)과 검색어 임베딩, 취향 벡터(히스토리 북마크 벡터의 중심과
+       계정 취향 프로필 TasteProfile의 중심)로 관련도 계산
+    3) MMR로 비슷한 게시물이 몰리지 않게 top_k개를 골라 관련도 순서대로 반환
+    벡터는 모두 인덱스 공간(차원 축소가 켜져 있으면 축소 후)의 정규화된 벡터로 비교합니다.
+    """
+
+    def __init__(self, vector_store, cache: Optional[EmbeddingCache] = None, profile=None,
+                 top_k: int = RECOMMEND_TOP_K, query_weight: float = RECOMMEND_QUERY_WEIGHT,
+                 mmr_lambda: float = RECOMMEND_MMR_LAMBDA):
+        """
+        Args:
+            vector_store: VectorStore 또는 VectorServiceClient (히스토리 벡터 조회, 인덱스 공간 변환)
+            cache: 후보 임베딩 캐시 (기본: 벡터 DB 디렉토리의 llm_cache.db)
+            profile: 계정 취향 프로필 (TasteProfile, 선택)
+            top_k: LLM으로 보낼 최대 후보 수
+            query_weight: 관련도에서 검색어 유사도의 비중 (취향 벡터가 없으면 검색어 유사도만 사용)
+            mmr_lambda: MMR 관련도 비중
+        """
+        self.vector_store = vector_store
+        self.cache = cache if cache is not None else get_embedding_cache(
+            os.path.join(os.path.dirname(os.path.abspath(getattr(vector_store, "db_path", "./data/bookmarks.db"))),
+                         "llm_cache.db"))
+        self.profile = profile
+        self.top_k = top_k
+        self.query_weight = query_weight
+        self.mmr_lambda = mmr_lambda
+
+    def embed_feeds(self, feeds: List[Dict[str, Any]]) -> Tuple[np.ndarray, int]:
+        """후보 임베딩 (캐시에 없는 텍스트만 한 번에 임베딩), (인덱스 공간 벡터, 새로 임베딩한 수)를 반환
+
+        텍스트가 없는 게시물은 임베딩하지 않고 영벡터로 채웁니다. (rank에서 맨 뒤로 보냄)
+        """
+        # 공유 벡터 서비스 클라이언트는 임베딩 객체가 없으므로 같은 설정의 프로세스 전역 클라이언트 사용
+        embeddings = getattr(self.vector_store, "embeddings", None) or get_embeddings()
+        model = embedding_model_name(embeddings)
+        all_texts = [feed_text(feed) for feed in feeds]
+        positions = [i for i, text in enumerate(all_texts) if text]
+        texts = [all_texts[i] for i in positions]
+        if not texts:
+            return np.zeros((len(feeds), 0), dtype=np.float32), 0
+        vectors = self.cache.get_many(model, texts)
+        missing = sorted({texts[i] for i, v in enumerate(vectors) if v is None})
+        if missing:
+            embedded = embeddings.embed_documents(missing)
+            self.cache.put_many(model, missing, embedded)
+            by_text = dict(zip(missing, embedded))
+            vectors = [v if v is not None else by_text[text] for v, text in zip(vectors, texts)]
+        vectors = self.vector_store.to_index_space(vectors)
+        result = np.zeros((len(feeds), vectors.shape[1]), dtype=np.float32)
+        result[positions] = vectors
+        return result, len(missing)
+
+    def taste_vector(self, user_history: List[Dict[str, Any]], dim: int) -> Optional[np.ndarray]:
+        """히스토리 중심(이번 검색의 관심사)과 취향 프로필 중심(장기 취향)의 정규화된 평균, 둘 다 없으면 None
+
+        차원이 dim(후보 벡터 차원)과 다른 중심은 (차원 축소 변경 후 다시 만들지 않은 프로필 등) 사용하지 않습니다.
+        """
+        vectors = [self.history_centroid(user_history)]
+        if self.profile is not None:
+            vectors.append(self.profile.centroid())
+        vectors = [v for v in vectors if v is not None and len(v) == dim]
+        if not vectors:
+            return None
+        taste = np.mean(vectors, axis=0)
+        norm = float(np.linalg.norm(taste))
+        return (taste / norm).astype(np.float32) if norm > 0 else None
+
+    def history_centroid(self, user_history: List[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """히스토리 북마크 벡터(인덱스에 저장된 것)의 정규화된 평균, 없으면 None"""
+        vectors = [v for v in (self.vector_store.get_vector(b.get("feed_id")) for b in user_history or []
+                               if b.get("feed_id")) if v is not None]
+        if not vectors:
+            return None
+        vectors = np.array(vectors, dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        centroid = vectors.mean(axis=0)
+        norm = float(np.linalg.norm(centroid))
+        return centroid / norm if norm > 0 else None
+
+    def rank(self, query: str, user_history: List[Dict[str, Any]],
+             feeds: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """후보를 줄여 (top_k개 후보, 통계)를 반환합니다. 임베딩 실패 시 후보를 줄이지 않고 그대로 반환"""
+        started = time.perf_counter()
+        stats = {"candidates": len(feeds), "bookmarked": 0, "embedded": 0, "selected": 0, "elapsed": 0.0}
+        seen = {b.get("feed_id") for b in user_history or []} | set(self.vector_store.live_ids())
+        fresh = []
+        for feed in feeds:
+            feed_id = feed.get("feed_id")
+            if feed_id and feed_id in seen:
+                stats["bookmarked"] += 1
+                continue
+            fresh.append(feed)
+        if len(fresh) <= 1:
+            stats["selected"] = len(fresh)
+            stats["elapsed"] = round(time.perf_counter() - started, 3)
+            return fresh, stats
+
+        if not any(feed_text(f) for f in fresh):
+            # 임베딩할 텍스트가 없으면 순서대로 top_k개
+            fresh = fresh[:self.top_k]
+            stats["selected"] = len(fresh)
+            stats["elapsed"] = round(time.perf_counter() - started, 3)
+            return fresh, stats
+
+        try:
+            vectors, stats["embedded"] = self.embed_feeds(fresh)
+            query_vector = self.vector_store.to_index_space([self.vector_store.embed_query(query)])[0]
+        except Exception as e:
+            print(f"추천 후보 임베딩 실패 (후보를 줄이지 않음): {e}")
+            stats["selected"] = len(fresh)
+            stats["elapsed"] = round(time.perf_counter() - started, 3)
+            return fresh, stats
+
+        relevance = vectors @ query_vector
+        centroid = self.taste_vector(user_history, vectors.shape[1])
+        if centroid is not None:
+            relevance = self.query_weight * relevance + (1 - self.query_weight) * (vectors @ centroid)
+        # 텍스트가 없는 게시물은 맨 뒤로
+        relevance = np.where([bool(feed_text(f)) for f in fresh], relevance, -1.0).astype(np.float32)
+
+        chosen = mmr(vectors, relevance, self.top_k, self.mmr_lambda)
+        # LLM 프롬프트에는 관련도 순서대로 (MMR은 고르는 데만 사용)
+        chosen.sort(key=lambda i: -relevance[i])
+        stats["selected"] = len(chosen)
+        stats["elapsed"] = round(time.perf_counter() - started, 3)
+        return [fresh[i] for i in chosen], stats
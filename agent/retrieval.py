@@ -0,0 +1,170 @@
+from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+# 검색기 병렬 실행용 스레드 풀 (검색마다 스레드를 새로 만들지 않도록 프로세스 전역에서 공유)
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="retrieval")
+
+
+def _timed(fn, *args):
+    """(fn 결과, 소요시간 ms)"""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+def keyword_score(query: str, bookmark: Dict[str, Any]) -> float:
+    """키워드 검색 결과의 lexical 점수 (캡션 등장 횟수 + 해시태그 일치 가중치)"""
+    q = query.strip().lower()
+    if not q:
+        return 0.0
+    caption = (bookmark.get('caption') or '').lower()
+    hashtags = [str(tag).lower() for tag in (bookmark.get('hashtags') or [])]
+
+    score = float(caption.count(q))
+    score += sum(2.0 if tag == q else 1.0 for tag in hashtags if q in tag)
+    return score
+
+
+def reciprocal_rank_fusion(ranked_lists: Dict[str, List[str]], weights: Dict[str, float], k: int = 60) -> Dict[str, float]:
+    """Reciprocal Rank Fusion: score(d) = sum_s w_s / (k + rank_s(d))
+
+    Args:
+        ranked_lists: {소스 이름: 순위대로 정렬된 feed_id 목록}
+        weights: 소스별 가중치
+        k: RRF 상수 (클수록 하위 순위의 영향이 커짐)
+
+    Returns:
+        {feed_id: 융합 점수}
+    """
+    fused = {}
+    for source, feed_ids in ranked_lists.items():
+        weight = weights.get(source, 1.0)
+        for rank, feed_id in enumerate(feed_ids):
+            fused[feed_id] = fused.get(feed_id, 0.0) + weight / (k + rank + 1)
+    return fused
+
+
+def weighted_score_fusion(scored_lists: Dict[str, Dict[str, float]], weights: Dict[str, float]) -> Dict[str, float]:
+    """소스별 점수를 min-max 정규화한 뒤 가중합으로 결합합니다.
+
+    Args:
+        scored_lists: {소스 이름: {feed_id: 원점수}}
+        weights: 소스별 가중치
+
+    Returns:
+        {feed_id: 융합 점수}
+    """
+    fused = {}
+    for source, scores in scored_lists.items():
+        if not scores:
+            continue
+        weight = weights.get(source, 1.0)
+        low, high = min(scores.values()), max(scores.values())
+        span = high - low
+        for feed_id, score in scores.items():
+            normalized = (score - low) / span if span > 0 else 1.0
+            fused[feed_id] = fused.get(feed_id, 0.0) + weight * normalized
+    return fused
+
+
+class HybridRetriever:
+    """키워드(SQLite) 검색과 의미(FAISS) 검색을 동시에 수행하고 결과를 융합하는 검색기"""
+
+    FUSION_METHODS = ("rrf", "weighted")
+
+    def __init__(self, db, vector_store, fusion: str = "rrf", weights: Optional[Dict[str, float]] = None,
+                 rrf_k: int = 60, semantic_limit: int = 20):
+        """
+        Args:
+            db: BookmarkDatabase 인스턴스
+            vector_store: VectorStore 인스턴스
+            fusion: "rrf" (Reciprocal Rank Fusion) 또는 "weighted" (점수 가중합)
+            weights: 소스별 가중치 (기본값: keyword 1.0, semantic 1.0)
+            rrf_k: RRF 상수
+            semantic_limit: 의미 검색에서 가져올 후보 수
+        """
+        if fusion not in self.FUSION_METHODS:
+            raise ValueError(f"지원하지 않는 fusion 방식: {fusion} (가능: {self.FUSION_METHODS})")
+        self.db = db
+        self.vector_store = vector_store
+        self.fusion = fusion
+        self.weights = weights or {"keyword": 1.0, "semantic": 1.0}
+        self.rrf_k = rrf_k
+        self.semantic_limit = semantic_limit
+
+    def _keyword(self, query: str) -> List[Dict[str, Any]]:
+        bookmarks = self.db.search_bookmarks(query)
+        for bookmark in bookmarks:
+            bookmark['keyword_score'] = keyword_score(query, bookmark)
+        # 점수가 같으면 기존 정렬(최신순) 유지
+        return sorted(bookmarks, key=lambda b: b['keyword_score'], reverse=True)
+
+    def _semantic(self, query: str) -> List[Dict[str, Any]]:
+        # VectorStore는 유사도 내림차순으로 반환
+        return self.vector_store.search_bookmarks(query, limit=self.semantic_limit)
+
+    def retrieve(self, query: str, limit: int = 20, timings: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+        """두 검색기를 병렬로 실행하고 feed_id 기준으로 중복 제거 후 융합 순위대로 반환합니다.
+
+        Args:
+            query: 검색어
+            limit: 반환할 최대 북마크 수
+            timings: 주어지면 단계별 소요시간(ms)을 기록 ({"keyword", "semantic", "retrieve", "fusion"})
+
+        Returns:
+            융합 점수 내림차순 북마크 목록. 각 북마크에는 소스별 점수가 담긴
+            'scores' ({"keyword", "semantic", "fused"}) 필드가 추가됩니다.
+        """
+        start = time.perf_counter()
+        keyword_future = _executor.submit(_timed, self._keyword, query)
+        semantic_future = _executor.submit(_timed, self._semantic, query)
+        (keyword_results, keyword_ms), (semantic_results, semantic_ms) = keyword_future.result(), semantic_future.result()
+        results = {"keyword": keyword_results, "semantic": semantic_results}
+        fusion_start = time.perf_counter()
+
+        # feed_id 기준 중복 제거 (먼저 나온 소스의 북마크 dict를 대표로 사용)
+        merged = {}
+        ranked_lists = {}
+        scored_lists = {}
+        for source, bookmarks in results.items():
+            ranked_lists[source] = []
+            scored_lists[source] = {}
+            for bookmark in bookmarks:
+                feed_id = bookmark.get('feed_id')
+                if not feed_id or feed_id in scored_lists[source]:
+                    continue
+                merged.setdefault(feed_id, bookmark)
+                ranked_lists[source].append(feed_id)
+                scored_lists[source][feed_id] = bookmark.get(
+                    'keyword_score' if source == "keyword" else 'similarity', 0.0
+                )
+
+        if self.fusion == "rrf":
+            fused = reciprocal_rank_fusion(ranked_lists, self.weights, self.rrf_k)
+        else:
+            fused = weighted_score_fusion(scored_lists, self.weights)
+
+        ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:limit]
+        output = []
+        for feed_id, fused_score in ranked:
+            bookmark = dict(merged[feed_id])
+            bookmark.pop('keyword_score', None)
+            bookmark.pop('similarity', None)
+            bookmark['scores'] = {
+                "keyword": scored_lists["keyword"].get(feed_id),
+                "semantic": scored_lists["semantic"].get(feed_id),
+                "fused": fused_score,
+            }
+            output.append(bookmark)
+
+        if timings is not None:
+            timings.update(keyword=keyword_ms, semantic=semantic_ms,
+                           retrieve=(fusion_start - start) * 1000,
+                           fusion=(time.perf_counter() - fusion_start) * 1000)
+        return output
+
+    def timed_retrieve(self, query: str, limit: int = 20):
+        """retrieve()와 동일하며 (결과, 소요시간 ms)를 반환합니다. (평가용)"""
+        start = time.perf_counter()
+        bookmarks = self.retrieve(query, limit)
+        return bookmarks, (time.perf_counter() - start) * 1000
@@ -1,37 +1,233 @@
+import time
+from pathlib import Path
 from .agents import FilterAgent
+from .prompts import FilteringPrompt
+from .retrieval import HybridRetriever
+from .gating import ScoreGate, FilterDecisionLog
+from .filter_cache import FilterCache
+from .ledger import new_trace_id
+from utils.cache import LRUCache, SharedInstances, normalize_query
+
+# 검색 결과 캐시 (프로세스 전역, Search 인스턴스는 rerun마다 새로 생성되므로)
+# 키에 DB/인덱스 버전이 포함되어 데이터가 바뀌면 자동으로 무효화됨
+_result_cache = LRUCache(maxsize=256)
+
+# 필터링 판단 캐시 (파일 경로별로 하나의 연결을 공유, 최근 사용한 파티션 것만 유지)
+# 후보 단위 캐시라 DB가 바뀌어도(새 북마크 추가 등) 이전에 판단한 후보는 다시 판단하지 않음
+_filter_caches = SharedInstances(FilterCache)
+
+
+def get_filter_cache(path):
+    return _filter_caches.get(str(path))
 
 class Search:
     """agent를 활용한 검색 수행"""
-    def __init__(self, db, vector_store):
+    def __init__(self, db, vector_store, fusion="rrf", limit=20, gate=None, decision_log=None, filter_cache=None):
+        """
+        Args:
+            gate: LLM 필터링 전 점수 게이트 (기본: DB 디렉토리의 filter_gate.json 보정값, 없으면 게이트 없음)
+            decision_log: LLM 필터링 판단 기록 (기본: DB 디렉토리의 filter_decisions.jsonl)
+            filter_cache: 검색어별 후보 판단 캐시 (기본: DB 디렉토리의 llm_cache.db)
+        """
         self.db = db
         self.vector_store = vector_store
+        self.fusion = fusion
+        self.limit = limit
+        self.retriever = HybridRetriever(db, vector_store, fusion=fusion)
+        data_dir = Path(db.db_path).parent
+        self.gate = gate or ScoreGate.load(data_dir / "filter_gate.json")
+        self.decision_log = decision_log or FilterDecisionLog(data_dir / "filter_decisions.jsonl")
+        self.filter_cache = filter_cache if filter_cache is not None else get_filter_cache(data_dir / "llm_cache.db")
+        # 마지막 검색에서 LLM 필터링을 끝내지 못해 (오류/차단/시간 초과) 일부 후보를 걸러내지 않았는지
+        self.degraded = False
+        # 마지막 검색의 단계별 소요시간(ms) (keyword/semantic/retrieve/fusion/collapse/filter, 모드별 전체 시간)
+        self.timings = {}
+
+    def _cache_key(self, mode, search_query):
+        """(쿼리, k, 필터, 인덱스 버전) 캐시 키"""
+        return (
+            mode,
+            normalize_query(search_query),
+            self.limit,
+            self.fusion,
+            self.db.db_path,
+            self.db.get_version(),
+            self.vector_store.index_version(),
+            self.gate.key(),
+        )
+
+    def _cached(self, mode, search_query, search_fn):
+        start = time.perf_counter()
+        key = self._cache_key(mode, search_query)
+        bookmarks = _result_cache.get(key)
+        if bookmarks is None:
+            self.degraded = False
+            bookmarks = search_fn(search_query)
+            if not self.degraded:
+                _result_cache.put(key, bookmarks)
+        else:
+            self.timings.setdefault("cache_hit", mode)
+        self.timings[mode] = (time.perf_counter() - start) * 1000
+        return list(bookmarks) if bookmarks is not None else bookmarks
+
+    def _timed(self, stage, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.timings[stage] = (time.perf_counter() - start) * 1000
+        return result
+
+    def cache_stats(self):
+        """모니터링용 캐시 hit/miss 통계"""
+        return {
+            "query_embedding": self.vector_store.cache_stats(),
+            "search_result": _result_cache.stats(),
+            "filter_decision": self.filter_cache.stats(),
+        }
 
     def keyword_search(self, search_query):
-        bookmarks = self.db.search_bookmarks(search_query)
+        self.timings = {}
+        bookmarks = self._timed("keyword", self.db.search_bookmarks, search_query)
         return bookmarks
 
     def semantic_search(self, search_query):
-        bookmarks = self.vector_store.search_bookmarks(search_query)
+        self.timings = {}
+        bookmarks = self._timed("semantic", self.vector_store.search_bookmarks, search_query)
         return bookmarks
-    
+
+    def hybrid_search(self, search_query):
+        """키워드 + 의미 검색을 병렬 실행 후 순위 융합 (LLM 필터링 없음)"""
+        self.timings = {}
+        return self._hybrid_search(search_query)
+
+    def _hybrid_search(self, search_query):
+        return self._cached("hybrid", search_query, self._retrieve)
+
+    def _retrieve(self, search_query):
+        # 키워드/의미 검색 병렬 수행 + feed_id 기준 중복 제거 + 순위 융합
+        bookmarks = self.retriever.retrieve(search_query, limit=self.limit, timings=self.timings)
+        return self._timed("collapse", self.db.collapse_duplicates, bookmarks)
+
     def multi_search(self, search_query):
-        bookmarks = self.vector_store.search_bookmarks(search_query)
-        filter = FilterAgent()
-        # bookmarks = filter.run(search_query, bookmarks)
-        # return bookmarks
-        state = filter.run(search_query, bookmarks)
-        print(state["filter_reasons"])
-        return state["filtered_bookmarks"]
-    
+        self.timings = {}
+        return self._cached("multi", search_query, self._multi_search)
+
+    def _multi_search(self, search_query):
+        bookmarks = self._timed("semantic", self.vector_store.search_bookmarks, search_query)
+        bookmarks = self._timed("collapse", self.db.collapse_duplicates, bookmarks)
+        return self._timed("filter", self._filter, search_query, bookmarks)
+
     def total_search(self, search_query):
-        db_bookmarks = self.keyword_search(search_query)
-        ss_bookmarks = self.semantic_search(search_query)
-
-        # 중복 제거(feed_id나 url 같은 고유 필드가 있음)
-        bookmarks = db_bookmarks + [b for b in ss_bookmarks if b not in db_bookmarks]
-        filter = FilterAgent()
-        # bookmarks = filter.run(search_query, bookmarks)
-        # return bookmarks
-        state = filter.run(search_query, bookmarks)
-        print(state["filter_reasons"])
-        return state["filtered_bookmarks"]
\ No newline at end of file
+        self.timings = {}
+        return self._cached("total", search_query, self._total_search)
+
+    def _total_search(self, search_query):
+        bookmarks = self._hybrid_search(search_query)
+        return self._timed("filter", self._filter, search_query, bookmarks)
+
+    def total_search_stream(self, search_query):
+        """total_search를 단계별로 yield합니다. (화면에 검색 결과를 먼저 보여주고 LLM 필터링 결과로 갱신)
+
+        Yields:
+            ("retrieved", 융합 검색 결과) -> ("filtering", 필터링 중간 결과, (끝난 청크 수, 전체 청크 수))...
+            -> ("final", 최종 결과). 캐시된 결과가 있으면 ("final", 결과)만 yield합니다.
+        """
+        start = time.perf_counter()
+        key = self._cache_key("total", search_query)
+        cached = _result_cache.get(key)
+        self.degraded = False
+        self.timings = {}
+        if cached is not None:
+            self.timings.update(cache_hit="total", total=(time.perf_counter() - start) * 1000)
+            yield "final", list(cached), None
+            return
+
+        bookmarks = self._hybrid_search(search_query)
+        yield "retrieved", bookmarks, None
+        filter_start = time.perf_counter()
+        filtered = bookmarks
+        for filtered, progress in self._filter_stream(search_query, bookmarks):
+            if progress:
+                yield "filtering", filtered, progress
+        # 화면 갱신(yield 이후 호출자 처리) 시간도 포함된 값
+        self.timings["filter"] = (time.perf_counter() - filter_start) * 1000
+        self.timings["total"] = (time.perf_counter() - start) * 1000
+        # 저하 모드 결과는 캐시하지 않음 (엔드포인트가 회복되면 다시 필터링)
+        if not self.degraded:
+            _result_cache.put(key, filtered)
+        yield "final", list(filtered), None
+
+    def _filter(self, search_query, bookmarks):
+        filtered = bookmarks
+        for filtered, _ in self._filter_stream(search_query, bookmarks):
+            pass
+        return filtered
+
+    def _filter_stream(self, search_query, bookmarks):
+        """점수 게이트로 확실한 후보는 바로 채택/제외하고, 애매한 후보만 FilterAgent로 필터링합니다.
+
+        FilterAgent 청크가 끝날 때마다 (중간 결과, (끝난 청크 수, 전체 청크 수))를, 마지막에 (최종 결과, None)을 yield합니다.
+        중간 결과에는 아직 판단하지 않은 후보도 포함됩니다.
+        """
+        gate_decisions, to_llm = self.gate.split(bookmarks)
+        decisions = list(gate_decisions)
+
+        # 같은 검색어로 이미 판단한 후보(내용이 바뀌지 않은 것)는 캐시된 판단 사용
+        n_cached = 0
+        if to_llm:
+            # 게이트가 모두 판단하면 FilterAgent를 만들지 않음 (모델 이름은 LLM 클라이언트 없이 설정에서 읽음)
+            filter = FilterAgent()
+            # 이 검색의 필터링 호출들을 LLM 호출 기록에서 하나로 집계
+            filter.trace_id = new_trace_id()
+            model = filter.model_name
+            try:
+                cached = self.filter_cache.get_many(FilteringPrompt.PROMPT_VERSION, model, search_query,
+                                                    [bookmarks[i] for i in to_llm])
+            except Exception as e:
+                print(f"필터링 캐시 조회 중 오류 (LLM으로 판단): {e}")
+                cached = [None] * len(to_llm)
+            uncached = []
+            for i, hit in zip(to_llm, cached):
+                if hit is None:
+                    uncached.append(i)
+                    continue
+                n_cached += 1
+                if gate_decisions[i] is None:
+                    decisions[i] = hit[0]
+            to_llm = uncached
+            if n_cached:
+                filter.record_usage("cache", items=n_cached, cache_hits=n_cached)
+
+        if to_llm:
+            candidates = [bookmarks[i] for i in to_llm]
+            state = None
+            try:
+                for state in filter.filter_stream(search_query, candidates):
+                    for i, keep in zip(to_llm, state["decisions"]):
+                        # 탐색용으로 보낸 후보는 게이트 판정 유지, 판단이 없으면(실패/시간 초과/진행 중) 채택
+                        if gate_decisions[i] is None:
+                            decisions[i] = keep is not False
+                    if not state["done"]:
+                        stats = state["filter_stats"]
+                        yield [b for b, keep in zip(bookmarks, decisions) if keep], (stats["completed"] + stats["failed"],
+                                                                                     stats["chunks"])
+            except Exception as e:
+                print(f"필터링 과정에서 오류 발생: {e}")
+                state = None
+            if not (state and state["done"]) or state["filter_stats"].get("degraded"):
+                self.degraded = True
+            if state and state["done"]:
+                print(state["filter_reasons"])
+                print(f"필터링 통계: {state['filter_stats']}")
+                self.decision_log.log(search_query, candidates, state["decisions"],
+                                      [gate_decisions[i] for i in to_llm])
+                try:
+                    self.filter_cache.put_many(FilteringPrompt.PROMPT_VERSION, model, search_query, candidates,
+                                               state["decisions"], state["reasons"])
+                except Exception as e:
+                    print(f"필터링 캐시 저장 중 오류: {e}")
+        print(f"필터 게이트: 채택 {gate_decisions.count(True)}개, 제외 {gate_decisions.count(False)}개, "
+              f"캐시 {n_cached}개, LLM {len(to_llm)}개 / 후보 {len(bookmarks)}개")
+
+        filtered = [b for b, keep in zip(bookmarks, decisions) if keep]
+        # 남은 후보가 없으면 원본 반환 (FilterAgent와 같은 동작)
+        yield filtered or bookmarks, None
@@ -0,0 +1,299 @@
+import os
+import json
+import math
+import time
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from utils.cache import SharedInstances
+
+# 북마크 가중치가 절반이 되는 기간(일), 오래전에 저장한 북마크일수록 취향 벡터에 덜 반영
+TASTE_HALF_LIFE_DAYS = float(os.getenv("TASTE_HALF_LIFE_DAYS", "90"))
+# 가중치 지수가 이 값을 넘으면 기준 시각을 옮겨 합계를 다시 스케일 (float 오버플로 방지)
+_MAX_EXPONENT = 50.0
+
+
+def parse_timestamp(value) -> float:
+    """DB created_at(UTC 'YYYY-MM-DD HH:MM:SS') 또는 숫자를 epoch 초로 변환 (없거나 형식이 다르면 현재 시각)"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if value:
+        try:
+            parsed = datetime.fromisoformat(str(value))
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed.timestamp()
+        except ValueError:
+            pass
+    return time.time()
+
+
+def _normalized(vector: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    if vector is None:
+        return None
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm > 0 else None
+
+
+class TasteProfile:
+    """계정별 취향 벡터 (북마크 벡터의 시간 감쇠 가중 중심 + 카테고리별 중심)
+
+    북마크 i의 가중치는 exp(decay * (t_i - ref_time))이므로 모든 북마크의 가중치가 시간이 지나며 같은 비율로 줄어
+    중심 방향은 현재 시각과 무관합니다. 따라서 가중 합계만 저장해 두면 북마크를 추가/삭제할 때
+    해당 벡터만 더하고 빼서(O(d)) 갱신할 수 있고, 후보 점수는 중심 벡터와의 내적 한 번입니다.
+    벡터는 VectorStore 인덱스 공간(get_vector()와 같은 공간)이며, 파티션 디렉토리의 faiss_index/taste_profile.npz에 저장합니다.
+    차원이 바뀌면(차원 축소 적용/해제) rebuild()로 다시 만듭니다. 북마크가 없어도 파일을 저장해
+    한 번 만든 프로필(built)인지 구분하므로, is_stale()이 참일 때만 다시 만들면 됩니다.
+    """
+
+    def __init__(self, path, half_life_days: float = TASTE_HALF_LIFE_DAYS):
+        self.path = Path(path)
+        self.decay = math.log(2) / (half_life_days * 86400)
+        self._lock = threading.Lock()
+        # 저장된 프로필을 불러왔거나 만든 뒤 저장했는지 (빈 프로필도 포함)
+        self.built = False
+        self._reset()
+        self.load()
+
+    def _reset(self, dim: Optional[int] = None):
+        self.dim = dim
+        self.ref_time = time.time()
+        self.total = np.zeros(dim, dtype=np.float64) if dim else None
+        self.total_weight = 0.0
+        # 카테고리 -> [가중 합계, 가중치 합]
+        self.categories: Dict[str, List[Any]] = {}
+        # feed_id -> (저장 시각, 카테고리) (삭제 시 같은 가중치/카테고리로 빼기 위해)
+        self.items: Dict[str, Tuple[float, Optional[str]]] = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, feed_id):
+        return feed_id in self.items
+
+    # ---- 저장/로드 ----
+
+    def load(self) -> bool:
+        if not self.path.exists():
+            return False
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                self._reset(meta["dim"])
+                self.ref_time = meta["ref_time"]
+                self.total = data["total"].astype(np.float64) if self.dim else None
+                self.total_weight = meta["total_weight"]
+                for i, (name, weight) in enumerate(zip(meta["category_names"], meta["category_weights"])):
+                    self.categories[name] = [data["category_totals"][i].astype(np.float64), weight]
+                self.items = {feed_id: (t, category) for feed_id, t, category in meta["items"]}
+            self.built = True
+            return True
+        except (OSError, KeyError, ValueError) as e:
+            print(f"취향 프로필 로드 실패 (새로 생성): {e}")
+            self._reset()
+            return False
+
+    def save(self) -> None:
+        with self._lock:
+            names = list(self.categories)
+            meta = {
+                "dim": self.dim, "ref_time": self.ref_time, "total_weight": self.total_weight,
+                "category_names": names, "category_weights": [self.categories[n][1] for n in names],
+                "items": [[feed_id, t, category] for feed_id, (t, category) in self.items.items()],
+            }
+            category_totals = (np.stack([self.categories[n][0] for n in names]) if names
+                               else np.zeros((0, self.dim or 0)))
+            # 북마크가 없는 프로필(dim 없음)도 저장해 다시 만들지 않도록 함
+            total = self.total if self.total is not None else np.zeros(0)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # 저장 중 종료되어도 이전 파일이 남도록 임시 파일에 쓴 뒤 교체
+            tmp_path = self.path.with_name(self.path.name + ".tmp.npz")
+            np.savez(tmp_path, total=total, category_totals=category_totals,
+                     meta=np.array(json.dumps(meta, ensure_ascii=False)))
+            os.replace(tmp_path, self.path)
+            self.built = True
+
+    def is_stale(self, vector_store) -> bool:
+        """다시 만들어야 하는지 (한 번도 만들지 않았거나 벡터 인덱스 차원이 바뀜)"""
+        return not self.built or (self.dim is not None and self.dim != vector_store.index_dimension)
+
+    # ---- 갱신 ----
+
+    def _weight(self, timestamp: float) -> float:
+        # self._lock 안에서 호출
+        exponent = self.decay * (timestamp - self.ref_time)
+        if abs(exponent) > _MAX_EXPONENT:
+            # 기준 시각을 옮기고 기존 합계를 같은 비율로 조정
+            scale = math.exp(self.decay * (self.ref_time - timestamp))
+            self.ref_time = timestamp
+            self.total *= scale
+            self.total_weight *= scale
+            for entry in self.categories.values():
+                entry[0] *= scale
+                entry[1] *= scale
+            exponent = 0.0
+        return math.exp(exponent)
+
+    def _apply(self, vector: np.ndarray, weight: float, category: Optional[str], total: bool = True) -> None:
+        # self._lock 안에서 호출 (weight가 음수면 빼기, total=False면 카테고리 중심만)
+        if total:
+            self.total += weight * vector
+            self.total_weight += weight
+        if category:
+            entry = self.categories.setdefault(category, [np.zeros(self.dim, dtype=np.float64), 0.0])
+            entry[0] += weight * vector
+            entry[1] += weight
+            if entry[1] <= 1e-9:
+                del self.categories[category]
+
+    def add(self, feed_id: str, vector, timestamp: Optional[float] = None, category: Optional[str] = None) -> bool:
+        """북마크 하나를 반영합니다. (이미 반영된 feed_id는 무시, 차원이 다르면 ValueError)"""
+        vector = _normalized(np.asarray(vector, dtype=np.float64))
+        if vector is None:
+            return False
+        with self._lock:
+            if feed_id in self.items:
+                return False
+            if self.dim is None:
+                self._reset(len(vector))
+            if len(vector) != self.dim:
+                raise ValueError(f"취향 프로필 차원({self.dim})과 벡터 차원({len(vector)})이 다릅니다. rebuild()가 필요합니다.")
+            timestamp = timestamp if timestamp is not None else time.time()
+            self._apply(vector, self._weight(timestamp), category)
+            self.items[feed_id] = (timestamp, category)
+            return True
+
+    def remove(self, feed_id: str, vector) -> bool:
+        """반영된 북마크를 뺍니다. (vector: 삭제 전 get_vector() 결과)"""
+        vector = _normalized(np.asarray(vector, dtype=np.float64)) if vector is not None else None
+        with self._lock:
+            if feed_id not in self.items or vector is None or len(vector) != self.dim:
+                return False
+            timestamp, category = self.items.pop(feed_id)
+            self._apply(vector, -self._weight(timestamp), category)
+            if not self.items:
+                self._reset(self.dim)
+            return True
+
+    # ---- 조회 ----
+
+    def centroid(self, category: Optional[str] = None) -> Optional[np.ndarray]:
+        """정규화된 취향 벡터 (category를 주면 해당 카테고리 중심), 반영된 북마크가 없으면 None"""
+        with self._lock:
+            if category is not None:
+                entry = self.categories.get(category)
+                total = entry[0] if entry else None
+            else:
+                total = self.total if self.items else None
+            centroid = _normalized(total)
+            return centroid.astype(np.float32) if centroid is not None else None
+
+    def score(self, vectors, category: Optional[str] = None) -> Optional[np.ndarray]:
+        """(n, d) 정규화된 후보 벡터와 취향 벡터의 코사인 유사도, 프로필이 비어 있으면 None"""
+        centroid = self.centroid(category)
+        if centroid is None:
+            return None
+        return np.asarray(vectors, dtype=np.float32) @ centroid
+
+    def top_categories(self, k: int = 5) -> List[Tuple[str, float]]:
+        """현재 시각 기준 가중치가 큰 카테고리 (카테고리, 가중치 비율)"""
+        with self._lock:
+            total = sum(weight for _, weight in self.categories.values())
+            if total <= 0:
+                return []
+            ranked = sorted(((name, weight / total) for name, (_, weight) in self.categories.items()),
+                            key=lambda item: -item[1])
+            return ranked[:k]
+
+    def stats(self) -> Dict[str, Any]:
+        """모니터링용 통계 (effective_count: 현재 시각 기준 가중치 합 = 감쇠 반영한 북마크 수)"""
+        with self._lock:
+            scale = math.exp(self.decay * (self.ref_time - time.time()))
+            return {"bookmarks": len(self.items), "dim": self.dim, "categories": len(self.categories),
+                    "effective_count": round(self.total_weight * scale, 2)}
+
+    # ---- VectorStore/DB 동기화 ----
+
+    def sync_added(self, db, vector_store, feed_ids: List[str]) -> int:
+        """DB/벡터 인덱스에 새로 저장된 북마크들을 반영하고 파일에 저장합니다. (반영한 수)
+
+        저장 시각(created_at)과 카테고리는 DB에서 가져오며, 벡터 차원이 바뀌었으면 전체를 다시 만듭니다.
+        """
+        feed_ids = [fid for fid in dict.fromkeys(feed_ids) if fid and fid not in self.items]
+        if not feed_ids:
+            return 0
+        bookmarks = {b["feed_id"]: b for b in db.get_bookmarks_by_feed_ids(feed_ids)}
+        added = 0
+        for feed_id in feed_ids:
+            vector = vector_store.get_vector(feed_id)
+            bookmark = bookmarks.get(feed_id)
+            if vector is None or bookmark is None:
+                continue
+            try:
+                added += self.add(feed_id, vector, parse_timestamp(bookmark.get("created_at")), bookmark.get("category"))
+            except ValueError:
+                return self.rebuild(db, vector_store)
+        if added:
+            self.save()
+        return added
+
+    def sync_removed(self, vector_store, feed_id: str) -> bool:
+        """삭제할 북마크를 뺍니다. (벡터 인덱스에서 지우기 전에 호출)"""
+        removed = self.remove(feed_id, vector_store.get_vector(feed_id))
+        if removed:
+            self.save()
+        return removed
+
+    def sync_categories(self, db, vector_store) -> int:
+        """DB에서 카테고리가 바뀐 북마크(재분류 등)의 기여를 새 카테고리 중심으로 옮깁니다. (옮긴 수)"""
+        categories = db.get_categories_by_feed_ids(list(self.items))
+        moved = 0
+        for feed_id, category in categories.items():
+            timestamp, previous = self.items.get(feed_id, (None, None))
+            if timestamp is None or previous == category:
+                continue
+            vector = vector_store.get_vector(feed_id)
+            vector = _normalized(np.asarray(vector, dtype=np.float64)) if vector is not None else None
+            if vector is None or len(vector) != self.dim:
+                continue
+            with self._lock:
+                if self.items.get(feed_id) != (timestamp, previous):
+                    continue
+                weight = self._weight(timestamp)
+                self._apply(vector, -weight, previous, total=False)
+                self._apply(vector, weight, category, total=False)
+                self.items[feed_id] = (timestamp, category)
+                moved += 1
+        if moved:
+            self.save()
+        return moved
+
+    def rebuild(self, db, vector_store) -> int:
+        """벡터 인덱스에 있는 모든 북마크로 다시 만듭니다. (반영한 수)"""
+        with self._lock:
+            self._reset()
+        feed_ids = vector_store.live_ids()
+        added = 0
+        for start in range(0, len(feed_ids), 500):
+            chunk = feed_ids[start:start + 500]
+            for bookmark in db.get_bookmarks_by_feed_ids(chunk):
+                vector = vector_store.get_vector(bookmark["feed_id"])
+                if vector is not None:
+                    added += self.add(bookmark["feed_id"], vector, parse_timestamp(bookmark.get("created_at")),
+                                      bookmark.get("category"))
+        self.save()
+        return added
+
+
+# 취향 프로필 (파일 경로별로 하나의 인스턴스를 공유, 최근 사용한 파티션 것만 유지)
+# 밀려난 프로필은 변경할 때마다 파일에 저장되어 있으므로 다음에 다시 불러옴
+_profiles = SharedInstances(TasteProfile)
+
+
+def get_taste_profile(db_path) -> TasteProfile:
+    """DB 파일과 같은 파티션 디렉토리의 취향 프로필"""
+    return _profiles.get(str(Path(db_path).parent / "faiss_index" / "taste_profile.npz"))
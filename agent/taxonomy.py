@@ -0,0 +1,404 @@
+import os
+import json
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+import faiss
+
+from .prompts import CategoryPrompt, ClusterLabelPrompt, count_tokens
+from .knn import UNLABELED_CATEGORIES
+
+# 새 북마크를 클러스터 라벨로 분류할 최소 중심 유사도의 하한 (미만이면 LLM 분류)
+# ada-002는 무관한 텍스트끼리도 0.7 안팎이므로 kNN 분류와 같은 0.85, 다시 클러스터링할 때 기존 라벨로 보정한 값이 더 높으면 그 값 사용
+TAXONOMY_MIN_SIMILARITY = float(os.getenv("TAXONOMY_MIN_SIMILARITY", "0.85"))
+# 보정 목표: 최소 유사도 이상인 북마크 중 기존 카테고리와 클러스터 라벨이 같은 비율
+TAXONOMY_TARGET_AGREEMENT = float(os.getenv("TAXONOMY_TARGET_AGREEMENT", "0.95"))
+# 클러스터링 이후 추가된 북마크 중 어느 중심과도 먼 북마크 비율이 이 값 이상이면 다시 클러스터링
+TAXONOMY_DRIFT_THRESHOLD = float(os.getenv("TAXONOMY_DRIFT_THRESHOLD", "0.1"))
+
+
+def taxonomy_path(db_path) -> Path:
+    """파티션의 클러스터 중심 파일 경로"""
+    return Path(db_path).parent / "faiss_index" / "taxonomy.npz"
+
+
+def calibrate_min_similarity(samples: List[Tuple[float, bool]], target_agreement: float = TAXONOMY_TARGET_AGREEMENT,
+                             min_support: int = 20, floor: float = TAXONOMY_MIN_SIMILARITY) -> float:
+    """기존 라벨 [(중심 유사도, 기존 카테고리 == 클러스터 라벨)]로 최소 중심 유사도를 정합니다.
+
+    "유사도 >= t인 북마크의 라벨 일치율 >= target_agreement"를 만족하는 가장 낮은 t이며 floor보다 낮추지 않습니다.
+    기록이 min_support개보다 적으면 floor, 목표를 만족하는 구간이 없으면 1.0 (클러스터 라벨 분류를 사실상 사용하지 않음)
+    """
+    samples = sorted((float(similarity), bool(agree)) for similarity, agree in samples)
+    n = len(samples)
+    if n < min_support:
+        return floor
+
+    # 위에서부터 내려오며 구간을 넓힘 (gating.calibrate의 upper와 같은 방식)
+    threshold, agreed = None, 0
+    for i in range(n - 1, -1, -1):
+        agreed += samples[i][1]
+        support = n - i
+        # 같은 유사도가 이어지면 경계로 쓸 수 없음
+        if i > 0 and samples[i - 1][0] == samples[i][0]:
+            continue
+        if support >= min_support and agreed / support >= target_agreement:
+            threshold = samples[i][0]
+    if threshold is None:
+        return 1.0
+    return max(floor, threshold)
+
+
+class Taxonomy:
+    """라벨이 붙은 클러스터 중심 (TaxonomyBuilder.run --apply 결과, faiss_index/taxonomy.npz에 저장)
+
+    중심 벡터는 VectorStore 인덱스 공간(get_vector()와 같은 공간)이며,
+    feed_ids는 클러스터링에 사용한 북마크입니다. (이후 추가된 북마크로 drift를 계산)
+    min_similarity는 클러스터링할 때 기존 라벨로 보정한 최소 중심 유사도입니다. (이전 파일은 None)
+    """
+
+    def __init__(self, centroids, categories: List[str], reasons: List[str], feed_ids,
+                 min_similarity: Optional[float] = None):
+        self.centroids = np.array(centroids, dtype='float32')
+        faiss.normalize_L2(self.centroids)
+        self.categories = list(categories)
+        self.reasons = list(reasons)
+        self.feed_ids = set(feed_ids)
+        self.min_similarity = min_similarity
+
+    def threshold(self, floor: float) -> float:
+        """분류에 사용할 최소 중심 유사도 (보정값과 floor 중 큰 값)"""
+        return max(floor, self.min_similarity or 0.0)
+
+    @property
+    def dim(self) -> int:
+        return self.centroids.shape[1]
+
+    def nearest(self, vectors) -> Tuple[np.ndarray, np.ndarray]:
+        """벡터마다 가장 가까운 클러스터 번호와 코사인 유사도"""
+        vectors = np.array(vectors, dtype='float32').reshape(-1, self.dim)
+        faiss.normalize_L2(vectors)
+        similarities = vectors @ self.centroids.T
+        clusters = similarities.argmax(axis=1)
+        return clusters, similarities[np.arange(len(vectors)), clusters]
+
+    def save(self, path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {"categories": self.categories, "reasons": self.reasons, "feed_ids": sorted(self.feed_ids),
+                "min_similarity": self.min_similarity}
+        # 저장 중 종료되어도 이전 파일이 남도록 임시 파일에 쓴 뒤 교체
+        tmp_path = path.with_name(path.name + ".tmp.npz")
+        np.savez(tmp_path, centroids=self.centroids, meta=np.array(json.dumps(meta, ensure_ascii=False)))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path) -> Optional["Taxonomy"]:
+        """저장된 중심을 읽습니다. (없거나 읽을 수 없으면 None)"""
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                return cls(data["centroids"], meta["categories"], meta["reasons"], meta["feed_ids"],
+                           meta.get("min_similarity"))
+        except (OSError, KeyError, ValueError) as e:
+            print(f"카테고리 클러스터 중심 로드 실패: {e}")
+            return None
+
+
+class TaxonomyClassifier:
+    """새 북마크를 가장 가까운 라벨 클러스터 중심의 카테고리로 분류하는 분류기
+
+    어느 중심과도 min_similarity(중심 파일에 보정값이 있고 더 높으면 그 값)보다 멀면 None을 반환해 LLM 분류로 넘깁니다.
+    utils/cluster_categories.py가 중심 파일을 바꾸면 다음 예측 때 다시 읽습니다.
+    """
+
+    def __init__(self, vector_store, path, min_similarity: float = TAXONOMY_MIN_SIMILARITY):
+        self.vector_store = vector_store
+        self.path = Path(path)
+        self.min_similarity = min_similarity
+        self._taxonomy = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def taxonomy(self) -> Optional[Taxonomy]:
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            mtime = None
+        with self._lock:
+            if mtime != self._mtime:
+                self._mtime = mtime
+                self._taxonomy = Taxonomy.load(self.path) if mtime is not None else None
+            return self._taxonomy
+
+    def predict_many(self, items: List[Tuple[str, Optional[str]]]) -> List[Optional[Dict[str, Any]]]:
+        """[(캡션, feed_id)] 목록의 카테고리를 예측합니다.
+
+        벡터 스토어에 없는 캡션은 embed_documents로 임베딩합니다. (kNN 단계에서 만든 임베딩은 캡션 캐시에서 재사용)
+
+        Returns:
+            항목별 {"category", "category_reason", "cluster", "similarity"} 또는 None
+        """
+        predictions = [None] * len(items)
+        taxonomy = self.taxonomy()
+        if taxonomy is None or not items:
+            return predictions
+
+        positions, vectors, pending = [], [], []
+        for i, (caption, feed_id) in enumerate(items):
+            vector = self.vector_store.get_vector(feed_id) if feed_id else None
+            if vector is not None:
+                positions.append(i)
+                vectors.append(vector)
+            elif caption:
+                pending.append(i)
+        if pending:
+            embedded = self.vector_store.embed_documents([items[i][0] for i in pending])
+            positions.extend(pending)
+            vectors.extend(self.vector_store.to_index_space(embedded))
+        if not vectors:
+            return predictions
+        vectors = np.array(vectors, dtype='float32')
+        if vectors.shape[1] != taxonomy.dim:
+            # 차원 축소 적용/해제 후에는 다시 클러스터링할 때까지 사용하지 않음
+            return predictions
+
+        threshold = taxonomy.threshold(self.min_similarity)
+        clusters, similarities = taxonomy.nearest(vectors)
+        for i, cluster, similarity in zip(positions, clusters, similarities):
+            if similarity >= threshold:
+                predictions[i] = {
+                    "category": taxonomy.categories[cluster],
+                    "category_reason": taxonomy.reasons[cluster],
+                    "cluster": int(cluster),
+                    "similarity": float(similarity),
+                }
+        return predictions
+
+
+class TaxonomyBuilder:
+    """북마크 임베딩을 k-means로 묶고 클러스터마다 한 번의 LLM 호출로 카테고리를 정하는 오프라인 작업
+
+    북마크마다 LLM을 호출하는 대신 클러스터 수만큼만 호출하므로,
+    수천 건의 분류를 수십 건의 호출로 줄이고 카테고리 체계도 클러스터 수로 제한됩니다.
+    """
+
+    def __init__(self, db, vector_store, label_agent=None, n_representatives: int = 5, path=None,
+                 min_similarity: float = TAXONOMY_MIN_SIMILARITY,
+                 target_agreement: float = TAXONOMY_TARGET_AGREEMENT):
+        """
+        Args:
+            db: BookmarkDatabase 인스턴스
+            vector_store: VectorStore 인스턴스
+            label_agent: ClusterLabelAgent (None이면 label 단계에서 생성)
+            n_representatives: 클러스터당 LLM에 보낼 대표 게시물 수 (중심에 가까운 순)
+            path: 라벨 클러스터 중심 파일 (기본: taxonomy_path(db.db_path))
+            min_similarity: 새 북마크를 클러스터 라벨로 분류할 최소 중심 유사도의 하한
+            target_agreement: 최소 중심 유사도 보정 목표 (calibrate 참고)
+        """
+        self.db = db
+        self.vector_store = vector_store
+        self.label_agent = label_agent
+        self.n_representatives = n_representatives
+        self.path = Path(path) if path else taxonomy_path(db.db_path)
+        self.min_similarity = min_similarity
+        self.target_agreement = target_agreement
+
+    def cluster(self, n_clusters: int, niter: int = 25, seed: int = 1234) -> Dict[str, Any]:
+        """벡터 스토어의 모든 북마크 벡터에 spherical k-means를 수행합니다.
+
+        Returns:
+            {"feed_ids", "assignments" (클러스터 번호), "similarities" (중심과의 유사도), "centroids"}
+        """
+        feed_ids, vectors = self._live_vectors()
+        if not feed_ids:
+            raise ValueError("벡터 스토어에 북마크가 없습니다.")
+
+        n_clusters = min(n_clusters, len(feed_ids))
+        kmeans = faiss.Kmeans(vectors.shape[1], n_clusters, niter=niter, seed=seed, spherical=True, verbose=False)
+        kmeans.train(vectors)
+        similarities, assignments = kmeans.index.search(vectors, 1)
+
+        return {
+            "feed_ids": feed_ids,
+            "assignments": assignments[:, 0],
+            "similarities": similarities[:, 0],
+            "centroids": kmeans.centroids,
+        }
+
+    def _live_vectors(self, exclude=None) -> Tuple[List[str], np.ndarray]:
+        """벡터 스토어의 (feed_id 목록, 정규화된 벡터 배열) (조회 사이에 삭제된 북마크는 제외)"""
+        feed_ids, vectors = [], []
+        for feed_id in self.vector_store.live_ids():
+            if exclude and feed_id in exclude:
+                continue
+            vector = self.vector_store.get_vector(feed_id)
+            if vector is not None:
+                feed_ids.append(feed_id)
+                vectors.append(vector)
+        vectors = np.array(vectors, dtype='float32').reshape(len(vectors), -1)
+        faiss.normalize_L2(vectors)
+        return feed_ids, vectors
+
+    def _representatives(self, members: np.ndarray, similarities: np.ndarray) -> np.ndarray:
+        order = np.argsort(-similarities[members])
+        return members[order[:self.n_representatives]]
+
+    def label(self, clustering: Dict[str, Any], bookmarks: Dict[str, Dict[str, Any]]) -> Dict[int, ClusterLabelPrompt.OutputFormat]:
+        """클러스터마다 대표 게시물로 LLM을 한 번 호출해 카테고리를 정합니다."""
+        if self.label_agent is None:
+            from .agents import ClusterLabelAgent
+            self.label_agent = ClusterLabelAgent(self.db.get_all_categories())
+
+        labels = {}
+        for cluster_id in np.unique(clustering["assignments"]):
+            members = np.where(clustering["assignments"] == cluster_id)[0]
+            representatives = self._representatives(members, clustering["similarities"])
+            samples = [bookmarks.get(clustering["feed_ids"][i], {}) for i in representatives]
+            labels[int(cluster_id)] = self.label_agent.label(
+                captions=[b.get('caption', '') for b in samples],
+                hashtags=[b.get('hashtags') or [] for b in samples],
+            )
+            print(f"클러스터 {cluster_id} ({len(members)}개) -> {labels[int(cluster_id)].categories}")
+        return labels
+
+    def assignments(self, clustering: Dict[str, Any], labels: Dict[int, ClusterLabelPrompt.OutputFormat]):
+        """클러스터 라벨을 북마크 단위 (feed_id, category, category_reason) 목록으로 펼칩니다."""
+        rows = []
+        for feed_id, cluster_id in zip(clustering["feed_ids"], clustering["assignments"]):
+            label = labels[int(cluster_id)]
+            rows.append((feed_id, label.categories, f"[클러스터 {cluster_id}] {label.category_reason}"))
+        return rows
+
+    def report(self, clustering: Dict[str, Any], labels: Dict[int, ClusterLabelPrompt.OutputFormat],
+               bookmarks: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """클러스터 단위 분류와 북마크 단위 분류의 호출 수/토큰/일치율을 비교합니다.
+
+        - agreement: 기존(북마크 단위 LLM) 카테고리가 있는 북마크 중 클러스터 라벨과 같은 비율
+        - purity: 클러스터마다 기존 카테고리 최빈값이 차지하는 비율의 가중 평균
+        """
+        base_categories = self.db.get_all_categories()
+        per_item_tokens = 0
+        for feed_id in clustering["feed_ids"]:
+            b = bookmarks.get(feed_id, {})
+            prompt = CategoryPrompt(b.get('caption', ''), b.get('hashtags') or [], base_categories)
+            per_item_tokens += count_tokens(prompt.get_system_prompt() + prompt.get_user_prompt())
+
+        per_cluster_tokens = 0
+        compared = agreed = pure = 0
+        for cluster_id, label in labels.items():
+            members = np.where(clustering["assignments"] == cluster_id)[0]
+            samples = [bookmarks.get(clustering["feed_ids"][i], {})
+                       for i in self._representatives(members, clustering["similarities"])]
+            prompt = ClusterLabelPrompt([b.get('caption', '') for b in samples],
+                                        [b.get('hashtags') or [] for b in samples], base_categories)
+            per_cluster_tokens += count_tokens(prompt.get_system_prompt() + prompt.get_user_prompt())
+
+            existing = [bookmarks.get(clustering["feed_ids"][i], {}).get('category') for i in members]
+            existing = [c for c in existing if c not in UNLABELED_CATEGORIES]
+            compared += len(existing)
+            agreed += sum(c == label.categories for c in existing)
+            if existing:
+                pure += max(existing.count(c) for c in set(existing))
+
+        n_items = len(clustering["feed_ids"])
+        return {
+            "items": n_items,
+            "clusters": len(labels),
+            "llm_calls_per_item": n_items,
+            "llm_calls_per_cluster": len(labels),
+            "prompt_tokens_per_item": per_item_tokens,
+            "prompt_tokens_per_cluster": per_cluster_tokens,
+            "compared_items": compared,
+            "agreement": agreed / compared if compared else None,
+            "purity": pure / compared if compared else None,
+        }
+
+    def calibrate(self, clustering: Dict[str, Any], labels: Dict[int, ClusterLabelPrompt.OutputFormat],
+                  bookmarks: Dict[str, Dict[str, Any]]) -> Tuple[float, int]:
+        """기존 카테고리가 있는 북마크로 최소 중심 유사도를 보정합니다.
+
+        LLM에 보낸 대표 게시물은 라벨을 정하는 데 쓰였으므로 제외하고 나머지(held-out) 북마크의
+        (중심 유사도, 기존 카테고리 == 클러스터 라벨)로 calibrate_min_similarity를 계산합니다.
+
+        Returns:
+            (최소 중심 유사도, 보정에 사용한 북마크 수)
+        """
+        samples = []
+        for cluster_id, label in labels.items():
+            members = np.where(clustering["assignments"] == cluster_id)[0]
+            representatives = set(self._representatives(members, clustering["similarities"]).tolist())
+            for i in members:
+                category = bookmarks.get(clustering["feed_ids"][i], {}).get('category')
+                if i in representatives or category in UNLABELED_CATEGORIES:
+                    continue
+                samples.append((clustering["similarities"][i], category == label.categories))
+        threshold = calibrate_min_similarity(samples, self.target_agreement, floor=self.min_similarity)
+        return threshold, len(samples)
+
+    def drift(self, taxonomy: Taxonomy) -> Dict[str, Any]:
+        """클러스터링 이후 추가된 북마크를 저장된 중심에 배정합니다.
+
+        Returns:
+            {"new" (추가된 북마크 수), "outliers" (어느 중심과도 먼 수), "drift" (outliers / 전체 북마크 수),
+             "rows" (중심에 배정된 (feed_id, category, category_reason) 목록)}
+        """
+        feed_ids, vectors = self._live_vectors(exclude=taxonomy.feed_ids)
+        total = len(feed_ids) + len(taxonomy.feed_ids)
+        if not feed_ids:
+            return {"new": 0, "outliers": 0, "drift": 0.0, "rows": []}
+        if vectors.shape[1] != taxonomy.dim:
+            # 차원 축소 적용/해제로 중심을 쓸 수 없음
+            return {"new": len(feed_ids), "outliers": len(feed_ids), "drift": 1.0, "rows": []}
+
+        threshold = taxonomy.threshold(self.min_similarity)
+        clusters, similarities = taxonomy.nearest(vectors)
+        rows = [(feed_id, taxonomy.categories[c], f"[클러스터 {c}] {taxonomy.reasons[c]}")
+                for feed_id, c, similarity in zip(feed_ids, clusters, similarities)
+                if similarity >= threshold]
+        outliers = len(feed_ids) - len(rows)
+        return {"new": len(feed_ids), "outliers": outliers, "drift": outliers / total, "rows": rows}
+
+    def run(self, n_clusters: int, apply: bool = False, drift_threshold: float = TAXONOMY_DRIFT_THRESHOLD,
+            force: bool = False) -> Dict[str, Any]:
+        """저장된 중심이 있고 drift가 drift_threshold 미만이면 새 북마크만 가장 가까운 중심에 배정하고,
+        아니면(또는 force) 클러스터링 -> 라벨링 -> 리포트를 수행합니다.
+
+        apply이면 결과를 DB에 반영합니다. 다시 클러스터링한 경우에만 모든 북마크의 카테고리를 바꾸고
+        기존 카테고리로 보정한 최소 중심 유사도(calibrate)와 함께 중심을 저장합니다.
+        """
+        taxonomy = None if force else Taxonomy.load(self.path)
+        if taxonomy is not None:
+            drift = self.drift(taxonomy)
+            print(f"저장된 클러스터 {len(taxonomy.categories)}개: 새 북마크 {drift['new']}개 중 "
+                  f"{drift['outliers']}개가 중심과 멀어 drift {drift['drift']:.1%}")
+            if drift["drift"] < drift_threshold:
+                rows = drift.pop("rows")
+                report = {"reclustered": False, "clusters": len(taxonomy.categories), "assigned": len(rows), **drift}
+                if apply:
+                    report["updated"] = self.db.bulk_update_categories(rows)
+                return report
+
+        bookmarks = {b['feed_id']: b for b in self.db.get_bookmarks(limit=1_000_000)}
+        clustering = self.cluster(n_clusters)
+        labels = self.label(clustering, bookmarks)
+        report = self.report(clustering, labels, bookmarks)
+        report["reclustered"] = True
+        report["min_similarity"], report["calibration_items"] = self.calibrate(clustering, labels, bookmarks)
+        if apply:
+            report["updated"] = self.db.bulk_update_categories(self.assignments(clustering, labels))
+            cluster_ids = range(len(clustering["centroids"]))
+            # 빈 클러스터는 배정될 수 없도록 라벨이 있는 중심만 저장
+            labeled = [c for c in cluster_ids if c in labels]
+            Taxonomy(
+                clustering["centroids"][labeled],
+                [labels[c].categories for c in labeled],
+                [labels[c].category_reason for c in labeled],
+                clustering["feed_ids"],
+                report["min_similarity"],
+            ).save(self.path)
+        return report
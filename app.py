@@ -3,7 +3,9 @@ from pathlib import Path
 from dotenv import load_dotenv
 import ssl
 import uuid
+import time
 import argparse
+import os
 # from langsmith import Client
 
 # SSL 인증서 검증 비활성화
@@ -18,8 +20,14 @@ from ui.recommend_page import render_recommend_page
 
 from db import BookmarkDatabase
 from vector_store import VectorStore
+from vector_service import VectorServiceClient
+from partitions import PartitionManager, Partition
 
 from agent.agents import CategorizeAgent
+from agent.knn import KNNCategoryClassifier
+from agent.taxonomy import TaxonomyClassifier, taxonomy_path
+from agent.category_cache import CategoryCache
+from agent.ledger import get_ledger
 
 
 parser = argparse.ArgumentParser()
@@ -42,20 +50,36 @@ st.set_page_config(
     layout="wide",
 )
 
-@st.cache_resource
-def get_db(path):
-    """데이터베이스 연결 객체를 반환합니다."""
-    return BookmarkDatabase(path)
-
-@st.cache_resource
 def get_vector_store(path):
-    """벡터 스토어 인스턴스를 반환합니다."""
+    """벡터 스토어 인스턴스를 반환합니다.
+
+    VECTOR_SERVICE_URL이 설정되어 있으면 인덱스를 프로세스마다 올리지 않고
+    공유 벡터 서비스(vector_service.py)에 접속하는 클라이언트를 반환합니다.
+    """
+    service_url = os.getenv("VECTOR_SERVICE_URL")
+    if service_url:
+        return VectorServiceClient(service_url)
     return VectorStore(path)
 
+def open_partition(key, db_path):
+    """계정 파티션의 데이터베이스, 벡터 스토어, 카테고리 분류 에이전트를 생성합니다."""
+    db = BookmarkDatabase(db_path)
+    vector_store = get_vector_store(db_path)
+    categorize_agent = CategorizeAgent()
+    # 카테고리 목록 가져오기
+    categorize_agent.base_categories = db.get_all_categories()
+    # 유사 북마크 카테고리가 확실하면 LLM 분류 생략
+    categorize_agent.knn_classifier = KNNCategoryClassifier(db, vector_store)
+    # utils/cluster_categories.py --apply로 저장한 라벨 클러스터 중심에 가까우면 그 카테고리 사용
+    categorize_agent.taxonomy_classifier = TaxonomyClassifier(vector_store, taxonomy_path(db_path))
+    # 이미 분류한 게시물(캡션/해시태그 동일)은 LLM 재호출 없이 이전 결과 사용
+    categorize_agent.cache = CategoryCache(str(Path(db_path).parent / "llm_cache.db"))
+    return Partition(key, db_path, db, vector_store, categorize_agent)
+
 @st.cache_resource
-def get_categorize_agent():
-    """카테고리 분류 에이전트를 반환합니다."""
-    return CategorizeAgent()
+def get_partition_manager(data_dir):
+    """계정별 파티션 관리자를 반환합니다. (열린 파티션 수는 MAX_OPEN_PARTITIONS로 제한)"""
+    return PartitionManager(data_dir, open_partition, max_open=int(os.getenv("MAX_OPEN_PARTITIONS", "8")))
 
 # @st.cache_resource
 # def get_langsmith_client():
@@ -67,16 +91,19 @@ def get_categorize_agent():
 # 기본 경로 및 설정
 DATA_DIR = Path("./data")
 DATA_DIR.mkdir(exist_ok=True)
-DB_PATH = DATA_DIR / "bookmarks.db"
 
-# 데이터베이스 및 벡터 스토어 초기화
-db = get_db(str(DB_PATH))
-vector_store = get_vector_store(str(DB_PATH))
-# vector_store = "" # NOTE 위로 바꾸기
-categorize_agent = get_categorize_agent()
+# 계정별 데이터베이스 및 벡터 스토어 (data/accounts/<계정>/)
+partition_manager = get_partition_manager(str(DATA_DIR))
 
-# 카테고리 목록 가져오기
-categorize_agent.base_categories = db.get_all_categories()
+
+def get_partition():
+    """로그인한 계정의 파티션을 반환합니다.
+
+    로그인 전이거나 공유 벡터 서비스(단일 인덱스)를 사용하는 경우 기본 파티션(data/bookmarks.db)을 사용합니다.
+    """
+    if os.getenv("VECTOR_SERVICE_URL"):
+        return partition_manager.get(None)
+    return partition_manager.get(st.session_state.get("insta_id"))
 
 
 # 메인 함수
@@ -105,6 +132,7 @@ def main():
 
     if args.debug:
         st.write(st.session_state)
+        st.write(partition_manager.stats())
 
     # streamlit page setting (endpoint, css style etc.)
     setup_page()
@@ -119,6 +147,18 @@ def main():
     # 콘솔에 현재 메뉴 로깅 (디버깅용)
     print(f"현재 메뉴: {st.session_state["current_menu"]}")
     
+    # 로그인한 계정의 저장소 선택 (로그인 직후 rerun부터 계정 파티션 사용)
+    partition = get_partition()
+    db, vector_store, categorize_agent = partition.db, partition.vector_store, partition.categorize_agent
+    if args.debug:
+        st.write({"categorize": categorize_agent.stats, "category_cache": categorize_agent.cache.stats()})
+        ledger = get_ledger()
+        if ledger is not None:
+            with st.expander("LLM 호출 통계 (최근 24시간)"):
+                since = time.time() - 24 * 3600
+                st.dataframe(ledger.summary(since))
+                st.write({"검색당 필터링": ledger.per_trace("filter", since)})
+
     # 현재 선택된 메뉴에 따라 콘텐츠 표시
     if st.session_state["current_menu"] == "랜딩 페이지":
         render_landing_page(db, vector_store, args.debug)
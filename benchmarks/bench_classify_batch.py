@@ -0,0 +1,268 @@
+"""CategorizeAgent.classify_many 동시성/묶음 벤치마크 (로컬 가짜 LLM 서버 사용)
+
+OpenAI 호환 chat/completions 응답을 지연시간을 주입해 돌려주는 로컬 서버를 띄우고,
+동시 호출 수 / 묶음 크기별 처리 시간, 서버에서 관측된 최대 동시 요청 수, LLM 호출 수,
+북마크당 프롬프트 토큰(추정), 결과 순서, 오류 격리를 확인합니다.
+캡션에 "FAIL"이 들어간 항목은 서버가 400(재시도 대상 아님)을 돌려주므로 해당 항목만 "기타"가 되어야 하고,
+묶음 응답에서 --drop-rate 비율로 빠뜨린 항목은 개별 호출로 재시도되어야 합니다.
+
+사용법:
+    python benchmarks/bench_classify_batch.py --items 100 --latency 0.3 --concurrency 1,4,8,16
+    python benchmarks/bench_classify_batch.py --concurrency 8 --pack-sizes 1,5,10,20   # 묶음 모드 비교
+    python benchmarks/bench_classify_batch.py --concurrency 16 --rpm 120   # RPM 한도 적용
+    python benchmarks/bench_classify_batch.py --concurrency 8 --cache   # 분류 캐시: 같은 항목 재실행 시 LLM 호출 수
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(project_root)
+
+# Azure 설정이 없으면 자리표시 값을 채움 (벤치마크는 아래 가짜 서버를 가리키는 LLM 객체로 교체해서 사용)
+# 가짜 서버 호출은 LLM 호출 기록(data/llm_ledger.db)에 남기지 않음 (LLM_LEDGER_PATH로 기록 파일 지정 가능)
+for key, value in [("AOAI_API_KEY", "bench"), ("AOAI_ENDPOINT", "https://localhost"),
+                   ("AOAI_DEPLOY_GPT4O_MINI", "bench"), ("LLM_LEDGER_PATH", "")]:
+    os.environ.setdefault(key, value)
+
+from langchain_openai import AzureChatOpenAI
+from agent.agents import CategorizeAgent
+from agent.category_cache import CategoryCache
+from utils.concurrency import RateLimiter
+
+CATEGORIES = ["여행", "음식", "패션", "공연", "운동", "반려동물", "IT"]
+CAPTION_PATTERN = re.compile(r"벤치마크 북마크 (\d+)")
+PACKED_PATTERN = re.compile(r"\[(\d+)\] 게시물 설명: 벤치마크 북마크 (\d+)")
+
+
+def expected_category(n):
+    return CATEGORIES[n % len(CATEGORIES)]
+
+
+class FakeLLMServer:
+    """Azure OpenAI chat/completions 형식으로 응답하는 로컬 서버 (지연시간 주입)"""
+
+    def __init__(self, latency, jitter=0.0, per_item_latency=0.0, drop_rate=0.0, port=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.per_item_latency = per_item_latency
+        self.drop_rate = drop_rate
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def reset(self):
+        with self._lock:
+            self.max_in_flight = 0
+            self.requests = 0
+
+    def count_items(self, text):
+        """요청 한 건에 들어있는 게시물 수 (응답 지연 계산용)"""
+        return max(1, len(PACKED_PATTERN.findall(text)))
+
+    def reject(self, text):
+        """응답 지연 전에 바로 돌려줄 오류 (status, body) 또는 (status, body, headers). 없으면 None"""
+        return None
+
+    def answer(self, text):
+        """프롬프트 텍스트에 대한 구조화 출력(dict)을 만듭니다. 다른 에이전트 벤치마크는 이 메서드를 재정의"""
+        packed = PACKED_PATTERN.findall(text)
+        if packed:
+            # 묶음 요청: 번호마다 결과 하나 (drop_rate 비율로 일부러 누락)
+            results = [
+                {"index": int(index), "categories": expected_category(int(n)), "category_reason": "가짜 서버 응답"}
+                for index, n in packed if random.random() >= self.drop_rate
+            ]
+            return {"results": results}
+        match = CAPTION_PATTERN.search(text)
+        category = expected_category(int(match.group(1))) if match else "기타"
+        return {"categories": category, "category_reason": "가짜 서버 응답"}
+
+    def _respond(self, request):
+        text = " ".join(str(m.get("content", "")) for m in request.get("messages", []))
+        if "FAIL" in text:
+            # 항목 자체의 오류 (재시도 대상이 아닌 400)
+            return 400, {"error": {"message": "injected failure", "type": "invalid_request_error"}}
+        arguments = json.dumps(self.answer(text), ensure_ascii=False)
+
+        if request.get("tools"):
+            # function_calling 방식
+            message = {"role": "assistant", "content": None, "tool_calls": [{
+                "id": "call_0", "type": "function",
+                "function": {"name": request["tools"][0]["function"]["name"], "arguments": arguments},
+            }]}
+            finish_reason = "tool_calls"
+        else:
+            # json_schema / json_mode 방식
+            message = {"role": "assistant", "content": arguments}
+            finish_reason = "stop"
+        return 200, {
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()),
+            "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": len(text) // 2, "completion_tokens": 30, "total_tokens": len(text) // 2 + 30},
+        }
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with fake._lock:
+                    fake.requests += 1
+                    fake.in_flight += 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+                try:
+                    text = " ".join(str(m.get("content", "")) for m in request.get("messages", []))
+                    rejected = fake.reject(text)
+                    headers = {}
+                    if rejected:
+                        status, body, *extra = rejected
+                        headers = extra[0] if extra else {}
+                    else:
+                        # 출력 토큰이 늘어나는 만큼 묶음 요청은 항목 수에 비례해 더 오래 걸림
+                        time.sleep(fake.latency + fake.per_item_latency * fake.count_items(text)
+                                   + random.uniform(0, fake.jitter))
+                        status, body = fake._respond(request)
+                finally:
+                    with fake._lock:
+                        fake.in_flight -= 1
+                payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_items(n, fail_every):
+    items = []
+    for i in range(n):
+        caption = f"벤치마크 북마크 {i} 캡션입니다."
+        if fail_every and i % fail_every == fail_every - 1:
+            caption += " FAIL"
+        items.append({"caption": caption, "hashtags": ["벤치마크"], "feed_id": f"bench{i}"})
+    return items
+
+
+def run(server, items, concurrency, rate_limiter, pack_size=1, cache=None):
+    llm = AzureChatOpenAI(
+        openai_api_key="bench",
+        azure_endpoint=server.url,
+        azure_deployment="bench",
+        api_version="2024-08-01-preview",
+        temperature=0.5,
+        max_retries=0,  # 오류 격리를 그대로 관찰하기 위해 SDK 재시도 끔
+    )
+    agent = CategorizeAgent(max_concurrency=concurrency, rate_limiter=rate_limiter, pack_size=pack_size)
+    agent.llm = llm
+    agent.base_categories = list(CATEGORIES)
+    agent.cache = cache
+
+    progress = []
+    server.reset()
+    started = time.perf_counter()
+    results = agent.classify_many(items, progress_callback=lambda done, total, i, r: progress.append(done))
+    elapsed = time.perf_counter() - started
+
+    ordered = failed = 0
+    for i, (item, result) in enumerate(zip(items, results)):
+        if "FAIL" in item["caption"]:
+            failed += result.categories == "기타"
+        else:
+            ordered += result.categories == expected_category(i)
+    return {
+        "concurrency": concurrency,
+        "pack_size": pack_size,
+        "llm_calls": agent.stats["llm_calls"],
+        "retries": agent.stats["retries"],
+        "cache_hits": agent.stats["cache"],
+        "tokens_per_item": agent.stats["prompt_tokens"] / len(items),
+        "elapsed": elapsed,
+        "items_per_s": len(items) / elapsed,
+        "max_in_flight": server.max_in_flight,
+        "ordered_ok": ordered,
+        "isolated_failures": failed,
+        "progress_calls": len(progress),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.3, help="가짜 LLM 응답 지연(초)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="지연에 더할 무작위 값 최대치(초), 완료 순서를 섞음")
+    parser.add_argument("--concurrency", default="1,4,8,16")
+    parser.add_argument("--pack-sizes", default="1", help="LLM 호출 한 번에 묶을 게시물 수 목록 (1: 묶지 않음)")
+    parser.add_argument("--per-item-latency", type=float, default=0.02, help="묶음 요청에서 항목당 추가 지연(초)")
+    parser.add_argument("--drop-rate", type=float, default=0.05, help="묶음 응답에서 항목을 빠뜨릴 확률")
+    parser.add_argument("--fail-every", type=int, default=10, help="N번째마다 항목 오류(400) 주입 (0: 없음)")
+    parser.add_argument("--rpm", type=int, default=0)
+    parser.add_argument("--tpm", type=int, default=0)
+    parser.add_argument("--cache", action="store_true", help="설정마다 빈 분류 캐시로 두 번 실행 (두 번째는 캐시 적중)")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(args.latency, args.jitter, args.per_item_latency, args.drop_rate).start()
+    items = make_items(args.items, args.fail_every)
+    n_fail = sum("FAIL" in item["caption"] for item in items)
+    print(f"items={args.items} (오류 주입 {n_fail}개), latency={args.latency}+U(0,{args.jitter})s, "
+          f"묶음 항목당 +{args.per_item_latency}s, drop={args.drop_rate}, rpm={args.rpm or '-'}, tpm={args.tpm or '-'}")
+    print(f"{'동시성':>6}{'묶음':>6}{'시간(s)':>10}{'items/s':>10}{'최대동시':>8}{'호출':>6}{'재시도':>6}"
+          f"{'토큰/건':>8}{'순서OK':>10}{'오류격리':>8}{'캐시':>6}")
+    try:
+        for pack_size in [int(p) for p in args.pack_sizes.split(",")]:
+            for concurrency in [int(c) for c in args.concurrency.split(",")]:
+                with tempfile.TemporaryDirectory() as tmp:
+                    cache = CategoryCache(os.path.join(tmp, "llm_cache.db")) if args.cache else None
+                    # 캐시가 있으면 같은 항목으로 한 번 더 실행 (재실행/중단 후 재개 상황)
+                    for _ in range(1 if cache is None else 2):
+                        limiter = RateLimiter(rpm=args.rpm, tpm=args.tpm)
+                        with open(os.devnull, "w") as devnull:
+                            stdout, sys.stdout = sys.stdout, devnull  # 분류 오류 로그 숨김
+                            try:
+                                r = run(server, items, concurrency, limiter, pack_size, cache)
+                            finally:
+                                sys.stdout = stdout
+                        print(f"{r['concurrency']:>6}{r['pack_size']:>6}{r['elapsed']:>10.2f}{r['items_per_s']:>10.1f}"
+                              f"{r['max_in_flight']:>8}{r['llm_calls']:>6}{r['retries']:>6}{r['tokens_per_item']:>8.0f}"
+                              f"{r['ordered_ok']:>6}/{args.items - n_fail:<3}{r['isolated_failures']:>4}/{n_fail:<3}"
+                              f"{r['cache_hits']:>6}")
+                        if limiter.enabled:
+                            print(f"       rate limiter: {limiter.stats()}")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""차원 축소(PCA / truncate) 벤치마크: recall@10, 인덱스 메모리, 검색 지연시간
+
+사용법:
+    python benchmarks/bench_dim_reduction.py                      # 합성 코퍼스
+    python benchmarks/bench_dim_reduction.py --index ./data/faiss_index/bookmark_vectors.index
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import faiss
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(project_root)
+from vector_store import DimensionReducer
+
+
+def make_synthetic_corpus(n, dim, rank=64, seed=0):
+    """임베딩처럼 저차원 구조(anisotropic)를 가진 합성 벡터 생성"""
+    rng = np.random.default_rng(seed)
+    basis = rng.standard_normal((rank, dim)).astype('float32')
+    scales = (1.0 / np.arange(1, rank + 1) ** 0.5).astype('float32')
+    coeffs = rng.standard_normal((n, rank)).astype('float32') * scales
+    noise = 0.05 * rng.standard_normal((n, dim)).astype('float32')
+    vectors = coeffs @ basis + noise
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def make_queries(corpus, n_queries, seed=1):
+    """코퍼스 벡터에 노이즈를 섞어 쿼리 생성"""
+    rng = np.random.default_rng(seed)
+    picks = corpus[rng.integers(0, len(corpus), n_queries)]
+    queries = picks + 0.3 * rng.standard_normal(picks.shape).astype('float32') * picks.std()
+    queries = np.ascontiguousarray(queries, dtype='float32')
+    faiss.normalize_L2(queries)
+    return queries
+
+
+def search(index, queries, k):
+    start = time.perf_counter()
+    _, indices = index.search(queries, k)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    return indices, elapsed_ms
+
+
+def recall_at_k(truth, found, k):
+    hits = sum(len(set(t[:k]) & set(f[:k])) for t, f in zip(truth, found))
+    return hits / (len(truth) * k)
+
+
+def run(corpus, queries, dims, modes, k=10):
+    dim = corpus.shape[1]
+
+    full_index = faiss.IndexFlatIP(dim)
+    full_index.add(corpus)
+    truth, full_ms = search(full_index, queries, k)
+
+    print(f"코퍼스 {len(corpus)}개, 쿼리 {len(queries)}개, 원본 차원 {dim}")
+    print(f"{'mode':<10}{'dim':>6}{'recall@10':>12}{'memory(MB)':>12}{'ms/query':>10}{'train(s)':>10}")
+    print(f"{'full':<10}{dim:>6}{1.0:>12.3f}{corpus.nbytes / 1e6:>12.2f}{full_ms:>10.3f}{0.0:>10.2f}")
+
+    for mode in modes:
+        for target_dim in dims:
+            if target_dim >= dim:
+                continue
+            start = time.perf_counter()
+            try:
+                reducer = DimensionReducer(mode, dim, target_dim).fit(corpus)
+            except ValueError as e:
+                print(f"{mode:<10}{target_dim:>6}  건너뜀: {e}")
+                continue
+            train_s = time.perf_counter() - start
+
+            reduced_index = faiss.IndexFlatIP(target_dim)
+            reduced_index.add(reducer.apply(corpus))
+            found, reduced_ms = search(reduced_index, reducer.apply(queries), k)
+            memory_mb = reduced_index.ntotal * target_dim * 4 / 1e6
+            print(f"{mode:<10}{target_dim:>6}{recall_at_k(truth, found, k):>12.3f}"
+                  f"{memory_mb:>12.2f}{reduced_ms:>10.3f}{train_s:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index", help="기존 FAISS 인덱스 파일 (없으면 합성 코퍼스 사용)")
+    parser.add_argument("--n", type=int, default=20000, help="합성 코퍼스 크기")
+    parser.add_argument("--dim", type=int, default=1536, help="합성 코퍼스 차원 (ada-002: 1536)")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dims", default="64,128,256,512")
+    parser.add_argument("--modes", default="pca,truncate")
+    args = parser.parse_args()
+
+    if args.index:
+        index = faiss.read_index(args.index)
+        corpus = index.reconstruct_n(0, index.ntotal)
+        faiss.normalize_L2(corpus)
+    else:
+        corpus = make_synthetic_corpus(args.n, args.dim)
+
+    queries = make_queries(corpus, args.queries)
+    dims = [int(d) for d in args.dims.split(",")]
+    run(corpus, queries, dims, args.modes.split(","))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""FilterAgent 청크 분할/동시 호출 벤치마크 (로컬 가짜 LLM 서버 사용)
+
+bench_classify_batch.py의 가짜 LLM 서버를 필터링 응답용으로 바꿔 후보 수(10/50/200/1000)별로
+단일 프롬프트(청크 분할 없음, 기존 방식)와 청크 분할 + 동시 호출의 지연시간, LLM 호출 수, 최대 프롬프트 토큰,
+정답(번호가 3의 배수인 후보) 재현율/정밀도를 비교합니다.
+가짜 서버는 북마크 수에 비례해 응답이 늦어지고(이유를 북마크마다 출력), --context-limit 토큰을 넘는
+요청은 400을 돌려줍니다. 실패/시간 초과된 청크의 후보는 걸러지지 않고 남으므로 정밀도가 떨어집니다.
+
+사용법:
+    python benchmarks/bench_filter.py --candidates 10,50,200,1000
+    python benchmarks/bench_filter.py --candidates 1000 --deadline 5   # 시간 제한 초과 시 동작 확인
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(project_root)
+
+for key, value in [("AOAI_API_KEY", "bench"), ("AOAI_ENDPOINT", "https://localhost"),
+                   ("AOAI_DEPLOY_GPT4O_MINI", "bench"), ("LLM_LEDGER_PATH", "")]:
+    os.environ.setdefault(key, value)
+
+from langchain_openai import AzureChatOpenAI
+from agent.agents import FilterAgent
+from agent.prompts import estimate_tokens
+from bench_classify_batch import FakeLLMServer
+
+CANDIDATE_PATTERN = re.compile(r"\[index: (\d+)\] feed caption: 벤치마크 후보 (\d+)")
+
+
+def is_relevant(n):
+    return n % 3 == 0
+
+
+class FakeFilterServer(FakeLLMServer):
+    """FilteringPrompt 요청에 번호가 3의 배수인 후보만 고르는 가짜 서버"""
+
+    def __init__(self, latency, jitter=0.0, per_item_latency=0.0, context_limit=0):
+        super().__init__(latency, jitter, per_item_latency)
+        self.context_limit = context_limit
+        self.max_prompt_tokens = 0
+
+    def reset(self):
+        super().reset()
+        self.max_prompt_tokens = 0
+
+    def count_items(self, text):
+        return max(1, len(CANDIDATE_PATTERN.findall(text)))
+
+    def answer(self, text):
+        candidates = CANDIDATE_PATTERN.findall(text)
+        return {
+            "bookmark_indexes": [int(i) for i, n in candidates if is_relevant(int(n))],
+            "filter_reasons": [f"{i} / {'O' if is_relevant(int(n)) else 'X'} / 가짜 서버 응답" for i, n in candidates],
+        }
+
+    def reject(self, text):
+        tokens = estimate_tokens(text)
+        with self._lock:
+            self.max_prompt_tokens = max(self.max_prompt_tokens, tokens)
+        if self.context_limit and tokens > self.context_limit:
+            return 400, {"error": {"message": f"context length exceeded ({tokens} tokens)",
+                                   "type": "invalid_request_error", "code": "context_length_exceeded"}}
+        return None
+
+
+def make_candidates(n, caption_chars):
+    filler = "여행 맛집 카페 사진 정보 " * (caption_chars // 15 + 1)
+    return [
+        {"feed_id": f"bench{i}", "caption": f"벤치마크 후보 {i} {filler[:caption_chars]}", "hashtags": ["벤치마크", "후보"]}
+        for i in range(n)
+    ]
+
+
+def run(server, candidates, mode, concurrency, deadline):
+    llm = AzureChatOpenAI(
+        openai_api_key="bench",
+        azure_endpoint=server.url,
+        azure_deployment="bench",
+        api_version="2024-08-01-preview",
+        temperature=0.5,
+        max_retries=0,
+    )
+    if mode == "single":
+        # 기존 방식: 모든 후보를 한 프롬프트로
+        agent = FilterAgent(chunk_token_budget=10 ** 9, chunk_size=10 ** 9, max_concurrency=1, deadline=deadline)
+    else:
+        agent = FilterAgent(max_concurrency=concurrency, deadline=deadline)
+    agent.llm = llm
+
+    server.reset()
+    started = time.perf_counter()
+    state = agent.run("벤치마크 검색어", candidates)
+    elapsed = time.perf_counter() - started
+
+    kept = state["filtered_bookmarks"]
+    kept_numbers = [int(b["feed_id"][5:]) for b in kept]
+    relevant = sum(is_relevant(i) for i in range(len(candidates)))
+    true_positive = sum(is_relevant(n) for n in kept_numbers)
+    stats = state.get("filter_stats") or {}
+    return {
+        "elapsed": elapsed,
+        "calls": server.requests,
+        "max_prompt_tokens": server.max_prompt_tokens,
+        "kept": len(kept),
+        "recall": true_positive / relevant if relevant else 1.0,
+        "precision": true_positive / len(kept) if kept else 0.0,
+        "ordered": kept_numbers == sorted(kept_numbers),
+        "failed": stats.get("failed", 0),
+        "timed_out": stats.get("timed_out", 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", default="10,50,200,1000")
+    parser.add_argument("--caption-chars", type=int, default=300, help="후보 캡션 길이(자)")
+    parser.add_argument("--latency", type=float, default=0.5, help="가짜 LLM 기본 응답 지연(초)")
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--per-item-latency", type=float, default=0.03, help="후보 한 개당 추가 지연(초), 이유 출력 시간")
+    parser.add_argument("--context-limit", type=int, default=128000, help="가짜 서버의 최대 프롬프트 토큰 (0: 제한 없음)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--deadline", type=float, default=20.0, help="FilterAgent 전체 시간 제한(초)")
+    parser.add_argument("--modes", default="single,chunked")
+    args = parser.parse_args()
+
+    server = FakeFilterServer(args.latency, args.jitter, args.per_item_latency, args.context_limit).start()
+    print(f"latency={args.latency}+U(0,{args.jitter})s + {args.per_item_latency}s/후보, caption={args.caption_chars}자, "
+          f"context_limit={args.context_limit or '-'}, concurrency={args.concurrency}, deadline={args.deadline}s")
+    print(f"{'후보':>6}{'방식':>9}{'시간(s)':>9}{'호출':>6}{'최대토큰':>10}{'남음':>6}{'재현율':>8}{'정밀도':>8}"
+          f"{'순서':>6}{'실패':>5}{'초과':>5}")
+    try:
+        for n in [int(c) for c in args.candidates.split(",")]:
+            candidates = make_candidates(n, args.caption_chars)
+            for mode in args.modes.split(","):
+                with open(os.devnull, "w") as devnull:
+                    stdout, sys.stdout = sys.stdout, devnull  # 필터링 오류 로그 숨김
+                    try:
+                        r = run(server, candidates, mode, args.concurrency, args.deadline)
+                    finally:
+                        sys.stdout = stdout
+                print(f"{n:>6}{mode:>9}{r['elapsed']:>9.2f}{r['calls']:>6}{r['max_prompt_tokens']:>10}{r['kept']:>6}"
+                      f"{r['recall']:>8.2f}{r['precision']:>8.2f}{'OK' if r['ordered'] else 'X':>6}"
+                      f"{r['failed']:>5}{r['timed_out']:>5}")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
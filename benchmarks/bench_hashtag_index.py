@@ -0,0 +1,142 @@
+"""검색어 -> 트렌드 해시태그 선택: 항상 LLM vs 해시태그 인덱스(HashtagResolver) 비교 (가짜 LLM/임베딩, 임시 디렉토리)
+
+고정 코퍼스 북마크(해시태그 빈도)와 트렌드 덤프(<해시태그>.json)를 임시 디렉토리에 만들고,
+정답 해시태그를 붙인 검색어마다 모든 트렌드 해시태그를 HashtagAgent에 보내는 방식과
+포함 일치 -> 임베딩 유사도 -> (유사도가 낮을 때만) LLM 순서로 고르는 방식의 검색어당 지연시간, 정확도, LLM 호출 수를 비교합니다.
+인덱스 생성 시간은 해시태그 임베딩 캐시가 비었을 때(cold)와 찼을 때(warm, 프로세스 재시작 가정)를 따로 잽니다.
+
+사용법:
+    python benchmarks/bench_hashtag_index.py
+    python benchmarks/bench_hashtag_index.py --bookmarks 5000 --latency 1.0 --min-similarity 0.7
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(project_root)
+
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ["EMBEDDING_PROVIDER"] = "fake"
+os.environ.setdefault("LLM_LEDGER_PATH", "")
+
+from db import BookmarkDatabase
+from vector_store import VectorStore
+from agent.agents import HashtagAgent
+from agent.fake_llm import FakeChatModel, FakeEmbeddings
+from agent.recommend_rank import EmbeddingCache
+from agent import hashtag_index
+from agent.hashtag_index import HashtagResolver, DEFAULT_HASHTAG
+from bench_prompt_tokens import make_corpus, HASHTAGS
+
+TREND_HASHTAGS = ["여행", "제주여행", "뮤지컬", "맛집", "카페", "전시회", "캠핑", "홈트", "코디", "트렌드"]
+# (검색어, 정답 해시태그)
+QUERIES = [
+    ("이번 여름에 여행 어디 가지?", "여행"),
+    ("제주여행 숙소 추천", "제주여행"),
+    ("뮤지컬 티켓팅 성공 후기", "뮤지컬"),
+    ("성수 카페 가볼만한 곳", "카페"),
+    ("서울 맛집 리스트", "맛집"),
+    ("요즘 볼만한 전시", "전시회"),
+    ("캠핑장 예약 꿀팁", "캠핑"),
+    ("겨울 데일리룩 코디", "코디"),
+    ("집에서 하는 운동 루틴", "홈트"),
+    ("주말에 뭐 하지", DEFAULT_HASHTAG),
+]
+
+
+def write_trend_dumps(trend_dir, per_tag):
+    os.makedirs(trend_dir, exist_ok=True)
+    for t, tag in enumerate(TREND_HASHTAGS):
+        feeds = [dict(f, feed_id=f"{tag}{i}", hashtags=[tag] + f["hashtags"][:3])
+                 for i, f in enumerate(make_corpus(per_tag, seed=t + 1))]
+        with open(os.path.join(trend_dir, f"{tag}.json"), "w", encoding="utf-8") as f:
+            json.dump(feeds, f, ensure_ascii=False)
+    # 게시물 목록이 아닌 JSON은 인덱스에서 제외되어야 함
+    with open(os.path.join(trend_dir, "filter_gate.json"), "w", encoding="utf-8") as f:
+        json.dump({"threshold": 0.5}, f)
+
+
+def always_llm(agent, query):
+    return agent.choose(query, TREND_HASHTAGS) or DEFAULT_HASHTAG
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bookmarks", type=int, default=1000)
+    parser.add_argument("--per-tag", type=int, default=30, help="트렌드 덤프 해시태그당 게시물 수")
+    parser.add_argument("--latency", type=float, default=0.5, help="가짜 LLM 호출당 지연(초)")
+    parser.add_argument("--embed-latency", type=float, default=0.1, help="가짜 임베딩 호출당 지연(초)")
+    parser.add_argument("--min-similarity", type=float, default=hashtag_index.HASHTAG_MIN_SIMILARITY)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="installm_hashtag_")
+    try:
+        trend_dir = os.path.join(workdir, "data")
+        write_trend_dumps(trend_dir, args.per_tag)
+        db_path = os.path.join(workdir, "bookmarks.db")
+        db = BookmarkDatabase(db_path)
+        # 코퍼스 해시태그 외에 드문 해시태그도 섞어 인덱스 크기를 현실적으로
+        db.add_bookmark_batch([
+            {"collection_id": "bench", "feed_id": b["feed_id"], "media_type": 1, "caption": b["caption"],
+             "media_url": "", "thumbnail_url": "", "url": f"https://www.instagram.com/p/{b['feed_id']}/",
+             "hashtags": b["hashtags"] + [f"{HASHTAGS[i % len(HASHTAGS)]}{i % 97}"]}
+            for i, b in enumerate(make_corpus(args.bookmarks))
+        ])
+        vector_store = VectorStore(db_path, embedding_model=FakeEmbeddings(latency=args.embed_latency))
+
+        llm = FakeChatModel(latency=args.latency)
+        agent = HashtagAgent()
+        agent.llm = llm
+        cache = EmbeddingCache(os.path.join(workdir, "llm_cache.db"))
+        resolver = HashtagResolver(db, vector_store, cache, trend_dir=trend_dir, agent=agent,
+                                   min_similarity=args.min_similarity)
+
+        started = time.perf_counter()
+        index = resolver.index()
+        cold = time.perf_counter() - started
+        hashtag_index._indexes.clear()
+        started = time.perf_counter()
+        resolver.index()
+        warm = time.perf_counter() - started
+        print(f"bookmarks={args.bookmarks}, 인덱스 해시태그 {len(index)}개 (트렌드 덤프), "
+              f"생성 cold {cold:.3f}s / warm {warm:.3f}s")
+        print(f"llm={args.latency}s/호출, embed={args.embed_latency}s/호출, min_similarity={args.min_similarity}")
+        print(f"{'검색어':<24}{'정답':>8}{'LLM':>8}{'(s)':>7}{'인덱스':>8}{'(s)':>7}  경로")
+
+        totals = {"llm": [0.0, 0, 0], "index": [0.0, 0, 0]}  # [시간, 정답 수, LLM 호출 수]
+        with open(os.devnull, "w") as devnull:
+            for query, expected in QUERIES:
+                stdout, sys.stdout = sys.stdout, devnull  # 에이전트 로그 숨김
+                try:
+                    started = time.perf_counter()
+                    by_llm = always_llm(agent, query)
+                    llm_elapsed = time.perf_counter() - started
+                    started = time.perf_counter()
+                    resolution = resolver.resolve(query)
+                    index_elapsed = time.perf_counter() - started
+                finally:
+                    sys.stdout = stdout
+                by_index = resolution["hashtag"]
+                for name, hashtag, elapsed, calls in [("llm", by_llm, llm_elapsed, 1),
+                                                      ("index", by_index, index_elapsed, int(resolution["llm"]))]:
+                    totals[name][0] += elapsed
+                    totals[name][1] += hashtag == expected
+                    totals[name][2] += calls
+                print(f"{query:<24}{expected:>8}{by_llm:>8}{llm_elapsed:>7.3f}{by_index:>8}{index_elapsed:>7.3f}"
+                      f"  {resolution['method']}")
+
+        n = len(QUERIES)
+        for name, (elapsed, correct, calls) in totals.items():
+            print(f"{name:>6}: 평균 {elapsed / n * 1000:8.1f}ms, 정확도 {correct}/{n}, LLM 호출 {calls}회")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
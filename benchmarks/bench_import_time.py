@@ -0,0 +1,112 @@
+"""import 시간 벤치마크: 모듈 import 비용과 LLM/임베딩 클라이언트 생성 시점
+
+새 파이썬 프로세스에서 모듈을 import하는 데 걸리는 시간(중앙값)과 그때 langchain_openai가 함께 로드되는지를 측정합니다.
+"app (백엔드)"는 app.py가 시작할 때 import하는 백엔드 모듈 묶음으로, `streamlit run app.py` 시작 시간 중
+UI 라이브러리(streamlit, hydralit 등, 이번 변경과 무관)를 뺀 부분입니다.
+이어서 한 프로세스 안에서 첫 LLM 클라이언트 생성 비용과 with_structured_output 러너블을
+호출마다 새로 만드는 경우(기존 방식)와 스키마별로 한 번 만들어 재사용하는 경우를 비교합니다. (API 호출 없음)
+
+사용법:
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --repeat 10 --calls 1000
+"""
+import os
+import sys
+import time
+import json
+import argparse
+import statistics
+import subprocess
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(project_root)
+
+for key, value in [("AOAI_API_KEY", "bench"), ("AOAI_ENDPOINT", "https://localhost"),
+                   ("AOAI_DEPLOY_GPT4O_MINI", "bench"), ("AOAI_DEPLOY_EMBED_ADA", "bench")]:
+    os.environ.setdefault(key, value)
+
+TARGETS = [
+    ("agent.search", ["agent.search"]),
+    ("agent.agents", ["agent.agents"]),
+    ("vector_store", ["vector_store"]),
+    ("app (백엔드)", ["db", "vector_store", "vector_service", "partitions", "agent.agents", "agent.knn",
+                    "agent.category_cache", "agent.search"]),
+]
+
+CHILD = """
+import sys, time, json, importlib
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+for name in {modules!r}:
+    importlib.import_module(name)
+print(json.dumps({{"seconds": time.perf_counter() - started, "langchain_openai": "langchain_openai" in sys.modules}}))
+"""
+
+
+def measure_import(modules, repeat):
+    """새 프로세스에서 modules를 import하는 시간 목록과 langchain_openai 로드 여부"""
+    times, loaded = [], False
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", CHILD.format(root=project_root, modules=modules)],
+                             capture_output=True, text=True, cwd=project_root, check=True)
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        times.append(result["seconds"])
+        loaded = result["langchain_openai"]
+    return times, loaded
+
+
+def measure_runnables(calls):
+    """첫 클라이언트 생성 시간, 호출마다 러너블 생성 시간, 캐시된 러너블 조회 시간 (초, 호출당)"""
+    from agent.prompts import FilteringPrompt
+    try:
+        from agent.llm import get_llm, structured_llm
+    except ImportError:
+        # 레지스트리 도입 전 트리: import 시 이미 생성된 클라이언트
+        from agent.agents import llm
+        get_llm, structured_llm = (lambda: llm), None
+
+    started = time.perf_counter()
+    client = get_llm()
+    first = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(calls):
+        client.with_structured_output(FilteringPrompt.OutputFormat)
+    rebuild = (time.perf_counter() - started) / calls
+
+    cached = None
+    if structured_llm is not None:
+        structured_llm(FilteringPrompt.OutputFormat, client)
+        started = time.perf_counter()
+        for _ in range(calls):
+            structured_llm(FilteringPrompt.OutputFormat, client)
+        cached = (time.perf_counter() - started) / calls
+    return first, rebuild, cached
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5, help="모듈별 import 측정 횟수 (새 프로세스)")
+    parser.add_argument("--calls", type=int, default=200, help="러너블 생성/조회 반복 횟수")
+    args = parser.parse_args()
+
+    print(f"python {sys.version.split()[0]}, 새 프로세스 {args.repeat}회 중앙값")
+    print(f"{'모듈':<16}{'중앙값(s)':>10}{'최소(s)':>9}{'langchain_openai':>18}")
+    for name, modules in TARGETS:
+        try:
+            times, loaded = measure_import(modules, args.repeat)
+        except subprocess.CalledProcessError as e:
+            print(f"{name:<16} import 실패: {e.stderr.strip().splitlines()[-1] if e.stderr else e}")
+            continue
+        print(f"{name:<16}{statistics.median(times):>10.3f}{min(times):>9.3f}{'로드됨' if loaded else '-':>18}")
+
+    first, rebuild, cached = measure_runnables(args.calls)
+    print(f"첫 LLM 클라이언트 생성: {first * 1000:.1f}ms")
+    print(f"with_structured_output 호출마다 생성: {rebuild * 1e6:.0f}us/호출")
+    if cached is not None:
+        print(f"스키마별 러너블 재사용: {cached * 1e6:.1f}us/호출")
+
+
+if __name__ == "__main__":
+    main()
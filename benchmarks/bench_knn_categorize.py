@@ -0,0 +1,95 @@
+"""kNN 카테고리 예측 벤치마크: LLM fallback 비율, LLM 라벨 대비 정확도, 절감 시간
+
+이미 LLM으로 분류된 북마크(bookmarks.category)를 정답으로 보고 leave-one-out으로 평가합니다.
+저장된 벡터를 재사용하므로 임베딩/LLM API 호출 없이 실행됩니다. (--measure-llm 제외)
+
+사용법:
+    python benchmarks/bench_knn_categorize.py --db ./data/bookmarks.db
+    python benchmarks/bench_knn_categorize.py --measure-llm 5   # 실제 LLM 지연시간 측정
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(project_root)
+from db import BookmarkDatabase
+from vector_store import VectorStore
+from agent.knn import KNNCategoryClassifier, UNLABELED_CATEGORIES
+
+
+def measure_llm_latency(db, samples):
+    """CategorizeAgent.classify 평균 지연시간 (초)"""
+    from agent.agents import CategorizeAgent
+    agent = CategorizeAgent()
+    agent.base_categories = db.get_all_categories()
+    latencies = []
+    for bookmark in samples:
+        start = time.perf_counter()
+        agent.classify(bookmark.get('caption', ''), bookmark.get('hashtags') or [])
+        latencies.append(time.perf_counter() - start)
+    return statistics.mean(latencies)
+
+
+def evaluate(classifier, vector_store, labeled):
+    """leave-one-out 평가: (자동 분류 수, 정답 수, kNN 평균 지연시간 ms)"""
+    assigned = correct = 0
+    latencies = []
+    for bookmark in labeled:
+        vector = vector_store.get_vector(bookmark['feed_id'])
+        start = time.perf_counter()
+        prediction = classifier.predict_vector(vector, exclude_id=bookmark['feed_id'], transformed=True)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if prediction:
+            assigned += 1
+            correct += prediction['category'] == bookmark['category']
+    return assigned, correct, statistics.mean(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default="./data/bookmarks.db")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--similarities", default="0.80,0.85,0.90")
+    parser.add_argument("--agreements", default="0.6,0.7,0.8")
+    parser.add_argument("--llm-latency", type=float, default=1.5, help="LLM 분류 1회 지연시간(초) 가정값")
+    parser.add_argument("--measure-llm", type=int, default=0, help="N개 샘플로 실제 LLM 지연시간 측정")
+    args = parser.parse_args()
+
+    db = BookmarkDatabase(args.db)
+    vector_store = VectorStore(args.db)
+
+    labeled = [
+        b for b in db.get_bookmarks(limit=1_000_000)
+        if b.get('category') not in UNLABELED_CATEGORIES and b['feed_id'] in vector_store.id_to_index
+    ]
+    if not labeled:
+        print("LLM으로 분류된 북마크가 벡터 스토어에 없습니다.")
+        return
+
+    llm_latency = args.llm_latency
+    if args.measure_llm:
+        llm_latency = measure_llm_latency(db, random.sample(labeled, min(args.measure_llm, len(labeled))))
+    print(f"평가 대상 {len(labeled)}개, LLM 분류 1회 {llm_latency:.2f}s 기준")
+    print(f"{'min_sim':>8}{'min_agree':>10}{'fallback':>10}{'accuracy':>10}{'knn(ms)':>9}{'saved(s)':>10}")
+
+    for min_similarity in [float(x) for x in args.similarities.split(",")]:
+        for min_agreement in [float(x) for x in args.agreements.split(",")]:
+            classifier = KNNCategoryClassifier(
+                db, vector_store, k=args.k, min_similarity=min_similarity, min_agreement=min_agreement
+            )
+            assigned, correct, knn_ms = evaluate(classifier, vector_store, labeled)
+            fallback_rate = 1 - assigned / len(labeled)
+            accuracy = correct / assigned if assigned else 0.0
+            # 자동 분류된 항목은 LLM 호출 대신 kNN 조회 비용만 발생
+            saved_s = assigned * (llm_latency - knn_ms / 1000)
+            print(f"{min_similarity:>8.2f}{min_agreement:>10.2f}{fallback_rate:>10.1%}"
+                  f"{accuracy:>10.1%}{knn_ms:>9.2f}{saved_s:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""프롬프트 크기 비교: 캡션 압축(compact_caption)/토큰 예산 적용 전후의 프롬프트 토큰 수
+
+인스타그램 캡션처럼 해시태그가 많이 붙고 이모지/장식 줄이 섞인 고정 시드 코퍼스(또는 --db의 실제 북마크)로
+CategoryPrompt, PackedCategoryPrompt, FilteringPrompt, RecommendPrompt, ClusterLabelPrompt의 사용자 프롬프트 토큰을
+압축을 끈 상태(기존 방식: 캡션 원문 그대로)와 비교합니다.
+tiktoken 인코딩을 불러올 수 있으면 실제 토큰 수, 아니면 estimate_tokens 근사치입니다.
+
+사용법:
+    python benchmarks/bench_prompt_tokens.py
+    python benchmarks/bench_prompt_tokens.py --db ./data/bookmarks.db
+"""
+import os
+import sys
+import json
+import random
+import sqlite3
+import argparse
+from contextlib import contextmanager
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(project_root)
+
+from agent import prompts
+from agent.prompts import (CategoryPrompt, PackedCategoryPrompt, FilteringPrompt, RecommendPrompt,
+                           ClusterLabelPrompt, count_tokens)
+
+SENTENCES = [
+    "오늘 성수동 새로 생긴 카페 다녀왔어요", "분위기도 좋고 디저트가 정말 맛있었다", "주말에 친구랑 또 가기로 했어요",
+    "제주도 3박 4일 여행 코스 정리해봤습니다", "숙소는 애월 쪽 오션뷰 게스트하우스였는데 강추합니다",
+    "뮤지컬 티켓팅 성공했다 드디어", "배우들 연기가 너무 좋아서 눈물 났어요", "집에서 만드는 간단한 파스타 레시피",
+    "재료는 마늘, 올리브오일, 페퍼론치노만 있으면 돼요", "저장해두고 나중에 꼭 해보세요", "이번 시즌 신상 코디 추천",
+    "가을에 입기 좋은 트렌치코트 스타일링", "댓글로 궁금한 점 남겨주세요", "팔로우하고 다음 게시물도 확인하세요",
+]
+EMOJI = ["✨", "🌊", "🍝", "☕️", "🎭", "❤️", "🔥", "👍🏻", "🏖️", "📍"]
+HASHTAGS = ["여행", "제주", "카페", "맛집", "뮤지컬", "레시피", "코디", "데일리", "일상", "소통", "좋아요", "팔로우",
+            "instagood", "travel", "food", "ootd", "daily", "맞팔", "선팔", "주말", "서울", "성수", "디저트", "감성"]
+
+
+def make_corpus(n, seed=0):
+    """인스타그램 스타일 고정 코퍼스 (짧은 캡션부터 해시태그로 채운 긴 캡션까지)"""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(n):
+        lines = []
+        for _ in range(rng.choice([1, 2, 4, 8, 16])):
+            line = ". ".join(rng.sample(SENTENCES, rng.randint(1, 3))) + rng.choice(["!", "!!!!!!", ".", "~~~~"])
+            line += " " + rng.choice(EMOJI) * rng.randint(0, 5)
+            lines.append(line)
+            if rng.random() < 0.2:
+                lines.append(rng.choice(["━━━━━━━━━━━━", "............", "", "   "]))
+        tags = rng.sample(HASHTAGS, rng.randint(3, len(HASHTAGS)))
+        caption = "\n".join(lines) + "\n\n" + " ".join(f"#{t}" for t in tags)
+        corpus.append({"feed_id": f"fixture{i}", "caption": caption, "hashtags": tags})
+    return corpus
+
+
+def load_corpus(db_path, n):
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT feed_id, caption, hashtags FROM bookmarks ORDER BY id DESC LIMIT ?", (n,)).fetchall()
+    corpus = []
+    for feed_id, caption, hashtags in rows:
+        try:
+            hashtags = json.loads(hashtags) if hashtags else []
+        except json.JSONDecodeError:
+            hashtags = []
+        corpus.append({"feed_id": feed_id, "caption": caption or "", "hashtags": hashtags})
+    return corpus
+
+
+@contextmanager
+def compaction_disabled():
+    """캡션 압축/토큰 예산을 끈 상태 (기존 방식과 같은 원문 그대로의 프롬프트)"""
+    saved = prompts.compact_caption, prompts.compact_hashtags, prompts.fit_items
+    prompts.compact_caption = lambda caption, max_tokens=0: caption or ""
+    prompts.compact_hashtags = lambda hashtags, max_hashtags=0: list(hashtags or [])
+    prompts.fit_items = lambda items, total_tokens, min_item_tokens=0, drop=False: list(items)
+    try:
+        yield
+    finally:
+        prompts.compact_caption, prompts.compact_hashtags, prompts.fit_items = saved
+
+
+def prompt_cases(corpus, categories):
+    """(이름, 프롬프트 목록) - 프롬프트 하나가 LLM 호출 한 번"""
+    captions = [b["caption"] for b in corpus]
+    hashtags = [b["hashtags"] for b in corpus]
+    return [
+        ("CategoryPrompt (1건)", [CategoryPrompt(c, h, categories) for c, h in zip(captions, hashtags)]),
+        ("PackedCategoryPrompt (10건)", [PackedCategoryPrompt(captions[i:i + 10], hashtags[i:i + 10], categories)
+                                         for i in range(0, len(corpus), 10)]),
+        ("ClusterLabelPrompt (5건)", [ClusterLabelPrompt(captions[i:i + 5], hashtags[i:i + 5], categories)
+                                      for i in range(0, len(corpus), 5)]),
+        ("FilteringPrompt (20건)", [FilteringPrompt("제주도 여행", corpus[i:i + 20]) for i in range(0, len(corpus), 20)]),
+        ("RecommendPrompt (히스토리 20 + 후보 30)", [RecommendPrompt("제주도 여행", corpus[i:i + 20], corpus[i + 20:i + 50])
+                                                  for i in range(0, len(corpus) - 49, 50)]),
+    ]
+
+
+def measure(case_prompts):
+    tokens = [count_tokens(p.get_user_prompt()) for p in case_prompts]
+    return sum(tokens) / len(tokens), max(tokens)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=200, help="코퍼스 북마크 수")
+    parser.add_argument("--db", default=None, help="실제 북마크 DB (없으면 고정 시드 코퍼스)")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.db, args.items) if args.db else make_corpus(args.items)
+    categories = ["여행", "음식", "패션", "공연", "운동", "반려동물", "IT", "카페"]
+    raw_tokens = [count_tokens(b["caption"]) for b in corpus]
+    compact_tokens = [count_tokens(prompts.compact_caption(b["caption"])) for b in corpus]
+    print(f"코퍼스 {len(corpus)}건 ({'DB: ' + args.db if args.db else '고정 시드'}), "
+          f"토큰 계산: {'tiktoken' if prompts._get_encoding() else 'estimate_tokens 근사치'}")
+    print(f"캡션 토큰 평균 {sum(raw_tokens) / len(corpus):.0f} -> {sum(compact_tokens) / len(corpus):.0f}, "
+          f"최대 {max(raw_tokens)} -> {max(compact_tokens)}")
+    print(f"{'프롬프트':<38}{'전 평균':>9}{'후 평균':>9}{'감소':>7}{'전 최대':>9}{'후 최대':>9}")
+    for name, case_prompts in prompt_cases(corpus, categories):
+        with compaction_disabled():
+            before_mean, before_max = measure(case_prompts)
+        after_mean, after_max = measure(case_prompts)
+        print(f"{name:<38}{before_mean:>9.0f}{after_mean:>9.0f}{1 - after_mean / before_mean:>7.0%}"
+              f"{before_max:>9}{after_max:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""추천 후보 사전 순위화(RecommendRanker) 전후 비교 (가짜 LLM/임베딩, 임시 디렉토리)
+
+고정 코퍼스로 북마크(히스토리)를 인덱싱하고, 트렌드 게시물 후보 수(20/100/500)별로
+모든 후보를 RecommendAgent에 보내는 기존 방식과 임베딩 + MMR로 top-k만 보내는 방식의
+순위화 시간(임베딩 캐시 없음/있음), LLM 시간, 추천 프롬프트 토큰, 추천 결과 중 이미 북마크한 게시물 수,
+본문이 검색어와 관련된 추천 비율을 비교합니다.
+가짜 LLM은 --latency + 후보당 --per-item-latency초 걸리고, 후보의 10%는 이미 북마크한 게시물입니다.
+
+사용법:
+    python benchmarks/bench_recommend_rank.py
+    python benchmarks/bench_recommend_rank.py --candidates 100,1000 --top-k 10 --embed-latency 0.3
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(project_root)
+
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ["EMBEDDING_PROVIDER"] = "fake"
+os.environ.setdefault("LLM_LEDGER_PATH", "")
+
+from vector_store import VectorStore
+from agent.agents import RecommendAgent
+from agent.fake_llm import FakeChatModel, FakeEmbeddings, overlap
+from agent.prompts import RecommendPrompt, count_tokens
+from agent.recommend_rank import RecommendRanker, EmbeddingCache
+from bench_prompt_tokens import make_corpus
+
+
+def body(feed):
+    """해시태그를 뺀 캡션 본문 (고정 코퍼스는 대부분 같은 해시태그를 달고 있어 본문으로 관련성 판단)"""
+    return (feed.get("caption") or "").rsplit("\n\n", 1)[0]
+
+
+def make_candidates(n, history):
+    feeds = [dict(f, feed_id=f"trend{i}") for i, f in enumerate(make_corpus(n, seed=1))]
+    # 10%는 이미 북마크한 게시물 (리포스트 등)
+    for i in range(0, n, 10):
+        feeds[i] = dict(history[(i // 10) % len(history)])
+    return feeds
+
+
+def run(query, history, feeds, ranker, llm):
+    agent = RecommendAgent()
+    agent.llm = llm
+    result = {"rank_cold": 0.0, "rank_warm": 0.0}
+    if ranker is not None:
+        started = time.perf_counter()
+        candidates, _ = ranker.rank(query, history, feeds)
+        result["rank_cold"] = time.perf_counter() - started
+        started = time.perf_counter()
+        candidates, _ = ranker.rank(query, history, feeds)
+        result["rank_warm"] = time.perf_counter() - started
+    else:
+        candidates = feeds
+    started = time.perf_counter()
+    state = agent.run(query, history, candidates)
+    result["llm"] = time.perf_counter() - started
+    result["sent"] = len(candidates)
+    result["tokens"] = count_tokens(RecommendPrompt(query, history, candidates).get_user_prompt())
+    recommended = state.get("recommended_feeds") or []
+    history_ids = {b["feed_id"] for b in history}
+    result["recommended"] = len(recommended)
+    result["bookmarked"] = sum(f["feed_id"] in history_ids for f in recommended)
+    result["relevant"] = (sum(overlap(query, body(f)) > 0 for f in recommended) / len(recommended)
+                          if recommended else 0.0)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", default="20,100,500")
+    parser.add_argument("--history", type=int, default=50, help="북마크(히스토리) 수")
+    parser.add_argument("--query", default="제주도 여행")
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5, help="가짜 LLM 호출당 지연(초)")
+    parser.add_argument("--per-item-latency", type=float, default=0.01, help="가짜 LLM 후보당 추가 지연(초)")
+    parser.add_argument("--embed-latency", type=float, default=0.1, help="가짜 임베딩 호출당 지연(초)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="installm_rank_")
+    try:
+        embeddings = FakeEmbeddings(latency=args.embed_latency)
+        vector_store = VectorStore(os.path.join(workdir, "bookmarks.db"), embedding_model=embeddings)
+        history = make_corpus(args.history)
+        vector_store.add_bookmark_batch(history)
+        llm = FakeChatModel(latency=args.latency, per_item_latency=args.per_item_latency)
+
+        print(f"history={args.history}, query='{args.query}', top_k={args.top_k}, "
+              f"llm={args.latency}s + {args.per_item_latency}s/후보, embed={args.embed_latency}s/호출")
+        print(f"{'후보':>6}{'방식':>11}{'보냄':>6}{'순위(s)':>9}{'캐시(s)':>9}{'LLM(s)':>8}{'입력토큰':>10}"
+              f"{'추천':>6}{'북마크':>7}{'관련':>7}")
+        for n in [int(c) for c in args.candidates.split(",")]:
+            feeds = make_candidates(n, history)
+            for mode in ["all", "preranked"]:
+                ranker = None
+                if mode == "preranked":
+                    # 후보 수마다 빈 캐시에서 시작 (첫 순위화는 모든 후보 임베딩)
+                    cache = EmbeddingCache(os.path.join(workdir, f"llm_cache_{n}.db"))
+                    ranker = RecommendRanker(vector_store, cache=cache, top_k=args.top_k)
+                with open(os.devnull, "w") as devnull:
+                    stdout, sys.stdout = sys.stdout, devnull  # 에이전트 로그 숨김
+                    try:
+                        r = run(args.query, history, feeds, ranker, llm)
+                    finally:
+                        sys.stdout = stdout
+                print(f"{n:>6}{mode:>11}{r['sent']:>6}{r['rank_cold']:>9.3f}{r['rank_warm']:>9.3f}{r['llm']:>8.2f}"
+                      f"{r['tokens']:>10}{r['recommended']:>6}{r['bookmarked']:>7}{r['relevant']:>7.2f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""LLM 장애 상황 벤치마크: 재시도(백오프 + jitter)/시간 초과/circuit breaker 적용 전후 비교 (로컬 가짜 LLM 서버 사용)
+
+bench_filter.py의 가짜 필터링 서버에 장애를 주입하고, 같은 검색어로 FilterAgent를 여러 번 연속 실행해
+검색당 지연시간(평균/p95), 서버가 받은 요청 수, 정밀도, 저하 모드(검색 결과 그대로 표시) 검색 수를 비교합니다.
+    - healthy: 정상
+    - rate_limited: 요청의 --reject-rate 비율에 429 (Retry-After 헤더 포함)
+    - outage: 모든 요청에 잠시 후 503
+    - hang: 모든 요청이 --hang초 동안 응답하지 않음
+정책:
+    - baseline: 기존 방식 (openai SDK 기본 재시도 2번/시간 제한 없음, circuit breaker 없음, FilterAgent 전체 시간 제한만 적용)
+    - resilient: SDK 재시도 끔, --timeout초 시간 제한, 에이전트 재시도(LLM_MAX_RETRIES) + circuit breaker
+
+사용법:
+    python benchmarks/bench_resilience.py
+    python benchmarks/bench_resilience.py --scenarios outage,hang --searches 20 --breaker-reset 5
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(project_root)
+
+for key, value in [("AOAI_API_KEY", "bench"), ("AOAI_ENDPOINT", "https://localhost"),
+                   ("AOAI_DEPLOY_GPT4O_MINI", "bench"), ("LLM_LEDGER_PATH", "")]:
+    os.environ.setdefault(key, value)
+
+from langchain_openai import AzureChatOpenAI
+from agent import agents
+from agent.agents import FilterAgent
+from agent.ledger import percentile
+from utils.concurrency import CircuitBreaker
+from bench_filter import FakeFilterServer, make_candidates, is_relevant
+
+
+class FaultyFilterServer(FakeFilterServer):
+    """scenario에 따라 429/503/무응답을 주입하는 가짜 필터링 서버"""
+
+    def __init__(self, latency, jitter=0.0, per_item_latency=0.0, reject_rate=0.3, hang=30.0):
+        super().__init__(latency, jitter, per_item_latency)
+        self.scenario = "healthy"
+        self.reject_rate = reject_rate
+        self.hang = hang
+
+    def reject(self, text):
+        if self.scenario == "rate_limited" and random.random() < self.reject_rate:
+            return 429, {"error": {"message": "rate limit exceeded", "type": "rate_limit_error"}}, {"Retry-After": "1"}
+        if self.scenario == "outage":
+            time.sleep(0.05)
+            return 503, {"error": {"message": "service unavailable", "type": "server_error"}}
+        if self.scenario == "hang":
+            time.sleep(self.hang)
+        return super().reject(text)
+
+
+def make_llm(server, policy, timeout):
+    if policy == "baseline":
+        return AzureChatOpenAI(openai_api_key="bench", azure_endpoint=server.url, azure_deployment="bench",
+                               api_version="2024-08-01-preview", temperature=0.5)
+    return AzureChatOpenAI(openai_api_key="bench", azure_endpoint=server.url, azure_deployment="bench",
+                           api_version="2024-08-01-preview", temperature=0.5, timeout=timeout, max_retries=0)
+
+
+def run(server, candidates, policy, args):
+    # 모듈 전역 설정을 정책에 맞게 바꿈 (baseline: 에이전트 재시도/차단 없음)
+    if policy == "baseline":
+        agents.LLM_MAX_RETRIES = 0
+        agents.llm_circuit_breaker = CircuitBreaker(failure_threshold=10 ** 9)
+    else:
+        agents.LLM_MAX_RETRIES = args.retries
+        agents.llm_circuit_breaker = CircuitBreaker(args.breaker_failures, args.breaker_reset)
+    llm = make_llm(server, policy, args.timeout)
+
+    server.reset()
+    latencies, precisions = [], []
+    degraded = 0
+    for _ in range(args.searches):
+        agent = FilterAgent(max_concurrency=args.concurrency, deadline=args.deadline)
+        agent.llm = llm
+        started = time.perf_counter()
+        state = agent.run("벤치마크 검색어", candidates)
+        latencies.append(time.perf_counter() - started)
+        kept = [int(b["feed_id"][5:]) for b in state["filtered_bookmarks"]]
+        precisions.append(sum(is_relevant(n) for n in kept) / len(kept) if kept else 0.0)
+        degraded += bool((state.get("filter_stats") or {}).get("degraded"))
+    breaker = agents.llm_circuit_breaker.stats()
+    return {
+        "mean": sum(latencies) / len(latencies),
+        "p95": percentile(latencies, 0.95),
+        "requests": server.requests,
+        "precision": sum(precisions) / len(precisions),
+        "degraded": degraded,
+        "opened": sum(v for k, v in breaker["transitions"].items() if k.endswith("->open")),
+        "rejected": breaker["rejected"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", default="healthy,rate_limited,outage,hang")
+    parser.add_argument("--policies", default="baseline,resilient")
+    parser.add_argument("--searches", type=int, default=10, help="시나리오/정책마다 연속 검색 횟수")
+    parser.add_argument("--candidates", type=int, default=60)
+    parser.add_argument("--latency", type=float, default=0.3, help="가짜 LLM 기본 응답 지연(초)")
+    parser.add_argument("--per-item-latency", type=float, default=0.01)
+    parser.add_argument("--reject-rate", type=float, default=0.3, help="rate_limited 시나리오의 429 비율")
+    parser.add_argument("--hang", type=float, default=30.0, help="hang 시나리오의 무응답 시간(초)")
+    parser.add_argument("--timeout", type=float, default=2.0, help="resilient 정책의 요청당 시간 제한(초)")
+    parser.add_argument("--retries", type=int, default=agents.LLM_MAX_RETRIES)
+    parser.add_argument("--breaker-failures", type=int, default=agents.llm_circuit_breaker.failure_threshold)
+    parser.add_argument("--breaker-reset", type=float, default=agents.llm_circuit_breaker.reset_seconds)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--deadline", type=float, default=10.0, help="FilterAgent 전체 시간 제한(초)")
+    args = parser.parse_args()
+
+    server = FaultyFilterServer(args.latency, 0.1, args.per_item_latency, args.reject_rate, args.hang).start()
+    candidates = make_candidates(args.candidates, 200)
+    print(f"candidates={args.candidates}, searches={args.searches}, timeout={args.timeout}s, retries={args.retries}, "
+          f"breaker={args.breaker_failures}회/{args.breaker_reset}s, deadline={args.deadline}s")
+    print(f"{'시나리오':<14}{'정책':<11}{'평균(s)':>8}{'p95(s)':>8}{'요청':>6}{'정밀도':>8}{'저하':>6}{'차단':>5}{'거부':>6}")
+    try:
+        for scenario in args.scenarios.split(","):
+            server.scenario = scenario
+            for policy in args.policies.split(","):
+                with open(os.devnull, "w") as devnull:
+                    stdout, sys.stdout = sys.stdout, devnull  # 필터링 오류 로그 숨김
+                    try:
+                        r = run(server, candidates, policy, args)
+                    finally:
+                        sys.stdout = stdout
+                print(f"{scenario:<14}{policy:<11}{r['mean']:>8.2f}{r['p95']:>8.2f}{r['requests']:>6}"
+                      f"{r['precision']:>8.2f}{r['degraded']:>6}{r['opened']:>5}{r['rejected']:>6}")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""total_search 검색 단계: 순차 실행 + 리스트 중복 제거 vs 병렬 실행 + feed_id 중복 제거 비교 (가짜 임베딩, 임시 디렉토리)
+
+북마크 --corpus개(썸네일 base64 --thumbnail-kb KB 포함)를 저장/인덱싱하고, 검색기당 결과 수(10/100/1000)별로
+키워드 검색 -> 의미 검색을 차례로 실행한 뒤 `[b for b in ss if b not in db]`로 합치는 기존 방식과
+HybridRetriever(두 검색기 동시 실행, feed_id 해시 기반 중복 제거 + 순위 융합)의 전체/단계별 지연시간(ms, 중앙값),
+결과 수, 남은 중복 수를 비교합니다. 매 반복마다 쿼리 임베딩 캐시를 비워 임베딩 API 지연(--embed-latency)을 포함합니다.
+
+사용법:
+    python benchmarks/bench_retrieval.py
+    python benchmarks/bench_retrieval.py --hits 10,100,1000 --corpus 5000 --embed-latency 0.1 --repeat 10
+"""
+import os
+import sys
+import time
+import base64
+import shutil
+import argparse
+import tempfile
+import statistics
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(project_root)
+
+os.environ["EMBEDDING_PROVIDER"] = "fake"
+
+from db import BookmarkDatabase
+from vector_store import VectorStore
+from agent.fake_llm import FakeEmbeddings
+from agent.retrieval import HybridRetriever
+from bench_prompt_tokens import make_corpus
+
+# 검색기당 결과 수 -> 그만큼의 북마크 캡션에만 넣는 검색어 (서로의 부분 문자열이 아니어야 함)
+MARKERS = {10: "알파카", 100: "브라보", 1000: "찰리채플린", 10000: "델타포스"}
+
+
+def make_bookmarks(n, hits, thumbnail_kb):
+    thumbnail = base64.b64encode(os.urandom(thumbnail_kb * 768)).decode()
+    bookmarks = []
+    for i, b in enumerate(make_corpus(n)):
+        markers = " ".join(MARKERS[h] for h in hits if i < h)
+        bookmarks.append({
+            "collection_id": "bench", "feed_id": b["feed_id"], "media_type": 1,
+            "caption": f"{markers} {b['caption']}" if markers else b["caption"],
+            "media_url": "", "thumbnail_url": "", "thumbnail": thumbnail,
+            "url": f"https://www.instagram.com/p/{b['feed_id']}/", "hashtags": b["hashtags"],
+        })
+    return bookmarks
+
+
+def sequential(db, vector_store, query, hits, timings):
+    """기존 total_search: 키워드 -> 의미 검색을 차례로 실행하고 dict 전체 비교로 중복 제거"""
+    start = time.perf_counter()
+    db_bookmarks = db.search_bookmarks(query)
+    timings["keyword"] = (time.perf_counter() - start) * 1000
+    semantic_start = time.perf_counter()
+    ss_bookmarks = vector_store.search_bookmarks(query, limit=hits)
+    timings["semantic"] = (time.perf_counter() - semantic_start) * 1000
+    dedupe_start = time.perf_counter()
+    bookmarks = db_bookmarks + [b for b in ss_bookmarks if b not in db_bookmarks]
+    timings["fusion"] = (time.perf_counter() - dedupe_start) * 1000
+    return bookmarks
+
+
+def concurrent(db, vector_store, query, hits, timings):
+    retriever = HybridRetriever(db, vector_store, semantic_limit=hits)
+    # 두 검색기 결과를 모두 남기도록 limit을 충분히 크게
+    return retriever.retrieve(query, limit=2 * hits, timings=timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hits", default="10,100,1000", help=f"검색기당 결과 수 (가능: {sorted(MARKERS)})")
+    parser.add_argument("--corpus", type=int, default=3000, help="전체 북마크 수")
+    parser.add_argument("--thumbnail-kb", type=int, default=8, help="북마크당 base64 썸네일 크기(KB)")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="가짜 임베딩 호출당 지연(초)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    hits_list = [int(h) for h in args.hits.split(",")]
+    workdir = tempfile.mkdtemp(prefix="installm_retrieval_")
+    try:
+        db = BookmarkDatabase(os.path.join(workdir, "bookmarks.db"))
+        db.add_bookmark_batch(make_bookmarks(max(args.corpus, max(hits_list)), hits_list, args.thumbnail_kb))
+        embeddings = FakeEmbeddings()
+        vector_store = VectorStore(db.db_path, embedding_model=embeddings)
+        with open(os.devnull, "w") as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                vector_store.add_bookmark_batch(db.get_bookmarks(limit=max(args.corpus, max(hits_list)) + 1))
+            finally:
+                sys.stdout = stdout
+        # 인덱싱이 끝난 뒤부터 쿼리 임베딩 지연 적용
+        embeddings.latency = args.embed_latency
+
+        print(f"corpus={vector_store.index.ntotal}, thumbnail={args.thumbnail_kb}KB, "
+              f"embed={args.embed_latency}s/호출, repeat={args.repeat}")
+        print(f"{'결과수':>6}{'방식':>12}{'전체(ms)':>10}{'키워드':>9}{'의미':>9}{'합치기':>9}{'결과':>7}{'중복':>6}")
+        with open(os.devnull, "w") as devnull:
+            for hits in hits_list:
+                query = MARKERS[hits]
+                for name, fn in [("sequential", sequential), ("concurrent", concurrent)]:
+                    samples = []
+                    for _ in range(args.repeat):
+                        vector_store.query_embedding_cache.clear()
+                        timings = {}
+                        stdout, sys.stdout = sys.stdout, devnull  # 검색 로그 숨김
+                        try:
+                            started = time.perf_counter()
+                            bookmarks = fn(db, vector_store, query, hits, timings)
+                            timings["total"] = (time.perf_counter() - started) * 1000
+                        finally:
+                            sys.stdout = stdout
+                        samples.append(timings)
+                    median = {key: statistics.median(t[key] for t in samples) for key in samples[0]}
+                    duplicates = len(bookmarks) - len({b["feed_id"] for b in bookmarks})
+                    print(f"{hits:>6}{name:>12}{median['total']:>10.1f}{median['keyword']:>9.1f}"
+                          f"{median['semantic']:>9.1f}{median['fusion']:>9.1f}{len(bookmarks):>7}{duplicates:>6}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
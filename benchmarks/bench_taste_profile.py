@@ -0,0 +1,111 @@
+"""취향 프로필(TasteProfile) 증분 갱신 vs 전체 재계산 비교
+
+카테고리별 군집을 이룬 무작위 정규화 벡터(북마크 수 1000/10000)로 프로필을 만들고,
+북마크 한 개 추가/삭제 시 증분 갱신과 전체 북마크의 시간 감쇠 가중 평균 재계산 시간,
+후보 500개 점수 계산(내적) 시간, 저장/로드 시간과 파일 크기를 비교합니다.
+절반을 무작위로 삭제한 뒤 증분 갱신 결과와 재계산 결과의 코사인 유사도(전체/카테고리별 최소)로 누적 오차를 확인합니다.
+
+사용법:
+    python benchmarks/bench_taste_profile.py
+    python benchmarks/bench_taste_profile.py --sizes 1000,10000,50000 --dim 256
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(project_root)
+
+from agent.taste_profile import TasteProfile
+
+CATEGORIES = ["여행", "음식", "카페", "패션", "공연", "운동", "반려동물", "기타"]
+DAY = 86400
+
+
+def make_bookmarks(n, dim, rng):
+    centers = rng.normal(size=(len(CATEGORIES), dim))
+    labels = rng.integers(0, len(CATEGORIES), size=n)
+    vectors = centers[labels] + 0.8 * rng.normal(size=(n, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    # 최근 2년 안에 저장한 북마크
+    timestamps = time.time() - rng.uniform(0, 730 * DAY, size=n)
+    return vectors.astype(np.float32), [CATEGORIES[i] for i in labels], timestamps
+
+
+def full_centroid(profile, vectors, timestamps, mask=None):
+    """모든 북마크로 시간 감쇠 가중 중심을 처음부터 계산 (증분 갱신이 없을 때의 방식)"""
+    weights = np.exp(profile.decay * (timestamps - time.time()))
+    if mask is not None:
+        weights = weights * mask
+    centroid = (weights[:, None] * vectors).sum(axis=0)
+    return centroid / np.linalg.norm(centroid)
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--candidates", type=int, default=500)
+    parser.add_argument("--half-life", type=float, default=90.0, help="가중치 반감기(일)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="installm_taste_")
+    rng = np.random.default_rng(0)
+    print(f"dim={args.dim}, candidates={args.candidates}, half_life={args.half_life}일")
+    print(f"{'북마크':>7}{'재계산(ms)':>12}{'증분(ms)':>10}{'점수(ms)':>10}{'저장(ms)':>10}{'로드(ms)':>10}"
+          f"{'파일(KB)':>10}{'일치(전체)':>11}{'일치(카테고리)':>14}")
+    try:
+        for n in [int(s) for s in args.sizes.split(",")]:
+            vectors, categories, timestamps = make_bookmarks(n, args.dim, rng)
+            path = os.path.join(workdir, f"taste_{n}.npz")
+            profile = TasteProfile(path, half_life_days=args.half_life)
+            for i in range(n):
+                profile.add(f"b{i}", vectors[i], timestamps[i], categories[i])
+
+            recompute = timed(lambda: full_centroid(profile, vectors, timestamps), 5)
+            extra = vectors[0] * 0.5 + vectors[1] * 0.5
+
+            def update():
+                profile.add("extra", extra, time.time(), "여행")
+                profile.remove("extra", extra)
+            incremental = timed(update, 200) / 2
+
+            candidates = vectors[rng.integers(0, n, size=args.candidates)]
+            score = timed(lambda: profile.score(candidates), 50)
+            save = timed(profile.save, 3)
+            load = timed(lambda: TasteProfile(path, half_life_days=args.half_life), 3)
+            size_kb = os.path.getsize(path) / 1024
+
+            # 절반 삭제 후 누적 오차 확인
+            removed = rng.choice(n, size=n // 2, replace=False)
+            for i in removed:
+                profile.remove(f"b{i}", vectors[i])
+            mask = np.ones(n)
+            mask[removed] = 0
+            agreement = float(profile.centroid() @ full_centroid(profile, vectors, timestamps, mask))
+            labels = np.array(categories)
+            category_agreement = min(
+                float(profile.centroid(c) @ full_centroid(profile, vectors, timestamps, mask * (labels == c)))
+                for c in CATEGORIES if (mask * (labels == c)).any()
+            )
+            print(f"{n:>7}{recompute * 1000:>12.2f}{incremental * 1000:>10.3f}{score * 1000:>10.3f}"
+                  f"{save * 1000:>10.1f}{load * 1000:>10.1f}{size_kb:>10.0f}{agreement:>11.6f}{category_agreement:>14.6f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
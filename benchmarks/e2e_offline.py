@@ -0,0 +1,175 @@
+"""오프라인 전체 경로 테스트: 수집 -> 카테고리 분류 -> 벡터 인덱싱 -> 검색 -> LLM 필터링 -> 추천
+
+LLM_PROVIDER=fake / EMBEDDING_PROVIDER=fake(agent/fake_llm.py)로 네트워크와 Azure 인증 없이
+임시 디렉토리에 DB, 인덱스, 캐시, LLM 호출 기록을 만들어 앱과 같은 코드 경로를 실행합니다.
+단계별 시간을 출력하고, 다음을 확인해 하나라도 실패하면 종료 코드 1을 반환합니다. (CI/성능 측정용)
+    - 모든 북마크가 저장/인덱싱되고 규칙대로 분류되는지, 다시 분류하면 캐시로만 처리되는지
+    - 검색 결과가 retrieved -> final 순서로 나오고 최종 결과가 모두 검색어와 관련 있는지
+    - 추천 결과가 후보 안에서 최대 5개인지, LLM 호출 기록이 남는지
+가짜 모델의 지연시간/실패율은 FAKE_LLM_LATENCY, FAKE_LLM_LATENCY_PER_ITEM, FAKE_LLM_FAIL_RATE로 조정합니다.
+
+사용법:
+    python benchmarks/e2e_offline.py
+    python benchmarks/e2e_offline.py --items 1000 --latency 0.2 --per-item-latency 0.01
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(project_root)
+
+QUERIES = ["제주도 여행", "파스타 레시피", "뮤지컬 티켓팅"]
+
+
+def configure(args, workdir):
+    """가짜 제공자와 임시 LLM 호출 기록을 사용하도록 환경 변수를 설정합니다. (agent 모듈 import 전)"""
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["EMBEDDING_PROVIDER"] = "fake"
+    os.environ["LLM_LEDGER_PATH"] = os.path.join(workdir, "llm_ledger.db")
+    os.environ["FAKE_LLM_LATENCY"] = str(args.latency)
+    os.environ["FAKE_LLM_LATENCY_PER_ITEM"] = str(args.per_item_latency)
+    os.environ["FAKE_LLM_FAIL_RATE"] = str(args.fail_rate)
+    os.environ["CATEGORY_PACK_SIZE"] = str(args.pack_size)
+
+
+def make_bookmarks(n):
+    from bench_prompt_tokens import make_corpus
+
+    return [
+        {
+            "collection_id": "e2e", "feed_id": b["feed_id"], "media_type": 1, "caption": b["caption"],
+            "media_url": "", "thumbnail_url": "", "url": f"https://www.instagram.com/p/{b['feed_id']}/",
+            "hashtags": b["hashtags"],
+        }
+        for b in make_corpus(n)
+    ]
+
+
+class Checks:
+    def __init__(self):
+        self.failed = []
+
+    def check(self, name, ok, detail=""):
+        print(f"  [{'OK' if ok else 'FAIL'}] {name}{f' ({detail})' if detail else ''}")
+        if not ok:
+            self.failed.append(name)
+
+
+def timed(timings, name, fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    timings.append((name, time.perf_counter() - started))
+    return result
+
+
+def run(args, workdir):
+    from db import BookmarkDatabase
+    from vector_store import VectorStore
+    from agent.agents import CategorizeAgent, RecommendAgent
+    from agent.category_cache import CategoryCache
+    from agent.fake_llm import FakeChatModel, overlap
+    from agent.prompts import CategoryPrompt
+    from agent.ledger import get_ledger
+    from agent.search import Search
+
+    checks = Checks()
+    timings = []
+    bookmarks = make_bookmarks(args.items)
+
+    db = BookmarkDatabase(os.path.join(workdir, "bookmarks.db"))
+    vector_store = VectorStore(db.db_path)
+    categorize_agent = CategorizeAgent()
+    categorize_agent.cache = CategoryCache(os.path.join(workdir, "llm_cache.db"))
+
+    # 1) 수집 + 분류 (앱의 "북마크 추가"와 같은 경로)
+    success, fail = timed(timings, "수집+분류", db.add_bookmark_batch, [dict(b) for b in bookmarks], categorize_agent)
+    checks.check("북마크 저장", success == len(bookmarks) and fail == 0, f"{success}/{len(bookmarks)}")
+    stored = db.get_bookmarks(limit=len(bookmarks) + 1)
+    # 같은 게시물 프롬프트에 대한 가짜 모델의 응답 (동시 호출 순서와 관계없이 같아야 함)
+    expected = {
+        b["feed_id"]: FakeChatModel().respond(
+            CategoryPrompt.OutputFormat, CategoryPrompt(b["caption"], b["hashtags"], []).get_user_prompt()
+        ).categories
+        for b in bookmarks
+    }
+    wrong = [b for b in stored if b["category"] != expected[b["feed_id"]] and b["category"] != "기타"]
+    if args.fail_rate == 0:
+        checks.check("규칙 분류 일치", not wrong, f"불일치 {len(wrong)}개")
+
+    # 2) 같은 게시물 재분류는 캐시로만 처리
+    before = dict(categorize_agent.stats)
+    timed(timings, "재분류(캐시)", categorize_agent.classify_many,
+          [{"caption": b["caption"], "hashtags": b["hashtags"], "feed_id": b["feed_id"]} for b in bookmarks])
+    new_calls = categorize_agent.stats["llm_calls"] - before["llm_calls"]
+    if args.fail_rate == 0:
+        checks.check("재분류 LLM 호출 없음", new_calls == 0, f"호출 {new_calls}회")
+
+    # 3) 벡터 인덱싱
+    timed(timings, "인덱싱", vector_store.add_bookmark_batch, stored)
+    checks.check("벡터 인덱싱", vector_store.index.ntotal == len(bookmarks), f"{vector_store.index.ntotal}개")
+
+    # 4) 검색 + 스트리밍 필터링
+    for query in QUERIES:
+        search = Search(db, vector_store)
+        stages = timed(timings, f"검색 '{query}'", lambda: list(search.total_search_stream(query)))
+        kinds = [kind for kind, _, _ in stages]
+        final = stages[-1][1]
+        checks.check(f"'{query}' 단계 순서", kinds[0] == "retrieved" and kinds[-1] == "final", " -> ".join(kinds))
+        unrelated = [b for b in final if not overlap(query, f"{b['caption']} {' '.join(b.get('hashtags') or [])}")]
+        if args.fail_rate == 0:
+            checks.check(f"'{query}' 필터링 결과 관련성", final and not unrelated,
+                         f"결과 {len(final)}개, 무관 {len(unrelated)}개")
+
+        # 5) 추천 (검색 결과를 히스토리로, 나머지 북마크를 최신 게시물 후보로 사용)
+        seen = {b["feed_id"] for b in final}
+        feeds = [b for b in stored if b["feed_id"] not in seen][:30]
+        state = timed(timings, f"추천 '{query}'", RecommendAgent().run, query, final, feeds)
+        recommended = (state or {}).get("recommended_feeds") or []
+        if state is not None or args.fail_rate == 0:
+            checks.check(f"'{query}' 추천", state is not None and all(f in feeds for f in recommended),
+                         f"{len(recommended)}개")
+
+    # 6) LLM 호출 기록
+    rows = get_ledger().summary()
+    agents = {r["agent"] for r in rows}
+    checks.check("LLM 호출 기록", {"categorize", "filter", "recommend"} <= agents,
+                 ", ".join(f"{r['agent']}/{r['operation']} {r['calls']}회" for r in rows))
+
+    print(f"\n{'단계':<28}{'시간(s)':>9}")
+    for name, seconds in timings:
+        print(f"{name:<28}{seconds:>9.2f}")
+    return checks.failed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=200, help="수집할 북마크 수")
+    parser.add_argument("--latency", type=float, default=0.0, help="가짜 LLM 호출당 지연(초)")
+    parser.add_argument("--per-item-latency", type=float, default=0.0, help="가짜 LLM 항목당 추가 지연(초)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="가짜 LLM 실패 비율 (0보다 크면 결과 검증 일부 생략)")
+    parser.add_argument("--pack-size", type=int, default=1, help="CATEGORY_PACK_SIZE")
+    parser.add_argument("--keep", action="store_true", help="임시 디렉토리를 지우지 않음")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="installm_e2e_")
+    configure(args, workdir)
+    print(f"items={args.items}, latency={args.latency}s + {args.per_item_latency}s/항목, "
+          f"fail_rate={args.fail_rate}, pack_size={args.pack_size}, workdir={workdir}")
+    try:
+        failed = run(args, workdir)
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    if failed:
+        print(f"실패 {len(failed)}개: {', '.join(failed)}")
+        sys.exit(1)
+    print("모든 확인 통과")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""하이브리드 검색 오프라인 평가: 라벨링된 쿼리셋으로 relevance / latency 비교
+
+라벨 파일 형식 (JSON):
+    [
+        {"query": "뮤지컬 관련 정보 보여줘.", "relevant": ["<feed_id>", "<feed_id>"]},
+        ...
+    ]
+
+사용법:
+    python benchmarks/eval_hybrid.py --labels ./data/labeled_queries.json --db ./data/bookmarks.db
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import statistics
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(project_root)
+from db import BookmarkDatabase
+from vector_store import VectorStore
+from agent.retrieval import HybridRetriever
+
+
+def recall_at_k(ranked, relevant, k):
+    if not relevant:
+        return 0.0
+    return len(set(ranked[:k]) & relevant) / len(relevant)
+
+
+def mrr(ranked, relevant):
+    for rank, feed_id in enumerate(ranked, start=1):
+        if feed_id in relevant:
+            return 1.0 / rank
+    return 0.0
+
+
+def ndcg_at_k(ranked, relevant, k):
+    dcg = sum(1.0 / math.log2(rank + 1) for rank, feed_id in enumerate(ranked[:k], start=1) if feed_id in relevant)
+    ideal = sum(1.0 / math.log2(rank + 1) for rank in range(1, min(len(relevant), k) + 1))
+    return dcg / ideal if ideal else 0.0
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def evaluate(name, run_query, labels, k):
+    """run_query(query) -> (feed_id 순위 목록, 지연시간 ms)"""
+    recalls, mrrs, ndcgs, latencies = [], [], [], []
+    for item in labels:
+        relevant = set(item["relevant"])
+        ranked, latency_ms = run_query(item["query"])
+        recalls.append(recall_at_k(ranked, relevant, k))
+        mrrs.append(mrr(ranked, relevant))
+        ndcgs.append(ndcg_at_k(ranked, relevant, k))
+        latencies.append(latency_ms)
+
+    print(f"{name:<14}{statistics.mean(recalls):>10.3f}{statistics.mean(mrrs):>8.3f}"
+          f"{statistics.mean(ndcgs):>9.3f}{percentile(latencies, 50):>10.1f}{percentile(latencies, 95):>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--labels", required=True, help="라벨링된 쿼리셋 JSON")
+    parser.add_argument("--db", default="./data/bookmarks.db")
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    with open(args.labels, 'r', encoding='utf-8') as f:
+        labels = json.load(f)
+
+    db = BookmarkDatabase(args.db)
+    vector_store = VectorStore(args.db)
+    retrievers = {
+        "rrf": HybridRetriever(db, vector_store, fusion="rrf"),
+        "weighted": HybridRetriever(db, vector_store, fusion="weighted"),
+    }
+    base = retrievers["rrf"]
+
+    def single_source(search_fn):
+        def run_query(query):
+            start = time.perf_counter()
+            bookmarks = search_fn(query)
+            return [b['feed_id'] for b in bookmarks], (time.perf_counter() - start) * 1000
+        return run_query
+
+    def hybrid(retriever):
+        def run_query(query):
+            bookmarks, latency_ms = retriever.timed_retrieve(query, limit=args.k)
+            return [b['feed_id'] for b in bookmarks], latency_ms
+        return run_query
+
+    print(f"쿼리 {len(labels)}개, k={args.k}")
+    print(f"{'method':<14}{'recall@k':>10}{'MRR':>8}{'nDCG@k':>9}{'p50(ms)':>10}{'p95(ms)':>10}")
+    evaluate("keyword", single_source(base._keyword), labels, args.k)
+    evaluate("semantic", single_source(base._semantic), labels, args.k)
+    for name, retriever in retrievers.items():
+        evaluate(f"hybrid-{name}", hybrid(retriever), labels, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""공유 벡터 서비스 부하 테스트: 동시 클라이언트 수(1/4/16)별 처리량과 지연시간
+
+먼저 서비스를 띄운 뒤 실행합니다:
+    python vector_service.py --db ./data/bookmarks.db --port 8765
+    python benchmarks/load_vector_service.py --url http://127.0.0.1:8765
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(project_root)
+from vector_service import VectorServiceClient
+
+DEFAULT_QUERIES = [
+    "뮤지컬 관련 정보 보여줘.",
+    "이번 여름에 여행 어디 가지?",
+    "서울 맛집 추천",
+    "주말에 볼 영화",
+    "개구리",
+]
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def run_clients(url, n_clients, duration, batch_size, queries, limit):
+    """n_clients개 스레드가 각자 연결을 열고 duration초 동안 검색 RPC를 반복 호출"""
+    client = VectorServiceClient(url)  # 스레드별 keep-alive 연결 사용
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(seed):
+        rng = random.Random(seed)
+        local = []
+        while time.perf_counter() < deadline:
+            batch = [rng.choice(queries) for _ in range(batch_size)]
+            start = time.perf_counter()
+            try:
+                client.search_bookmarks_batch(batch, limit=limit)
+                local.append((time.perf_counter() - start) * 1000)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    searches = len(latencies) * batch_size
+    return {
+        "clients": n_clients,
+        "rpcs": len(latencies),
+        "searches_per_s": searches / elapsed,
+        "p50_ms": percentile(latencies, 50) if latencies else 0.0,
+        "p95_ms": percentile(latencies, 95) if latencies else 0.0,
+        "errors": errors[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--clients", default="1,4,16")
+    parser.add_argument("--duration", type=float, default=10.0, help="클라이언트 수별 측정 시간(초)")
+    parser.add_argument("--batch-size", type=int, default=1, help="RPC 한 번에 보낼 검색어 수")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    # 임베딩 캐시를 미리 채워 벡터 검색 경로만 측정
+    VectorServiceClient(args.url).search_bookmarks_batch(DEFAULT_QUERIES, limit=args.limit)
+
+    print(f"batch_size={args.batch_size}, limit={args.limit}, {args.duration}s/단계")
+    print(f"{'clients':>8}{'rpcs':>8}{'search/s':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'errors':>8}")
+    for n_clients in [int(c) for c in args.clients.split(",")]:
+        r = run_clients(args.url, n_clients, args.duration, args.batch_size, DEFAULT_QUERIES, args.limit)
+        print(f"{r['clients']:>8}{r['rpcs']:>8}{r['searches_per_s']:>10.1f}"
+              f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""VectorStore 동시성 스트레스 테스트: 검색 스레드와 추가/삭제/재구축 스레드를 동시에 실행
+
+임베딩 API 대신 캡션 해시로 만든 결정적 벡터를 사용하므로 네트워크 없이 실행됩니다.
+임시 디렉토리에 DB와 인덱스를 만들고, 검색 스레드가 매 반복마다 다음을 확인합니다.
+    - id_to_index / index_to_id 가 서로의 역방향이고 모든 위치가 ntotal 미만인지 (찢어진 매핑 없음)
+    - 이미 추가가 끝난 북마크의 캡션으로 검색하면 자기 자신이 top-1인지
+
+사용법:
+    python benchmarks/stress_vector_store.py --readers 8 --writers 2 --duration 10
+"""
+import os
+import io
+import sys
+import time
+import random
+import hashlib
+import argparse
+import tempfile
+import threading
+import contextlib
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(project_root)
+
+# Azure 설정이 없으면 자리표시 값을 채움 (이 스크립트는 HashEmbeddings만 사용하므로 실제 API는 호출되지 않음)
+for key, value in [("AOAI_DEPLOY_EMBED_ADA", "stress-test"), ("AOAI_API_KEY", "stress-test"),
+                   ("AOAI_ENDPOINT", "https://localhost")]:
+    os.environ.setdefault(key, value)
+
+from db import BookmarkDatabase
+from vector_store import VectorStore
+
+
+class HashEmbeddings:
+    """캡션 해시로 시드를 정한 정규 분포 벡터 (같은 텍스트 -> 같은 벡터)"""
+
+    def __init__(self, dimension=128):
+        self.dimension = dimension
+
+    def embed_query(self, text):
+        seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:4], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dimension).astype('float32')
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+def make_bookmarks(prefix, n):
+    return [{
+        "collection_id": "stress", "feed_id": f"{prefix}{i}", "media_type": 1,
+        "caption": f"{prefix} 북마크 {i} 캡션", "media_url": "", "thumbnail_url": "", "url": "",
+        "hashtags": [], "category": None, "category_reason": None,
+    } for i in range(n)]
+
+
+def check_mappings(vector_store):
+    """매핑 일관성 검사 (검색과 같은 읽기 잠금 안에서 확인). 문제가 있으면 설명 문자열 반환"""
+    with vector_store._lock.read():
+        ntotal = vector_store.index.ntotal
+        for bookmark_id, idx in vector_store.id_to_index.items():
+            if idx >= ntotal:
+                return f"{bookmark_id}의 위치 {idx}가 ntotal {ntotal} 이상"
+            if vector_store.index_to_id.get(idx) != bookmark_id:
+                return f"id_to_index[{bookmark_id}]={idx} 이지만 index_to_id[{idx}]={vector_store.index_to_id.get(idx)}"
+        if len(vector_store.index_to_id) != len(vector_store.id_to_index):
+            return f"매핑 크기 불일치 ({len(vector_store.id_to_index)} vs {len(vector_store.index_to_id)})"
+    return None
+
+
+def run(n_readers, n_writers, duration, batch_size, initial, rebuild_every):
+    workdir = tempfile.mkdtemp(prefix="vector_store_stress_")
+    db_path = os.path.join(workdir, "bookmarks.db")
+    db = BookmarkDatabase(db_path)
+    vector_store = VectorStore(db_path, embedding_model=HashEmbeddings())
+
+    # 검증 대상(stable)은 삭제하지 않고, 삭제는 별도 풀(volatile)에서만 수행
+    # 쓰기 스레드가 sqlite 커밋이 아니라 인덱스 변경에 시간을 쓰도록 stable 북마크는 미리 DB에 저장
+    # (volatile은 벡터만 추가하므로 재구축 시 사라짐)
+    stable = make_bookmarks("stable", initial)
+    pending = make_bookmarks("pending", n_writers * 2000)
+    db.add_bookmark_batch([dict(b) for b in stable + pending])
+    vector_store.add_bookmark_batch(stable)
+
+    committed = list(b['feed_id'] for b in stable)  # 추가가 끝난 stable 북마크
+    captions = {b['feed_id']: b['caption'] for b in stable}
+    state_lock = threading.Lock()
+    stop = threading.Event()
+    failures = []
+    counters = {"searches": 0, "checks": 0, "added": 0, "deleted": 0, "rebuilds": 0}
+
+    def fail(message):
+        with state_lock:
+            failures.append(message)
+        stop.set()
+
+    def guarded(target):
+        """스레드 안 예외(매핑 순회 중 변경 등)도 실패로 기록"""
+        def run_guarded(*args):
+            try:
+                target(*args)
+            except Exception as e:
+                fail(f"{target.__name__} 예외: {type(e).__name__}: {e}")
+        return run_guarded
+
+    def reader(seed):
+        rng = random.Random(seed)
+        searches = checks = 0
+        while not stop.is_set():
+            with state_lock:
+                feed_id = rng.choice(committed)
+            results = vector_store.search_by_vector(
+                vector_store.embeddings.embed_query(captions[feed_id]), limit=5)
+            if not results or results[0][0] != feed_id:
+                fail(f"{feed_id} 검색 top-1 불일치: {results[:3]}")
+                return
+            searches += 1
+            if searches % 20 == 0:
+                problem = check_mappings(vector_store)
+                if problem:
+                    fail(problem)
+                    return
+                checks += 1
+        with state_lock:
+            counters["searches"] += searches
+            counters["checks"] += checks
+
+    def writer(writer_id):
+        rng = random.Random(1000 + writer_id)
+        rounds = 0
+        while not stop.is_set():
+            rounds += 1
+            with state_lock:
+                new_stable = [pending.pop() for _ in range(min(batch_size, len(pending)))]
+            volatile = make_bookmarks(f"w{writer_id}r{rounds}v", batch_size)
+            if not vector_store.add_bookmark_batch(new_stable + volatile):
+                fail("add_bookmark_batch 실패")
+                return
+            with state_lock:
+                for b in new_stable:
+                    captions[b['feed_id']] = b['caption']
+                committed.extend(b['feed_id'] for b in new_stable)
+                counters["added"] += len(new_stable) + len(volatile)
+
+            for b in rng.sample(volatile, k=len(volatile) // 2):
+                vector_store.delete_bookmark(b['feed_id'])
+                with state_lock:
+                    counters["deleted"] += 1
+
+            if not pending:
+                break
+
+            if writer_id == 0 and rebuild_every and rounds % rebuild_every == 0:
+                # 재구축 중에도 검색은 기존 인덱스로 계속됨 (DB 기준으로 다시 만들므로 volatile은 사라짐)
+                if not vector_store.rebuild_index():
+                    fail("rebuild_index 실패")
+                    return
+                with state_lock:
+                    counters["rebuilds"] += 1
+
+    threads = [threading.Thread(target=guarded(reader), args=(i,)) for i in range(n_readers)]
+    threads += [threading.Thread(target=guarded(writer), args=(i,)) for i in range(n_writers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    stop.wait(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    final_problem = check_mappings(vector_store)
+    if final_problem:
+        failures.append(f"종료 후 {final_problem}")
+    return counters, failures, elapsed, vector_store.index.ntotal
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--batch-size", type=int, default=20, help="쓰기 스레드가 한 번에 추가하는 북마크 수")
+    parser.add_argument("--initial", type=int, default=500, help="시작 시 인덱스에 넣을 북마크 수")
+    parser.add_argument("--rebuild-every", type=int, default=3, help="첫 쓰기 스레드가 N라운드마다 재구축 (0: 안 함)")
+    parser.add_argument("--switch-interval", type=float, default=1e-5,
+                        help="GIL 스레드 전환 간격(초). 기본값(5ms)보다 짧게 해 경합 구간을 더 자주 만듦")
+    args = parser.parse_args()
+
+    sys.setswitchinterval(args.switch_interval)
+
+    # VectorStore의 추가/삭제 로그는 숨김
+    with contextlib.redirect_stdout(io.StringIO()):
+        counters, failures, elapsed, ntotal = run(args.readers, args.writers, args.duration,
+                                                  args.batch_size, args.initial, args.rebuild_every)
+    print(f"readers={args.readers}, writers={args.writers}, {elapsed:.1f}s, 최종 벡터 {ntotal}개")
+    print(f"검색 {counters['searches']}회 ({counters['searches'] / elapsed:.0f}/s), 매핑 검사 {counters['checks']}회")
+    print(f"추가 {counters['added']}개, 삭제 {counters['deleted']}개, 재구축 {counters['rebuilds']}회")
+    if failures:
+        print(f"실패 {len(failures)}건:")
+        for message in failures[:10]:
+            print(f"  - {message}")
+        sys.exit(1)
+    print("찢어진 매핑이나 top-1 불일치 없음")
+
+
+if __name__ == "__main__":
+    main()
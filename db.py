@@ -1,10 +1,15 @@
 import sqlite3
 import os
 import logging
+import threading
 from typing import List, Dict, Optional, Any, Tuple, Optional
 import json
+import itertools
 import streamlit as st
 
+# get_version의 쓰기 순번 (프로세스 전역, 파티션을 닫았다 다시 열어 인스턴스가 바뀌어도 이전 버전과 겹치지 않도록)
+_write_sequence = itertools.count(1)
+
 class BookmarkDatabase:
     """SQLite 데이터베이스 관리 클래스"""
 
@@ -16,6 +21,10 @@ class BookmarkDatabase:
         """
         self.db_path = db_path
         self.logger = logging.getLogger("Database")
+        # get_version용: 이 인스턴스의 마지막 쓰기 순번과 PRAGMA data_version을 읽을 연결 (처음 호출할 때 생성)
+        self._write_count = next(_write_sequence)
+        self._version_conn = None
+        self._version_lock = threading.Lock()
         
         # 데이터베이스 디렉토리 확인 및 생성
         db_dir = os.path.dirname(db_path)
@@ -57,6 +66,9 @@ class BookmarkDatabase:
             # 컬럼이 이미 존재하는 경우 무시
             pass
 
+        # 의미 검색 결과/중복 확인은 feed_id로 조회하므로 인덱스 생성 (고유 제약은 기존 DB 호환을 위해 걸지 않음)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_bookmarks_feed_id ON bookmarks(feed_id)")
+
         # 카테고리 테이블 생성
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS categories (
@@ -66,6 +78,16 @@ class BookmarkDatabase:
         )
         ''')
 
+        # 중복(near-duplicate) 북마크 그룹 테이블 생성
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS duplicate_groups (
+            feed_id TEXT PRIMARY KEY,
+            canonical_id TEXT,
+            similarity REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+
         # 기본 카테고리 추가
         default_categories = ["여행", "맛집", "영화", "공연", "개구리"]
         for category in default_categories:
@@ -85,6 +107,30 @@ class BookmarkDatabase:
         """
         return sqlite3.connect(self.db_path)
     
+    def get_version(self) -> Tuple[int, int]:
+        """데이터베이스 버전을 반환합니다. (검색 결과 캐시 무효화용)
+
+        같은 연결로 읽은 PRAGMA data_version은 다른 연결(다른 프로세스 포함)이 커밋할 때마다 바뀌고,
+        쓰기 메서드가 커밋 후 새로 받는 쓰기 순번과 함께 사용하므로 크기가 같은 빠른 연속 쓰기도 놓치지 않습니다.
+
+        Returns:
+            (data_version, 쓰기 순번) 튜플
+        """
+        with self._version_lock:
+            try:
+                if self._version_conn is None:
+                    self._version_conn = sqlite3.connect(self.db_path, check_same_thread=False)
+                data_version = self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+            except sqlite3.Error as e:
+                self.logger.warning(f"data_version 조회 실패: {e}")
+                data_version = 0
+            return (data_version, self._write_count)
+
+    def _bump_version(self) -> None:
+        """쓰기 메서드에서 커밋 후 호출 (get_version의 쓰기 순번 갱신)"""
+        with self._version_lock:
+            self._write_count = next(_write_sequence)
+
     def _check_bookmark_exists(self, cursor, feed_id: str) -> Optional[int]:
         """북마크가 이미 데이터베이스에 존재하는지 확인합니다.
         
@@ -106,6 +152,57 @@ class BookmarkDatabase:
             return existing[0] # bookmark_id: int
         return None
 
+    def _categorize_bookmarks(self, bookmarks: List[dict], categorize_agent) -> None:
+        """북마크들의 category/category_reason을 채웁니다.
+
+        LLM 호출은 categorize_agent.classify_many로 동시에 수행하고,
+        Streamlit 진행 표시는 완료될 때마다 현재 스레드에서 갱신합니다.
+        """
+        if not bookmarks:
+            return
+
+        # Streamlit UI가 있는 경우 진행 상황 표시
+        progress_bar = None
+        info_container = None
+        if 'st' in globals() and hasattr(st, 'progress'):
+            # 빈 컨테이너 생성
+            info_container = st.empty()
+            info_container.info("카테고리 자동 분류 중...")
+            progress_bar = st.progress(0)
+
+        items = []
+        for bookmark in bookmarks:
+            # 해시태그가 JSON 문자열로 저장되어 있으면 다시 파싱
+            hashtags = bookmark.get('hashtags', [])
+            if isinstance(hashtags, str):
+                try:
+                    hashtags = json.loads(hashtags)
+                except:
+                    hashtags = []
+            items.append({
+                "caption": bookmark.get('caption', ''),
+                "hashtags": hashtags,
+                "feed_id": bookmark.get('feed_id'),
+            })
+
+        def on_progress(done, total, index, response):
+            # 진행상황 업데이트
+            if progress_bar:
+                progress_bar.progress(done / total)
+            if info_container:
+                info_container.info(f"카테고리 자동 분류 중... ({done}/{total}): {response.categories}")
+
+        # 항목별 오류는 classify_many 안에서 "기타"로 처리됨
+        responses = categorize_agent.classify_many(items, progress_callback=on_progress)
+        for bookmark, response in zip(bookmarks, responses):
+            bookmark['category'] = response.categories
+            bookmark['category_reason'] = response.category_reason
+
+        # 진행 완료
+        if progress_bar:
+            progress_bar.progress(100)
+            info_container.success("카테고리 분류 완료!")
+
     def add_bookmark_batch(self, bookmarks: List[dict], categorize_agent=None) -> Tuple[int, int]:
         """북마크 목록을 일괄적으로 추가하고 자동으로 카테고리를 분류합니다.
         
@@ -130,74 +227,16 @@ class BookmarkDatabase:
 
             # 1단계: 카테고리 분류 (북마크 저장 전 수행)
             if categorize_agent:
-                # Streamlit UI가 있는 경우 진행 상황 표시
-                progress_bar = None
-                if 'st' in globals() and hasattr(st, 'progress'):
-                    # 빈 컨테이너 생성
-                    info_container = st.empty()
-                    info_container.info("카테고리 자동 분류 중...")
-                    progress_bar = st.progress(0)
-                
-                total_items = len(bookmarks)
-                
-                # 각 북마크별로 카테고리 분류
-                for i, bookmark in enumerate(bookmarks):
+                targets = []
+                for bookmark in bookmarks:
                     # 기존에 저장된 feed인지 확인
                     feed_id = bookmark.get('feed_id')
                     if not feed_id:
                         self.logger.warning("feed_id가 없는 북마크는 카테고리 생성 건너뜀")
                         continue
-                    # cursor.execute("SELECT id FROM bookmarks WHERE feed_id = ?", (feed_id,))
-                    # existing = cursor.fetchone()
-                    
-                    # if not existing:
-                    bookmark_id = self._check_bookmark_exists(cursor, feed_id)
-                    if not bookmark_id:
-                        try:
-                            caption = bookmark.get('caption', '')
-                            
-                            # 해시태그가 JSON 문자열로 저장되어 있으면 다시 파싱
-                            hashtags = bookmark.get('hashtags', [])
-                            if isinstance(hashtags, str):
-                                try:
-                                    hashtags = json.loads(hashtags)
-                                except:
-                                    hashtags = []
-                            
-                            # 카테고리 분류
-                            try:
-                                response = categorize_agent.classify(
-                                    caption=caption,
-                                    hashtags=hashtags
-                                )
-                                bookmark['category'] = response.categories
-                                bookmark['category_reason'] = response.category_reason
-                                # 기존 st.info 대신 info_container 업데이트
-                                if 'st' in globals() and hasattr(st, 'info') and 'info_container' in locals():
-                                    info_container.info(f"카테고리 자동 분류 중...: {bookmark['category']}")
-                            except Exception as e:
-                                self.logger.error(f"북마크 카테고리 분류 중 오류: {str(e)}")
-                                if 'st' in globals() and hasattr(st, 'warning'):
-                                    st.warning(f"북마크 카테고리 분류 중 오류: {str(e)}")
-                                bookmark['category'] = "기타"
-                                bookmark['category_reason'] = f"카테고리 분류 중 오류 발생: {str(e)}"
-                        
-                        except Exception as e:
-                            self.logger.error(f"북마크 처리 중 오류: {str(e)}")
-                            bookmark['category'] = "기타"
-                            bookmark['category_reason'] = f"처리 중 오류: {str(e)}"
-                    
-                    # 진행상황 업데이트
-                    if progress_bar:
-                        progress_bar.progress((i + 1) / total_items)
-                
-                # 진행 완료
-                if progress_bar:
-                    progress_bar.progress(100)
-                    if 'info_container' in locals():
-                        info_container.success("카테고리 분류 완료!")
-                    else:
-                        st.success("카테고리 분류 완료!")
+                    if not self._check_bookmark_exists(cursor, feed_id):  # 새 북마크만 분류
+                        targets.append(bookmark)
+                self._categorize_bookmarks(targets, categorize_agent)
             
             # 2단계: 북마크 저장 (카테고리 포함하여 저장)
             for bookmark in bookmarks:
@@ -265,6 +304,7 @@ class BookmarkDatabase:
                 
                 # 트랜잭션 커밋
                 conn.commit()
+                self._bump_version()
             
         except Exception as e:
             if conn:
@@ -302,74 +342,16 @@ class BookmarkDatabase:
 
             # 1단계: 카테고리 분류 (북마크 저장 전 수행)
             if categorize_agent:
-                # Streamlit UI가 있는 경우 진행 상황 표시
-                progress_bar = None
-                if 'st' in globals() and hasattr(st, 'progress'):
-                    # 빈 컨테이너 생성
-                    info_container = st.empty()
-                    info_container.info("카테고리 자동 분류 중...")
-                    progress_bar = st.progress(0)
-                
-                total_items = len(bookmarks)
-                
-                # 각 북마크별로 카테고리 분류
-                for i, bookmark in enumerate(bookmarks):
+                targets = []
+                for bookmark in bookmarks:
                     # 기존에 저장된 feed인지 확인
                     feed_id = bookmark.get('feed_id')
                     if not feed_id:
                         self.logger.warning("feed_id가 없는 북마크는 카테고리 생성 건너뜀")
                         continue
-                    # cursor.execute("SELECT id FROM bookmarks WHERE feed_id = ?", (feed_id,))
-                    # existing = cursor.fetchone()
-                    
-                    # if not existing:
-                    bookmark_id = self._check_bookmark_exists(cursor, feed_id)
-                    if bookmark_id:
-                        try:
-                            caption = bookmark.get('caption', '')
-                            
-                            # 해시태그가 JSON 문자열로 저장되어 있으면 다시 파싱
-                            hashtags = bookmark.get('hashtags', [])
-                            if isinstance(hashtags, str):
-                                try:
-                                    hashtags = json.loads(hashtags)
-                                except:
-                                    hashtags = []
-                            
-                            # 카테고리 분류
-                            try:
-                                response = categorize_agent.classify(
-                                    caption=caption,
-                                    hashtags=hashtags
-                                )
-                                bookmark['category'] = response.categories
-                                bookmark['category_reason'] = response.category_reason
-                                # 기존 st.info 대신 info_container 업데이트
-                                if 'st' in globals() and hasattr(st, 'info') and 'info_container' in locals():
-                                    info_container.info(f"카테고리 자동 분류 중...: {bookmark['category']}")
-                            except Exception as e:
-                                self.logger.error(f"북마크 카테고리 분류 중 오류: {str(e)}")
-                                if 'st' in globals() and hasattr(st, 'warning'):
-                                    st.warning(f"북마크 카테고리 분류 중 오류: {str(e)}")
-                                bookmark['category'] = "기타"
-                                bookmark['category_reason'] = f"카테고리 분류 중 오류 발생: {str(e)}"
-                        
-                        except Exception as e:
-                            self.logger.error(f"북마크 처리 중 오류: {str(e)}")
-                            bookmark['category'] = "기타"
-                            bookmark['category_reason'] = f"처리 중 오류: {str(e)}"
-                    
-                    # 진행상황 업데이트
-                    if progress_bar:
-                        progress_bar.progress((i + 1) / total_items)
-                
-                # 진행 완료
-                if progress_bar:
-                    progress_bar.progress(100)
-                    if 'info_container' in locals():
-                        info_container.success("카테고리 분류 완료!")
-                    else:
-                        st.success("카테고리 분류 완료!")
+                    if self._check_bookmark_exists(cursor, feed_id):  # 저장된 북마크만 다시 분류
+                        targets.append(bookmark)
+                self._categorize_bookmarks(targets, categorize_agent)
             
             # 2단계: 북마크 저장 (카테고리 포함하여 저장)
             for bookmark in bookmarks:
@@ -429,6 +411,7 @@ class BookmarkDatabase:
                 
                 # 트랜잭션 커밋
                 conn.commit()
+                self._bump_version()
             
         except Exception as e:
             if conn:
@@ -506,6 +489,7 @@ class BookmarkDatabase:
         try:
             cursor.execute("DELETE FROM bookmarks WHERE id = ?", (bookmark_id,))
             conn.commit()
+            self._bump_version()
             
             if cursor.rowcount > 0:
                 self.logger.info(f"북마크 삭제됨: ID {bookmark_id}")
@@ -614,6 +598,7 @@ class BookmarkDatabase:
             
             category_id = cursor.lastrowid
             conn.commit()
+            self._bump_version()
             self.logger.info(f"카테고리 추가됨: {name}")
             return category_id
             
@@ -685,6 +670,155 @@ class BookmarkDatabase:
         finally:
             conn.close()
 
+    def bulk_update_categories(self, assignments: List[Tuple[str, str, str]]) -> int:
+        """여러 북마크의 카테고리를 한 트랜잭션으로 갱신합니다.
+
+        Args:
+            assignments: (feed_id, category, category_reason) 목록
+
+        Returns:
+            갱신된 북마크 수
+        """
+        if not assignments:
+            return 0
+
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.executemany(
+                "INSERT OR IGNORE INTO categories (name) VALUES (?)",
+                [(category,) for category in {a[1] for a in assignments}]
+            )
+            cursor.executemany('''
+            UPDATE bookmarks
+            SET category = ?, category_reason = ?
+            WHERE feed_id = ?
+            ''', [(category, reason, feed_id) for feed_id, category, reason in assignments])
+            # executemany의 rowcount는 모든 UPDATE가 실제로 바꾼 행 수의 합 (없는 feed_id는 0)
+            updated = cursor.rowcount
+            conn.commit()
+            self._bump_version()
+            self.logger.info(f"카테고리 일괄 갱신: {updated}개")
+            return updated
+
+        except sqlite3.Error as e:
+            conn.rollback()
+            self.logger.error(f"카테고리 일괄 갱신 실패: {e}")
+            return 0
+
+        finally:
+            conn.close()
+
+    def get_categories_by_feed_ids(self, feed_ids: List[str]) -> Dict[str, str]:
+        """여러 북마크의 카테고리를 한 번에 가져옵니다.
+
+        Args:
+            feed_ids: 피드 ID 목록
+
+        Returns:
+            {feed_id: category}
+        """
+        if not feed_ids:
+            return {}
+
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        try:
+            categories = {}
+            # SQLite 바인딩 변수 개수 제한 때문에 나눠서 조회
+            unique_ids = list(dict.fromkeys(feed_ids))
+            for start in range(0, len(unique_ids), 500):
+                chunk = unique_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                cursor.execute(f'''
+                SELECT feed_id, category
+                FROM bookmarks
+                WHERE feed_id IN ({placeholders})
+                ''', chunk)
+                categories.update(cursor.fetchall())
+            return categories
+
+        except sqlite3.Error as e:
+            self.logger.error(f"북마크 카테고리 일괄 조회 실패: {e}")
+            return {}
+
+        finally:
+            conn.close()
+
+    def get_hashtag_counts(self) -> Dict[str, int]:
+        """북마크에 달린 해시태그별 북마크 수를 가져옵니다.
+
+        Returns:
+            {해시태그: 북마크 수}
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("SELECT hashtags FROM bookmarks WHERE hashtags IS NOT NULL AND hashtags != ''")
+            counts = {}
+            for (hashtags,) in cursor.fetchall():
+                try:
+                    tags = json.loads(hashtags)
+                except json.JSONDecodeError:
+                    continue
+                for tag in set(tags or []):
+                    counts[tag] = counts.get(tag, 0) + 1
+            return counts
+
+        except sqlite3.Error as e:
+            self.logger.error(f"해시태그 집계 실패: {e}")
+            return {}
+
+        finally:
+            conn.close()
+
+    def get_bookmarks_by_feed_ids(self, feed_ids: List[str]) -> List[Dict[str, Any]]:
+        """여러 북마크를 한 번에 가져옵니다. (feed_ids 순서, 없는 feed_id는 제외)
+
+        Args:
+            feed_ids: 피드 ID 목록
+
+        Returns:
+            북마크 목록
+        """
+        if not feed_ids:
+            return []
+
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        try:
+            found = {}
+            # SQLite 바인딩 변수 개수 제한 때문에 나눠서 조회
+            unique_ids = list(dict.fromkeys(feed_ids))
+            for start in range(0, len(unique_ids), 500):
+                chunk = unique_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                cursor.execute(f"SELECT * FROM bookmarks WHERE feed_id IN ({placeholders})", chunk)
+                columns = [desc[0] for desc in cursor.description]
+                for row in cursor.fetchall():
+                    item = dict(zip(columns, row))
+
+                    # 해시태그 JSON 파싱
+                    if item.get('hashtags'):
+                        try:
+                            item['hashtags'] = json.loads(item['hashtags'])
+                        except json.JSONDecodeError:
+                            item['hashtags'] = []
+
+                    found.setdefault(item['feed_id'], item)
+            return [found[feed_id] for feed_id in unique_ids if feed_id in found]
+
+        except sqlite3.Error as e:
+            self.logger.error(f"북마크 일괄 조회 실패: {e}")
+            return []
+
+        finally:
+            conn.close()
+
     def get_bookmarks_by_category(self, category_name: str) -> List[Dict[str, Any]]:
         """특정 카테고리의 북마크 목록을 가져옵니다.
         
@@ -727,4 +861,96 @@ class BookmarkDatabase:
             return []
             
         finally:
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+    def save_duplicate_groups(self, groups: List[Dict[str, Any]], prune: bool = False) -> int:
+        """중복 북마크 그룹을 저장합니다. (feed_id별 upsert, 유사도는 저장된 값과 큰 쪽 유지)
+
+        Args:
+            groups: VectorStore.find_near_duplicates() 결과
+            prune: 전체 재계산 결과일 때만 True. 결과에 없는 북마크(삭제/더는 중복 아님)의 그룹 정보를 지움
+
+        Returns:
+            저장된 북마크 수
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        try:
+            rows = [
+                (feed_id, group['canonical'], similarity)
+                for group in groups
+                for feed_id, similarity in group['members'].items()
+            ]
+            if prune:
+                cursor.execute("CREATE TEMP TABLE keep_duplicates (feed_id TEXT PRIMARY KEY)")
+                cursor.executemany("INSERT OR IGNORE INTO keep_duplicates VALUES (?)", [(row[0],) for row in rows])
+                cursor.execute("DELETE FROM duplicate_groups WHERE feed_id NOT IN (SELECT feed_id FROM keep_duplicates)")
+            cursor.executemany('''
+            INSERT INTO duplicate_groups (feed_id, canonical_id, similarity)
+            VALUES (?, ?, ?)
+            ON CONFLICT(feed_id) DO UPDATE SET
+                canonical_id = excluded.canonical_id,
+                similarity = MAX(COALESCE(similarity, 0), excluded.similarity)
+            ''', rows)
+            conn.commit()
+            self._bump_version()
+            self.logger.info(f"중복 그룹 {len(groups)}개 저장됨 (북마크 {len(rows)}개)")
+            return len(rows)
+
+        except sqlite3.Error as e:
+            conn.rollback()
+            self.logger.error(f"중복 그룹 저장 실패: {e}")
+            return 0
+
+        finally:
+            conn.close()
+
+    def get_duplicate_map(self) -> Dict[str, str]:
+        """feed_id -> 대표 feed_id 매핑을 가져옵니다.
+
+        Returns:
+            중복 그룹에 속한 북마크의 {feed_id: canonical_id}
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("SELECT feed_id, canonical_id FROM duplicate_groups")
+            return dict(cursor.fetchall())
+
+        except sqlite3.Error as e:
+            self.logger.error(f"중복 그룹 가져오기 실패: {e}")
+            return {}
+
+        finally:
+            conn.close()
+
+    def collapse_duplicates(self, bookmarks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """같은 중복 그룹의 북마크는 가장 먼저 나온 하나만 남깁니다. (순서 유지)
+
+        Args:
+            bookmarks: 북마크 목록
+
+        Returns:
+            중복이 접힌 북마크 목록. 대표 북마크에는 접힌 개수가 'duplicate_count'로 기록됩니다.
+        """
+        duplicate_map = self.get_duplicate_map()
+        if not duplicate_map:
+            return bookmarks
+
+        collapsed = []
+        seen = {}
+        for bookmark in bookmarks:
+            feed_id = bookmark.get('feed_id')
+            if not feed_id:
+                collapsed.append(bookmark)
+                continue
+            group = duplicate_map.get(feed_id, feed_id)
+            if group in seen:
+                seen[group]['duplicate_count'] = seen[group].get('duplicate_count', 0) + 1
+                continue
+            bookmark = dict(bookmark)
+            seen[group] = bookmark
+            collapsed.append(bookmark)
+        return collapsed
@@ -0,0 +1,104 @@
+"""Instagram 계정별 DB/벡터 인덱스 파티션
+
+계정마다 data/accounts/<계정>/bookmarks.db 와 같은 디렉토리의 faiss_index/ 를 사용하므로
+검색은 자기 계정의 벡터만 대상으로 하고, 열린 파티션 수는 LRU로 제한해 사용자 수가 늘어도
+메모리 사용량이 일정하게 유지됩니다. 로그인 전(계정 없음)에는 기존 data/bookmarks.db 를 사용합니다.
+"""
+import re
+import hashlib
+import threading
+import weakref
+from pathlib import Path
+from collections import OrderedDict
+
+# Instagram 아이디는 영문 소문자/숫자/마침표/밑줄만 허용 (최대 30자)
+_ACCOUNT_PATTERN = re.compile(r"^[a-z0-9._]{1,30}$")
+
+
+def account_key(insta_id):
+    """로그인 아이디를 파티션 디렉토리 이름으로 변환합니다.
+
+    아이디 형식이 아니면(경로 문자 등) 해시로 대체해 data 디렉토리 밖으로 나가지 않도록 합니다.
+    """
+    key = str(insta_id).strip().lower()
+    if _ACCOUNT_PATTERN.match(key) and key.strip(".") == key:
+        return key
+    return "id_" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+class Partition:
+    """한 계정의 저장소 묶음 (db, vector_store, categorize_agent)"""
+
+    def __init__(self, key, db_path, db, vector_store, categorize_agent=None):
+        self.key = key
+        self.db_path = db_path
+        self.db = db
+        self.vector_store = vector_store
+        self.categorize_agent = categorize_agent
+
+    def __repr__(self):
+        return f"Partition({self.key!r}, {self.db_path})"
+
+
+class PartitionManager:
+    """계정별 파티션을 열고 최근 사용한 max_open개만 유지하는 LRU
+
+    Streamlit 세션 스레드들이 공유하므로 모든 접근은 lock으로 보호합니다.
+    LRU에서 밀려난 파티션도 아직 다른 세션이 사용 중이면(약한 참조가 살아있으면) 같은 인스턴스를
+    다시 돌려주므로, 한 계정의 인덱스 파일을 두 VectorStore가 동시에 쓰는 일은 없습니다.
+    """
+
+    # account_key()가 만들 수 없는 이름 (계정 이름과 충돌 방지)
+    DEFAULT_KEY = ":default"
+
+    def __init__(self, data_dir, open_partition, max_open=8):
+        """
+        Args:
+            data_dir: 데이터 루트 디렉토리 (기본 파티션: data_dir/bookmarks.db)
+            open_partition: (key, db_path) -> Partition 을 만드는 함수
+            max_open: 동시에 열어둘 최대 파티션 수
+        """
+        self.data_dir = Path(data_dir)
+        self.open_partition = open_partition
+        self.max_open = max_open
+        self._open = OrderedDict()
+        self._alive = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.evictions = 0
+
+    def db_path(self, insta_id=None):
+        """계정의 DB 파일 경로 (계정이 없으면 기본 DB)"""
+        if not insta_id:
+            return self.data_dir / "bookmarks.db"
+        return self.data_dir / "accounts" / account_key(insta_id) / "bookmarks.db"
+
+    def get(self, insta_id=None):
+        """계정의 파티션을 반환합니다. 열려 있지 않으면 새로 엽니다."""
+        key = account_key(insta_id) if insta_id else self.DEFAULT_KEY
+        with self._lock:
+            partition = self._open.get(key) or self._alive.get(key)
+            if partition is None:
+                db_path = self.db_path(insta_id)
+                db_path.parent.mkdir(parents=True, exist_ok=True)
+                partition = self.open_partition(key, str(db_path))
+                self._alive[key] = partition
+                self.opened += 1
+                print(f"파티션 열기: {partition}")
+            self._open[key] = partition
+            self._open.move_to_end(key)
+            while len(self._open) > self.max_open:
+                evicted_key, _ = self._open.popitem(last=False)
+                self.evictions += 1
+                print(f"파티션 닫기 (LRU): {evicted_key}")
+            return partition
+
+    def stats(self):
+        with self._lock:
+            return {
+                "open": len(self._open),
+                "alive": len(self._alive),
+                "max_open": self.max_open,
+                "opened": self.opened,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,106 @@
+"""테스트 공통 설정: 가짜 LLM/임베딩(agent/fake_llm.py)과 임시 디렉토리의 DB/인덱스를 사용합니다.
+
+실행:
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+# agent 모듈 import 전에 설정 (네트워크/Azure 인증 없이 실행, LLM 호출 기록은 남기지 않음)
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ["EMBEDDING_PROVIDER"] = "fake"
+os.environ["LLM_LEDGER_PATH"] = ""
+os.environ["FAKE_LLM_LATENCY"] = "0"
+os.environ["FAKE_LLM_FAIL_RATE"] = "0"
+
+from db import BookmarkDatabase  # noqa: E402
+from vector_store import VectorStore  # noqa: E402
+from agent.fake_llm import FakeEmbeddings  # noqa: E402
+
+# 테스트용 임베딩 차원 (가짜 임베딩은 차원과 무관하게 같은 규칙으로 만들어짐)
+DIM = 256
+
+
+def make_bookmark(feed_id, caption, hashtags=(), collection_id="test"):
+    """DB/벡터 스토어에 넣을 북마크 dict"""
+    return {
+        "collection_id": collection_id, "feed_id": str(feed_id), "media_type": 1, "caption": caption,
+        "media_url": "", "thumbnail_url": "", "url": f"https://www.instagram.com/p/{feed_id}/",
+        "hashtags": list(hashtags),
+    }
+
+
+# 카테고리별 캡션 (가짜 LLM의 키워드 규칙으로 분류되는 단어들)
+TOPICS = {
+    "여행": ["제주 여행 숙소 추천", "호텔 관광 여행 코스", "게스트하우스 여행 비행 일정"],
+    "음식": ["파스타 레시피 요리", "맛집 디저트 먹방", "요리 레시피 음식 추천"],
+    "공연": ["뮤지컬 티켓팅 후기", "콘서트 공연 일정", "연극 공연 티켓팅"],
+    "운동": ["헬스 운동 루틴", "러닝 운동 기록", "요가 필라테스 운동"],
+}
+
+
+def topic_bookmarks(per_topic=10, prefix="b"):
+    """주제별로 비슷한 캡션을 가진 북마크 목록 (주제 안에서는 단어를 공유)"""
+    bookmarks = []
+    for t, (topic, captions) in enumerate(TOPICS.items()):
+        for i in range(per_topic):
+            caption = f"{captions[i % len(captions)]} {topic} 모음 {i}"
+            bookmarks.append(make_bookmark(f"{prefix}{t}_{i}", caption, [topic]))
+    return bookmarks
+
+
+class ScaledEmbeddings(FakeEmbeddings):
+    """정규화되지 않은 벡터를 돌려주는 임베딩 (ada-002처럼 길이가 정확히 1이 아닌 실제 임베딩 흉내)"""
+
+    @staticmethod
+    def scale(text):
+        """텍스트마다 다른 벡터 길이 (0.5 ~ 2.0)"""
+        return 0.5 + (sum(map(ord, text or "")) % 16) / 10
+
+    def _embed(self, text):
+        return (np.asarray(super()._embed(text)) * self.scale(text)).tolist()
+
+
+class OffsetEmbeddings(FakeEmbeddings):
+    """공통 성분을 섞어 무관한 텍스트끼리도 코사인 유사도가 ~0.7인 임베딩 (ada-002 흉내)"""
+
+    def __init__(self, dim=DIM, shared=0.7):
+        super().__init__(dim=dim)
+        self.shared = shared
+
+    def _embed(self, text):
+        vector = np.asarray(super()._embed(text))
+        common = np.zeros(self.dim)
+        common[-1] = 1.0
+        mixed = np.sqrt(self.shared) * common + np.sqrt(1 - self.shared) * vector
+        return (mixed / np.linalg.norm(mixed)).tolist()
+
+
+@pytest.fixture
+def embeddings():
+    return FakeEmbeddings(dim=DIM)
+
+
+@pytest.fixture
+def db(tmp_path):
+    return BookmarkDatabase(str(tmp_path / "bookmarks.db"))
+
+
+@pytest.fixture
+def vector_store(db, embeddings):
+    return VectorStore(db.db_path, embedding_model=embeddings)
+
+
+@pytest.fixture
+def indexed(db, vector_store):
+    """주제별 북마크 40개를 DB와 벡터 스토어에 저장"""
+    bookmarks = topic_bookmarks()
+    db.add_bookmark_batch(bookmarks)
+    assert vector_store.add_bookmark_batch(bookmarks)
+    return bookmarks
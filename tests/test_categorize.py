@@ -0,0 +1,144 @@
+import pytest
+
+from conftest import TOPICS
+from agent.agents import CategorizeAgent
+from agent.category_cache import CategoryCache
+from agent.knn import KNNCategoryClassifier
+from agent.prompts import CategoryPrompt
+
+ITEMS = [
+    {"caption": "제주 여행 숙소", "hashtags": ["여행"]},
+    {"caption": "파스타 레시피", "hashtags": []},
+    {"caption": "뮤지컬 티켓팅 후기", "hashtags": ["공연"]},
+    {"caption": "헬스 운동 루틴", "hashtags": []},
+    {"caption": "강아지 산책", "hashtags": ["멍스타그램"]},
+    {"caption": "카페 라떼 추천", "hashtags": []},
+]
+EXPECTED = ["여행", "음식", "공연", "운동", "반려동물", "카페"]
+
+
+@pytest.fixture
+def agent():
+    agent = CategorizeAgent(max_concurrency=4)
+    agent.base_categories = list(TOPICS)
+    return agent
+
+
+@pytest.fixture
+def labeled(db, indexed):
+    """주제 북마크에 주제 이름을 카테고리로 저장"""
+    db.bulk_update_categories([(b["feed_id"], b["hashtags"][0], "") for b in indexed])
+    return indexed
+
+
+# ---- kNN 분류 (user-030) ----
+
+def test_knn_votes_with_labeled_neighbours(db, vector_store, labeled):
+    knn = KNNCategoryClassifier(db, vector_store, min_similarity=0.5)
+    calls = []
+    embed_documents = vector_store.embed_documents
+    vector_store.embed_documents = lambda texts: calls.append(len(texts)) or embed_documents(texts)
+
+    predictions = knn.predict_many([("제주 여행 숙소 추천 여행 모음 99", None),
+                                    ("요가 필라테스 운동 운동 모음 99", None),
+                                    (labeled[0]["caption"], labeled[0]["feed_id"])])
+    assert [p and p["category"] for p in predictions] == ["여행", "운동", "여행"]
+    # 새 캡션은 한 번에 임베딩, 저장된 북마크는 저장 벡터 재사용
+    assert calls == [2]
+
+
+def test_knn_abstains_without_labels(db, vector_store, indexed):
+    knn = KNNCategoryClassifier(db, vector_store, min_similarity=0.5)
+    assert knn.predict("제주 여행 숙소 추천 여행 모음 99") is None
+
+
+def test_classify_many_uses_knn_before_llm(db, vector_store, labeled, agent):
+    agent.knn_classifier = KNNCategoryClassifier(db, vector_store, min_similarity=0.5)
+    results = agent.classify_many([{"caption": "헬스 운동 루틴 운동 모음 99", "hashtags": []}] + ITEMS[4:])
+    assert [r.categories for r in results] == ["운동", "반려동물", "카페"]
+    assert agent.stats["knn"] == 1 and agent.stats["llm"] == 2
+
+
+# ---- 동시 분류 (user-035) ----
+
+def test_classify_many_keeps_input_order(agent):
+    progress = []
+    results = agent.classify_many(ITEMS, progress_callback=lambda done, total, i, r: progress.append((done, i)))
+    assert [r.categories for r in results] == EXPECTED
+    assert sorted(i for _, i in progress) == list(range(len(ITEMS)))
+    assert [done for done, _ in progress] == list(range(1, len(ITEMS) + 1))
+    # 새 카테고리는 기본 카테고리에 추가
+    assert {"반려동물", "카페"} <= set(agent.base_categories)
+
+
+def test_classify_many_isolates_errors(agent, monkeypatch):
+    invoke = CategorizeAgent._invoke_structured
+
+    def failing(self, schema, chat_messages, operation, **kwargs):
+        if "파스타" in chat_messages[1]["content"]:
+            raise ValueError("응답 형식 오류")
+        return invoke(self, schema, chat_messages, operation, **kwargs)
+
+    monkeypatch.setattr(CategorizeAgent, "_invoke_structured", failing)
+    results = agent.classify_many(ITEMS)
+    assert results[1].categories == "기타"
+    assert [r.categories for i, r in enumerate(results) if i != 1] == EXPECTED[:1] + EXPECTED[2:]
+
+
+# ---- 묶음 분류 (user-036) ----
+
+def test_packed_classification_uses_fewer_calls(agent):
+    agent.pack_size = 3
+    results = agent.classify_many(ITEMS)
+    assert [r.categories for r in results] == EXPECTED
+    assert agent.stats["llm_calls"] == 2 and agent.stats["llm"] == len(ITEMS)
+
+
+def test_make_packs_respects_token_budget(agent):
+    agent.pack_size = 10
+    agent.pack_token_budget = 1
+    # 예산이 시스템 프롬프트보다 작으면 게시물마다 한 묶음
+    assert agent._make_packs(ITEMS, [0, 1, 2]) == [[0], [1], [2]]
+
+
+def test_missing_pack_items_are_retried_individually(agent, monkeypatch):
+    agent.pack_size = 3
+    classify_pack = CategorizeAgent._classify_pack
+
+    def dropping(self, items):
+        results = classify_pack(self, items)
+        results[0] = None
+        return results
+
+    monkeypatch.setattr(CategorizeAgent, "_classify_pack", dropping)
+    results = agent.classify_many(ITEMS)
+    assert [r.categories for r in results] == EXPECTED
+    assert agent.stats["retries"] == 2
+
+
+# ---- 분류 결과 캐시 (user-037) ----
+
+def test_category_cache_skips_llm_on_rerun(tmp_path, agent):
+    agent.cache = CategoryCache(str(tmp_path / "llm_cache.db"))
+    first = agent.classify_many(ITEMS)
+    llm_calls = agent.stats["llm_calls"]
+
+    second = agent.classify_many(ITEMS)
+    assert [r.categories for r in second] == [r.categories for r in first]
+    assert agent.stats["llm_calls"] == llm_calls
+    assert agent.stats["cache"] == len(ITEMS)
+
+
+def test_category_cache_reuses_compatible_results(tmp_path):
+    cache = CategoryCache(str(tmp_path / "llm_cache.db"))
+    response = CategoryPrompt.OutputFormat(categories="여행", category_reason="제주")
+    cache.put("v1", "model", "제주  여행", ["b", "a"], ["여행", "음식"], response)
+
+    # 공백/해시태그 순서가 달라도 같은 게시물
+    assert cache.get("v1", "model", "제주 여행", ["a", "b"], ["음식", "여행"]).categories == "여행"
+    # 카테고리 목록이 늘어도 기존 카테고리가 남아 있으면 재사용
+    assert cache.get("v1", "model", "제주 여행", ["a", "b"], ["여행", "음식", "카페"]).categories == "여행"
+    assert cache.get("v1", "model", "제주 여행", ["a", "b"], ["음식"]) is None
+    assert cache.get("v2", "model", "제주 여행", ["a", "b"], ["여행", "음식"]) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["compatible_hits"], stats["misses"]) == (1, 1, 2)
@@ -0,0 +1,76 @@
+import time
+
+from conftest import make_bookmark
+from agent.agents import FilterAgent
+
+CANDIDATES = [
+    make_bookmark("0", "제주 여행 숙소"), make_bookmark("1", "파스타 레시피"),
+    make_bookmark("2", "제주 맛집 투어"), make_bookmark("3", "헬스 운동 루틴"),
+    make_bookmark("4", "부산 여행 코스"), make_bookmark("5", "뮤지컬 후기"),
+    make_bookmark("6", "여행 가방 싸기"),
+]
+RELEVANT = ["0", "4", "6"]
+
+
+# ---- 청크 단위 필터링 (user-038) ----
+
+def test_filter_in_chunks_keeps_candidate_order():
+    agent = FilterAgent(chunk_size=3)
+    state = agent.filter("여행", CANDIDATES)
+    assert state["filter_stats"]["chunks"] == 3
+    assert [b["feed_id"] for b in state["filtered_bookmarks"]] == RELEVANT
+    assert state["decisions"] == [b["feed_id"] in RELEVANT for b in CANDIDATES]
+    assert not state["filter_stats"]["degraded"]
+
+
+def test_filter_reasons_use_global_positions():
+    state = FilterAgent(chunk_size=3).filter("여행", CANDIDATES)
+    reasons = state["filter_reasons"]
+    assert [int(r.split(" / ")[0]) for r in reasons] == list(range(len(CANDIDATES)))
+    assert reasons[4].startswith("4 / O") and reasons[3].startswith("3 / X")
+    assert state["reasons"] == reasons
+
+
+def test_filter_stream_yields_progress():
+    # 같은 state dict를 갱신하며 yield하므로 yield 시점의 값을 기록
+    progress = [(state["done"], state["decisions"].count(None))
+                for state in FilterAgent(chunk_size=2, max_concurrency=1).filter_stream("여행", CANDIDATES)]
+    # 중간 상태는 끝난 청크(2개씩)만큼 판단이 채워짐 (여러 청크가 함께 끝나면 한 번에 반영)
+    assert progress[-1] == (True, 0)
+    assert progress[:-1] and all(not done and remaining in (5, 3, 1) for done, remaining in progress[:-1])
+
+
+def test_failed_chunk_keeps_its_candidates(monkeypatch):
+    filter_chunk = FilterAgent._filter_chunk
+
+    def failing(self, query, bookmarks):
+        if bookmarks[0]["feed_id"] == "3":
+            raise RuntimeError("503")
+        return filter_chunk(self, query, bookmarks)
+
+    monkeypatch.setattr(FilterAgent, "_filter_chunk", failing)
+    state = FilterAgent(chunk_size=3).filter("여행", CANDIDATES)
+    assert [b["feed_id"] for b in state["filtered_bookmarks"]] == ["0", "3", "4", "5", "6"]
+    assert state["filter_stats"]["failed"] == 1 and state["filter_stats"]["degraded"]
+
+
+def test_deadline_keeps_unfinished_chunks(monkeypatch):
+    filter_chunk = FilterAgent._filter_chunk
+
+    def slow(self, query, bookmarks):
+        if bookmarks[0]["feed_id"] == "6":
+            time.sleep(0.5)
+        return filter_chunk(self, query, bookmarks)
+
+    monkeypatch.setattr(FilterAgent, "_filter_chunk", slow)
+    started = time.monotonic()
+    state = FilterAgent(chunk_size=3, deadline=0.2).filter("여행", CANDIDATES)
+    assert time.monotonic() - started < 0.45
+    assert [b["feed_id"] for b in state["filtered_bookmarks"]] == RELEVANT
+    assert state["decisions"][6] is None
+    assert state["filter_stats"]["timed_out"] == 1 and state["filter_stats"]["degraded"]
+
+
+def test_make_chunks_respects_token_budget():
+    agent = FilterAgent(chunk_size=10, chunk_token_budget=1)
+    assert agent._make_chunks("여행", CANDIDATES[:3]) == [[0], [1], [2]]
@@ -0,0 +1,197 @@
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pytest
+
+from conftest import project_root
+from agent import agents
+from agent.agents import LLMAgent, LLMUnavailableError, is_rate_limit_error, is_retryable_error
+from agent.fake_llm import FakeChatModel, FakeEmbeddings, FakeLLMError, FakeTimeoutError
+from agent.ledger import LLMLedger, get_ledger
+from agent.llm import get_llm, structured_llm
+from agent.prompts import CategoryPrompt
+from utils.concurrency import CircuitBreaker
+
+MESSAGES = [{"role": "system", "content": "분류"}, {"role": "user", "content": "게시물 설명: 제주 여행\n해시태그: \n"}]
+
+
+class APIError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = type("Response", (), {"headers": headers or {}})()
+
+
+class ScriptedLLM:
+    """응답/오류를 순서대로 돌려주는 LLM (오류는 raise)"""
+    deployment_name = "scripted"
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def with_structured_output(self, schema, include_raw=False, **kwargs):
+        return self
+
+    def invoke(self, chat_messages):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return {"raw": None, "parsed": outcome, "parsing_error": None}
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=60)
+    monkeypatch.setattr(agents, "llm_circuit_breaker", breaker)
+    monkeypatch.setattr(agents, "LLM_RETRY_BASE", 0.001)
+    monkeypatch.setattr(agents, "LLM_RETRY_MAX", 0.01)
+    return breaker
+
+
+def make_agent(*outcomes):
+    agent = LLMAgent()
+    agent.llm = ScriptedLLM(*outcomes)
+    return agent
+
+
+OK = CategoryPrompt.OutputFormat(categories="여행", category_reason="")
+
+
+# ---- 지연 생성 클라이언트 (user-043) ----
+
+def test_agent_import_does_not_load_openai_client():
+    code = "import sys, agent.agents, agent.search; print('langchain_openai' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=project_root, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "False"
+
+
+def test_clients_and_structured_runnables_are_shared():
+    assert get_llm() is get_llm()
+    assert isinstance(get_llm(), FakeChatModel)
+    assert structured_llm(CategoryPrompt.OutputFormat) is structured_llm(CategoryPrompt.OutputFormat)
+    other = FakeChatModel()
+    assert structured_llm(CategoryPrompt.OutputFormat, other) is not structured_llm(CategoryPrompt.OutputFormat)
+
+
+# ---- LLM 호출 기록 (user-044) ----
+
+def test_ledger_summary_and_traces(tmp_path):
+    ledger = LLMLedger(str(tmp_path / "ledger.db"))
+    ledger.record("filter", "filter", trace_id="t1", latency=0.1, prompt_tokens=100, completion_tokens=10)
+    ledger.record("filter", "filter", trace_id="t1", latency=0.3, prompt_tokens=100, ok=False, error="503")
+    ledger.record("filter", "cache", trace_id="t1", items=5, cache_hits=5)
+
+    summary = {(row["agent"], row["operation"]): row for row in ledger.summary()}
+    assert summary[("filter", "filter")]["calls"] == 2 and summary[("filter", "filter")]["errors"] == 1
+    assert summary[("filter", "cache")]["calls"] == 0 and summary[("filter", "cache")]["cache_hits"] == 5
+    trace = ledger.per_trace("filter")
+    assert trace["traces"] == 1 and trace["calls_mean"] == 2 and trace["tokens_mean"] == 210
+
+
+def test_agent_calls_are_recorded(tmp_path, monkeypatch, breaker):
+    path = str(tmp_path / "ledger.db")
+    monkeypatch.setenv("LLM_LEDGER_PATH", path)
+    agent = make_agent(APIError(503), OK)
+    agent.trace_id = "trace"
+    assert agent._invoke_structured(CategoryPrompt.OutputFormat, MESSAGES, "classify") == OK
+
+    rows = get_ledger(path)._rows("SELECT operation, ok, retries, model, trace_id FROM llm_calls ORDER BY id", ())
+    assert rows == [("classify", 0, 0, "scripted", "trace"), ("classify", 1, 1, "scripted", "trace")]
+    assert get_ledger("") is None
+
+
+# ---- 가짜 LLM/임베딩 (user-045) ----
+
+def test_fake_embeddings_are_deterministic_and_normalized():
+    embeddings = FakeEmbeddings(dim=64)
+    first, second = embeddings.embed_documents(["제주 여행", "제주 여행"])
+    assert first == second == embeddings.embed_query("제주 여행")
+    assert np.isclose(np.linalg.norm(first), 1.0)
+    assert embeddings.embed_query("제주 여행") != embeddings.embed_query("파스타")
+
+
+def test_fake_llm_failures_are_reproducible():
+    def failures(seed):
+        model = FakeChatModel(fail_rate=0.5, seed=seed)
+        runnable = model.with_structured_output(CategoryPrompt.OutputFormat, include_raw=True)
+        outcomes = []
+        for _ in range(20):
+            try:
+                runnable.invoke(MESSAGES)
+                outcomes.append(True)
+            except FakeLLMError:
+                outcomes.append(False)
+        return outcomes
+
+    assert failures(1) == failures(1)
+    assert True in failures(1) and False in failures(1)
+
+
+# ---- 재시도/circuit breaker (user-046) ----
+
+def test_error_classification():
+    assert is_retryable_error(APIError(503)) and is_retryable_error(TimeoutError())
+    assert is_retryable_error(APIError(429)) and is_rate_limit_error(APIError(429))
+    assert not is_retryable_error(APIError(400)) and not is_rate_limit_error(APIError(503))
+
+
+def test_retries_transient_errors(breaker):
+    agent = make_agent(APIError(503), APIError(502), OK)
+    assert agent._invoke_structured(CategoryPrompt.OutputFormat, MESSAGES, "classify") == OK
+    assert agent.llm.calls == 3
+    assert breaker.stats()["failures"] == 0 and breaker.state == CircuitBreaker.CLOSED
+
+
+def test_client_errors_are_not_retried(breaker):
+    agent = make_agent(APIError(400), OK)
+    with pytest.raises(APIError):
+        agent._invoke_structured(CategoryPrompt.OutputFormat, MESSAGES, "classify")
+    assert agent.llm.calls == 1 and breaker.stats()["failures"] == 0
+
+
+def test_rate_limits_do_not_open_breaker(breaker):
+    agent = make_agent(APIError(429), APIError(429), APIError(429), OK)
+    assert agent._invoke_structured(CategoryPrompt.OutputFormat, MESSAGES, "classify") == OK
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_opens_after_failures(breaker):
+    agent = make_agent(*[APIError(503)] * 4)
+    with pytest.raises(LLMUnavailableError):
+        agent._invoke_structured(CategoryPrompt.OutputFormat, MESSAGES, "classify")
+    assert agent.llm.calls == 3 and breaker.is_open
+    agent = make_agent(OK)
+    with pytest.raises(LLMUnavailableError):
+        agent._invoke_structured(CategoryPrompt.OutputFormat, MESSAGES, "classify")
+    assert agent.llm.calls == 0
+
+
+def test_retry_after_beyond_deadline_gives_up(breaker, monkeypatch):
+    monkeypatch.setattr(agents, "LLM_RETRY_MAX", 10)
+    agent = make_agent(APIError(429, {"retry-after": "5"}), OK)
+    started = time.monotonic()
+    with pytest.raises(APIError):
+        agent._invoke_structured(CategoryPrompt.OutputFormat, MESSAGES, "classify", deadline=1.0)
+    assert time.monotonic() - started < 0.5 and agent.llm.calls == 1
+
+
+def test_attempt_timeout_is_capped_by_deadline(breaker, monkeypatch):
+    monkeypatch.setattr(agents, "LLM_MIN_ATTEMPT_SECONDS", 0.5)
+    agent = LLMAgent()
+    agent.llm = FakeChatModel(latency=1.5)
+    started = time.monotonic()
+    with pytest.raises(FakeTimeoutError):
+        agent._invoke_structured(CategoryPrompt.OutputFormat, MESSAGES, "classify", deadline=1.8)
+    # 남은 시간으로 줄인 1초, 0.7초 시도가 모두 시간 초과되고 최소 시도 시간(0.5초)이 남지 않아 포기
+    assert time.monotonic() - started < 1.85 and agent.llm.calls == 2
+
+
+
+def test_attempt_timeout_rounds_down_remaining_time():
+    assert agents.attempt_timeout(agents.LLM_TIMEOUT + 5) is None
+    assert agents.attempt_timeout(2.7) == 2.0
+    assert agents.attempt_timeout(0.27) == 0.2 and agents.attempt_timeout(0.01) == 0.1
@@ -0,0 +1,66 @@
+import gc
+
+from partitions import Partition, PartitionManager, account_key
+from utils.cache import LRUCache, SharedInstances, normalize_query
+
+
+class Instance:
+    """약한 참조가 가능한 인스턴스"""
+
+
+def open_partition(key, db_path):
+    return Partition(key, db_path, db=None, vector_store=None)
+
+
+# ---- 계정별 파티션 (user-034) ----
+
+def test_account_key_blocks_path_escape():
+    assert account_key("Some.User_1") == "some.user_1"
+    for insta_id in ("../etc", "a/b", ".hidden", "x" * 31):
+        key = account_key(insta_id)
+        assert key.startswith("id_") and "/" not in key
+
+
+def test_partition_manager_evicts_lru(tmp_path):
+    manager = PartitionManager(tmp_path, open_partition, max_open=2)
+    default = manager.get()
+    assert default.db_path == str(tmp_path / "bookmarks.db")
+
+    alice = manager.get("alice")
+    assert alice.db_path == str(tmp_path / "accounts" / "alice" / "bookmarks.db")
+    assert manager.get("alice") is alice
+
+    manager.get("bob")
+    assert manager.stats()["open"] == 2 and manager.evictions == 1
+    # 밀려났어도 아직 사용 중이면 같은 인스턴스
+    assert manager.get() is default
+    assert manager.opened == 3
+
+
+def test_partition_manager_reopens_released_partition(tmp_path):
+    manager = PartitionManager(tmp_path, open_partition, max_open=1)
+    manager.get("alice")
+    manager.get("bob")
+    gc.collect()
+    manager.get("alice")
+    assert manager.opened == 3
+
+
+def test_shared_instances_reuse_live_instances():
+    created = []
+    shared = SharedInstances(lambda key: created.append(key) or Instance(), maxsize=1)
+    first = shared.get("a")
+    assert shared.get("a") is first
+    shared.get("b")
+    assert shared.get("a") is first and created == ["a", "b"]
+
+
+def test_lru_cache_and_query_normalization():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert "b" not in cache and cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+    assert normalize_query("  Jeju   Travel ") == normalize_query("jeju travel")
@@ -0,0 +1,63 @@
+import pytest
+
+from agent import prompts
+from agent.prompts import (compact_caption, compact_hashtags, count_tokens, estimate_tokens, fit_items,
+                           truncate_tokens)
+
+
+@pytest.fixture
+def approximate(monkeypatch):
+    """tiktoken 없이 근사치로 토큰을 셈"""
+    monkeypatch.setattr(prompts, "_encoding", False)
+
+
+# ---- 프롬프트 압축 (user-042) ----
+
+def test_compact_caption_strips_noise():
+    caption = "제주 여행 🌊🌊🌊 최고!!!!!!\n━━━━━━\n\n   숙소   추천 #제주 #여행"
+    assert compact_caption(caption) == "제주 여행 🌊 최고!!!\n숙소 추천"
+
+
+def test_compact_caption_keeps_hashtag_only_caption():
+    assert compact_caption("#제주 #여행") == "#제주 #여행"
+    assert compact_caption(None) == ""
+
+
+def test_truncate_tokens_respects_budget(approximate):
+    text = "첫 문장입니다. " * 50
+    truncated = truncate_tokens(text, 30)
+    assert truncated.endswith("…") and count_tokens(truncated) <= 30
+    assert truncate_tokens("짧은 글", 30) == "짧은 글"
+
+
+def test_compact_hashtags_dedupes_and_limits():
+    assert compact_hashtags(["#Jeju", "jeju", "여행", "", "#여행"]) == ["Jeju", "여행"]
+    assert compact_hashtags("#a #b #c", max_hashtags=2) == ["a", "b"]
+
+
+def test_fit_items_shrinks_or_drops(approximate):
+    items = ["여행 " * 40, "음식 " * 40, "운동 " * 40]
+    shrunk = fit_items(items, total_tokens=60, min_item_tokens=10)
+    assert len(shrunk) == 3 and all(count_tokens(item) <= 20 for item in shrunk)
+    dropped = fit_items(items, total_tokens=count_tokens(items[0]) + 1, drop=True)
+    assert dropped == items[:1]
+    assert fit_items(items[:1], total_tokens=1000) == items[:1]
+
+
+def test_count_tokens_falls_back_to_estimate(approximate):
+    assert count_tokens("hello world") == estimate_tokens("hello world")
+    assert count_tokens("") == 0
+
+
+def test_encoding_failure_is_logged_once(monkeypatch, caplog):
+    class Offline:
+        @staticmethod
+        def get_encoding(name):
+            raise OSError("offline")
+
+    monkeypatch.setattr(prompts, "tiktoken", Offline)
+    monkeypatch.setattr(prompts, "_encoding", None)
+    with caplog.at_level("WARNING", logger="Prompts"):
+        assert count_tokens("hello world") == estimate_tokens("hello world")
+        count_tokens("hello again")
+    assert [r.levelname for r in caplog.records] == ["WARNING"] and "offline" in caplog.text
@@ -0,0 +1,171 @@
+import json
+import time
+
+import numpy as np
+import pytest
+
+from conftest import make_bookmark
+from agent.agents import HashtagAgent
+from agent.hashtag_index import DEFAULT_HASHTAG, HashtagResolver
+from agent.recommend_rank import EmbeddingCache, RecommendRanker, embedding_model_name, mmr
+from agent.taste_profile import TasteProfile
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(str(tmp_path / "llm_cache.db"))
+
+
+def feeds(*captions, prefix="t"):
+    return [make_bookmark(f"{prefix}{i}", caption) for i, caption in enumerate(captions)]
+
+
+# ---- 추천 후보 순위화 (user-047) ----
+
+def test_mmr_prefers_diverse_candidates():
+    vectors = np.array([[1, 0], [1, 0], [0, 1]], dtype=np.float32)
+    relevance = np.array([0.9, 0.89, 0.5], dtype=np.float32)
+    assert mmr(vectors, relevance, k=2, mmr_lambda=1.0) == [0, 1]
+    assert mmr(vectors, relevance, k=2, mmr_lambda=0.5) == [0, 2]
+    assert mmr(vectors, relevance, k=0) == []
+
+
+def test_rank_excludes_bookmarks_and_limits_candidates(vector_store, indexed, cache):
+    ranker = RecommendRanker(vector_store, cache=cache, top_k=2)
+    candidates = [dict(indexed[0])] + feeds("부산 여행 코스", "파스타 맛집", "여행 가방 싸기")
+    ranked, stats = ranker.rank("여행", [], candidates)
+    assert stats["bookmarked"] == 1 and stats["selected"] == 2
+    assert {f["feed_id"] for f in ranked} == {"t0", "t2"}
+
+
+def test_rank_reuses_cached_embeddings(vector_store, cache):
+    ranker = RecommendRanker(vector_store, cache=cache)
+    candidates = feeds("부산 여행 코스", "파스타 맛집", "헬스 루틴")
+    assert ranker.rank("여행", [], candidates)[1]["embedded"] == 3
+    assert ranker.rank("음식", [], candidates)[1]["embedded"] == 0
+
+
+def test_rank_puts_feeds_without_text_last(vector_store, cache):
+    ranker = RecommendRanker(vector_store, cache=cache)
+    candidates = feeds("", "부산 여행 코스", "파스타 맛집")
+    ranked, stats = ranker.rank("여행", [], candidates)
+    assert stats["embedded"] == 2
+    assert ranked[0]["feed_id"] == "t1" and ranked[-1]["feed_id"] == "t0"
+
+
+# ---- 취향 프로필 (user-048) ----
+
+def test_taste_profile_add_remove_and_persist(tmp_path):
+    path = tmp_path / "taste_profile.npz"
+    profile = TasteProfile(path)
+    now = time.time()
+    assert profile.add("a", [1.0, 0.0], now, "여행")
+    assert profile.add("b", [0.0, 1.0], now - 365 * 86400, "음식")
+    assert not profile.add("a", [1.0, 0.0], now)
+    # 최근 북마크 쪽으로 기움
+    centroid = profile.centroid()
+    assert centroid[0] > centroid[1]
+    assert profile.top_categories()[0][0] == "여행"
+
+    profile.save()
+    loaded = TasteProfile(path)
+    assert len(loaded) == 2 and np.allclose(loaded.centroid(), centroid)
+
+    assert loaded.remove("a", [1.0, 0.0])
+    assert np.allclose(loaded.centroid(), [0.0, 1.0])
+    assert loaded.remove("b", [0.0, 1.0]) and loaded.centroid() is None
+
+
+def test_taste_profile_syncs_with_store(tmp_path, db, vector_store, indexed):
+    profile = TasteProfile(tmp_path / "taste_profile.npz")
+    assert profile.rebuild(db, vector_store) == len(indexed)
+
+    new = make_bookmark("new", "새로 저장한 여행 북마크", ["여행"])
+    db.add_bookmark_batch([new])
+    vector_store.add_bookmark_batch([new])
+    assert profile.sync_added(db, vector_store, ["new", indexed[0]["feed_id"]]) == 1
+    assert profile.sync_removed(vector_store, "new") and "new" not in profile
+
+    db.bulk_update_categories([(indexed[0]["feed_id"], "여행", "")])
+    assert profile.sync_categories(db, vector_store) == 1
+    assert profile.centroid("여행") is not None
+
+
+
+def test_empty_taste_profile_is_built_once(tmp_path, db, vector_store):
+    path = tmp_path / "taste_profile.npz"
+    profile = TasteProfile(path)
+    assert profile.is_stale(vector_store)
+    assert profile.rebuild(db, vector_store) == 0 and len(profile) == 0
+    assert not profile.is_stale(vector_store)
+    # 북마크가 없어도 저장되어 다시 불러오면 만들지 않음
+    assert not TasteProfile(path).is_stale(vector_store)
+
+
+def test_taste_profile_is_stale_after_dimension_change(tmp_path, db, vector_store, indexed):
+    profile = TasteProfile(tmp_path / "taste_profile.npz")
+    profile.rebuild(db, vector_store)
+    assert not profile.is_stale(vector_store)
+    assert vector_store.enable_reduction("truncate", target_dim=64)
+    assert profile.is_stale(vector_store)
+
+# ---- 해시태그 선택 (user-049) ----
+
+@pytest.fixture
+def trend_dir(tmp_path):
+    directory = tmp_path / "trends"
+    directory.mkdir()
+    for name, hashtags in {"여행스타그램": ["여행", "제주"], "먹스타그램": ["맛집"]}.items():
+        (directory / f"{name}.json").write_text(
+            json.dumps([{"feed_id": f"{name}{i}", "hashtags": hashtags} for i in range(3)], ensure_ascii=False),
+            encoding="utf-8")
+    # 게시물 목록이 아닌 JSON은 무시
+    (directory / "filter_gate.json").write_text('{"lower": 0.1}', encoding="utf-8")
+    return directory
+
+
+def resolver(db, vector_store, cache, trend_dir, **kwargs):
+    return HashtagResolver(db, vector_store, cache, trend_dir=str(trend_dir), **kwargs)
+
+
+def test_resolve_lexical_and_embedding(db, vector_store, cache, trend_dir):
+    hashtags = resolver(db, vector_store, cache, trend_dir, min_similarity=0.3)
+    assert hashtags.resolve("이번 주말 #먹스타그램 어디")["method"] == "lexical"
+
+    result = hashtags.resolve("여행스타그 추천")
+    assert (result["hashtag"], result["method"], result["llm"]) == ("여행스타그램", "embedding", False)
+    assert "filter_gate" not in hashtags.index().available
+
+
+def test_resolve_falls_back_to_llm_or_default(db, vector_store, cache, trend_dir):
+    result = resolver(db, vector_store, cache, trend_dir, min_similarity=0.99,
+                      agent=HashtagAgent()).resolve("여행스타그 추천")
+    assert (result["hashtag"], result["method"], result["llm"]) == ("여행스타그램", "llm", True)
+
+    result = resolver(db, vector_store, cache, trend_dir, min_similarity=0.99).resolve("여행스타그 추천")
+    assert (result["hashtag"], result["method"]) == (DEFAULT_HASHTAG, "default")
+
+
+def test_hashtag_index_is_cached_until_dumps_change(db, vector_store, cache, trend_dir):
+    hashtags = resolver(db, vector_store, cache, trend_dir)
+    index = hashtags.index()
+    assert hashtags.index() is index
+    (trend_dir / "운동.json").write_text(json.dumps([{"feed_id": "x", "hashtags": []}]), encoding="utf-8")
+    assert hashtags.index() is not index and "운동" in hashtags.index().available
+
+
+def test_hashtag_index_embeds_only_trend_hashtags(db, vector_store, cache, trend_dir):
+    db.add_bookmark_batch([make_bookmark(f"m{i}", "맛집 투어", [f"기타태그{i}", "먹스타그램"]) for i in range(5)])
+    hashtags = resolver(db, vector_store, cache, trend_dir)
+    index = hashtags.index()
+    assert sorted(index.tags) == ["먹스타그램", "여행스타그램"]
+    assert cache.get_many(embedding_model_name(vector_store.embeddings), ["기타태그0"]) == [None]
+
+    # DB에 쓰면 빈도 보너스만 다시 계산하고 인덱스(임베딩)는 그대로 사용
+    bonus = hashtags.frequency_bonus(index)
+    assert bonus[index.tags.index("먹스타그램")] > index.bonus[index.tags.index("먹스타그램")]
+    assert bonus[index.tags.index("여행스타그램")] == index.bonus[index.tags.index("여행스타그램")]
+    db.add_bookmark_batch([make_bookmark("t0", "여행", ["여행스타그램"])])
+    assert hashtags.index() is index
+    bonus = hashtags.frequency_bonus(index)
+    assert bonus[index.tags.index("여행스타그램")] > index.bonus[index.tags.index("여행스타그램")]
@@ -0,0 +1,35 @@
+import pytest
+
+from agent.retrieval import HybridRetriever, reciprocal_rank_fusion, weighted_score_fusion
+
+
+# ---- 순위 융합 (user-027) ----
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion({"keyword": ["a", "b"], "semantic": ["b", "c"]},
+                                   {"keyword": 1.0, "semantic": 1.0}, k=60)
+    assert max(fused, key=fused.get) == "b"
+    assert fused["a"] == 1 / 61 and fused["c"] == 1 / 62
+
+
+def test_weighted_score_fusion_normalizes_each_source():
+    fused = weighted_score_fusion({"keyword": {"a": 10.0, "b": 0.0}, "semantic": {"a": 0.2, "b": 0.9}},
+                                  {"keyword": 1.0, "semantic": 2.0})
+    assert fused == {"a": 1.0, "b": 2.0}
+
+
+def test_retrieve_dedupes_by_feed_id_and_records_scores(db, vector_store, indexed):
+    timings = {}
+    results = HybridRetriever(db, vector_store).retrieve("여행", limit=10, timings=timings)
+    feed_ids = [b["feed_id"] for b in results]
+    assert len(feed_ids) == len(set(feed_ids))
+    assert results and all(b["feed_id"].startswith("b0_") for b in results[:3])
+    assert set(results[0]["scores"]) == {"keyword", "semantic", "fused"}
+    assert "similarity" not in results[0] and "keyword_score" not in results[0]
+    # 단계별 소요시간 (user-050)
+    assert set(timings) >= {"keyword", "semantic", "retrieve", "fusion"}
+
+
+def test_unknown_fusion_is_rejected(db, vector_store):
+    with pytest.raises(ValueError):
+        HybridRetriever(db, vector_store, fusion="max")
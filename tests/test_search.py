@@ -0,0 +1,144 @@
+import os
+
+import pytest
+
+from conftest import make_bookmark
+from db import BookmarkDatabase
+from agent import agents
+from agent import search as search_module
+from agent.agents import FilterAgent
+from agent.gating import ScoreGate
+from agent.search import Search
+
+
+@pytest.fixture(autouse=True)
+def clear_result_cache():
+    search_module._result_cache.clear()
+    yield
+    search_module._result_cache.clear()
+
+
+@pytest.fixture
+def filter_calls(monkeypatch):
+    """FilterAgent.filter_stream에 넘어간 후보 수 목록"""
+    calls = []
+    filter_stream = FilterAgent.filter_stream
+
+    def counting(self, query, bookmarks):
+        calls.append(len(bookmarks))
+        return filter_stream(self, query, bookmarks)
+
+    monkeypatch.setattr(FilterAgent, "filter_stream", counting)
+    return calls
+
+
+# ---- 검색 결과 캐시 (user-028) ----
+
+def test_result_cache_hits_until_data_changes(db, vector_store, indexed):
+    search = Search(db, vector_store, gate=ScoreGate())
+    first = search.hybrid_search("여행")
+    assert "cache_hit" not in search.timings
+
+    assert search.hybrid_search("  여행 ") == first
+    assert search.timings["cache_hit"] == "hybrid"
+
+    new = make_bookmark("new", "여행 새 북마크", ["여행"])
+    db.add_bookmark_batch([new])
+    vector_store.add_bookmark_batch([new])
+    search.hybrid_search("여행")
+    assert "cache_hit" not in search.timings
+
+
+
+def test_db_version_changes_on_same_size_writes(db, indexed):
+    feed_id = indexed[0]["feed_id"]
+    db.bulk_update_categories([(feed_id, "여행", "a")])
+    version = db.get_version()
+    stat = os.stat(db.db_path)
+    # 같은 길이의 값으로 바로 이어서 바꿈 (수정 시각 해상도가 낮은 파일 시스템처럼 mtime도 되돌림)
+    db.bulk_update_categories([(feed_id, "여행", "b")])
+    os.utime(db.db_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert os.stat(db.db_path).st_size == stat.st_size
+    assert db.get_version() != version
+
+
+def test_db_version_detects_other_connections(db, indexed):
+    version = db.get_version()
+    other = BookmarkDatabase(db.db_path)
+    other.bulk_update_categories([(indexed[0]["feed_id"], "음식", "")])
+    assert db.get_version() != version
+    # 같은 파일을 다시 연 인스턴스의 버전은 이전 인스턴스의 버전과 겹치지 않음
+    assert BookmarkDatabase(db.db_path).get_version() not in (version, db.get_version(), other.get_version())
+
+
+# ---- 점수 게이트 (user-039) ----
+
+def test_gate_decides_without_llm(db, vector_store, indexed, filter_calls):
+    # 모든 후보가 upper 이상 -> 바로 채택
+    search = Search(db, vector_store, gate=ScoreGate(lower=-2.0, upper=-1.0))
+    bookmarks = search.hybrid_search("여행")
+    search_module._result_cache.clear()
+
+    semantic = [b for b in bookmarks if b["scores"]["semantic"] is not None]
+    assert semantic
+    result = search.total_search("여행")
+    assert [b["feed_id"] for b in semantic] == [b["feed_id"] for b in result if b["scores"]["semantic"] is not None]
+    # 의미 점수가 없는 (키워드로만 찾은) 후보만 LLM으로
+    assert filter_calls in ([], [len(bookmarks) - len(semantic)])
+
+
+def test_filter_agent_is_not_created_when_gate_decides_all(db, vector_store, indexed, monkeypatch):
+    class AcceptAll(ScoreGate):
+        def split(self, bookmarks):
+            return [True] * len(bookmarks), []
+
+    created = []
+    monkeypatch.setattr(search_module, "FilterAgent", lambda: created.append(1) or FilterAgent())
+    result = Search(db, vector_store, gate=AcceptAll()).total_search("여행")
+    assert result and created == []
+
+
+def test_filter_cache_hits_do_not_create_llm_client(db, vector_store, indexed, monkeypatch):
+    search = Search(db, vector_store, gate=ScoreGate())
+    first = search.total_search("제주 여행")
+    search_module._result_cache.clear()
+
+    def no_client():
+        raise AssertionError("LLM 클라이언트를 만들면 안 됨")
+
+    monkeypatch.setattr(agents, "get_llm", no_client)
+    assert search.total_search("제주 여행") == first
+    assert not search.degraded
+
+def test_gate_split_uses_semantic_score():
+    gate = ScoreGate(lower=0.3, upper=0.8)
+    bookmarks = [{"scores": {"semantic": 0.9}}, {"scores": {"semantic": 0.1}},
+                 {"scores": {"semantic": 0.5}}, {"scores": {"semantic": None}}]
+    decisions, to_llm = gate.split(bookmarks)
+    assert decisions == [True, False, None, None]
+    assert to_llm == [2, 3]
+
+
+# ---- 단계별 결과 (user-040) ----
+
+def test_total_search_stream_stages_and_cache(db, vector_store, indexed):
+    search = Search(db, vector_store, gate=ScoreGate())
+    stages = [stage for stage, _, _ in search.total_search_stream("제주 여행")]
+    assert stages[0] == "retrieved" and stages[-1] == "final"
+    final = [result for stage, result, _ in search.total_search_stream("제주 여행")]
+    assert len(final) == 1 and search.timings["cache_hit"] == "total"
+    assert final[0] == search.total_search("제주 여행")
+
+
+# ---- 필터링 판단 캐시 (user-041) ----
+
+def test_filter_cache_skips_llm_on_repeat(db, vector_store, indexed, filter_calls):
+    search = Search(db, vector_store, gate=ScoreGate())
+    first = search.total_search("제주 여행")
+    assert filter_calls and search.filter_cache.stats()["writes"] > 0
+
+    search_module._result_cache.clear()
+    filter_calls.clear()
+    assert search.total_search("제주 여행") == first
+    assert filter_calls == []
+    assert search.filter_cache.stats()["hits"] > 0
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from conftest import OffsetEmbeddings, topic_bookmarks
+from agent.agents import CategorizeAgent
+from agent.taxonomy import (TAXONOMY_MIN_SIMILARITY, Taxonomy, TaxonomyBuilder, TaxonomyClassifier,
+                            calibrate_min_similarity, taxonomy_path)
+from vector_store import VectorStore
+
+
+def build(db, vector_store, **kwargs):
+    builder = TaxonomyBuilder(db, vector_store, min_similarity=0.5, **kwargs)
+    return builder, builder.run(n_clusters=4, apply=True, force=True)
+
+
+# ---- 클러스터 라벨 분류 (user-031) ----
+
+def test_run_labels_clusters_and_saves_centroids(db, vector_store, indexed):
+    builder, report = build(db, vector_store)
+    assert report["reclustered"] and report["clusters"] == 4
+    assert report["llm_calls_per_cluster"] == 4 < report["llm_calls_per_item"]
+    assert report["updated"] == len(indexed)
+
+    taxonomy = Taxonomy.load(taxonomy_path(db.db_path))
+    assert sorted(taxonomy.categories) == ["공연", "여행", "운동", "음식"]
+    assert taxonomy.feed_ids == {b["feed_id"] for b in indexed}
+    categories = db.get_categories_by_feed_ids([b["feed_id"] for b in indexed])
+    assert set(categories.values()) == set(taxonomy.categories)
+
+
+def test_new_bookmarks_are_assigned_without_reclustering(db, vector_store, indexed):
+    builder, _ = build(db, vector_store)
+    new = topic_bookmarks(per_topic=1, prefix="n")
+    db.add_bookmark_batch(new)
+    vector_store.add_bookmark_batch(new)
+
+    report = builder.run(n_clusters=4, apply=True, drift_threshold=0.5)
+    assert not report["reclustered"]
+    assert report["new"] == len(new) and report["assigned"] == len(new) - report["outliers"]
+    assert report["updated"] == report["assigned"]
+
+
+def test_classifier_predicts_nearest_label(db, vector_store, indexed):
+    build(db, vector_store)
+    classifier = TaxonomyClassifier(vector_store, taxonomy_path(db.db_path), min_similarity=0.5)
+    predictions = classifier.predict_many([("요가 필라테스 운동 운동 모음 99", None), (indexed[0]["caption"], indexed[0]["feed_id"])])
+    assert predictions[0]["category"] == "운동"
+    assert predictions[1]["category"] == "여행"
+
+
+def test_categorize_agent_uses_taxonomy(db, vector_store, indexed):
+    build(db, vector_store)
+    agent = CategorizeAgent()
+    agent.taxonomy_classifier = TaxonomyClassifier(vector_store, taxonomy_path(db.db_path), min_similarity=0.5)
+    results = agent.classify_many([{"caption": "뮤지컬 티켓팅 후기 공연 모음 99", "hashtags": []}])
+    assert results[0].categories == "공연"
+    assert agent.stats["taxonomy"] == 1 and agent.stats["llm_calls"] == 0
+
+
+def test_taxonomy_save_and_load_roundtrip(tmp_path):
+    centroids = np.eye(3, dtype="float32") * 2
+    Taxonomy(centroids, ["a", "b", "c"], ["ra", "rb", "rc"], ["f1"]).save(tmp_path / "taxonomy.npz")
+    loaded = Taxonomy.load(tmp_path / "taxonomy.npz")
+    clusters, similarities = loaded.nearest([[0, 3, 0]])
+    assert loaded.categories[clusters[0]] == "b" and np.isclose(similarities[0], 1.0)
+    assert Taxonomy.load(tmp_path / "missing.npz") is None
+
+
+def test_unrelated_captions_fall_through_to_llm(db):
+    # 무관한 텍스트끼리도 유사도가 ~0.7인 임베딩 (ada-002)
+    vector_store = VectorStore(db.db_path, embedding_model=OffsetEmbeddings())
+    bookmarks = topic_bookmarks()
+    db.add_bookmark_batch(bookmarks)
+    vector_store.add_bookmark_batch(bookmarks)
+    TaxonomyBuilder(db, vector_store).run(n_clusters=4, apply=True, force=True)
+
+    agent = CategorizeAgent()
+    agent.taxonomy_classifier = TaxonomyClassifier(vector_store, taxonomy_path(db.db_path))
+    results = agent.classify_many([{"caption": "강아지 산책 고양이 사진", "hashtags": []},
+                                   {"caption": "카페 라떼 추천", "hashtags": []},
+                                   {"caption": "헬스 운동 루틴 운동 모음 99", "hashtags": []}])
+    assert [r.categories for r in results] == ["반려동물", "카페", "운동"]
+    assert agent.stats["taxonomy"] == 1 and agent.stats["llm"] == 2
+
+
+def test_calibrate_min_similarity():
+    # 0.9 이상 30개는 모두 일치, 그 아래는 모두 불일치 -> 불일치 1개(0.829)까지 포함해야 일치율 30/31 >= 0.95
+    samples = [(0.9 + i / 1000, True) for i in range(30)] + [(0.8 + i / 1000, False) for i in range(30)]
+    assert calibrate_min_similarity(samples, 0.95, floor=0.5) == pytest.approx(0.829)
+    assert calibrate_min_similarity(samples, 1.0, floor=0.5) == pytest.approx(0.9)
+    assert calibrate_min_similarity(samples, 0.95, floor=0.95) == 0.95
+    assert calibrate_min_similarity(samples[:5], 0.95, floor=0.85) == 0.85
+    # 목표를 만족하는 구간이 없으면 사용하지 않음
+    assert calibrate_min_similarity([(0.9, False)] * 30, 0.95, floor=0.5) == 1.0
+    assert TAXONOMY_MIN_SIMILARITY >= 0.85
+
+
+def test_calibrated_threshold_is_saved_and_used(db, vector_store, indexed):
+    # 기존 카테고리 (대표 게시물을 뺀 나머지로 보정)
+    db.bulk_update_categories([(b["feed_id"], b["hashtags"][0], "") for b in indexed])
+    _, report = build(db, vector_store, n_representatives=2)
+    assert report["calibration_items"] == len(indexed) - 8
+    assert report["min_similarity"] >= 0.5
+
+    taxonomy = Taxonomy.load(taxonomy_path(db.db_path))
+    assert taxonomy.min_similarity == report["min_similarity"]
+    assert taxonomy.threshold(0.3) == report["min_similarity"] and taxonomy.threshold(1.0) == 1.0
@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+from conftest import make_bookmark
+from vector_service import VectorService, VectorServiceClient
+
+
+@pytest.fixture
+def client(vector_store, indexed):
+    server = VectorService(vector_store).serve(port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield VectorServiceClient(f"http://127.0.0.1:{server.server_address[1]}")
+    server.shutdown()
+    server.server_close()
+
+
+# ---- 공유 벡터 서비스 (user-032) ----
+
+def test_client_matches_local_store(client, vector_store):
+    local = vector_store.search_bookmarks("파스타 레시피 요리", limit=5)
+    remote = client.search_bookmarks("파스타 레시피 요리", limit=5)
+    assert [b["feed_id"] for b in remote] == [b["feed_id"] for b in local]
+    assert client.index_version() == vector_store.index_version()
+
+
+def test_client_writes_go_through_service(client, vector_store):
+    assert client.add_bookmark_batch([make_bookmark("svc", "서비스로 추가한 북마크")])
+    assert "svc" in vector_store.live_ids()
+    assert client.get_vector("svc").shape == (vector_store.index_dimension,)
+
+    assert client.delete_bookmark("svc")
+    assert "svc" not in client.live_ids()
+    assert client.get_vector("svc") is None
+
+
+def test_unknown_method_raises(client):
+    with pytest.raises(RuntimeError):
+        client._call("drop_everything")
+
+
+def test_concurrent_clients(client):
+    results, errors = [], []
+
+    def search():
+        try:
+            results.append(len(client.search_bookmarks_batch(["여행", "운동", "공연"], limit=3)))
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+
+    threads = [threading.Thread(target=search) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors and results == [3] * 8
@@ -0,0 +1,174 @@
+import threading
+
+import numpy as np
+
+from conftest import ScaledEmbeddings, make_bookmark, topic_bookmarks
+from vector_store import DimensionReducer, VectorStore
+
+
+def top_ids(results, n=3):
+    return [b["feed_id"] for b in results[:n]]
+
+
+# ---- 차원 축소 (user-026) ----
+
+def test_pca_reduction_keeps_neighbours_and_persists(db, vector_store, indexed):
+    before = top_ids(vector_store.search_bookmarks("파스타 레시피 요리", limit=5))
+
+    assert vector_store.enable_reduction("pca", target_dim=16)
+    assert vector_store.index_dimension == 16
+    assert vector_store.index.ntotal == len(indexed)
+    after = top_ids(vector_store.search_bookmarks("파스타 레시피 요리", limit=5))
+    assert after[0] == before[0]
+
+    reopened = VectorStore(db.db_path, embedding_model=vector_store.embeddings)
+    assert reopened.reducer is not None and reopened.index_dimension == 16
+    assert top_ids(reopened.search_bookmarks("파스타 레시피 요리", limit=5))[0] == before[0]
+
+
+def test_truncate_reduction_and_disable(db, vector_store, indexed):
+    assert vector_store.enable_reduction("truncate", target_dim=64)
+    assert vector_store.get_vector(indexed[0]["feed_id"]).shape == (64,)
+    # 이미 축소된 인덱스에는 다시 적용하지 않음
+    assert not vector_store.enable_reduction("pca", target_dim=16)
+
+    assert vector_store.disable_reduction()
+    assert vector_store.reducer is None
+    assert vector_store.get_vector(indexed[0]["feed_id"]).shape == (vector_store.dimension,)
+
+
+def test_pca_is_trained_on_live_vectors_only(db, vector_store, indexed, monkeypatch):
+    deleted = [b["feed_id"] for b in indexed[:10]]
+    for feed_id in deleted:
+        vector_store.delete_bookmark(feed_id)
+    fit = DimensionReducer.fit
+    trained = []
+    monkeypatch.setattr(DimensionReducer, "fit", lambda self, vectors: trained.append(len(vectors)) or fit(self, vectors))
+
+    assert vector_store.enable_reduction("pca", target_dim=16)
+    assert trained == [len(indexed) - len(deleted)]
+    assert vector_store.index.ntotal == len(indexed)
+    assert not list(vector_store.index_path.glob("*.tmp"))
+    reopened = VectorStore(db.db_path, embedding_model=vector_store.embeddings)
+    assert reopened.index.d == reopened.index_dimension == 16
+
+def test_pca_requires_enough_vectors(vector_store):
+    vector_store.add_bookmark_batch([make_bookmark("a", "제주 여행"), make_bookmark("b", "파스타")])
+    assert not vector_store.enable_reduction("pca", target_dim=16)
+    assert vector_store.reducer is None
+
+
+# ---- 쿼리 임베딩 캐시 (user-028) ----
+
+def test_query_embedding_cache_normalizes_queries(vector_store, indexed):
+    vector_store.search_bookmarks("제주 여행")
+    vector_store.search_bookmarks("  제주   여행 ")
+    stats = vector_store.cache_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_index_version_changes_on_write(vector_store, indexed):
+    version = vector_store.index_version()
+    vector_store.add_bookmark_batch([make_bookmark("new", "새 북마크 캡션")])
+    assert vector_store.index_version() > version
+    version = vector_store.index_version()
+    vector_store.delete_bookmark("new")
+    assert vector_store.index_version() > version
+
+
+# ---- 중복 탐지 (user-029) ----
+
+def test_find_near_duplicates_groups_identical_captions(vector_store, indexed):
+    original = indexed[0]
+    vector_store.add_bookmark_batch([make_bookmark("dup1", original["caption"]),
+                                     make_bookmark("dup2", original["caption"])])
+
+    groups = vector_store.find_near_duplicates(threshold=0.95)
+    group = next(g for g in groups if original["feed_id"] in g["members"])
+    assert group["canonical"] == original["feed_id"]
+    assert set(group["members"]) == {original["feed_id"], "dup1", "dup2"}
+
+
+def test_find_near_duplicates_skips_deleted(vector_store, indexed):
+    original = indexed[0]
+    vector_store.add_bookmark_batch([make_bookmark("dup", original["caption"])])
+    vector_store.delete_bookmark("dup")
+    groups = vector_store.find_near_duplicates(threshold=0.95)
+    assert all("dup" not in g["members"] for g in groups)
+
+
+def test_incremental_duplicates_match_full_recompute(db, vector_store, indexed):
+    db.save_duplicate_groups(vector_store.find_near_duplicates(threshold=0.95), prune=True)
+    new = [make_bookmark("dup_a", indexed[0]["caption"]), make_bookmark("dup_b", indexed[5]["caption"]),
+           make_bookmark("fresh", "처음 보는 전혀 다른 캡션")]
+    vector_store.add_bookmark_batch(new)
+
+    groups = vector_store.find_near_duplicates(feed_ids=[b["feed_id"] for b in new],
+                                               existing=db.get_duplicate_map())
+    db.save_duplicate_groups(groups)
+    incremental = db.get_duplicate_map()
+
+    full = {m: g["canonical"] for g in vector_store.find_near_duplicates(threshold=0.95) for m in g["members"]}
+    assert incremental == full
+    assert "fresh" not in incremental
+
+
+
+def test_incremental_duplicates_use_normalized_vectors(db, embeddings):
+    # 정규화되지 않은 임베딩에서도 증분 결과가 전체 재계산(코사인 유사도)과 같아야 함
+    store = VectorStore(db.db_path, embedding_model=ScaledEmbeddings(dim=embeddings.dim))
+    bookmarks = topic_bookmarks(per_topic=5)
+    store.add_bookmark_batch(bookmarks)
+    db.save_duplicate_groups(store.find_near_duplicates(threshold=0.9), prune=True)
+
+    # 저장된 벡터 길이가 1보다 짧은 원본의 중복 (정규화하지 않은 인덱스에서는 내적이 threshold보다 작음)
+    original = next(b for b in bookmarks if ScaledEmbeddings.scale(b["caption"]) < 0.9)
+    store.add_bookmark_batch([make_bookmark("dup", original["caption"]), make_bookmark("gone", original["caption"])])
+    store.delete_bookmark("gone")
+    groups = store.find_near_duplicates(threshold=0.9, feed_ids=["dup", "gone"], existing=db.get_duplicate_map())
+    db.save_duplicate_groups(groups)
+
+    full = {m: g["canonical"] for g in store.find_near_duplicates(threshold=0.9) for m in g["members"]}
+    assert db.get_duplicate_map() == full
+    assert full["dup"] == original["feed_id"] and "gone" not in full
+
+# ---- 동시 읽기/쓰기 (user-033) ----
+
+def test_concurrent_searches_during_writes(vector_store, indexed):
+    errors = []
+    stop = threading.Event()
+
+    def search():
+        while not stop.is_set():
+            try:
+                for result in vector_store.search_bookmarks("운동 루틴", limit=5):
+                    assert result["feed_id"]
+            except Exception as e:  # pragma: no cover - 실패 시 내용 확인용
+                errors.append(e)
+
+    readers = [threading.Thread(target=search) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    try:
+        for i in range(5):
+            vector_store.add_bookmark_batch(topic_bookmarks(per_topic=2, prefix=f"w{i}_"))
+    finally:
+        stop.set()
+        for reader in readers:
+            reader.join()
+
+    assert not errors
+    assert len(vector_store.live_ids()) == len(indexed) + 5 * 8
+    assert vector_store.index.ntotal == len(vector_store.live_ids())
+
+
+def test_document_embeddings_are_cached_for_ingest(vector_store):
+    calls = []
+    embed_documents = vector_store.embeddings.embed_documents
+    vector_store.embeddings.embed_documents = lambda texts: calls.append(list(texts)) or embed_documents(texts)
+
+    vector_store.embed_documents(["제주 여행", "파스타 레시피"])
+    vector_store.add_bookmark_batch([make_bookmark("a", "제주 여행"), make_bookmark("b", "파스타 레시피")])
+    assert calls == [["제주 여행", "파스타 레시피"]]
+    assert len(vector_store.query_embedding_cache) == 0
+    assert np.allclose(vector_store.get_vector("a"), vector_store.embed_documents(["제주 여행"])[0], atol=1e-6)
@@ -2,6 +2,7 @@ import os
 import streamlit as st
 import hydralit_components as hc
 from utils.helpers import *
+from agent.taste_profile import get_taste_profile
 
 theme_good = {'bgcolor': '#EFF8F7','title_color': 'green','content_color': 'green','icon_color': 'green', 'icon': 'fa fa-check-circle'}
 
@@ -73,6 +74,8 @@ def render_add_bookmark_page(db, vector_store, categorize_agent, debug):
                     st.session_state["fetched_bookmarks"],
                     categorize_agent=categorize_agent
                 )
+                # 이미 취향 프로필에 반영된 북마크의 카테고리 중심 갱신
+                get_taste_profile(db.db_path).sync_categories(db, vector_store)
             
             if success_count > 0:
                 st.success(f"{success_count}개의 북마크의 카테고리가 분류되어 DB에 저장되었습니다.")
@@ -102,6 +105,17 @@ def render_add_bookmark_page(db, vector_store, categorize_agent, debug):
                 success_vector = vector_store.add_bookmark_batch(st.session_state["successful_bookmarks"])
             
             if success_vector:
+                # 새로 추가된 북마크만 기존 벡터와 비교해 중복(리포스트 등) 그룹에 합침 (실패하면 기존 그룹 유지)
+                groups = vector_store.find_near_duplicates(
+                    feed_ids=[b["feed_id"] for b in st.session_state["successful_bookmarks"]],
+                    existing=db.get_duplicate_map(),
+                )
+                if groups is not None:
+                    db.save_duplicate_groups(groups)
+                # 새 북마크 벡터만 취향 프로필에 더함
+                get_taste_profile(db.db_path).sync_added(
+                    db, vector_store, [b["feed_id"] for b in st.session_state["successful_bookmarks"]]
+                )
                 st.session_state["vector_saved"] = True
                 st.success(f"{len(st.session_state["successful_bookmarks"])}개의 북마크가 벡터 스토어에 저장되었습니다.")
                 st.rerun()  # 상태 표시 업데이트를 위한 리로드
@@ -2,12 +2,16 @@ import streamlit as st
 from PIL import Image
 import os
 import time
+from pathlib import Path
 # from datetime import datetime
 # import base64
 # from io import BytesIO
 # from annotated_text import annotated_text
 
-from agent.agents import RecommendAgent
+from agent.agents import RecommendAgent, HashtagAgent
+from agent.hashtag_index import HashtagResolver
+from agent.recommend_rank import RecommendRanker, get_embedding_cache
+from agent.taste_profile import get_taste_profile
 from utils.instagram import get_recent_feeds
 
 
@@ -18,22 +22,36 @@ def render_recommend_page(db, vector_store, debug):
     else:
         previous_query = "이번 여름에 여행 어디 가지?"
 
+    profile = get_taste_profile(db.db_path)
+    if profile.is_stale(vector_store):
+        # 취향 프로필 도입 전에 저장한 북마크로 처음 한 번 생성 (차원 축소 적용/해제 후에도 다시 생성)
+        profile.rebuild(db, vector_store)
     if 'search_output' in st.session_state:
         user_history = st.session_state["search_output"]
     else:
         st.error("검색 히스토리가 없습니다. LLM 오마카세 모드로 추천합니다.")
-        # user_history = []
-        from agent.search import Search
-        search = Search(db, vector_store)
-        user_history = search.total_search(previous_query)
-
-    # TODO previous_query에서 hashtag extract agent와 같은 키워드 추출 기능 추가 필요
-    if "뮤지컬" in previous_query:
-        hashtag = "뮤지컬"
-    elif "여행" in previous_query:
-        hashtag = "여행"
-    else:
-        hashtag = "트렌드" 
+        centroid = profile.centroid()
+        if centroid is not None:
+            # 취향 벡터와 가까운 북마크를 히스토리로 (검색/LLM 필터링 없이 벡터 검색 한 번)
+            neighbors = vector_store.search_by_vector(centroid, limit=10, transformed=True)
+            user_history = db.get_bookmarks_by_feed_ids([feed_id for feed_id, _ in neighbors])
+        else:
+            # user_history = []
+            from agent.search import Search
+            search = Search(db, vector_store)
+            user_history = search.total_search(previous_query)
+
+    # 중복(리포스트 등) 북마크는 하나만 남겨 프롬프트 크기 축소
+    user_history = db.collapse_duplicates(user_history or [])
+
+    # 검색어 -> 트렌드 해시태그 (포함된 해시태그 / 해시태그 임베딩 인덱스, 유사도가 낮을 때만 LLM)
+    embedding_cache = get_embedding_cache(Path(db.db_path).parent / "llm_cache.db")
+    resolver = HashtagResolver(db, vector_store, embedding_cache, agent=HashtagAgent())
+    resolution = resolver.resolve(previous_query)
+    hashtag = resolution["hashtag"]
+    if debug:
+        st.info(f"해시태그: #{hashtag} ({resolution['method']}, 유사도 {resolution['similarity']}, "
+                f"후보 {resolution['candidates']}, {resolution['elapsed'] * 1000:.1f}ms)")
 
     with st.spinner(f"#{hashtag}의 트렌드 게시물을 불러오는 중..."):
         time.sleep(5)
@@ -41,11 +59,25 @@ def render_recommend_page(db, vector_store, debug):
         # print(f"recent_feeds: {recent_feeds}")
 
     if recent_feeds:
+        # 임베딩으로 후보를 먼저 줄여 (이미 북마크한 게시물 제외 + MMR) 상위 후보만 LLM으로
+        ranker = RecommendRanker(vector_store, cache=embedding_cache, profile=profile)
+        candidates, rank_stats = ranker.rank(previous_query, user_history, recent_feeds)
+        if debug:
+            st.info(f"취향 프로필: {profile.stats()}, 주요 카테고리: {profile.top_categories()}")
+            st.info(f"추천 후보 {rank_stats['candidates']}개 -> {rank_stats['selected']}개 "
+                    f"(북마크 제외 {rank_stats['bookmarked']}개, 새로 임베딩 {rank_stats['embedded']}개, "
+                    f"{rank_stats['elapsed']:.2f}초)")
+        if not candidates:
+            st.info("트렌드 게시물이 모두 이미 북마크한 게시물이에요.")
+            return
+
         recommend_agent = RecommendAgent()
         with st.spinner("당신의 취향을 기반으로 게시물을 추리고 있어요!"):
-            state = recommend_agent.run(previous_query, user_history, recent_feeds)
+            state = recommend_agent.run(previous_query, user_history, candidates)
             print(f"추천 이유: {state["recommend_reasons"]}")
         
+        if state and state.get("degraded"):
+            st.warning("AI 추천을 일시적으로 사용할 수 없어 트렌드 게시물을 그대로 보여드려요.")
         if state and state['recommended_feeds']:
             display_recom_bookmarks(state['recommended_feeds'], state["recommend_reasons"], hashtag, db, vector_store, debug)
 
@@ -120,6 +152,7 @@ def display_recom_bookmarks(bookmarks, reasons, hashtag, db, vector_store, debug
             #         st.rerun()
 
         # if debug:
-        st.info(f"이 게시물을 추천한 이유: {reasons[i].split('/')[-1]}")
+        if reasons and i < len(reasons):
+            st.info(f"이 게시물을 추천한 이유: {reasons[i].split('/')[-1]}")
         
         st.markdown("---")
\ No newline at end of file
@@ -6,6 +6,7 @@ from annotated_text import annotated_text
 
 from utils.helpers import *
 from agent.search import Search
+from agent.taste_profile import get_taste_profile
 # from ui.bookmark_viewer import BookmarkViewer
 
 category_color = {  # TODO 몇몇 카태고리 annotation 색 지정
@@ -17,7 +18,7 @@ category_color = {  # TODO 몇몇 카태고리 annotation 색 지정
 # 북마크 검색 기능
 def render_search_page(db, vector_store, debug):
     if debug:
-        search_type = st.radio("검색 유형", ["키워드 검색", "의미 검색", "다중 검색", "total"])
+        search_type = st.radio("검색 유형", ["키워드 검색", "의미 검색", "하이브리드 검색", "다중 검색", "total"])
     if 'search_input' not in st.session_state or st.session_state["search_input"] == "":
         # st.session_state["search_input"] = st.text_input("검색어를 입력하세요")
         # st.session_state["search_input"] = st.text_input("검색어를 입력하세요", key="search_input", label_visibility="collapsed")
@@ -65,32 +66,63 @@ def render_search_page(db, vector_store, debug):
     search = Search(db, vector_store)
     
     if st.session_state["search_input"] and st.session_state["search_input"] != "":
+        # 검색 결과 영역 (LLM 필터링이 끝날 때마다 같은 자리에서 갱신)
+        status = st.empty()
+        results = st.empty()
         if debug:
             if search_type == "키워드 검색":
                 bookmarks = search.keyword_search(st.session_state["search_input"])
             elif search_type == "의미 검색":
                 bookmarks = search.semantic_search(st.session_state["search_input"])
+            elif search_type == "하이브리드 검색":
+                bookmarks = search.hybrid_search(st.session_state["search_input"])
             elif search_type == "다중 검색":
                 bookmarks = search.multi_search(st.session_state["search_input"])
             elif search_type == "total":
                 bookmarks = search.multi_search(st.session_state["search_input"])
         else:
             # bookmarks = search.multi_search(st.session_state["search_input"])
-            bookmarks = search.total_search(st.session_state["search_input"])
+            # bookmarks = search.total_search(st.session_state["search_input"])
+            bookmarks = stream_search_results(search, st.session_state["search_input"], status, results, db, vector_store)
         
         st.session_state["search_output"] = bookmarks
 
+        if debug:
+            with st.expander("검색 캐시 통계"):
+                st.write(search.cache_stats())
+            with st.expander("검색 단계별 시간(ms)"):
+                st.write({stage: round(ms, 1) if isinstance(ms, float) else ms for stage, ms in search.timings.items()})
+
         if bookmarks:
-            display_bookmarks(bookmarks, db, vector_store)
+            if search.degraded:
+                st.warning("AI 결과 정리를 일시적으로 사용할 수 없어 검색 결과를 그대로 보여드려요.")
+            with results.container():
+                display_bookmarks(bookmarks, db, vector_store)
 
             st.info("검색 결과를 기반으로 트렌드 게시물을 추천해드릴게요! 🐸")
             st.button("추천 페이지로 이동", on_click=change_menu, args=("추천 페이지",))
 
         else:
-            st.info("검색 결과가 없습니다.")
+            results.info("검색 결과가 없습니다.")
+
+# 검색 결과를 먼저 표시하고 LLM 필터링 결과로 갱신하는 함수
+def stream_search_results(search, query, status, results, db, vector_store):
+    bookmarks = []
+    for stage, bookmarks, progress in search.total_search_stream(query):
+        if stage == "final":
+            break
+        if stage == "retrieved":
+            status.caption(f"검색 결과 {len(bookmarks)}개 - 관련 없는 결과를 정리하는 중...")
+        else:
+            status.caption(f"관련 없는 결과를 정리하는 중... ({progress[0]}/{progress[1]})")
+        # 중간 결과는 삭제 버튼 없이 표시 (최종 결과와 위젯 key가 겹치지 않도록)
+        with results.container():
+            display_bookmarks(bookmarks, db, vector_store, interactive=False)
+    status.empty()
+    return bookmarks
 
 # 북마크 표시 함수
-def display_bookmarks(bookmarks, db, vector_store):
+def display_bookmarks(bookmarks, db, vector_store, interactive=True):
     for bookmark in bookmarks:
         col1, col2 = st.columns([1, 3])
         
@@ -130,9 +162,11 @@ def display_bookmarks(bookmarks, db, vector_store):
             st.caption(f"저장일: {bookmark["created_at"]}")
             
             # 북마크 삭제 버튼
-            if st.button("삭제", key=f"delete_{bookmark['id']}"):
+            if interactive and st.button("삭제", key=f"delete_{bookmark['id']}"):
                 if db.delete_bookmark(bookmark["id"]):
-                    vector_store.delete_bookmark(bookmark["id"])
+                    # 벡터 인덱스는 feed_id 기준 (취향 프로필은 벡터를 지우기 전에 갱신)
+                    get_taste_profile(db.db_path).sync_removed(vector_store, bookmark["feed_id"])
+                    vector_store.delete_bookmark(bookmark["feed_id"])
                     st.success("북마크가 삭제되었습니다.")
                     st.rerun()
         
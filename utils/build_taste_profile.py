@@ -0,0 +1,34 @@
+# 벡터 인덱스의 모든 북마크로 계정 취향 프로필(faiss_index/taste_profile.npz)을 다시 만드는 스크립트 (차원 축소 적용/해제 후 등)
+import os
+import sys
+import argparse
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(project_root)
+from db import BookmarkDatabase
+from vector_store import VectorStore
+from agent.taste_profile import get_taste_profile
+
+
+def main():
+    """메인 실행 함수"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default="./data/bookmarks.db", help="계정 파티션의 bookmarks.db")
+    parser.add_argument("--top", type=int, default=10, help="출력할 주요 카테고리 수")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"DB가 없습니다: {args.db}")
+        return
+    db = BookmarkDatabase(args.db)
+    vector_store = VectorStore(args.db)
+    profile = get_taste_profile(args.db)
+    added = profile.rebuild(db, vector_store)
+    print(f"취향 프로필 생성 완료: 북마크 {added}개 -> {profile.path}")
+    print(profile.stats())
+    for category, share in profile.top_categories(args.top):
+        print(f"  {category}: {share:.1%}")
+
+
+if __name__ == "__main__":
+    main()
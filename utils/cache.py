@@ -0,0 +1,115 @@
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+
+def normalize_query(text):
+    """캐시 키용 쿼리 정규화 (앞뒤/중복 공백 제거, 소문자화)"""
+    if not text:
+        return ""
+    return " ".join(str(text).split()).lower()
+
+
+class LRUCache:
+    """스레드 안전한 in-process LRU 캐시 (hit/miss 카운터 포함)
+
+    Streamlit 세션 스레드들이 하나의 인스턴스를 공유하므로 모든 접근은 lock으로 보호합니다.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """키에 해당하는 값을 반환합니다. 없으면 default를 반환하고 miss로 집계합니다."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """값을 저장하고 maxsize를 넘으면 가장 오래 사용되지 않은 항목을 제거합니다."""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """모니터링용 통계"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+class SharedInstances:
+    """키(파티션 파일 경로 등)별로 하나의 인스턴스를 공유하는 레지스트리
+
+    최근 사용한 maxsize개만 강한 참조로 유지하고, 밀려난 인스턴스도 아직 다른 세션이 사용 중이면
+    (약한 참조가 살아있으면) 같은 인스턴스를 돌려줍니다. (PartitionManager와 같은 방식)
+    아무도 쓰지 않게 된 인스턴스는 해제되므로 SQLite 연결/메모리가 계정 수만큼 쌓이지 않습니다.
+    """
+
+    def __init__(self, factory, maxsize=None):
+        """
+        Args:
+            factory: key -> 인스턴스를 만드는 함수
+            maxsize: 강한 참조로 유지할 최대 인스턴스 수 (기본: 열린 파티션 수 MAX_OPEN_PARTITIONS)
+        """
+        self.factory = factory
+        self.maxsize = maxsize or int(os.getenv("MAX_OPEN_PARTITIONS", "8"))
+        self._open = OrderedDict()
+        self._alive = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            instance = self._open.get(key) or self._alive.get(key)
+            if instance is None:
+                instance = self.factory(key)
+                self._alive[key] = instance
+            self._open[key] = instance
+            self._open.move_to_end(key)
+            while len(self._open) > self.maxsize:
+                self._open.popitem(last=False)
+                self.evictions += 1
+            return instance
+
+    def clear(self):
+        with self._lock:
+            self._open.clear()
+
+    def stats(self):
+        """모니터링용 통계"""
+        with self._lock:
+            return {"open": len(self._open), "alive": len(self._alive), "maxsize": self.maxsize,
+                    "evictions": self.evictions}
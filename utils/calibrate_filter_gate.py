@@ -0,0 +1,66 @@
+# 기록된 LLM 필터링 판단(filter_decisions.jsonl)으로 점수 게이트 임계값을 보정해 filter_gate.json에 저장하는 스크립트
+import os
+import sys
+import json
+import math
+import argparse
+from collections import defaultdict
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(project_root)
+from agent.gating import FilterDecisionLog, ScoreGate, calibrate
+
+
+def estimate_calls(records, gate, chunk_size):
+    """검색 한 번(같은 query/ts)마다 FilterAgent 청크 수로 LLM 호출 수를 추정합니다. (게이트 전, 후)"""
+    searches = defaultdict(list)
+    for record in records:
+        searches[(record.get("query"), record.get("ts"))].append(record)
+    before = after = 0
+    for candidates in searches.values():
+        before += math.ceil(len(candidates) / chunk_size)
+        ambiguous = sum(gate.decide(r.get("score")) is None for r in candidates)
+        after += math.ceil(ambiguous / chunk_size)
+    return before, after
+
+
+def main():
+    """메인 실행 함수"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-dir", default="./data", help="filter_decisions.jsonl이 있는 디렉토리 (계정 파티션 디렉토리)")
+    parser.add_argument("--target", type=float, default=0.95, help="게이트 판정과 LLM 판단의 최소 일치율")
+    parser.add_argument("--min-support", type=int, default=20, help="게이트 구간별 최소 기록 수")
+    parser.add_argument("--chunk-size", type=int, default=int(os.getenv("FILTER_CHUNK_SIZE", "20")))
+    parser.add_argument("--dry-run", action="store_true", help="보고서만 출력하고 저장하지 않음")
+    args = parser.parse_args()
+
+    records = FilterDecisionLog(os.path.join(args.data_dir, "filter_decisions.jsonl")).read()
+    scored = [r for r in records if r.get("score") is not None]
+    print(f"LLM 판단 기록 {len(records)}개 (의미 점수 있음 {len(scored)}개, 채택 {sum(bool(r['keep']) for r in scored)}개)")
+    if not scored:
+        print("보정할 기록이 없습니다. 검색을 사용해 판단 기록을 먼저 쌓으세요.")
+        return
+
+    # 목표 일치율별 절감량/일치율 비교
+    print(f"{'목표':>6}{'lower':>8}{'upper':>8}{'게이트':>8}{'토큰절감':>8}{'호출(전→후)':>14}{'일치율':>8}{'게이트일치':>8}")
+    chosen = None
+    for target in sorted({0.8, 0.9, 0.95, 0.98, 0.99, args.target}):
+        result = calibrate(records, target, args.min_support)
+        before, after = estimate_calls(scored, ScoreGate(result["lower"], result["upper"]), args.chunk_size)
+        result.update({"llm_calls_before": before, "llm_calls_after": after})
+        fmt = lambda v: f"{v:.3f}" if v is not None else "-"
+        print(f"{target:>6.2f}{fmt(result['lower']):>8}{fmt(result['upper']):>8}{result['gated']:>8.0%}"
+              f"{result['tokens_saved']:>8.0%}{f'{before}→{after}':>14}{result['agreement']:>8.1%}"
+              f"{result['gated_agreement']:>8.1%}")
+        if target == args.target:
+            chosen = result
+
+    if args.dry_run:
+        return
+    path = os.path.join(args.data_dir, "filter_gate.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(chosen, f, ensure_ascii=False, indent=2)
+    print(f"임계값 저장: {path} (lower={chosen['lower']}, upper={chosen['upper']})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# 임베딩 클러스터링으로 카테고리 체계를 만들고 북마크 카테고리를 일괄 갱신하는 스크립트
+import os
+import sys
+import argparse
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(project_root)
+from db import BookmarkDatabase
+from vector_store import VectorStore
+from agent.taxonomy import (TaxonomyBuilder, TAXONOMY_DRIFT_THRESHOLD, TAXONOMY_MIN_SIMILARITY,
+                            TAXONOMY_TARGET_AGREEMENT)
+
+
+def main():
+    """메인 실행 함수"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default="./data/bookmarks.db")
+    parser.add_argument("--k", type=int, default=20, help="클러스터(카테고리) 수")
+    parser.add_argument("--representatives", type=int, default=5, help="클러스터당 LLM에 보낼 대표 게시물 수")
+    parser.add_argument("--apply", action="store_true", help="결과를 DB에 반영하고 클러스터 중심 저장 (기본: 리포트만 출력)")
+    parser.add_argument("--drift", type=float, default=TAXONOMY_DRIFT_THRESHOLD,
+                        help="저장된 중심과 먼 새 북마크 비율이 이 값 이상일 때만 다시 클러스터링")
+    parser.add_argument("--min-similarity", type=float, default=TAXONOMY_MIN_SIMILARITY,
+                        help="새 북마크를 클러스터 라벨로 분류할 최소 중심 유사도의 하한")
+    parser.add_argument("--target-agreement", type=float, default=TAXONOMY_TARGET_AGREEMENT,
+                        help="최소 중심 유사도 보정 목표 (이 유사도 이상인 북마크의 기존 카테고리 일치율)")
+    parser.add_argument("--force", action="store_true", help="drift와 관계없이 다시 클러스터링")
+    args = parser.parse_args()
+
+    db = BookmarkDatabase(args.db)
+    vector_store = VectorStore(args.db)
+    builder = TaxonomyBuilder(db, vector_store, n_representatives=args.representatives,
+                              min_similarity=args.min_similarity, target_agreement=args.target_agreement)
+    report = builder.run(args.k, apply=args.apply, drift_threshold=args.drift, force=args.force)
+
+    if not report["reclustered"]:
+        print(f"drift {report['drift']:.1%} < {args.drift:.1%}: 다시 클러스터링하지 않고 "
+              f"새 북마크 {report['assigned']}개를 클러스터 {report['clusters']}개 중심에 배정")
+        if args.apply:
+            print(f"DB 반영: {report['updated']}개")
+        return
+
+    print("== 클러스터 단위 분류 리포트 ==")
+    print(f"북마크 {report['items']}개, 클러스터 {report['clusters']}개")
+    print(f"LLM 호출: 북마크 단위 {report['llm_calls_per_item']}회 -> 클러스터 단위 {report['llm_calls_per_cluster']}회")
+    print(f"프롬프트 토큰(추정): {report['prompt_tokens_per_item']:,} -> {report['prompt_tokens_per_cluster']:,}")
+    if report['agreement'] is not None:
+        print(f"기존 분류와 일치율: {report['agreement']:.1%} (비교 {report['compared_items']}개), "
+              f"클러스터 순도: {report['purity']:.1%}")
+    print(f"최소 중심 유사도: {report['min_similarity']:.3f} (기존 카테고리 {report['calibration_items']}개로 보정, "
+          f"하한 {args.min_similarity})")
+    if args.apply:
+        print(f"DB 반영: {report['updated']}개")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    """읽기는 여러 스레드가 동시에, 쓰기는 한 스레드만 잡을 수 있는 잠금
+
+    쓰기 대기 중에는 새 읽기를 받지 않아(writer 우선) 검색이 계속 들어와도 쓰기가 굶지 않습니다.
+    재진입은 지원하지 않으므로 읽기 잠금 안에서 다시 read()/write()를 호출하면 안 됩니다.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._waiting_writers += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class RateLimiter:
+    """분당 요청 수(RPM)와 분당 토큰 수(TPM) 한도를 함께 지키는 token bucket
+
+    Azure OpenAI 배포의 할당량처럼 두 한도가 동시에 걸린 API 호출 전에 acquire()를 호출합니다.
+    버킷 크기는 burst_seconds 동안의 허용량이라 처음부터 1분치를 한꺼번에 보내지 않습니다.
+    rpm/tpm이 0 또는 None이면 해당 한도는 적용하지 않습니다.
+    """
+
+    def __init__(self, rpm=None, tpm=None, burst_seconds=10.0):
+        self.rpm = rpm or 0
+        self.tpm = tpm or 0
+        self._request_capacity = max(1.0, self.rpm * burst_seconds / 60)
+        self._token_capacity = max(1.0, self.tpm * burst_seconds / 60)
+        self._requests = self._request_capacity
+        self._tokens = self._token_capacity
+        self._updated = time.monotonic()
+        self._cond = threading.Condition(threading.Lock())
+        self.acquired = 0
+        self.waited_seconds = 0.0
+
+    @property
+    def enabled(self):
+        return bool(self.rpm or self.tpm)
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm:
+            self._requests = min(self._request_capacity, self._requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self._tokens = min(self._token_capacity, self._tokens + elapsed * self.tpm / 60)
+
+    def acquire(self, tokens=0):
+        """요청 1건과 tokens개 토큰을 쓸 수 있을 때까지 기다린 뒤 차감합니다.
+
+        Returns:
+            기다린 시간(초)
+        """
+        if not self.enabled:
+            return 0.0
+        # 버킷보다 큰 요청은 버킷 크기만큼만 요구 (영원히 기다리지 않도록)
+        tokens = min(tokens, self._token_capacity) if self.tpm else 0
+        started = time.monotonic()
+        with self._cond:
+            while True:
+                self._refill(time.monotonic())
+                wait = 0.0
+                if self.rpm and self._requests < 1:
+                    wait = max(wait, (1 - self._requests) * 60 / self.rpm)
+                if self.tpm and self._tokens < tokens:
+                    wait = max(wait, (tokens - self._tokens) * 60 / self.tpm)
+                if wait <= 0:
+                    if self.rpm:
+                        self._requests -= 1
+                    if self.tpm:
+                        self._tokens -= tokens
+                    waited = time.monotonic() - started
+                    self.acquired += 1
+                    self.waited_seconds += waited
+                    return waited
+                self._cond.wait(wait)
+
+    def stats(self):
+        with self._cond:
+            return {"rpm": self.rpm, "tpm": self.tpm, "acquired": self.acquired,
+                    "waited_seconds": round(self.waited_seconds, 3)}
+
+
+def backoff_delay(attempt, base=0.5, maximum=8.0):
+    """attempt번째 재시도 전 대기 시간 (지수 증가 + full jitter: 0 ~ min(maximum, base * 2^attempt))"""
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """연속 실패가 failure_threshold번 나면 reset_seconds 동안 호출을 막는 circuit breaker
+
+    closed(정상) -> open(차단, allow()가 False) -> reset_seconds 후 half_open(시험 호출 1건만 허용)
+    -> 시험 호출이 성공하면 closed, 실패하면 다시 open.
+    상태가 바뀔 때마다 on_transition(이전 상태, 새 상태)을 호출하고 전이 횟수를 셉니다.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_seconds=30.0, on_transition=None):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.on_transition = on_transition
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.transitions = {}
+        self.rejected = 0
+
+    def _set_state(self, state):
+        # self._lock 안에서 호출
+        previous, self.state = self.state, state
+        key = f"{previous}->{state}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        return previous
+
+    def _notify(self, previous, state):
+        if self.on_transition and previous != state:
+            try:
+                self.on_transition(previous, state)
+            except Exception as e:
+                print(f"circuit breaker 상태 기록 실패: {e}")
+
+    def allow(self):
+        """지금 호출해도 되는지 (open 상태면 False, half_open이면 시험 호출 1건만 True)"""
+        transition = None
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_seconds:
+                    self.rejected += 1
+                    return False
+                transition = (self._set_state(self.HALF_OPEN), self.HALF_OPEN)
+                self._probing = False
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    self.rejected += 1
+                    allowed = False
+                else:
+                    self._probing = True
+                    allowed = True
+            else:
+                allowed = True
+        if transition:
+            self._notify(*transition)
+        return allowed
+
+    def record_success(self):
+        transition = None
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            if self.state != self.CLOSED:
+                transition = (self._set_state(self.CLOSED), self.CLOSED)
+        if transition:
+            self._notify(*transition)
+
+    def release(self):
+        """엔드포인트 상태와 무관한 결과(요청 오류, 429 등): 실패 수는 그대로 두고 half_open 시험 호출 자리만 비웁니다."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        transition = None
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                transition = (self._set_state(self.OPEN), self.OPEN)
+        if transition:
+            self._notify(*transition)
+
+    @property
+    def is_open(self):
+        """차단 중인지 (reset_seconds가 지나 시험 호출을 기다리는 상태는 제외)"""
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() - self._opened_at < self.reset_seconds
+
+    def stats(self):
+        with self._lock:
+            return {"state": self.state, "failures": self._failures, "rejected": self.rejected,
+                    "transitions": dict(self.transitions)}
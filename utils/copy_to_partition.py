@@ -0,0 +1,39 @@
+# 계정별 파티션 도입 전의 공용 DB/벡터 인덱스(data/bookmarks.db, data/faiss_index)를 계정 파티션으로 복사하는 스크립트
+import os
+import sys
+import shutil
+import argparse
+from pathlib import Path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(project_root)
+from partitions import PartitionManager
+
+
+def main():
+    """메인 실행 함수"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--account", required=True, help="Instagram 아이디")
+    parser.add_argument("--data-dir", default="./data")
+    parser.add_argument("--force", action="store_true", help="이미 계정 파티션이 있어도 덮어쓰기")
+    args = parser.parse_args()
+
+    manager = PartitionManager(args.data_dir, open_partition=None)
+    source_db = manager.db_path(None)
+    target_db = manager.db_path(args.account)
+    if not source_db.exists():
+        print(f"공용 DB가 없습니다: {source_db}")
+        return
+    if target_db.exists() and not args.force:
+        print(f"이미 계정 파티션이 있습니다: {target_db} (--force로 덮어쓰기)")
+        return
+
+    target_db.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copy2(source_db, target_db)
+    source_index = Path(source_db).parent / "faiss_index"
+    if source_index.exists():
+        shutil.copytree(source_index, target_db.parent / "faiss_index", dirs_exist_ok=True)
+    print(f"{source_db} -> {target_db} 복사 완료")
+
+if __name__ == "__main__":
+    main()
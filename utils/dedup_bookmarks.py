@@ -0,0 +1,35 @@
+# 중복(near-duplicate) 북마크 그룹을 다시 계산해 DB에 저장하는 스크립트
+import os
+import sys
+import argparse
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(project_root)
+from db import BookmarkDatabase
+from vector_store import VectorStore
+
+
+def main():
+    """메인 실행 함수"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default="./data/bookmarks.db")
+    parser.add_argument("--threshold", type=float, default=0.95, help="중복으로 볼 최소 코사인 유사도")
+    args = parser.parse_args()
+
+    db = BookmarkDatabase(args.db)
+    vector_store = VectorStore(args.db)
+
+    groups = vector_store.find_near_duplicates(threshold=args.threshold)
+    if groups is None:
+        print("중복 탐지에 실패해 저장된 그룹을 그대로 둡니다.")
+        return
+    # 전체 재계산 결과이므로 더는 중복이 아닌 북마크의 그룹 정보는 지움
+    saved = db.save_duplicate_groups(groups, prune=True)
+
+    collapsed = saved - len(groups)
+    print(f"중복 그룹 {len(groups)}개, 그룹에 속한 북마크 {saved}개 (검색/추천 시 {collapsed}개가 접힘)")
+    for group in sorted(groups, key=lambda g: len(g["members"]), reverse=True)[:10]:
+        print(f"- {group['canonical']}: {len(group['members'])}개 {group['members']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# LLM 호출 기록(llm_ledger.db)을 에이전트/작업별 지연시간, 토큰, 추정 비용과 검색당 토큰으로 집계해 출력하는 스크립트
+import os
+import sys
+import time
+import argparse
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(project_root)
+from agent.ledger import LLMLedger
+
+
+def main():
+    """메인 실행 함수"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ledger", default=os.getenv("LLM_LEDGER_PATH") or "./data/llm_ledger.db",
+                        help="LLM 호출 기록 파일")
+    parser.add_argument("--hours", type=float, default=0, help="최근 N시간 기록만 집계 (0: 전체)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.ledger):
+        print(f"LLM 호출 기록이 없습니다: {args.ledger}")
+        return
+    ledger = LLMLedger(args.ledger)
+    since = time.time() - args.hours * 3600 if args.hours else None
+
+    rows = ledger.summary(since)
+    if not rows:
+        print("집계할 기록이 없습니다.")
+        return
+    print(f"{'에이전트':<14}{'작업':<15}{'호출':>6}{'오류':>5}{'p50(ms)':>9}{'p95(ms)':>9}{'입력토큰':>10}{'출력토큰':>9}"
+          f"{'항목':>7}{'재시도':>6}{'캐시':>6}{'비용($)':>9}")
+    for r in rows:
+        print(f"{r['agent']:<14}{r['operation']:<15}{r['calls']:>6}{r['errors']:>5}{r['p50_ms']:>9.0f}{r['p95_ms']:>9.0f}"
+              f"{r['prompt_tokens']:>10}{r['completion_tokens']:>9}{r['items']:>7}{r['retries']:>6}{r['cache_hits']:>6}"
+              f"{r['cost_usd']:>9.4f}")
+    print(f"합계 추정 비용: ${sum(r['cost_usd'] for r in rows):.4f}")
+
+    search = ledger.per_trace("filter", since)
+    if search["traces"]:
+        print(f"검색 {search['traces']}회: 검색당 필터링 호출 {search['calls_mean']:.1f}회, "
+              f"토큰 평균 {search['tokens_mean']:.0f} / p95 {search['tokens_p95']:.0f}, "
+              f"비용 평균 ${search['cost_usd_mean']:.5f}")
+
+
+if __name__ == "__main__":
+    main()
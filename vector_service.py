@@ -0,0 +1,235 @@
+"""여러 Streamlit 프로세스가 공유하는 로컬 벡터 검색 서비스
+
+인덱스는 이 서비스 프로세스 하나만 메모리에 올리고 파일에 쓰며,
+Streamlit 프로세스들은 VectorServiceClient로 localhost HTTP(JSON) RPC를 호출합니다.
+
+실행:
+    python vector_service.py --db ./data/bookmarks.db --port 8765
+    VECTOR_SERVICE_URL=http://127.0.0.1:8765 streamlit run app.py
+"""
+import json
+import socket
+import argparse
+import threading
+import traceback
+import http.client
+from urllib.parse import urlparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import numpy as np
+
+
+def _to_json(value):
+    """numpy 값을 JSON 직렬화 가능한 값으로 변환"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (np.floating, np.integer)):
+        return value.item()
+    # datetime 등 (북마크 dict의 부가 필드, 벡터 처리에는 사용되지 않음)
+    return str(value)
+
+
+class VectorService:
+    """VectorStore를 소유하고 RPC 요청을 처리하는 서비스"""
+
+    # 인덱스를 변경하는 RPC
+    WRITE_METHODS = {"add_bookmark_batch", "delete_bookmarks", "rebuild_index", "enable_reduction"}
+
+    def __init__(self, vector_store):
+        # VectorStore가 검색은 동시에, 변경은 순서대로 처리하므로 서비스에서는 별도 잠금을 두지 않음
+        self.vector_store = vector_store
+
+    def handle(self, method, params):
+        """RPC 메서드 실행. 검색/추가/삭제는 여러 건을 한 번에 받는 배치 형태입니다."""
+        vs = self.vector_store
+        if method == "search_bookmarks_batch":
+            return vs.search_bookmarks_batch(params["queries"], params.get("limit", 10))
+        if method == "search_by_vector":
+            return vs.search_by_vector(params["vector"], params.get("limit", 10), params.get("transformed", False))
+        if method == "embed_queries":
+            return vs.embed_queries(params["queries"])
+        if method == "embed_documents":
+            return vs.embed_documents(params["texts"])
+        if method == "get_vector":
+            return vs.get_vector(params["bookmark_id"])
+        if method == "to_index_space":
+            return vs.to_index_space(params["vectors"])
+        if method == "add_bookmark_batch":
+            return vs.add_bookmark_batch(params["bookmarks"])
+        if method == "delete_bookmarks":
+            return [vs.delete_bookmark(bookmark_id) for bookmark_id in params["bookmark_ids"]]
+        if method == "rebuild_index":
+            return vs.rebuild_index()
+        if method == "enable_reduction":
+            return vs.enable_reduction(params.get("mode", "pca"), params.get("target_dim", 256))
+        if method == "find_near_duplicates":
+            return vs.find_near_duplicates(params.get("threshold", 0.95), feed_ids=params.get("feed_ids"),
+                                           existing=params.get("existing"))
+        if method == "check_index_health":
+            return vs.check_index_health()
+        if method == "live_ids":
+            return vs.live_ids()
+        if method == "index_version":
+            return vs.index_version()
+        if method == "cache_stats":
+            return vs.cache_stats()
+        raise ValueError(f"알 수 없는 RPC 메서드: {method}")
+
+    def make_handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def setup(self):
+                super().setup()
+                # 헤더/본문 분할 전송 시 Nagle + delayed ACK로 ~40ms 지연되는 것 방지
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_POST(self):
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                    result = service.handle(request.get("method"), request.get("params") or {})
+                    status, body = 200, {"result": result}
+                except Exception as e:
+                    traceback.print_exc()
+                    status, body = 500, {"error": f"{type(e).__name__}: {e}"}
+                payload = json.dumps(body, ensure_ascii=False, default=_to_json).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass  # 요청마다 로그 출력하지 않음
+
+        return Handler
+
+    def serve(self, host="127.0.0.1", port=8765):
+        server = ThreadingHTTPServer((host, port), self.make_handler())
+        server.daemon_threads = True
+        print(f"벡터 서비스 시작: http://{host}:{port} ({self.vector_store.index.ntotal}개 벡터)")
+        return server
+
+
+class VectorServiceClient:
+    """VectorService에 접속하는 클라이언트 (VectorStore와 같은 인터페이스)
+
+    Streamlit 세션 스레드마다 keep-alive 연결을 하나씩 재사용합니다.
+    """
+
+    def __init__(self, url, timeout=30):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 8765
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _call(self, method, **params):
+        payload = json.dumps({"method": method, "params": params}, ensure_ascii=False, default=_to_json)
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request("POST", "/rpc", body=payload.encode("utf-8"),
+                             headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                body = json.loads(response.read())
+                break
+            except (http.client.HTTPException, ConnectionError, OSError):
+                # 서버가 keep-alive 연결을 닫은 경우 한 번 재연결
+                # (쓰기 요청은 중복 반영될 수 있으므로 재시도하지 않음)
+                conn.close()
+                self._local.conn = None
+                if attempt or method in VectorService.WRITE_METHODS:
+                    raise
+        if "error" in body:
+            raise RuntimeError(f"벡터 서비스 오류 ({method}): {body['error']}")
+        return body["result"]
+
+    def search_bookmarks(self, query, limit=10):
+        return self.search_bookmarks_batch([query], limit)[0]
+
+    def search_bookmarks_batch(self, queries, limit=10):
+        return self._call("search_bookmarks_batch", queries=list(queries), limit=limit)
+
+    def search_by_vector(self, vector, limit=10, transformed=False):
+        return [tuple(item) for item in self._call("search_by_vector", vector=vector, limit=limit, transformed=transformed)]
+
+    def embed_query(self, query):
+        return self.embed_queries([query])[0]
+
+    def embed_queries(self, queries):
+        return self._call("embed_queries", queries=list(queries))
+
+    def embed_documents(self, texts):
+        # 서버 쪽 캡션 임베딩 캐시에 남아 add_bookmark_batch에서 재사용됨
+        return [np.array(v, dtype='float32') for v in self._call("embed_documents", texts=list(texts))]
+
+    def get_vector(self, bookmark_id):
+        vector = self._call("get_vector", bookmark_id=bookmark_id)
+        return np.array(vector, dtype='float32') if vector is not None else None
+
+    def to_index_space(self, vectors):
+        return np.array(self._call("to_index_space", vectors=[list(map(float, v)) for v in vectors]),
+                        dtype='float32').reshape(len(vectors), -1)
+
+    def add_bookmark(self, bookmark):
+        return self.add_bookmark_batch([bookmark])
+
+    def add_bookmark_batch(self, bookmarks):
+        return self._call("add_bookmark_batch", bookmarks=bookmarks)
+
+    def delete_bookmark(self, bookmark_id):
+        return self._call("delete_bookmarks", bookmark_ids=[bookmark_id])[0]
+
+    def rebuild_index(self):
+        return self._call("rebuild_index")
+
+    def enable_reduction(self, mode="pca", target_dim=256):
+        return self._call("enable_reduction", mode=mode, target_dim=target_dim)
+
+    def find_near_duplicates(self, threshold=0.95, feed_ids=None, existing=None):
+        return self._call("find_near_duplicates", threshold=threshold, feed_ids=feed_ids, existing=existing)
+
+    def check_index_health(self):
+        return self._call("check_index_health")
+
+    def live_ids(self):
+        return self._call("live_ids")
+
+    def index_version(self):
+        return self._call("index_version")
+
+    def cache_stats(self):
+        return self._call("cache_stats")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default="./data/bookmarks.db")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    from vector_store import VectorStore
+    service = VectorService(VectorStore(args.db))
+    server = service.serve(args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
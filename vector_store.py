@@ -4,45 +4,142 @@ from pathlib import Path
 import numpy as np
 import faiss
 import sqlite3
-from langchain_openai import AzureOpenAIEmbeddings
 from dotenv import load_dotenv
 import streamlit as st
+import threading
 import traceback
+from utils.cache import LRUCache, normalize_query
+from utils.concurrency import ReadWriteLock
+from agent.llm import get_embeddings
 
 # .env 파일에서 환경 변수 로드
 load_dotenv()
 
-# FAISS 벡터 스토어 초기화
-# 임베딩 설정
-embeddings = AzureOpenAIEmbeddings(
-    model=os.getenv("AOAI_DEPLOY_EMBED_ADA"),
-    openai_api_version="2024-02-01",
-    api_key=os.getenv("AOAI_API_KEY"),
-    azure_endpoint=os.getenv("AOAI_ENDPOINT"),
-)
+class DimensionReducer:
+    """임베딩 차원 축소 (PCA 또는 Matryoshka 방식 truncation)
+
+    - pca: 기존 코퍼스 벡터로 학습한 PCA 행렬을 적용합니다.
+    - truncate: 앞쪽 target_dim 차원만 사용합니다.
+      (text-embedding-3 계열처럼 Matryoshka 학습된 모델에서만 의미가 있음, ada-002는 pca 권장)
+    두 방식 모두 축소 후 L2 정규화하여 내적 = 코사인 유사도가 유지되도록 합니다.
+    """
+    MODES = ("pca", "truncate")
+
+    def __init__(self, mode, input_dim, target_dim):
+        if mode not in self.MODES:
+            raise ValueError(f"지원하지 않는 차원 축소 방식: {mode} (가능: {self.MODES})")
+        if not 0 < target_dim < input_dim:
+            raise ValueError(f"target_dim은 1 이상 {input_dim} 미만이어야 합니다: {target_dim}")
+        self.mode = mode
+        self.input_dim = input_dim
+        self.target_dim = target_dim
+        self.pca = None
+
+    @property
+    def is_trained(self):
+        return self.mode == "truncate" or (self.pca is not None and self.pca.is_trained)
+
+    def fit(self, vectors_np):
+        """코퍼스 벡터로 축소 행렬을 학습합니다. (truncate는 학습 불필요)"""
+        if self.mode == "pca":
+            if len(vectors_np) < self.target_dim:
+                raise ValueError(
+                    f"PCA 학습에는 최소 {self.target_dim}개의 벡터가 필요합니다 (현재 {len(vectors_np)}개)"
+                )
+            self.pca = faiss.PCAMatrix(self.input_dim, self.target_dim, 0, False)
+            self.pca.train(np.ascontiguousarray(vectors_np, dtype='float32'))
+        return self
+
+    def apply(self, vectors_np):
+        """(n, input_dim) 벡터를 (n, target_dim)으로 축소하고 정규화합니다."""
+        vectors_np = np.ascontiguousarray(vectors_np, dtype='float32')
+        if self.mode == "pca":
+            reduced = self.pca.apply(vectors_np)
+        else:
+            reduced = vectors_np[:, :self.target_dim]
+        reduced = np.ascontiguousarray(reduced, dtype='float32')
+        faiss.normalize_L2(reduced)
+        return reduced
+
+    def save(self, config_file, matrix_file):
+        """설정(json)과 PCA 행렬을 인덱스 디렉토리에 저장합니다.
+
+        저장 중 종료되어도 반쯤 쓴 파일이 남지 않도록 임시 파일에 쓴 뒤 교체하며,
+        로드 여부를 정하는 설정 파일을 PCA 행렬 다음에 씁니다.
+        """
+        if self.pca is not None:
+            tmp_file = f"{matrix_file}.tmp"
+            faiss.write_VectorTransform(self.pca, tmp_file)
+            os.replace(tmp_file, matrix_file)
+        tmp_file = f"{config_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({"mode": self.mode, "input_dim": self.input_dim, "target_dim": self.target_dim}, f)
+        os.replace(tmp_file, config_file)
+
+    @classmethod
+    def load(cls, config_file, matrix_file):
+        """저장된 설정과 PCA 행렬을 로드합니다."""
+        with open(config_file, 'r') as f:
+            config = json.load(f)
+        reducer = cls(config["mode"], config["input_dim"], config["target_dim"])
+        if reducer.mode == "pca":
+            reducer.pca = faiss.read_VectorTransform(str(matrix_file))
+        return reducer
+
 
 class VectorStore:
-    """FAISS를 이용한 벡터 검색 클래스"""
-    def __init__(self, db_path):
+    """FAISS를 이용한 벡터 검색 클래스
+
+    Streamlit 세션 스레드들이 인스턴스 하나를 공유합니다.
+    검색은 읽기 잠금으로 동시에 실행되고, 추가/삭제/재구축은 임베딩 생성처럼 오래 걸리는 작업을
+    잠금 밖에서 끝낸 뒤 인덱스와 ID 매핑 변경만 쓰기 잠금 안에서 한 번에 반영합니다.
+    """
+    def __init__(self, db_path, embedding_model=None):
         self.db_path = db_path
-        
-        # Azure OpenAI Embeddings 설정
-        self.embeddings = embeddings
-        
+
+        # Azure OpenAI Embeddings 설정 (embedding_model로 다른 임베딩 객체 주입 가능)
+        # 주입하지 않으면 처음 임베딩할 때 프로세스 전역 클라이언트(get_embeddings)를 사용
+        self._embedding_model = embedding_model
+
         # FAISS 인덱스 생성 또는 로드
         self.index_path = Path(db_path).parent / "faiss_index"
         self.index_path.mkdir(exist_ok=True)
         self.index_file = self.index_path / "bookmark_vectors.index"
         self.mapping_file = self.index_path / "id_mapping.json"
-        
+        # 차원 축소 설정 (enable_reduction()으로 학습된 경우에만 존재)
+        self.reduction_file = self.index_path / "reduction.json"
+        self.pca_file = self.index_path / "pca.matrix"
+
+        # 정규화된 쿼리 -> 임베딩 LRU (Streamlit rerun 시 동일 쿼리 재임베딩 방지)
+        self.query_embedding_cache = LRUCache(maxsize=512)
+        # 캡션 -> 임베딩 LRU (kNN 분류 때 만든 캡션 임베딩을 벡터 저장 시 재사용, 쿼리 캐시와 분리)
+        self.document_embedding_cache = LRUCache(maxsize=int(os.getenv("DOCUMENT_EMBEDDING_CACHE_SIZE", "2048")))
+        # 인덱스가 변경될 때마다 증가 (검색 결과 캐시 무효화용)
+        self.version = 0
+
+        # index / id_to_index / index_to_id / reducer 보호 (검색: read, 변경: write)
+        self._lock = ReadWriteLock()
+        # 쓰기 작업끼리는 임베딩 생성부터 파일 저장까지 순서대로 실행
+        self._write_mutex = threading.Lock()
+
         self._load_or_create_index()
-    
+
+    @property
+    def embeddings(self):
+        return self._embedding_model if self._embedding_model is not None else get_embeddings()
+
     def _load_or_create_index(self):
         """FAISS 인덱스 로드 또는 생성"""
         # 예시 임베딩 생성해서 차원 확인
         sample_vector = self.embeddings.embed_query("sample text")
         self.dimension = len(sample_vector)
-        
+
+        # 차원 축소 설정 로드 (인덱스에는 축소된 벡터가 저장되어 있음)
+        self.reducer = None
+        if self.reduction_file.exists():
+            self.reducer = DimensionReducer.load(self.reduction_file, self.pca_file)
+        self.index_dimension = self.reducer.target_dim if self.reducer else self.dimension
+
         # ID 매핑 로드 또는 생성
         if self.mapping_file.exists():
             with open(self.mapping_file, 'r') as f:
@@ -57,16 +154,135 @@ class VectorStore:
         if self.index_file.exists():
             self.index = faiss.read_index(str(self.index_file))
         else:
-            self.index = faiss.IndexFlatIP(self.dimension)  # 내적 유사도 사용 (코사인 유사도와 동일 효과)
-            
-        # print(f"FAISS 인덱스 준비 완료: {self.index.ntotal} 벡터, {self.dimension} 차원")
-    
+            self.index = faiss.IndexFlatIP(self.index_dimension)  # 내적 유사도 사용 (코사인 유사도와 동일 효과)
+
+        # print(f"FAISS 인덱스 준비 완료: {self.index.ntotal} 벡터, {self.index_dimension} 차원")
+
     def _save_index(self):
-        """FAISS 인덱스와 매핑 저장"""
-        faiss.write_index(self.index, str(self.index_file))
-        with open(self.mapping_file, 'w') as f:
-            json.dump(self.id_to_index, f)
-    
+        """FAISS 인덱스와 매핑 저장 (_write_mutex를 잡은 쓰기 작업에서 호출, 저장 중에도 검색 가능)
+
+        저장 중 종료되어도 이전 파일이 남도록 임시 파일에 쓴 뒤 교체합니다.
+        """
+        with self._lock.read():
+            tmp_file = f"{self.index_file}.tmp"
+            faiss.write_index(self.index, tmp_file)
+            os.replace(tmp_file, self.index_file)
+            tmp_file = f"{self.mapping_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(self.id_to_index, f)
+            os.replace(tmp_file, self.mapping_file)
+
+    def index_version(self):
+        """인덱스 버전 (추가/삭제/재구축/차원 축소 시마다 증가)"""
+        return self.version
+
+    def embed_queries(self, queries):
+        """여러 쿼리 임베딩 (캐시에 없는 쿼리만 embed_documents로 일괄 생성)"""
+        keys = [normalize_query(q) for q in queries]
+        vectors = [self.query_embedding_cache.get(key) for key in keys]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            embedded = self.embeddings.embed_documents([queries[i] for i in missing])
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+                self.query_embedding_cache.put(keys[i], vector)
+        return vectors
+
+    def embed_documents(self, texts):
+        """북마크 캡션 임베딩 (캐시에 없는 캡션만 embed_documents 한 번으로 생성, 쿼리 캐시는 사용하지 않음)"""
+        vectors = [self.document_embedding_cache.get(text) for text in texts]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            embedded = self.embeddings.embed_documents([texts[i] for i in missing])
+            for i, vector in zip(missing, embedded):
+                vectors[i] = np.asarray(vector, dtype='float32')
+                self.document_embedding_cache.put(texts[i], vectors[i])
+        return vectors
+
+    def cache_stats(self):
+        """쿼리 임베딩 캐시 통계"""
+        return self.query_embedding_cache.stats()
+
+    def embed_query(self, query):
+        """쿼리 임베딩 (정규화된 쿼리 기준 LRU 캐시 사용)"""
+        key = normalize_query(query)
+        vector = self.query_embedding_cache.get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(query)
+            self.query_embedding_cache.put(key, vector)
+        return vector
+
+    def _to_index_space(self, vectors_np):
+        """임베딩 벡터를 인덱스에 저장/검색할 형태로 변환 (차원 축소가 켜져 있으면 적용)"""
+        vectors_np = np.ascontiguousarray(vectors_np, dtype='float32')
+        if self.reducer:
+            return self.reducer.apply(vectors_np)
+        return vectors_np
+
+    def to_index_space(self, vectors):
+        """임베딩 벡터 목록을 get_vector()/검색과 같은 공간의 정규화된 벡터 배열로 변환합니다."""
+        if len(vectors) == 0:
+            return np.zeros((0, self.index_dimension), dtype='float32')
+        with self._lock.read():
+            vectors_np = self._to_index_space(np.array(vectors, dtype='float32').reshape(len(vectors), -1))
+        vectors_np = np.array(vectors_np, dtype='float32')
+        faiss.normalize_L2(vectors_np)
+        return vectors_np
+
+    def enable_reduction(self, mode="pca", target_dim=256):
+        """기존 코퍼스로 차원 축소를 학습하고 인덱스를 축소된 벡터로 교체합니다.
+
+        Args:
+            mode: "pca" 또는 "truncate" (Matryoshka 임베딩 모델 전용)
+            target_dim: 축소 후 차원
+
+        Returns:
+            성공 여부
+        """
+        try:
+            with self._write_mutex:
+                if self.reducer:
+                    print("이미 차원 축소가 적용된 인덱스입니다. disable_reduction() 후 다시 시도하세요.")
+                    return False
+
+                # 전체 차원 원본 벡터를 인덱스에서 복원 (재임베딩 불필요)
+                with self._lock.read():
+                    vectors_np = self.index.reconstruct_n(0, self.index.ntotal) if self.index.ntotal else \
+                        np.zeros((0, self.dimension), dtype='float32')
+                    live_positions = np.array(sorted(self.index_to_id.keys()), dtype='int64')
+                # PCA는 매핑이 살아있는 벡터로만 학습 (삭제된 북마크의 잔여 벡터 제외)
+                reducer = DimensionReducer(mode, self.dimension, target_dim).fit(vectors_np[live_positions])
+
+                new_index = faiss.IndexFlatIP(target_dim)
+                if len(vectors_np):
+                    new_index.add(reducer.apply(vectors_np))
+
+                # 인덱스 내 위치는 그대로이므로 ID 매핑은 유지됨
+                with self._lock.write():
+                    self.reducer = reducer
+                    self.index_dimension = target_dim
+                    self.index = new_index
+                    self.version += 1
+                # 축소된 인덱스를 먼저 저장하고 reduction.json을 마지막에 씀
+                self._save_index()
+                reducer.save(self.reduction_file, self.pca_file)
+            print(f"차원 축소 적용 완료: {self.dimension} -> {target_dim} ({mode}, {new_index.ntotal}개 벡터)")
+            return True
+        except Exception as e:
+            print(f"차원 축소 적용 중 오류: {e}")
+            traceback.print_exc()
+            return False
+
+    def disable_reduction(self):
+        """차원 축소를 해제하고 전체 차원으로 인덱스를 재구축합니다. (재임베딩 필요)"""
+        with self._write_mutex:
+            if not self._rebuild(reducer=None):
+                return False
+            for path in (self.reduction_file, self.pca_file):
+                if path.exists():
+                    path.unlink()
+            return True
+
     def add_bookmark(self, bookmark):
         """북마크 벡터 추가"""
         try:
@@ -76,27 +292,28 @@ class VectorStore:
             bookmark_id = bookmark['feed_id']
             text = bookmark['caption']
             
-            # Azure OpenAI API로 벡터 생성
+            # Azure OpenAI API로 벡터 생성 (잠금 밖에서)
             vector = self.embeddings.embed_query(text)
-            vector_np = np.array([vector]).astype('float32')
-            
-            # 북마크 ID가 이미 있는지 확인
-            if bookmark_id in self.id_to_index:
-                # 기존 벡터 삭제
-                old_index = self.id_to_index[bookmark_id]
-                # FAISS는 벡터를 직접 삭제할 수 없어서, 여기서는 업데이트로 처리
-                # 실제 프로덕션에서는 더 복잡한 로직이 필요할 수 있음
-            
-            # 새 벡터 추가
-            self.index.add(vector_np)
-            new_idx = self.index.ntotal - 1
-            
-            # 매핑 업데이트
-            self.id_to_index[bookmark_id] = new_idx
-            self.index_to_id[new_idx] = bookmark_id
-            
-            # 인덱스 저장
-            self._save_index()
+
+            with self._write_mutex:
+                vector_np = self._to_index_space(np.array([vector]).astype('float32'))
+
+                # 새 벡터 추가와 매핑 업데이트를 한 번에 반영
+                with self._lock.write():
+                    # 북마크 ID가 이미 있으면 이전 위치의 역방향 매핑 제거
+                    # (FAISS는 벡터를 직접 삭제할 수 없어 이전 벡터는 rebuild_index() 전까지 남음)
+                    old_idx = self.id_to_index.get(bookmark_id)
+                    if old_idx is not None:
+                        self.index_to_id.pop(old_idx, None)
+
+                    self.index.add(vector_np)
+                    new_idx = self.index.ntotal - 1
+                    self.id_to_index[bookmark_id] = new_idx
+                    self.index_to_id[new_idx] = bookmark_id
+                    self.version += 1
+
+                # 인덱스 저장
+                self._save_index()
             
         except Exception as e:
             print(f"북마크 벡터 추가 중 오류: {e}")
@@ -116,78 +333,78 @@ class VectorStore:
             # 모든 유효 북마크에 대한 임베딩 한번에 생성
             texts = [bookmark['caption'] for bookmark in valid_bookmarks]
             
-            # 임베딩 생성 (텍스트당 하나씩)
+            # 임베딩 생성 (kNN 분류 때 만든 임베딩은 캐시에서 재사용, 나머지는 한 번에)
             vectors = []
+            embedded_bookmarks = []
             try:
+                vectors = self.embed_documents(texts)
+                embedded_bookmarks = list(valid_bookmarks)
+            except Exception as batch_error:
+                # 일괄 임베딩 실패 시 텍스트당 하나씩 다시 시도
+                print(f"임베딩 일괄 생성 중 오류, 개별 생성으로 재시도합니다: {batch_error}")
                 for i, text in enumerate(texts):
                     try:
-                        vector = self.embeddings.embed_query(text)
-                        vectors.append(vector)
+                        vectors.append(self.embed_documents([text])[0])
+                        embedded_bookmarks.append(valid_bookmarks[i])
                     except Exception as embed_error:
                         # 개별 임베딩 오류 처리
                         bookmark_id = valid_bookmarks[i]['feed_id']
                         print(f"북마크 {bookmark_id}의 임베딩 생성 중 오류: {embed_error}")
                         # 해당 북마크만 건너뛰고 계속 진행
                         continue
-            except Exception as batch_error:
-                # 전체 임베딩 프로세스 실패 시
-                error_msg = f"임베딩 생성 중 일괄 오류: {batch_error}"
-                print(error_msg)
-                if 'st' in globals() and hasattr(st, 'error'):
-                    st.error(error_msg)
-                return False
             
             if not vectors:
                 print("생성된 유효한 벡터가 없습니다.")
                 return True
                 
-            # 벡터 배열로 변환
-            vectors_np = np.array(vectors).astype('float32')
-            
-            # 시작 인덱스 저장
-            start_idx = self.index.ntotal
-            
-            # FAISS에 벡터 일괄 추가
-            try:
-                self.index.add(vectors_np)
-            except Exception as faiss_error:
-                error_msg = f"FAISS 인덱스에 벡터 추가 중 오류: {faiss_error}"
-                print(error_msg)
-                if 'st' in globals() and hasattr(st, 'error'):
-                    st.error(error_msg)
-                return False
-            
-            # 매핑 업데이트
-            update_count = 0
-            for i, bookmark in enumerate(valid_bookmarks):
-                if i >= len(vectors):
-                    continue  # 임베딩 생성에 실패한 북마크는 건너뜀
-                    
-                bookmark_id = bookmark['feed_id']
-                new_idx = start_idx + i
-                
-                # 기존 매핑이 있었다면 제거
-                if bookmark_id in self.id_to_index:
-                    old_idx = self.id_to_index[bookmark_id]
-                    if old_idx in self.index_to_id:
-                        del self.index_to_id[old_idx]
-                
-                # 새 매핑 추가
-                self.id_to_index[bookmark_id] = new_idx
-                self.index_to_id[new_idx] = bookmark_id
-                update_count += 1
-            
-            # 인덱스 저장
-            try:
-                self._save_index()
-                print(f"북마크 벡터 {update_count}개를 성공적으로 추가했습니다.")
-                return True
-            except Exception as save_error:
-                error_msg = f"인덱스 저장 중 오류: {save_error}"
-                print(error_msg)
-                if 'st' in globals() and hasattr(st, 'error'):
-                    st.error(error_msg)
-                return False
+            with self._write_mutex:
+                # 벡터 배열로 변환
+                vectors_np = self._to_index_space(np.array(vectors).astype('float32'))
+
+                # 벡터 추가와 매핑 업데이트를 쓰기 잠금 안에서 한 번에 반영 (검색은 그 전/후 상태만 봄)
+                with self._lock.write():
+                    # 시작 인덱스 저장
+                    start_idx = self.index.ntotal
+
+                    # FAISS에 벡터 일괄 추가
+                    try:
+                        self.index.add(vectors_np)
+                    except Exception as faiss_error:
+                        error_msg = f"FAISS 인덱스에 벡터 추가 중 오류: {faiss_error}"
+                        print(error_msg)
+                        if 'st' in globals() and hasattr(st, 'error'):
+                            st.error(error_msg)
+                        return False
+
+                    # 매핑 업데이트 (임베딩에 실패한 북마크는 vectors에 없으므로 embedded_bookmarks 기준)
+                    update_count = 0
+                    for i, bookmark in enumerate(embedded_bookmarks):
+                        bookmark_id = bookmark['feed_id']
+                        new_idx = start_idx + i
+
+                        # 기존 매핑이 있었다면 제거
+                        if bookmark_id in self.id_to_index:
+                            old_idx = self.id_to_index[bookmark_id]
+                            if old_idx in self.index_to_id:
+                                del self.index_to_id[old_idx]
+
+                        # 새 매핑 추가
+                        self.id_to_index[bookmark_id] = new_idx
+                        self.index_to_id[new_idx] = bookmark_id
+                        update_count += 1
+                    self.version += 1
+
+                # 인덱스 저장
+                try:
+                    self._save_index()
+                    print(f"북마크 벡터 {update_count}개를 성공적으로 추가했습니다.")
+                    return True
+                except Exception as save_error:
+                    error_msg = f"인덱스 저장 중 오류: {save_error}"
+                    print(error_msg)
+                    if 'st' in globals() and hasattr(st, 'error'):
+                        st.error(error_msg)
+                    return False
                 
         except Exception as e:
             error_msg = f"북마크 벡터 일괄 추가 중 예상치 못한 오류: {e}"
@@ -197,38 +414,45 @@ class VectorStore:
                 st.error(error_msg)
             return False
 
-    def search_bookmarks(self, query, limit=10):
-        """검색어와 유사한 북마크 찾기"""
+    def search_bookmarks(self, query, limit=10, query_vector=None):
+        """검색어와 유사한 북마크 찾기 (query_vector가 주어지면 임베딩 생략)"""
         try:
             # 북마크가 없으면 빈 리스트 반환
             if self.index.ntotal == 0:
                 print("벡터 인덱스가 비어 있습니다")
                 return []
             
-            # 쿼리 벡터 생성
-            query_vector = self.embeddings.embed_query(query)
-            query_vector_np = np.array([query_vector]).astype('float32')
+            # 쿼리 벡터 생성 (캐시 사용, 잠금 밖에서)
+            if query_vector is None:
+                query_vector = self.embed_query(query)
 
-            # 쿼리 벡터 정규화 (코사인 유사도를 위해)
-            faiss.normalize_L2(query_vector_np)
-            
-            # FAISS로 유사 벡터 검색
-            k = min(limit, self.index.ntotal)  # k는 인덱스 크기를 초과할 수 없음
-            distances, indices = self.index.search(query_vector_np, k)
-            
-            print(f"검색 결과: {len(indices[0])}개 항목 발견, 유사도: {distances[0]}")
-            
-            # 검색 결과에서 북마크 ID 추출
+            # 변환/검색/ID 변환은 같은 인덱스 상태에서 수행 (다른 검색과는 동시에 실행됨)
             bookmark_ids = []
+            similarities = {}
             missing_indices = []
-            for idx in indices[0]:
-                idx_int = int(idx)
-                bookmark_id = self.index_to_id.get(idx_int)
-                if bookmark_id:
-                    bookmark_ids.append(bookmark_id)
-                else:
-                    missing_indices.append(idx_int)
-                    print(f"경고: 인덱스 {idx_int}에 대한 북마크 ID를 찾을 수 없습니다")
+            with self._lock.read():
+                query_vector_np = self._to_index_space(np.array([query_vector]).astype('float32'))
+
+                # 쿼리 벡터 정규화 (코사인 유사도를 위해)
+                faiss.normalize_L2(query_vector_np)
+
+                # FAISS로 유사 벡터 검색
+                k = min(limit, self.index.ntotal)  # k는 인덱스 크기를 초과할 수 없음
+                distances, indices = self.index.search(query_vector_np, k)
+
+                # 검색 결과에서 북마크 ID 추출
+                for idx, distance in zip(indices[0], distances[0]):
+                    idx_int = int(idx)
+                    bookmark_id = self.index_to_id.get(idx_int)
+                    if bookmark_id:
+                        bookmark_ids.append(bookmark_id)
+                        similarities.setdefault(bookmark_id, float(distance))
+                    else:
+                        missing_indices.append(idx_int)
+
+            print(f"검색 결과: {len(indices[0])}개 항목 발견, 유사도: {distances[0]}")
+            for idx_int in missing_indices:
+                print(f"경고: 인덱스 {idx_int}에 대한 북마크 ID를 찾을 수 없습니다")
             
             # 누락된 인덱스가 많을 경우 인덱스 재구축 권장
             if missing_indices and len(missing_indices) > len(indices[0]) / 2:
@@ -244,25 +468,38 @@ class VectorStore:
             try:
                 with sqlite3.connect(self.db_path) as conn:
                     cursor = conn.cursor()
-                    for bookmark_id in bookmark_ids:
-                        cursor.execute("SELECT * FROM bookmarks WHERE feed_id = ?", (bookmark_id,))
-                        result = cursor.fetchone()
-                        if result:
-                            # 컬럼 이름 가져오기
-                            columns = [desc[0] for desc in cursor.description]
+                    # 히트마다 조회하지 않고 IN 쿼리로 한 번에 (SQLite 변수 개수 제한 때문에 나눠서)
+                    rows = {}
+                    unique_ids = list(dict.fromkeys(bookmark_ids))
+                    for i in range(0, len(unique_ids), 500):
+                        chunk = unique_ids[i:i + 500]
+                        cursor.execute(
+                            f"SELECT * FROM bookmarks WHERE feed_id IN ({','.join('?' * len(chunk))})", chunk
+                        )
+                        # 컬럼 이름 가져오기
+                        columns = [desc[0] for desc in cursor.description]
+                        for result in cursor.fetchall():
                             # 딕셔너리로 변환
                             bookmark = dict(zip(columns, result))
-                            
-                            # 해시태그 JSON 파싱
-                            if bookmark.get('hashtags'):
-                                try:
-                                    bookmark['hashtags'] = json.loads(bookmark['hashtags'])
-                                except json.JSONDecodeError:
-                                    bookmark['hashtags'] = []
-                            
-                            bookmarks.append(bookmark)
-                        else:
+                            rows.setdefault(bookmark['feed_id'], bookmark)
+
+                    for bookmark_id in bookmark_ids:
+                        bookmark = rows.get(bookmark_id)
+                        if bookmark is None:
                             print(f"북마크 ID {bookmark_id}를 DB에서 찾을 수 없습니다")
+                            continue
+                        bookmark = dict(bookmark)
+
+                        # 해시태그 JSON 파싱
+                        if bookmark.get('hashtags'):
+                            try:
+                                bookmark['hashtags'] = json.loads(bookmark['hashtags'])
+                            except json.JSONDecodeError:
+                                bookmark['hashtags'] = []
+
+                        # 코사인 유사도 (하이브리드 검색 랭킹에 사용)
+                        bookmark['similarity'] = similarities[bookmark_id]
+                        bookmarks.append(bookmark)
             except sqlite3.Error as db_error:
                 print(f"데이터베이스 오류: {db_error}")
                 
@@ -275,31 +512,90 @@ class VectorStore:
             traceback.print_exc()  # 자세한 오류 추적
             return []
     
+    def search_bookmarks_batch(self, queries, limit=10):
+        """여러 검색어를 한 번에 검색 (캐시에 없는 쿼리는 한 번의 API 호출로 임베딩)"""
+        vectors = self.embed_queries(queries)
+        return [self.search_bookmarks(q, limit, query_vector=v) for q, v in zip(queries, vectors)]
+
+    def get_vector(self, bookmark_id):
+        """저장된 북마크 벡터를 반환합니다. (인덱스 공간, 없으면 None)"""
+        with self._lock.read():
+            idx = self.id_to_index.get(bookmark_id)
+            if idx is None or idx >= self.index.ntotal:
+                return None
+            return self.index.reconstruct(int(idx))
+
+    def live_ids(self):
+        """매핑이 살아있는 북마크 ID를 인덱스 위치 순서로 반환합니다. (삭제된 잔여 벡터 제외)"""
+        with self._lock.read():
+            return [fid for _, fid in sorted(self.index_to_id.items())]
+
+    def search_by_vector(self, vector, limit=10, transformed=False):
+        """벡터로 유사 북마크 ID를 검색합니다. (DB 조회 없음)
+
+        Args:
+            vector: 검색할 벡터
+            limit: 최대 결과 수
+            transformed: 이미 인덱스 공간 벡터인 경우 True (get_vector() 결과 등)
+
+        Returns:
+            유사도 내림차순 (feed_id, 유사도) 목록
+        """
+        with self._lock.read():
+            if self.index.ntotal == 0:
+                return []
+            vector_np = np.array([vector]).astype('float32')
+            if not transformed:
+                vector_np = self._to_index_space(vector_np)
+            faiss.normalize_L2(vector_np)
+
+            k = min(limit, self.index.ntotal)
+            distances, indices = self.index.search(vector_np, k)
+            results = []
+            for idx, distance in zip(indices[0], distances[0]):
+                bookmark_id = self.index_to_id.get(int(idx))
+                if bookmark_id:
+                    results.append((bookmark_id, float(distance)))
+            return results
+
     def delete_bookmark(self, bookmark_id):
         """북마크 벡터 삭제"""
         try:
-            if bookmark_id in self.id_to_index:
+            with self._write_mutex:
                 # FAISS는 직접적인 삭제를 지원하지 않아 인덱스를 재구성해야 함
                 # 실제 구현에서는 더 효율적인 방법을 사용해야 함
                 # 여기서는 ID 매핑에서만 제거하는 간단한 방식 사용
-                idx = self.id_to_index[bookmark_id]
-                del self.id_to_index[bookmark_id]
-                if idx in self.index_to_id:
-                    del self.index_to_id[idx]
-                
+                with self._lock.write():
+                    if bookmark_id not in self.id_to_index:
+                        return False
+                    idx = self.id_to_index.pop(bookmark_id)
+                    self.index_to_id.pop(idx, None)
+                    self.version += 1
+
                 print(f"주의: 북마크 ID {bookmark_id}를 매핑에서 제거했지만, 벡터는 FAISS 인덱스에 남아있습니다.")
                 print("다수의 북마크를 삭제한 경우 rebuild_index()를 호출하는 것이 좋습니다.")
-                
+
                 # 인덱스 저장
                 self._save_index()
                 return True
-            return False
         except Exception as e:
             print(f"북마크 벡터 삭제 중 오류: {e}")
             return False
     
     def rebuild_index(self):
-        """인덱스 완전히 재구축 (대규모 삭제 후 필요할 수 있음)"""
+        """인덱스 완전히 재구축 (대규모 삭제 후 필요할 수 있음)
+
+        새 인덱스는 별도로 만든 뒤 마지막에 교체하므로, 재구축 중에도 기존 인덱스로 검색할 수 있습니다.
+        """
+        with self._write_mutex:
+            return self._rebuild(self.reducer)
+
+    def _rebuild(self, reducer):
+        """DB의 모든 북마크를 다시 임베딩해 새 인덱스를 만들고 교체합니다. (_write_mutex 안에서 호출)
+
+        Args:
+            reducer: 새 인덱스에 적용할 DimensionReducer (None이면 전체 차원)
+        """
         try:
             print("FAISS 인덱스와 ID 매핑을 재구축합니다...")
             # 기존 북마크 데이터 가져오기
@@ -322,10 +618,11 @@ class VectorStore:
                             
                     bookmarks.append(bookmark)
             
-            # 새 인덱스 생성
-            self.index = faiss.IndexFlatIP(self.dimension)  # 내적 유사도 사용
-            self.id_to_index = {}
-            self.index_to_id = {}
+            # 새 인덱스 생성 (교체 전까지 검색은 기존 인덱스 사용)
+            index_dimension = reducer.target_dim if reducer else self.dimension
+            new_index = faiss.IndexFlatIP(index_dimension)  # 내적 유사도 사용
+            id_to_index = {}
+            index_to_id = {}
             
             print(f"총 {len(bookmarks)}개의 북마크에 대해 새 인덱스를 생성합니다...")
             
@@ -336,15 +633,26 @@ class VectorStore:
                     bookmark_id = bookmark['feed_id']
                     vector = self.embeddings.embed_query(bookmark['caption'])
                     vector_np = np.array([vector]).astype('float32')
+                    if reducer:
+                        vector_np = reducer.apply(vector_np)
                     
                     # 새 벡터 추가
-                    self.index.add(vector_np)
-                    new_idx = self.index.ntotal - 1
+                    new_index.add(vector_np)
+                    new_idx = new_index.ntotal - 1
                     
                     # 매핑 업데이트
-                    self.id_to_index[bookmark_id] = new_idx
-                    self.index_to_id[new_idx] = bookmark_id
+                    id_to_index[bookmark_id] = new_idx
+                    index_to_id[new_idx] = bookmark_id
                     added_count += 1
+
+            # 인덱스/매핑/차원 축소 설정을 한 번에 교체
+            with self._lock.write():
+                self.reducer = reducer
+                self.index_dimension = index_dimension
+                self.index = new_index
+                self.id_to_index = id_to_index
+                self.index_to_id = index_to_id
+                self.version += 1
             
             # 인덱스 저장
             self._save_index()
@@ -355,15 +663,170 @@ class VectorStore:
             traceback.print_exc()  # 자세한 오류 추적
             return False
             
+    def find_near_duplicates(self, threshold=0.95, batch_size=512, feed_ids=None, existing=None):
+        """코사인 유사도가 threshold 이상인 북마크 묶음(near-duplicate group)을 찾습니다.
+
+        전체 쌍 비교 대신 FAISS range_search를 배치 단위로 실행하고,
+        찾은 유사 쌍을 union-find로 묶습니다.
+        feed_ids가 주어지면 해당 북마크 벡터만 인덱스 전체에 range_search하고(새로 추가한 북마크),
+        existing(기존 중복 그룹 {feed_id: 대표 feed_id})과 합쳐 바뀐 그룹만 반환합니다.
+
+        Args:
+            threshold: 중복으로 판단할 최소 코사인 유사도
+            batch_size: range_search 한 번에 보낼 쿼리 벡터 수
+            feed_ids: 이 북마크들만 쿼리로 사용 (None이면 전체 재계산)
+            existing: feed_ids와 함께 사용할 기존 중복 그룹 (BookmarkDatabase.get_duplicate_map())
+
+        Returns:
+            중복 그룹 목록. 각 그룹은 {"canonical": 대표 feed_id, "members": {feed_id: 최대 유사도}}
+            형태이며, 대표는 인덱스에 가장 먼저 추가된 북마크입니다. (이번에 비교하지 않은 기존 멤버의 유사도는 0)
+            오류가 나면 None (저장된 그룹을 지우지 않도록 빈 목록과 구분)
+        """
+        try:
+            if feed_ids is not None:
+                return self._find_new_duplicates(feed_ids, existing or {}, threshold, batch_size)
+
+            positions, feed_ids, vectors = self._live_vectors()
+            if len(positions) < 2:
+                return []
+            live_index = faiss.IndexFlatIP(vectors.shape[1])
+            live_index.add(vectors)
+
+            # union-find (배열 기반)
+            parent = np.arange(len(positions))
+            best_similarity = np.zeros(len(positions), dtype='float32')
+
+            def find(x):
+                while parent[x] != x:
+                    parent[x] = parent[parent[x]]
+                    x = parent[x]
+                return x
+
+            for start in range(0, len(positions), batch_size):
+                batch = vectors[start:start + batch_size]
+                lims, distances, labels = live_index.range_search(batch, threshold)
+                query_ids = np.repeat(np.arange(start, start + len(batch)), np.diff(lims).astype("int64"))
+                # 자기 자신 및 (b, a) 중복 쌍 제외
+                mask = labels > query_ids
+                for a, b, similarity in zip(query_ids[mask], labels[mask], distances[mask]):
+                    best_similarity[a] = max(best_similarity[a], similarity)
+                    best_similarity[b] = max(best_similarity[b], similarity)
+                    root_a, root_b = find(a), find(b)
+                    if root_a != root_b:
+                        # 먼저 추가된(작은 위치) 벡터가 루트가 되도록
+                        parent[max(root_a, root_b)] = min(root_a, root_b)
+
+            groups = {}
+            for i in range(len(positions)):
+                groups.setdefault(find(i), []).append(i)
+
+            duplicate_groups = []
+            for root, members in groups.items():
+                if len(members) < 2:
+                    continue
+                duplicate_groups.append({
+                    "canonical": feed_ids[root],
+                    "members": {feed_ids[m]: float(best_similarity[m]) for m in members},
+                })
+            print(f"중복 그룹 {len(duplicate_groups)}개 발견 (임계값 {threshold}, 대상 {len(positions)}개)")
+            return duplicate_groups
+        except Exception as e:
+            print(f"중복 북마크 탐지 중 오류: {e}")
+            traceback.print_exc()
+            return None
+
+    def _live_vectors(self):
+        """매핑이 살아있는 벡터(삭제된 북마크의 잔여 벡터 제외)의 (인덱스 위치 배열, feed_id 목록, 정규화된 벡터 배열)
+
+        저장된 벡터는 차원 축소를 쓰지 않으면 정규화되어 있지 않으므로 코사인 유사도 비교용으로 정규화한 복사본을 만듭니다.
+        벡터와 ID를 같은 시점 상태로 복사해 잠금 밖에서 계산할 수 있게 합니다.
+        """
+        with self._lock.read():
+            positions = np.array(sorted(self.index_to_id.keys()), dtype='int64')
+            feed_ids = [self.index_to_id[int(p)] for p in positions]
+            all_vectors = self.index.reconstruct_n(0, self.index.ntotal) if len(positions) else None
+        if all_vectors is None:
+            return positions, feed_ids, np.zeros((0, self.index_dimension), dtype='float32')
+        vectors = np.ascontiguousarray(all_vectors[positions], dtype='float32')
+        faiss.normalize_L2(vectors)
+        return positions, feed_ids, vectors
+
+    def _find_new_duplicates(self, feed_ids, existing, threshold, batch_size):
+        """find_near_duplicates(feed_ids=...)의 증분 계산 (새 벡터만 쿼리, 기존 그룹과 병합)
+
+        전체 재계산과 같은 결과가 나오도록 살아있는 벡터의 정규화된 복사본에서 range_search합니다.
+        """
+        pairs = []
+        positions, live_ids, vectors = self._live_vectors()
+        row = {fid: i for i, fid in enumerate(live_ids)}
+        query_ids = [fid for fid in dict.fromkeys(feed_ids) if fid in row]
+        if query_ids:
+            live_index = faiss.IndexFlatIP(vectors.shape[1])
+            live_index.add(vectors)
+            # 새 벡터만 쿼리로 사용
+            for start in range(0, len(query_ids), batch_size):
+                chunk = query_ids[start:start + batch_size]
+                batch = vectors[[row[fid] for fid in chunk]]
+                lims, distances, labels = live_index.range_search(batch, threshold)
+                for i, fid in enumerate(chunk):
+                    for label, similarity in zip(labels[lims[i]:lims[i + 1]], distances[lims[i]:lims[i + 1]]):
+                        other = live_ids[int(label)]
+                        if other != fid:
+                            pairs.append((fid, other, float(similarity)))
+        position = dict(zip(live_ids, positions.tolist()))
+
+        # union-find (feed_id 기반, 대표는 인덱스에 먼저 추가된 북마크)
+        parent = {}
+
+        def find(x):
+            parent.setdefault(x, x)
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        def union(a, b):
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                order = lambda fid: (position.get(fid, float("inf")), fid)
+                first, second = sorted([root_a, root_b], key=order)
+                parent[second] = first
+
+        best_similarity = {}
+        for a, b, similarity in pairs:
+            best_similarity[a] = max(best_similarity.get(a, 0.0), similarity)
+            best_similarity[b] = max(best_similarity.get(b, 0.0), similarity)
+            union(a, b)
+
+        # 이번에 닿은 기존 그룹은 멤버 전체를 합쳐 대표를 다시 정함
+        touched = {existing.get(fid, fid) for fid in best_similarity}
+        for member, canonical in existing.items():
+            if canonical in touched:
+                union(member, canonical)
+
+        groups = {}
+        for fid in list(parent):
+            groups.setdefault(find(fid), []).append(fid)
+        duplicate_groups = [
+            {"canonical": root, "members": {m: best_similarity.get(m, 0.0) for m in members}}
+            for root, members in groups.items() if len(members) > 1
+        ]
+        print(f"중복 그룹 {len(duplicate_groups)}개 갱신 (임계값 {threshold}, 새 북마크 {len(query_ids)}개)")
+        return duplicate_groups
+
     def check_index_health(self):
         """인덱스 상태 확인 및 진단"""
         try:
-            total_vectors = self.index.ntotal
-            total_mappings = len(self.id_to_index)
+            with self._lock.read():
+                total_vectors = self.index.ntotal
+                total_mappings = len(self.id_to_index)
+                index_dimension = self.index_dimension
+                reduction = self.reducer.mode if self.reducer else None
             
             print(f"== FAISS 인덱스 상태 ==")
             print(f"벡터 수: {total_vectors}")
             print(f"ID 매핑 수: {total_mappings}")
+            print(f"인덱스 차원: {index_dimension} (원본 {self.dimension})")
             
             # 불일치 확인
             if total_vectors != total_mappings:
@@ -375,7 +838,10 @@ class VectorStore:
             return {
                 "total_vectors": total_vectors,
                 "total_mappings": total_mappings,
-                "is_healthy": total_vectors == total_mappings
+                "is_healthy": total_vectors == total_mappings,
+                "dimension": index_dimension,
+                "reduction": reduction,
+                "memory_bytes": total_vectors * index_dimension * 4
             }
         except Exception as e:
             print(f"인덱스 상태 확인 중 오류: {e}")